@@ -0,0 +1,48 @@
+-- Índices de busca textual de produtos
+-- Usados pela busca híbrida do ProductDataService (full-text em português + trigramas)
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Coluna tsvector gerada a partir das colunas de texto existentes, com pesos:
+-- nome (A), descrição (B), benefícios/ingredientes (C), informações detalhadas (D)
+DO $$
+DECLARE
+    expr TEXT := '';
+    col RECORD;
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'products' AND column_name = 'search_vector'
+    ) THEN
+        RETURN;
+    END IF;
+
+    FOR col IN
+        SELECT c.column_name, w.weight
+        FROM (VALUES
+            ('name', 'A', 1), ('description', 'B', 2), ('benefits', 'C', 3),
+            ('ingredients', 'C', 4), ('detailed_information', 'D', 5)
+        ) AS w(column_name, weight, position)
+        JOIN information_schema.columns c
+            ON c.table_name = 'products' AND c.column_name = w.column_name
+        ORDER BY w.position
+    LOOP
+        IF expr <> '' THEN
+            expr := expr || ' || ';
+        END IF;
+        expr := expr || format(
+            'setweight(to_tsvector(''portuguese'', coalesce(%I, '''')), %L)',
+            col.column_name, col.weight
+        );
+    END LOOP;
+
+    EXECUTE format(
+        'ALTER TABLE products ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (%s) STORED',
+        expr
+    );
+END $$;
+
+CREATE INDEX IF NOT EXISTS idx_products_search_vector ON products USING GIN (search_vector);
+
+-- Fallback por similaridade para consultas com erros de digitação
+CREATE INDEX IF NOT EXISTS idx_products_name_trgm ON products USING GIN (name gin_trgm_ops);
@@ -2,18 +2,31 @@
 Asynchronous processing system for the hub-and-spoke architecture.
 
 This module implements a message queue system for asynchronous processing,
-allowing the system to handle high volumes of messages efficiently.
+allowing the system to handle high volumes of messages efficiently. Tasks are
+stored in Redis Streams consumed through consumer groups, so workers can be
+scaled horizontally across processes and nodes.
 """
 
+import os
 import logging
 import asyncio
 import json
 import time
-from typing import Dict, List, Any, Optional, Callable, Union
+import uuid
+import socket
+import contextvars
+from collections import deque
+from contextlib import asynccontextmanager, nullcontext
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Dict, List, Any, Optional, Callable, Set, Union
 from enum import Enum
 import redis
 from redis import Redis
 
+from src.core.metrics import LatencyHistogram
+from src.core.redis_health import CircuitOpenError, CircuitState, get_redis_breaker
+
 logger = logging.getLogger(__name__)
 
 
@@ -34,14 +47,160 @@ class TaskPriority(Enum):
     URGENT = 3
 
 
+class BlockingCallExecutor:
+    """
+    Bounded executor for running blocking (sync) work from async code.
+    
+    The crews, the Redis/psycopg2 clients they use and the LLM calls are
+    synchronous. Calling them directly from a coroutine stalls the event loop
+    and every other request on the worker. This executor runs them in a
+    dedicated thread pool, and an asyncio semaphore caps how many calls are
+    in flight so excess work waits without piling up in the pool queue.
+    
+    Each call runs in a copy of the caller's context, so context variables
+    (such as an open ConversationContextService.batch_writes block) reach the
+    worker thread.
+    """
+    
+    def __init__(self, max_concurrency: Optional[int] = None, thread_name_prefix: str = "blocking"):
+        """
+        Initialize the executor.
+        
+        Args:
+            max_concurrency: Maximum number of blocking calls running at once
+                (defaults to the CREW_MAX_CONCURRENCY environment variable, or 8)
+            thread_name_prefix: Prefix for the worker thread names
+        """
+        self.max_concurrency = max_concurrency or int(os.getenv("CREW_MAX_CONCURRENCY", "8"))
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency,
+            thread_name_prefix=thread_name_prefix
+        )
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.in_flight = 0
+        self.waiting = 0
+        self.completed = 0
+    
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Run a blocking function without blocking the event loop.
+        
+        Args:
+            func: Synchronous function to run
+            *args: Positional arguments for the function
+            **kwargs: Keyword arguments for the function
+            
+        Returns:
+            Result of the function
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            context = contextvars.copy_context()
+            return await loop.run_in_executor(self._executor, partial(context.run, func, *args, **kwargs))
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self._semaphore.release()
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get executor usage statistics.
+        
+        Returns:
+            In-flight, waiting and completed call counts
+        """
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "completed": self.completed
+        }
+    
+    def shutdown(self, wait: bool = True):
+        """
+        Shut down the underlying thread pool.
+        
+        Args:
+            wait: Whether to wait for running calls to finish
+        """
+        self._executor.shutdown(wait=wait)
+
+
 class AsyncTaskProcessor:
-    """Processor for asynchronous tasks using Redis as a message queue."""
+    """
+    Processor for asynchronous tasks using Redis Streams as a message queue.
+    
+    Each priority has its own stream (lane), consumed through a shared
+    consumer group, so any number of worker processes on any number of nodes
+    can consume the same queue. A delivered entry stays in the group's pending
+    list until the worker acknowledges it; entries left pending by a crashed
+    consumer are reclaimed by the remaining ones after `claim_idle_ms`. While
+    an entry is running (or waiting for a slot), the worker resets its idle
+    time every `heartbeat_interval` with XCLAIM ... JUSTID, so long tasks are
+    not reclaimed and run twice.
+    
+    The worker's Redis round-trips run in a BlockingCallExecutor, never on the
+    event loop.
+    
+    Within a worker, up to `concurrency` tasks run at once. Coroutine handlers
+    run on the event loop, sync handlers in a thread pool and handlers
+    registered with executor="process" in a process pool.
+    
+    Redis keys (relative to `queue_prefix`):
+        stream:<priority>  one stream per TaskPriority, e.g. stream:urgent
+        task:<id>          JSON status record returned by get_task_status
+        delayed            zset of delayed/retried task ids scored by due time
+    """
+    
+    # Moves due tasks from the delayed zset into their lanes in one atomic step,
+    # so that two workers never move the same task and a crash cannot drop a
+    # task between removing it from the zset and adding it to its lane.
+    # KEYS: delayed zset, then the lanes indexed by priority value (KEYS[2 + value]).
+    # ARGV: now, limit, task record key prefix.
+    _MOVE_DUE_SCRIPT = """
+    local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+    local moved = 0
+    for _, id in ipairs(ids) do
+        redis.call('ZREM', KEYS[1], id)
+        local task_json = redis.call('GET', ARGV[3] .. id)
+        if task_json then
+            local ok, task = pcall(cjson.decode, task_json)
+            local priority = ok and tonumber(task['priority']) or nil
+            local lane = (priority and KEYS[2 + priority]) or KEYS[3]
+            redis.call('XADD', lane, '*', 'task', task_json)
+            moved = moved + 1
+        end
+    end
+    return moved
+    """
     
     def __init__(self, 
                  redis_client: Redis,
                  queue_prefix: str = "async_task",
                  max_retries: int = 3,
-                 retry_delay: int = 5):
+                 retry_delay: int = 5,
+                 group_name: Optional[str] = None,
+                 consumer_name: Optional[str] = None,
+                 batch_size: int = 10,
+                 block_ms: int = 1000,
+                 claim_idle_ms: int = 60000,
+                 reclaim_interval: float = 30.0,
+                 max_deliveries: Optional[int] = None,
+                 result_ttl: int = 86400,
+                 concurrency: Optional[int] = None,
+                 process_workers: Optional[int] = None,
+                 drain_timeout: float = 30.0,
+                 heartbeat_interval: Optional[float] = None):
         """
         Initialize the asynchronous task processor.
         
@@ -50,23 +209,119 @@ class AsyncTaskProcessor:
             queue_prefix: Prefix for Redis queue keys
             max_retries: Maximum number of retries for failed tasks
             retry_delay: Delay between retries in seconds
+            group_name: Consumer group shared by all workers of this queue
+            consumer_name: Unique name of this consumer (defaults to host-pid-random)
+            batch_size: Maximum number of entries claimed per read
+            block_ms: How long a read blocks waiting for new entries
+            claim_idle_ms: Idle time after which another consumer's pending
+                entry is considered abandoned and reclaimed
+            reclaim_interval: Seconds between scans for abandoned entries
+            max_deliveries: Deliveries after which a reclaimed entry is failed
+                instead of retried again (defaults to max_retries + 1)
+            result_ttl: Seconds a finished task record is kept for status queries
+            concurrency: Maximum number of tasks running at once in this worker
+                (defaults to the TASK_WORKER_CONCURRENCY environment variable, or 8)
+            process_workers: Size of the process pool for CPU-heavy handlers
+                (defaults to the number of CPUs)
+            drain_timeout: Seconds stop() waits for running tasks before
+                cancelling them (cancelled entries are reclaimed later)
+            heartbeat_interval: Seconds between idle time resets of the
+                entries this worker holds (defaults to a third of claim_idle_ms)
         """
         self.redis = redis_client
+        self.breaker = get_redis_breaker(redis_client)
         self.queue_prefix = queue_prefix
         self.max_retries = max_retries
         self.retry_delay = retry_delay
+        self.group_name = group_name or f"{queue_prefix}:workers"
+        self.consumer_name = consumer_name or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.claim_idle_ms = claim_idle_ms
+        self.reclaim_interval = reclaim_interval
+        self.max_deliveries = max_deliveries or max_retries + 1
+        self.result_ttl = result_ttl
+        self.concurrency = concurrency or int(os.getenv("TASK_WORKER_CONCURRENCY", "8"))
+        self.process_workers = process_workers
+        self.drain_timeout = drain_timeout
+        self.heartbeat_interval = heartbeat_interval or self.claim_idle_ms / 3000
         self.handlers = {}
+        self.handler_executors = {}
         self.running = False
+        
+        # Execution state of this worker
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._active = set()
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._redis_calls: Optional[BlockingCallExecutor] = None
+        self._in_flight: Dict[str, Set[str]] = {}
+        self.processed = 0
+        self.latency: Dict[str, LatencyHistogram] = {}
+        self.queue_wait: Dict[str, LatencyHistogram] = {}
+        
+        # Lanes ordered from highest to lowest priority
+        self.lanes = [
+            self._lane_key(priority)
+            for priority in sorted(TaskPriority, key=lambda p: p.value, reverse=True)
+        ]
+        self._lane_rank = {lane: rank for rank, lane in enumerate(self.lanes)}
+        self._reclaim_cursors = {lane: "0-0" for lane in self.lanes}
+        self._last_reclaim = 0.0
+        self._groups_ready = False
+        self._move_due = redis_client.register_script(self._MOVE_DUE_SCRIPT)
+    
+    def _lane_key(self, priority: Union[TaskPriority, int]) -> str:
+        """Get the stream key of a priority lane."""
+        if not isinstance(priority, TaskPriority):
+            priority = TaskPriority(priority)
+        return f"{self.queue_prefix}:stream:{priority.name.lower()}"
+    
+    def _task_key(self, task_id: str) -> str:
+        """Get the key of a task status record."""
+        return f"{self.queue_prefix}:task:{task_id}"
+    
+    @staticmethod
+    def _normalize_priority(priority: Union[TaskPriority, int, str]) -> int:
+        """Convert a priority given as enum, name or value to its value."""
+        if isinstance(priority, TaskPriority):
+            return priority.value
+        if isinstance(priority, str):
+            try:
+                return TaskPriority[priority.upper()].value
+            except KeyError:
+                return TaskPriority.NORMAL.value
+        try:
+            return TaskPriority(priority).value
+        except ValueError:
+            return TaskPriority.NORMAL.value
     
-    def register_handler(self, task_type: str, handler: Callable):
+    @staticmethod
+    def _to_str(value: Union[str, bytes]) -> str:
+        return value.decode() if isinstance(value, bytes) else value
+    
+    def register_handler(self, task_type: str, handler: Callable, executor: str = "auto"):
         """
         Register a handler for a task type.
         
         Args:
             task_type: Type of task
             handler: Handler function
+            executor: Where the handler runs: "auto" (coroutines on the event
+                loop, sync functions in the thread pool), "thread", or
+                "process" for CPU-heavy handlers (must be a picklable,
+                module-level function)
+            
+        Raises:
+            ValueError: If the executor is unknown or a coroutine handler is
+                registered for a pool
         """
+        if executor not in ("auto", "thread", "process"):
+            raise ValueError(f"Unknown executor: {executor}")
+        if executor != "auto" and asyncio.iscoroutinefunction(handler):
+            raise ValueError("Coroutine handlers run on the event loop, use executor='auto'")
         self.handlers[task_type] = handler
+        self.handler_executors[task_type] = executor
     
     def enqueue_task(self, 
                     task_type: str,
@@ -84,18 +339,13 @@ class AsyncTaskProcessor:
             
         Returns:
             Task ID
+            
+        Raises:
+            CircuitOpenError: If Redis is currently marked as unavailable
         """
         # Generate task ID
-        task_id = f"{int(time.time())}-{task_type}-{id(payload)}"
-        
-        # Normalize priority
-        if isinstance(priority, str):
-            try:
-                priority = TaskPriority[priority].value
-            except KeyError:
-                priority = TaskPriority.NORMAL.value
-        elif isinstance(priority, TaskPriority):
-            priority = priority.value
+        task_id = f"{int(time.time())}-{task_type}-{uuid.uuid4().hex[:12]}"
+        priority = self._normalize_priority(priority)
         
         # Create task
         task = {
@@ -109,19 +359,16 @@ class AsyncTaskProcessor:
             "attempts": 0,
             "last_error": None
         }
+        task_json = json.dumps(task)
         
-        # Store task in Redis
-        self.redis.set(f"{self.queue_prefix}:task:{task_id}", json.dumps(task))
-        
-        # Add to priority queue
-        self.redis.zadd(f"{self.queue_prefix}:queue", {task_id: priority})
-        
-        # Add to delayed queue if needed
+        # Store the status record and queue the task in a single round-trip
+        pipe = self.redis.pipeline()
+        pipe.set(self._task_key(task_id), task_json)
         if delay > 0:
-            self.redis.zadd(f"{self.queue_prefix}:delayed", {task_id: task["process_after"]})
+            pipe.zadd(f"{self.queue_prefix}:delayed", {task_id: task["process_after"]})
         else:
-            # Add to ready queue
-            self.redis.lpush(f"{self.queue_prefix}:ready", task_id)
+            pipe.xadd(self._lane_key(priority), {"task": task_json})
+        self.breaker.call(pipe.execute)
         
         return task_id
     
@@ -135,116 +382,544 @@ class AsyncTaskProcessor:
         Returns:
             Task status
         """
-        task_json = self.redis.get(f"{self.queue_prefix}:task:{task_id}")
+        task_json = self.redis.get(self._task_key(task_id))
         
         if not task_json:
             return {"status": "not_found", "id": task_id}
         
         return json.loads(task_json)
     
+    def get_queue_stats(self) -> Dict[str, Any]:
+        """
+        Get backlog statistics for every priority lane.
+        
+        Returns:
+            Per-lane stream length and pending (delivered, unacknowledged) count,
+            plus the number of delayed tasks
+        """
+        pipe = self.redis.pipeline(transaction=False)
+        for lane in self.lanes:
+            pipe.xlen(lane)
+            pipe.xpending(lane, self.group_name)
+        pipe.zcard(f"{self.queue_prefix}:delayed")
+        results = self.breaker.call(pipe.execute, raise_on_error=False)
+        
+        lanes = {}
+        for index, lane in enumerate(self.lanes):
+            length, pending = results[2 * index], results[2 * index + 1]
+            lanes[lane] = {
+                "length": length if isinstance(length, int) else 0,
+                "pending": pending.get("pending", 0) if isinstance(pending, dict) else 0
+            }
+        return {"lanes": lanes, "delayed": results[-1]}
+    
+    def _ensure_groups(self):
+        """Create the consumer group on every lane (idempotent)."""
+        for lane in self.lanes:
+            try:
+                self.breaker.call(self.redis.xgroup_create, lane, self.group_name, id="0", mkstream=True)
+            except redis.ResponseError as e:
+                # BUSYGROUP: another worker already created it
+                if "BUSYGROUP" not in str(e):
+                    raise
+        self._groups_ready = True
+    
     async def process_tasks(self):
-        """Process tasks from the queue."""
+        """
+        Process tasks from the queue until stop() is called.
+        
+        New entries are only claimed when a concurrency slot is free, and at
+        most one entry per free slot is claimed. On stop, running tasks are
+        given `drain_timeout` seconds to finish.
+        """
         self.running = True
+        self._slots = asyncio.Semaphore(self.concurrency)
+        heartbeat = asyncio.create_task(self._heartbeat_loop())
         
-        while self.running:
-            # Move ready delayed tasks
-            await self._move_delayed_tasks()
-            
-            # Get a task from the ready queue
-            task_id = self.redis.rpop(f"{self.queue_prefix}:ready")
+        try:
+            while self.running:
+                # Redis is down: back off without touching the network, the
+                # health monitor takes care of reconnecting
+                if self.breaker.state == CircuitState.OPEN:
+                    await asyncio.sleep(self.breaker.recovery_timeout)
+                    continue
+                
+                free = await self._acquire_slots()
+                if not free:
+                    continue
+                
+                entries = []
+                try:
+                    if not self._groups_ready:
+                        await self._call_redis(self._ensure_groups)
+                    
+                    await self._call_redis(self._move_delayed_tasks)
+                    
+                    if time.monotonic() - self._last_reclaim >= self.reclaim_interval:
+                        self._last_reclaim = time.monotonic()
+                        entries = await self._call_redis(self._reclaim_abandoned, limit=free)
+                    
+                    if not entries:
+                        # Blocking read in a thread so running tasks keep going
+                        response = await self._call_redis(
+                            self.breaker.call,
+                            self.redis.xreadgroup,
+                            self.group_name,
+                            self.consumer_name,
+                            {lane: ">" for lane in self.lanes},
+                            count=free,
+                            block=self.block_ms
+                        )
+                        entries = self._parse_entries(response)
+                except CircuitOpenError:
+                    pass
+                except redis.ResponseError as e:
+                    if "NOGROUP" in str(e):
+                        # Stream or group deleted under us: recreate on next loop
+                        self._groups_ready = False
+                    else:
+                        logger.error(f"Error reading task queue: {e}")
+                        await asyncio.sleep(1)
+                except Exception as e:
+                    logger.error(f"Error reading task queue: {e}")
+                    await asyncio.sleep(1)
+                
+                await self._start_batch(entries, reserved=free)
+        finally:
+            await self._drain()
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+            if self._redis_calls is not None:
+                self._redis_calls.shutdown(wait=False)
+                self._redis_calls = None
+    
+    async def _call_redis(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Run a blocking Redis call (or a method made of them) off the event loop.
+        
+        Args:
+            func: Synchronous function to run
+            *args: Positional arguments for the function
+            **kwargs: Keyword arguments for the function
             
-            if not task_id:
-                # No tasks, wait a bit
-                await asyncio.sleep(0.1)
+        Returns:
+            Result of the function
+        """
+        if self._redis_calls is None:
+            # One thread for the blocking read, one for the heartbeat, one per running task
+            self._redis_calls = BlockingCallExecutor(
+                max_concurrency=self.concurrency + 2,
+                thread_name_prefix=f"{self.queue_prefix}-redis"
+            )
+        return await self._redis_calls.run(func, *args, **kwargs)
+    
+    async def _heartbeat_loop(self):
+        """Periodically reset the idle time of the entries held by this worker."""
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            held = {lane: list(ids) for lane, ids in self._in_flight.items() if ids}
+            if not held:
                 continue
+            try:
+                await self._call_redis(self._renew_leases, held)
+            except Exception as e:
+                logger.warning(f"Could not renew pending entries: {e}")
+    
+    def _renew_leases(self, held: Dict[str, List[str]]):
+        """
+        Reset the idle time of pending entries, keeping them on this consumer.
+        
+        XCLAIM with JUSTID does not count as a delivery, and ids that were
+        acknowledged in the meantime are ignored by Redis.
+        
+        Args:
+            held: Entry ids per lane
+        """
+        pipe = self.redis.pipeline(transaction=False)
+        for lane, entry_ids in held.items():
+            pipe.xclaim(lane, self.group_name, self.consumer_name,
+                        min_idle_time=0, message_ids=entry_ids, justid=True)
+        self.breaker.call(pipe.execute)
+    
+    async def _acquire_slots(self) -> int:
+        """
+        Wait for at least one free concurrency slot and take up to batch_size.
+        
+        Returns:
+            Number of slots acquired (0 if none became free within block_ms)
+        """
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.block_ms / 1000)
+        except asyncio.TimeoutError:
+            return 0
+        
+        free = 1
+        while free < self.batch_size and not self._slots.locked():
+            await self._slots.acquire()
+            free += 1
+        return free
+    
+    async def _drain(self):
+        """Wait for running tasks to finish, cancelling them after drain_timeout."""
+        if self._active:
+            logger.info(f"Draining {len(self._active)} running task(s)")
+            done, pending = await asyncio.wait(set(self._active), timeout=self.drain_timeout)
+            for task in pending:
+                task.cancel()
+            if pending:
+                # Their entries stay pending in the group and are reclaimed later
+                logger.warning(f"Cancelled {len(pending)} task(s) still running after {self.drain_timeout}s")
+                await asyncio.gather(*pending, return_exceptions=True)
+        
+        for pool in (self._thread_pool, self._process_pool):
+            if pool is not None:
+                pool.shutdown(wait=False)
+        self._thread_pool = None
+        self._process_pool = None
+    
+    def _parse_entries(self, response: Any) -> List[Dict[str, Any]]:
+        """
+        Convert an XREADGROUP/XAUTOCLAIM reply into task entries.
+        
+        Entries are returned ordered by lane priority (highest first), keeping
+        the stream order within a lane.
+        
+        Args:
+            response: Reply as [[stream, [(entry_id, fields), ...]], ...] or
+                {stream: [[(entry_id, fields), ...]]} (RESP3)
             
-            # Get task details
-            task_json = self.redis.get(f"{self.queue_prefix}:task:{task_id}")
-            
-            if not task_json:
-                # Task not found, skip
+        Returns:
+            List of {"lane", "entry_id", "task"} dicts
+        """
+        if not response:
+            return []
+        
+        if isinstance(response, dict):
+            streams = [(lane, messages[0] if messages and isinstance(messages[0], list) else messages)
+                       for lane, messages in response.items()]
+        else:
+            streams = response
+        
+        entries = []
+        for lane, messages in streams:
+            lane = self._to_str(lane)
+            for entry_id, fields in messages:
+                entries.append(self._build_entry(lane, entry_id, fields))
+        
+        entries.sort(key=lambda entry: self._lane_rank.get(entry["lane"], len(self.lanes)))
+        return entries
+    
+    def _build_entry(self, lane: str, entry_id: Union[str, bytes], fields: Optional[Dict]) -> Dict[str, Any]:
+        """Decode a single stream entry; a missing or corrupt payload yields task None."""
+        task = None
+        if fields:
+            raw = fields.get("task", fields.get(b"task"))
+            try:
+                task = json.loads(raw) if raw is not None else None
+            except (TypeError, ValueError):
+                logger.error(f"Discarding corrupt task entry {entry_id!r} from {lane}")
+        return {"lane": lane, "entry_id": self._to_str(entry_id), "task": task}
+    
+    def _reclaim_abandoned(self, limit: int) -> List[Dict[str, Any]]:
+        """
+        Claim entries left pending by consumers that died or stalled.
+        
+        Entries that were already delivered `max_deliveries` times are failed
+        and acknowledged instead of being handed out again, so a task that
+        crashes its worker cannot take down the whole fleet.
+        
+        Args:
+            limit: Maximum number of entries to claim
+        
+        Returns:
+            Reclaimed entries to process
+        """
+        entries = []
+        for lane in self.lanes:
+            if len(entries) >= limit:
+                break
+            reply = self.breaker.call(
+                self.redis.xautoclaim,
+                lane,
+                self.group_name,
+                self.consumer_name,
+                min_idle_time=self.claim_idle_ms,
+                start_id=self._reclaim_cursors[lane],
+                count=limit - len(entries)
+            )
+            if not reply:
                 continue
-            
-            task = json.loads(task_json)
-            
-            # Update status
+            self._reclaim_cursors[lane] = self._to_str(reply[0])
+            entries.extend(self._build_entry(lane, entry_id, fields) for entry_id, fields in reply[1])
+        
+        if not entries:
+            return []
+        
+        # Delivery counts of the claimed entries, in one round-trip
+        pipe = self.redis.pipeline(transaction=False)
+        for entry in entries:
+            pipe.xpending_range(entry["lane"], self.group_name, entry["entry_id"], entry["entry_id"], 1)
+        pending = self.breaker.call(pipe.execute)
+        
+        runnable = []
+        for entry, info in zip(entries, pending):
+            deliveries = info[0]["times_delivered"] if info else 0
+            if entry["task"] is not None and deliveries > self.max_deliveries:
+                task = entry["task"]
+                logger.error(f"Task {task['id']} abandoned after {deliveries} deliveries, marking as failed")
+                task["status"] = TaskStatus.FAILED.value
+                task["last_error"] = f"Abandoned after {deliveries} deliveries"
+                self._finalize(entry, task)
+            else:
+                runnable.append(entry)
+        
+        logger.info(f"Reclaimed {len(runnable)} abandoned task(s)")
+        runnable.sort(key=lambda entry: self._lane_rank[entry["lane"]])
+        return runnable
+    
+    async def _start_batch(self, entries: List[Dict[str, Any]], reserved: int):
+        """
+        Start a batch of claimed entries, one concurrency slot each.
+        
+        COUNT applies per stream, so a read across several lanes can return
+        more entries than slots were reserved; the extra entries wait for a
+        slot (in priority order) instead of being dropped.
+        
+        Args:
+            entries: Entries returned by _parse_entries/_reclaim_abandoned,
+                highest priority first
+            reserved: Number of slots already acquired for this batch
+        """
+        valid = [entry for entry in entries if entry["task"] is not None]
+        
+        # Give back the slots that did not get an entry
+        for _ in range(reserved - len(valid)):
+            self._slots.release()
+        
+        # Entries whose payload is gone (deleted or corrupt) are just acknowledged
+        for entry in entries:
+            if entry["task"] is None:
+                await self._call_redis(self._ack, entry)
+        if not valid:
+            return
+        
+        # Held from now on, including while waiting for a slot
+        for entry in valid:
+            self._in_flight.setdefault(entry["lane"], set()).add(entry["entry_id"])
+        
+        # Mark the whole batch as processing in one round-trip
+        started_at = time.time()
+        pipe = self.redis.pipeline(transaction=False)
+        for entry in valid:
+            task = entry["task"]
             task["status"] = TaskStatus.PROCESSING.value
-            task["started_at"] = time.time()
-            self.redis.set(f"{self.queue_prefix}:task:{task_id}", json.dumps(task))
+            task["started_at"] = started_at
+            pipe.set(self._task_key(task["id"]), json.dumps(task))
             
-            # Process the task
-            try:
-                handler = self.handlers.get(task["type"])
-                
-                if not handler:
-                    logger.warning(f"No handler for task type: {task['type']}")
-                    task["status"] = TaskStatus.FAILED.value
-                    task["last_error"] = "No handler registered for this task type"
-                else:
-                    result = await self._call_handler(handler, task["payload"])
-                    task["status"] = TaskStatus.COMPLETED.value
-                    task["result"] = result
-                    task["completed_at"] = time.time()
+            ready_at = max(task.get("created_at", started_at), task.get("process_after", started_at))
+            self._histogram(self.queue_wait, task["type"]).observe(started_at - ready_at)
+        try:
+            await self._call_redis(self.breaker.call, pipe.execute)
+        except Exception as e:
+            logger.warning(f"Could not update task status for batch: {e}")
+        
+        for index, entry in enumerate(valid):
+            worker = asyncio.create_task(self._process_entry(entry, has_slot=index < reserved))
+            self._active.add(worker)
+            worker.add_done_callback(self._active.discard)
+    
+    async def _process_entry(self, entry: Dict[str, Any], has_slot: bool = True):
+        """Run one entry, store its outcome and free its concurrency slot."""
+        if not has_slot:
+            await self._slots.acquire()
+        task = entry["task"]
+        started = time.monotonic()
+        try:
+            task = await self._run_task(task)
+            await self._call_redis(self._finalize, entry, task)
+        finally:
+            self._in_flight.get(entry["lane"], set()).discard(entry["entry_id"])
+            self._histogram(self.latency, task["type"]).observe(time.monotonic() - started)
+            self.processed += 1
+            self._slots.release()
+    
+    @asynccontextmanager
+    async def released_slot(self):
+        """
+        Give the concurrency slot of the running task back while it waits.
+        
+        Meant for handlers that wait on something other than their own work,
+        such as a KeyedTaskScheduler lane busy with an earlier item of the same
+        key: the slot is free for other tasks meanwhile, and the handler
+        acquires the yielded semaphore only around the actual work. The slot is
+        taken back before the block exits.
+        
+        Yields:
+            The worker's concurrency semaphore
+        """
+        self._slots.release()
+        try:
+            yield self._slots
+        finally:
+            # Shielded, so that a cancelled wait still leaves the slot count balanced
+            await asyncio.shield(self._slots.acquire())
+    
+    @staticmethod
+    def _histogram(histograms: Dict[str, LatencyHistogram], task_type: str) -> LatencyHistogram:
+        """Get (or create) the histogram of a task type."""
+        histogram = histograms.get(task_type)
+        if histogram is None:
+            histogram = histograms.setdefault(task_type, LatencyHistogram())
+        return histogram
+    
+    def get_worker_stats(self) -> Dict[str, Any]:
+        """
+        Get execution statistics of this worker.
+        
+        Returns:
+            Concurrency usage, processed count and, per task type, handler
+            latency and queue wait histograms (in seconds)
+        """
+        task_types = sorted(set(self.latency) | set(self.queue_wait))
+        return {
+            "consumer": self.consumer_name,
+            "concurrency": self.concurrency,
+            "in_flight": len(self._active),
+            "processed": self.processed,
+            "task_types": {
+                task_type: {
+                    "latency": self._histogram(self.latency, task_type).snapshot(),
+                    "queue_wait": self._histogram(self.queue_wait, task_type).snapshot()
+                }
+                for task_type in task_types
+            }
+        }
+    
+    async def _run_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run the handler of a task and update the task with the outcome.
+        
+        Args:
+            task: Task being processed
             
-            except Exception as e:
-                logger.error(f"Error processing task {task_id}: {e}")
+        Returns:
+            The updated task
+        """
+        try:
+            handler = self.handlers.get(task["type"])
+            
+            if not handler:
+                logger.warning(f"No handler for task type: {task['type']}")
                 task["status"] = TaskStatus.FAILED.value
-                task["last_error"] = str(e)
-                
-                # Retry if not exceeded max retries
-                if task["attempts"] < self.max_retries:
-                    task["status"] = TaskStatus.RETRY.value
-                    task["attempts"] += 1
-                    task["process_after"] = time.time() + self.retry_delay * task["attempts"]
-                    
-                    # Add to delayed queue
-                    self.redis.zadd(f"{self.queue_prefix}:delayed", {task_id: task["process_after"]})
+                task["last_error"] = "No handler registered for this task type"
+            else:
+                result = await self._call_handler(
+                    handler, task["payload"], self.handler_executors.get(task["type"], "auto")
+                )
+                task["status"] = TaskStatus.COMPLETED.value
+                task["result"] = result
+                task["completed_at"] = time.time()
+        
+        except Exception as e:
+            logger.error(f"Error processing task {task['id']}: {e}")
+            task["status"] = TaskStatus.FAILED.value
+            task["last_error"] = str(e)
             
-            # Update task in Redis
-            self.redis.set(f"{self.queue_prefix}:task:{task_id}", json.dumps(task))
-    
-    async def _move_delayed_tasks(self):
-        """Move delayed tasks that are ready to the ready queue."""
-        now = time.time()
-        
-        # Get tasks that are ready
-        ready_tasks = self.redis.zrangebyscore(
-            f"{self.queue_prefix}:delayed",
-            0,
-            now
-        )
+            # Retry if not exceeded max retries
+            if task["attempts"] < self.max_retries:
+                task["status"] = TaskStatus.RETRY.value
+                task["attempts"] += 1
+                task["process_after"] = time.time() + self.retry_delay * task["attempts"]
         
-        if not ready_tasks:
-            return
+        return task
+    
+    def _finalize(self, entry: Dict[str, Any], task: Dict[str, Any]):
+        """
+        Store the outcome of a task and acknowledge its entry in one round-trip.
         
-        # Remove from delayed queue
-        self.redis.zremrangebyscore(
-            f"{self.queue_prefix}:delayed",
-            0,
-            now
-        )
+        Retried tasks go to the delayed zset and get a fresh entry when due.
         
-        # Add to ready queue
-        self.redis.lpush(f"{self.queue_prefix}:ready", *ready_tasks)
+        Args:
+            entry: Stream entry that delivered the task
+            task: Updated task
+        """
+        pipe = self.redis.pipeline()
+        if task["status"] == TaskStatus.RETRY.value:
+            pipe.set(self._task_key(task["id"]), json.dumps(task))
+            pipe.zadd(f"{self.queue_prefix}:delayed", {task["id"]: task["process_after"]})
+        else:
+            pipe.set(self._task_key(task["id"]), json.dumps(task, default=str), ex=self.result_ttl)
+        pipe.xack(entry["lane"], self.group_name, entry["entry_id"])
+        pipe.xdel(entry["lane"], entry["entry_id"])
+        try:
+            self.breaker.call(pipe.execute)
+        except Exception as e:
+            # Not acknowledged: the entry stays pending and is reclaimed later
+            logger.error(f"Error storing result of task {task['id']}: {e}")
+    
+    def _ack(self, entry: Dict[str, Any]):
+        """Acknowledge and delete an entry without touching its task record."""
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.xack(entry["lane"], self.group_name, entry["entry_id"])
+        pipe.xdel(entry["lane"], entry["entry_id"])
+        try:
+            self.breaker.call(pipe.execute)
+        except Exception as e:
+            logger.error(f"Error acknowledging entry {entry['entry_id']}: {e}")
     
-    async def _call_handler(self, handler: Callable, payload: Dict[str, Any]) -> Any:
+    def _move_delayed_tasks(self) -> int:
+        """
+        Move delayed tasks that are due into their priority lanes.
+        
+        Tasks whose record expired or was deleted are dropped. The record keeps
+        its status (pending or retry) until a worker marks it as processing.
+        
+        Returns:
+            Number of tasks moved
+        """
+        lanes = [self._lane_key(priority) for priority in sorted(TaskPriority, key=lambda p: p.value)]
+        return self.breaker.call(
+            self._move_due,
+            keys=[f"{self.queue_prefix}:delayed", *lanes],
+            args=[time.time(), self.batch_size * 10, self._task_key("")]
+        )
+    
+    async def _call_handler(self, handler: Callable, payload: Dict[str, Any],
+                            executor: str = "auto") -> Any:
         """
         Call a handler function.
         
         Args:
             handler: Handler function
             payload: Task payload
+            executor: Executor the handler was registered with
             
         Returns:
             Result of the handler
         """
         if asyncio.iscoroutinefunction(handler):
             return await handler(payload)
-        else:
-            return handler(payload)
+        
+        loop = asyncio.get_running_loop()
+        if executor == "process":
+            if self._process_pool is None:
+                self._process_pool = ProcessPoolExecutor(max_workers=self.process_workers)
+            return await loop.run_in_executor(self._process_pool, handler, payload)
+        
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(
+                max_workers=self.concurrency,
+                thread_name_prefix=f"{self.queue_prefix}-task"
+            )
+        return await loop.run_in_executor(self._thread_pool, handler, payload)
     
     def stop(self):
-        """Stop processing tasks."""
+        """
+        Stop processing tasks.
+        
+        No new entries are claimed (the current read returns within block_ms);
+        running tasks are drained before process_tasks returns.
+        """
         self.running = False
 
 
@@ -299,6 +974,144 @@ class NotificationSystem:
                 self.subscribers.pop(task_id, None)
 
 
+class KeyedTaskScheduler:
+    """
+    Scheduler that serializes work per key while running different keys in parallel.
+    
+    Used with the conversation id as key, messages of the same Chatwoot
+    conversation are handled strictly in submission order (no races on the
+    conversation context and variables), while other conversations are not
+    held back. Each key with pending work gets its own lane; lanes are created
+    on demand and dropped once drained, so idle conversations cost nothing.
+    
+    With a positive `coalesce_window`, items that arrive for a key within the
+    window (or while the previous batch of that key is running) are handed to
+    the handler together, so a burst of short messages from a customer can be
+    answered by a single crew invocation.
+    
+    Ordering is guaranteed within one scheduler (one worker process) only:
+    with several worker processes on the same queue, items of one key may be
+    consumed by different processes and run concurrently.
+    
+    Items waiting behind their key should not hold a worker concurrency slot;
+    pass the worker's semaphore as `limiter` (see
+    AsyncTaskProcessor.released_slot) so that a slot is only taken while the
+    batch actually runs.
+    """
+    
+    def __init__(self,
+                 handler: Callable[[str, List[Any]], Any],
+                 coalesce_window: float = 0.0,
+                 max_batch_size: int = 10):
+        """
+        Initialize the scheduler.
+        
+        Args:
+            handler: Function called as handler(key, items) with the items of a
+                batch, in submission order. Coroutine functions are awaited,
+                sync functions run in a thread.
+            coalesce_window: Seconds to wait for more items of the same key
+                before calling the handler (0 disables coalescing, every item
+                is handled alone)
+            max_batch_size: Maximum number of items coalesced into one call
+        """
+        self.handler = handler
+        self.coalesce_window = coalesce_window
+        self.max_batch_size = max_batch_size if coalesce_window > 0 else 1
+        self._lanes: Dict[str, Any] = {}
+        self._workers = set()
+        self.batches = 0
+        self.coalesced_items = 0
+    
+    async def submit(self, key: Any, item: Any, limiter: Optional[asyncio.Semaphore] = None) -> Any:
+        """
+        Schedule an item and wait until the batch containing it was handled.
+        
+        Args:
+            key: Serialization key (e.g. conversation id)
+            item: Item passed to the handler
+            limiter: Semaphore acquired while the batch containing the item runs
+            
+        Returns:
+            Result of the handler call for the batch that included the item
+            
+        Raises:
+            Exception: Whatever the handler raised for that batch
+        """
+        key = str(key)
+        future = asyncio.get_running_loop().create_future()
+        lane = self._lanes.get(key)
+        if lane is None:
+            lane = self._lanes[key] = deque()
+            worker = asyncio.create_task(self._run_lane(key, lane))
+            self._workers.add(worker)
+            worker.add_done_callback(self._workers.discard)
+        lane.append((item, future, limiter))
+        return await future
+    
+    async def _run_lane(self, key: str, lane: deque):
+        """Handle the items of a key, one batch at a time, until none are left."""
+        try:
+            while lane:
+                if self.coalesce_window > 0 and len(lane) < self.max_batch_size:
+                    await asyncio.sleep(self.coalesce_window)
+                
+                batch = []
+                limiter = None
+                while lane and len(batch) < self.max_batch_size:
+                    item, future, item_limiter = lane.popleft()
+                    # Callers that gave up (cancelled) are skipped
+                    if not future.done():
+                        batch.append((item, future))
+                        limiter = limiter or item_limiter
+                if not batch:
+                    continue
+                
+                self.batches += 1
+                if len(batch) > 1:
+                    self.coalesced_items += len(batch)
+                
+                try:
+                    items = [item for item, _ in batch]
+                    async with limiter or nullcontext():
+                        if asyncio.iscoroutinefunction(self.handler):
+                            result = await self.handler(key, items)
+                        else:
+                            result = await asyncio.to_thread(self.handler, key, items)
+                except Exception as e:
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                else:
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_result(result)
+        finally:
+            # No await between the last emptiness check and this point, so no
+            # item can be appended to a lane that is being dropped
+            self._lanes.pop(key, None)
+            for _, future, _ in lane:
+                future.cancel()
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get scheduler statistics.
+        
+        Returns:
+            Active keys, queued items, handler calls and coalesced item counts
+        """
+        return {
+            "active_keys": len(self._lanes),
+            "queued_items": sum(len(lane) for lane in self._lanes.values()),
+            "batches": self.batches,
+            "coalesced_items": self.coalesced_items
+        }
+
+
+# Task type used for raw Chatwoot webhook events acknowledged by the web server
+WEBHOOK_TASK_TYPE = "chatwoot_webhook"
+
+
 class MessageQueue:
     """Queue for processing messages asynchronously."""
     
@@ -340,6 +1153,53 @@ class MessageQueue:
             priority=priority
         )
     
+    def enqueue_webhook_event(self,
+                              event: Dict[str, Any],
+                              idempotency_key: Optional[str] = None,
+                              idempotency_ttl: int = 86400,
+                              priority: Union[TaskPriority, int, str] = TaskPriority.NORMAL) -> Optional[str]:
+        """
+        Persist a raw webhook event for processing by the worker processes.
+        
+        Chatwoot retries deliveries that are not acknowledged quickly enough.
+        When an idempotency key (e.g. the Chatwoot message id) is given, a
+        delivery whose key was already seen within `idempotency_ttl` seconds
+        is dropped.
+        
+        Args:
+            event: Webhook payload as received from Chatwoot
+            idempotency_key: Key identifying the delivery (optional)
+            idempotency_ttl: How long a key is remembered, in seconds
+            priority: Priority of the task
+            
+        Returns:
+            Task ID, or None if the event is a duplicate delivery
+        """
+        marker = None
+        if idempotency_key:
+            marker = f"{self.processor.queue_prefix}:idempotency:{idempotency_key}"
+            is_new = self.processor.breaker.call(
+                self.processor.redis.set, marker, "1", nx=True, ex=idempotency_ttl
+            )
+            if not is_new:
+                logger.info(f"Duplicate webhook delivery dropped: {idempotency_key}")
+                return None
+        
+        try:
+            return self.processor.enqueue_task(
+                task_type=WEBHOOK_TASK_TYPE,
+                payload={"event": event},
+                priority=priority
+            )
+        except Exception:
+            # Not persisted: release the key so Chatwoot's retry is accepted
+            if marker:
+                try:
+                    self.processor.redis.delete(marker)
+                except Exception as e:
+                    logger.error(f"Error releasing idempotency key {idempotency_key}: {e}")
+            raise
+    
     async def _process_message_handler(self, payload: Dict[str, Any]) -> Dict[str, Any]:
         """
         Handler for processing messages.
@@ -3,5 +3,8 @@ Módulo de cache para o sistema ChatwootAI.
 """
 
 from src.core.cache.agent_cache import RedisAgentCache
+from src.core.cache.local_cache import LocalCache
+from src.core.cache.search_cache import SearchResultCache
+from src.core.cache.route_cache import SemanticRouteCache
 
-__all__ = ["RedisAgentCache"]
+__all__ = ["RedisAgentCache", "LocalCache", "SearchResultCache", "SemanticRouteCache"]
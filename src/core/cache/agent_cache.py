@@ -6,13 +6,87 @@ na versão atual.
 """
 
 import json
+import hashlib
 import logging
-from typing import Any, Dict, Optional
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional
 
 import redis
 
+from src.core.redis_health import CircuitOpenError, get_redis_breaker
+
 logger = logging.getLogger(__name__)
 
+# Versão do formato das chaves; incrementar invalida todas as entradas antigas
+CACHE_KEY_VERSION = "v2"
+
+# Campos que mudam a cada mensagem e não influenciam a decisão do agente.
+# Nomes simples valem apenas para o nível superior; caminhos com ponto
+# ("message.id") alcançam campos aninhados. Ids de outras entidades aninhadas
+# (produtos, pedidos) fazem parte do conteúdo e não são removidos.
+DEFAULT_VOLATILE_FIELDS = frozenset({
+    "message_id", "timestamp", "created_at", "updated_at", "received_at",
+    "message.id", "message.message_id", "message.timestamp", "message.created_at",
+    "message.updated_at", "message.received_at"
+})
+
+
+def _strip_path(data: Any, path: List[str]) -> Any:
+    """Remove o campo indicado por um caminho (listas aplicam o caminho a cada item)."""
+    if isinstance(data, (list, tuple)):
+        return [_strip_path(item, path) for item in data]
+    if not isinstance(data, dict) or path[0] not in data:
+        return data
+    if len(path) == 1:
+        return {key: value for key, value in data.items() if key != path[0]}
+    return {**data, path[0]: _strip_path(data[path[0]], path[1:])}
+
+
+def _strip_volatile(data: Any, volatile_fields: frozenset) -> Any:
+    """
+    Remove campos voláteis de uma estrutura de dados.
+    
+    Args:
+        data: Estrutura (dict/list/valor) a normalizar.
+        volatile_fields: Campos a descartar: nomes do nível superior ou
+            caminhos separados por ponto para campos aninhados.
+        
+    Returns:
+        Estrutura sem os campos voláteis.
+    """
+    for field in sorted(volatile_fields):
+        data = _strip_path(data, field.split("."))
+    return data
+
+
+def stable_hash(input_data: Any, volatile_fields: Iterable[str] = DEFAULT_VOLATILE_FIELDS) -> str:
+    """
+    Gera um hash de conteúdo estável entre processos e reinicializações.
+    
+    Diferente de `hash()`, que é aleatorizado por interpretador (PYTHONHASHSEED),
+    este hash usa BLAKE2b sobre o JSON canônico (chaves ordenadas) dos dados,
+    após remover os campos voláteis.
+    
+    Args:
+        input_data: Dados de entrada (string JSON ou objeto serializável).
+        volatile_fields: Campos ignorados no cálculo do hash.
+        
+    Returns:
+        Digest hexadecimal de 32 caracteres.
+    """
+    data = input_data
+    if isinstance(input_data, (str, bytes)):
+        try:
+            data = json.loads(input_data)
+        except (ValueError, TypeError):
+            data = input_data.decode("utf-8") if isinstance(input_data, bytes) else input_data
+    
+    data = _strip_volatile(data, frozenset(volatile_fields))
+    canonical = json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+
 class RedisAgentCache:
     """
     Cache para agentes usando Redis.
@@ -22,7 +96,8 @@ class RedisAgentCache:
     """
     
     def __init__(self, redis_client: Optional[redis.Redis] = None, 
-                 prefix: str = "agent_cache:", ttl: int = 3600):
+                 prefix: str = "agent_cache:", ttl: int = 3600,
+                 volatile_fields: Iterable[str] = DEFAULT_VOLATILE_FIELDS):
         """
         Inicializa o cache de agentes.
         
@@ -30,6 +105,7 @@ class RedisAgentCache:
             redis_client: Cliente Redis a ser usado. Se None, um novo cliente será criado.
             prefix: Prefixo para as chaves no Redis.
             ttl: Tempo de vida das entradas de cache em segundos.
+            volatile_fields: Campos removidos dos dados de entrada antes de gerar a chave.
         """
         if not redis_client:
             # Tentar criar um novo cliente Redis com o endereço IP explícito
@@ -64,14 +140,25 @@ class RedisAgentCache:
                     logger.error(f"Falha na reconexão com Redis: {e2}")
                 
         self.redis_client = redis_client
+        # Circuit breaker compartilhado: substitui o PING antes de cada comando
+        self.breaker = get_redis_breaker(redis_client)
         self.prefix = prefix
         self.ttl = ttl
+        self.volatile_fields = frozenset(volatile_fields)
+        
+        # Contadores de hits/misses por agent_id
+        self._stats = defaultdict(lambda: {"hits": 0, "misses": 0})
+        self._stats_lock = threading.Lock()
         logger.info(f"Inicializando RedisAgentCache com prefixo {prefix} e TTL {ttl}s")
     
     def _get_key(self, agent_id: str, input_data: str) -> str:
         """
         Gera uma chave para o cache baseada no ID do agente e nos dados de entrada.
         
+        A chave é determinística entre processos e reinicializações, e ignora
+        campos voláteis (IDs de mensagem, timestamps), permitindo que workers
+        diferentes compartilhem decisões em cache.
+        
         Args:
             agent_id: ID do agente.
             input_data: Dados de entrada para o agente.
@@ -79,7 +166,36 @@ class RedisAgentCache:
         Returns:
             Chave para o cache.
         """
-        return f"{self.prefix}{agent_id}:{hash(input_data)}"
+        digest = stable_hash(input_data, self.volatile_fields)
+        return f"{self.prefix}{CACHE_KEY_VERSION}:{agent_id}:{digest}"
+    
+    def _record_lookup(self, agent_id: str, hit: bool) -> None:
+        """Atualiza os contadores de hit/miss de um agente."""
+        with self._stats_lock:
+            self._stats[agent_id]["hits" if hit else "misses"] += 1
+    
+    def get_stats(self, agent_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Retorna estatísticas de hit rate do cache.
+        
+        Args:
+            agent_id: ID do agente. Se None, retorna as estatísticas de todos os agentes.
+            
+        Returns:
+            Dicionário com hits, misses e hit_rate (por agente, se agent_id for None).
+        """
+        def summarize(counters: Dict[str, int]) -> Dict[str, Any]:
+            lookups = counters["hits"] + counters["misses"]
+            return {
+                "hits": counters["hits"],
+                "misses": counters["misses"],
+                "hit_rate": counters["hits"] / lookups if lookups else 0.0
+            }
+        
+        with self._stats_lock:
+            if agent_id is not None:
+                return summarize(self._stats.get(agent_id, {"hits": 0, "misses": 0}))
+            return {aid: summarize(counters) for aid, counters in self._stats.items()}
     
     def get(self, agent_id: str, input_data: str) -> Optional[Dict[str, Any]]:
         """
@@ -94,28 +210,16 @@ class RedisAgentCache:
         """
         key = self._get_key(agent_id, input_data)
         try:
-            # Verificar conexão Redis antes de tentar recuperar
-            try:
-                self.redis_client.ping()
-            except Exception as e:
-                logger.warning(f"Redis indisponível para cache.get: {e}")
-                # Tentar reconectar com endereço IP explícito
-                import os
-                redis_url = os.getenv('REDIS_URL', 'redis://172.24.0.5:6379/0')
-                logger.info(f"Tentando reconectar ao Redis usando URL: {redis_url}")
-                try:
-                    self.redis_client = redis.from_url(redis_url)
-                    self.redis_client.ping()
-                    logger.info("Reconexão com Redis bem-sucedida")
-                except Exception as e2:
-                    logger.error(f"Falha na reconexão com Redis: {e2}")
-                    return None  # Retornar None se não conseguir reconectar
-            
-            data = self.redis_client.get(key)
+            data = self.breaker.call(self.redis_client.get, key)
             if data:
                 logger.debug(f"Cache hit para {key}")
+                self._record_lookup(agent_id, hit=True)
                 return json.loads(data)
             logger.debug(f"Cache miss para {key}")
+            self._record_lookup(agent_id, hit=False)
+            return None
+        except CircuitOpenError:
+            self._record_lookup(agent_id, hit=False)
             return None
         except Exception as e:
             logger.error(f"Erro ao recuperar do cache: {e}")
@@ -135,30 +239,16 @@ class RedisAgentCache:
         """
         key = self._get_key(agent_id, input_data)
         try:
-            # Verificar conexão Redis antes de tentar definir
-            try:
-                self.redis_client.ping()
-            except Exception as e:
-                logger.warning(f"Redis indisponível para cache.set: {e}")
-                # Tentar reconectar com endereço IP explícito
-                import os
-                redis_url = os.getenv('REDIS_URL', 'redis://172.24.0.5:6379/0')
-                logger.info(f"Tentando reconectar ao Redis usando URL: {redis_url}")
-                try:
-                    self.redis_client = redis.from_url(redis_url)
-                    self.redis_client.ping()
-                    logger.info("Reconexão com Redis bem-sucedida")
-                except Exception as e2:
-                    logger.error(f"Falha na reconexão com Redis: {e2}")
-                    return False  # Abandonar operação se não conseguir reconectar
-            
-            self.redis_client.setex(
+            self.breaker.call(
+                self.redis_client.setex,
                 key, 
                 self.ttl, 
                 json.dumps(output_data)
             )
             logger.debug(f"Dados armazenados no cache para {key}")
             return True
+        except CircuitOpenError:
+            return False
         except Exception as e:
             logger.error(f"Erro ao armazenar no cache: {e}")
             return False
@@ -176,26 +266,11 @@ class RedisAgentCache:
         """
         key = self._get_key(agent_id, input_data)
         try:
-            # Verificar conexão Redis antes de tentar deletar
-            try:
-                self.redis_client.ping()
-            except Exception as e:
-                logger.warning(f"Redis indisponível para cache.delete: {e}")
-                # Tentar reconectar com endereço IP explícito
-                import os
-                redis_url = os.getenv('REDIS_URL', 'redis://172.24.0.5:6379/0')
-                logger.info(f"Tentando reconectar ao Redis usando URL: {redis_url}")
-                try:
-                    self.redis_client = redis.from_url(redis_url)
-                    self.redis_client.ping()
-                    logger.info("Reconexão com Redis bem-sucedida")
-                except Exception as e2:
-                    logger.error(f"Falha na reconexão com Redis: {e2}")
-                    return False  # Retornar False se não conseguir reconectar
-            
-            self.redis_client.delete(key)
+            self.breaker.call(self.redis_client.delete, key)
             logger.debug(f"Dados removidos do cache para {key}")
             return True
+        except CircuitOpenError:
+            return False
         except Exception as e:
             logger.error(f"Erro ao remover do cache: {e}")
             return False
@@ -210,13 +285,15 @@ class RedisAgentCache:
         Returns:
             True se o cache foi limpo com sucesso, False caso contrário.
         """
-        pattern = f"{self.prefix}{agent_id}:*" if agent_id else f"{self.prefix}*"
+        pattern = f"{self.prefix}{CACHE_KEY_VERSION}:{agent_id}:*" if agent_id else f"{self.prefix}*"
         try:
-            keys = self.redis_client.keys(pattern)
+            keys = self.breaker.call(self.redis_client.keys, pattern)
             if keys:
-                self.redis_client.delete(*keys)
+                self.breaker.call(self.redis_client.delete, *keys)
                 logger.debug(f"Cache limpo para o padrão {pattern}")
             return True
+        except CircuitOpenError:
+            return False
         except Exception as e:
             logger.error(f"Erro ao limpar o cache: {e}")
             return False
@@ -0,0 +1,300 @@
+"""
+Barramento de invalidação de cache entre processos.
+
+Cada worker mantém seu próprio cache L1 em memória. Quando um processo altera
+ou invalida uma chave, os demais precisam descartar suas cópias locais. Este
+módulo publica invalidações (por chave ou por prefixo) em um canal Redis
+pub/sub e aplica as invalidações recebidas aos caches L1 registrados.
+
+Sob rajadas de escrita, as invalidações são acumuladas e enviadas em lote,
+em uma única mensagem por intervalo de flush.
+
+O barramento é compartilhado pelos caches do processo (get_invalidation_bus) e
+as mensagens com a origem do próprio processo são ignoradas ao chegar do Redis;
+por isso uma invalidação publicada é repassada na hora aos demais listeners
+locais, exceto ao que a publicou (source).
+
+Cada cache usa seu próprio canal (HUB_INVALIDATION_CHANNEL, TOOLS_INVALIDATION_CHANNEL),
+para que as chaves e prefixos de um não invalidem o outro. Prefixos vazios
+são descartados: invalidariam o cache inteiro de todos os processos.
+"""
+
+import json
+import uuid
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Canais de invalidação de cada cache
+HUB_INVALIDATION_CHANNEL = "cache:invalidate:hub"
+TOOLS_INVALIDATION_CHANNEL = "cache:invalidate:tools"
+
+# Assinatura dos listeners: listener(chaves, prefixos)
+InvalidationListener = Callable[[List[str], List[str]], None]
+
+
+class CacheInvalidationBus:
+    """
+    Publica e consome invalidações de cache L1 via Redis pub/sub.
+
+    As mensagens publicadas por esta instância são ignoradas ao serem
+    recebidas do Redis: quem publicou já aplicou a invalidação, e os demais
+    listeners do processo a recebem diretamente no momento da publicação.
+    """
+
+    def __init__(self, redis_client, channel: str = HUB_INVALIDATION_CHANNEL,
+                 flush_interval: float = 0.05, max_batch_size: int = 500):
+        """
+        Inicializa o barramento de invalidação.
+
+        Args:
+            redis_client: Cliente Redis usado para publicar e assinar.
+            channel: Canal pub/sub das invalidações.
+            flush_interval: Intervalo máximo (segundos) para acumular invalidações.
+            max_batch_size: Número de itens pendentes que força um flush imediato.
+        """
+        self.redis = redis_client
+        self.channel = channel
+        self.flush_interval = flush_interval
+        self.max_batch_size = max_batch_size
+        self.origin = uuid.uuid4().hex
+
+        self._listeners: List[InvalidationListener] = []
+        self._pending_keys: Set[str] = set()
+        self._pending_prefixes: Set[str] = set()
+        self._lock = threading.Lock()
+        self._flush_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._flush_thread: Optional[threading.Thread] = None
+        self._pubsub = None
+        self._subscriber_thread = None
+
+        self.published_messages = 0
+        self.received_messages = 0
+
+    @property
+    def running(self) -> bool:
+        return self._flush_thread is not None and self._flush_thread.is_alive()
+
+    def add_listener(self, listener: InvalidationListener) -> None:
+        """
+        Registra um callback chamado para invalidações vindas de outros processos.
+
+        Args:
+            listener: Função que recebe (chaves, prefixos).
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: InvalidationListener) -> None:
+        """
+        Remove um callback registrado com add_listener.
+
+        Args:
+            listener: Função registrada anteriormente.
+        """
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def start(self) -> bool:
+        """
+        Inicia a assinatura do canal e a thread de flush em lote.
+
+        Returns:
+            True se o barramento foi iniciado, False em caso de erro.
+        """
+        if self.running:
+            return True
+        try:
+            self._pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            self._pubsub.subscribe(**{self.channel: self._on_message})
+            self._subscriber_thread = self._pubsub.run_in_thread(sleep_time=0.01, daemon=True)
+        except Exception as e:
+            logger.error(f"Erro ao assinar canal de invalidação {self.channel}: {e}")
+            self._pubsub = None
+            return False
+
+        self._stop_event.clear()
+        self._flush_thread = threading.Thread(
+            target=self._flush_loop, name="cache-invalidation-flush", daemon=True
+        )
+        self._flush_thread.start()
+        logger.info(f"Barramento de invalidação de cache iniciado no canal {self.channel}")
+        return True
+
+    def stop(self) -> None:
+        """Envia invalidações pendentes e encerra as threads do barramento."""
+        self._stop_event.set()
+        self._flush_event.set()
+        if self._flush_thread:
+            self._flush_thread.join(timeout=1)
+            self._flush_thread = None
+        self.flush()
+
+        if self._subscriber_thread:
+            try:
+                self._subscriber_thread.stop()
+            except Exception as e:
+                logger.debug(f"Erro ao parar assinante de invalidação: {e}")
+            self._subscriber_thread = None
+        if self._pubsub:
+            try:
+                self._pubsub.close()
+            except Exception as e:
+                logger.debug(f"Erro ao fechar pubsub de invalidação: {e}")
+            self._pubsub = None
+
+    def publish_key(self, key: str, source: Optional[InvalidationListener] = None) -> None:
+        """
+        Agenda a invalidação de uma chave em todos os processos.
+
+        Args:
+            key: Chave completa a invalidar.
+            source: Listener de quem publicou (não é notificado localmente).
+        """
+        self._enqueue(keys=[key], source=source)
+
+    def publish_keys(self, keys: List[str], source: Optional[InvalidationListener] = None) -> None:
+        """
+        Agenda a invalidação de várias chaves (enviadas na mesma mensagem).
+
+        Args:
+            keys: Chaves completas a invalidar.
+            source: Listener de quem publicou (não é notificado localmente).
+        """
+        self._enqueue(keys=list(keys), source=source)
+
+    def publish_prefix(self, prefix: str, source: Optional[InvalidationListener] = None) -> None:
+        """
+        Agenda a invalidação de todas as chaves com um prefixo em todos os processos.
+
+        Args:
+            prefix: Prefixo das chaves a invalidar.
+            source: Listener de quem publicou (não é notificado localmente).
+        """
+        self._enqueue(prefixes=[prefix], source=source)
+
+    def flush(self) -> bool:
+        """
+        Publica imediatamente as invalidações pendentes em uma única mensagem.
+
+        Returns:
+            True se publicado (ou se não havia pendências), False em caso de erro.
+        """
+        with self._lock:
+            keys = list(self._pending_keys)
+            prefixes = list(self._pending_prefixes)
+            self._pending_keys.clear()
+            self._pending_prefixes.clear()
+
+        if not keys and not prefixes:
+            return True
+
+        message = json.dumps({"origin": self.origin, "keys": keys, "prefixes": prefixes})
+        try:
+            self.redis.publish(self.channel, message)
+            self.published_messages += 1
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao publicar invalidação de cache: {e}")
+            return False
+
+    def _enqueue(self, keys: List[str] = None, prefixes: List[str] = None,
+                 source: Optional[InvalidationListener] = None) -> None:
+        """Repassa as invalidações aos demais listeners locais e as acumula para o próximo flush."""
+        keys = list(keys or [])
+        prefixes = [prefix for prefix in prefixes or [] if prefix]
+        if not keys and not prefixes:
+            return
+        self._notify(keys, prefixes, exclude=source)
+
+        with self._lock:
+            self._pending_keys.update(keys)
+            self._pending_prefixes.update(prefixes)
+            pending = len(self._pending_keys) + len(self._pending_prefixes)
+
+        if not self.running:
+            # Sem thread de flush, publicar de forma síncrona
+            self.flush()
+        elif pending >= self.max_batch_size:
+            self._flush_event.set()
+
+    def _flush_loop(self) -> None:
+        """Loop da thread de flush: publica pendências a cada intervalo."""
+        while not self._stop_event.is_set():
+            self._flush_event.wait(self.flush_interval)
+            self._flush_event.clear()
+            self.flush()
+
+    def _on_message(self, message) -> None:
+        """Aplica uma mensagem de invalidação recebida aos listeners locais."""
+        try:
+            data = message.get("data")
+            if isinstance(data, bytes):
+                data = data.decode("utf-8")
+            payload = json.loads(data)
+        except Exception as e:
+            logger.warning(f"Mensagem de invalidação inválida ignorada: {e}")
+            return
+
+        if payload.get("origin") == self.origin:
+            return
+
+        self.received_messages += 1
+        keys = payload.get("keys", [])
+        prefixes = [prefix for prefix in payload.get("prefixes", []) if prefix]
+        if keys or prefixes:
+            self._notify(keys, prefixes)
+
+    def _notify(self, keys: List[str], prefixes: List[str],
+                exclude: Optional[InvalidationListener] = None) -> None:
+        """Chama os listeners registrados, exceto exclude."""
+        for listener in list(self._listeners):
+            if exclude is not None and listener == exclude:
+                continue
+            try:
+                listener(keys, prefixes)
+            except Exception as e:
+                logger.error(f"Erro ao aplicar invalidação de cache: {e}")
+
+
+_shared_buses: Dict[Tuple, CacheInvalidationBus] = {}
+_shared_buses_lock = threading.Lock()
+
+
+def _connection_id(redis_client) -> Tuple:
+    """Identifica o servidor Redis de um cliente (host, porta, db ou socket)."""
+    pool = getattr(redis_client, "connection_pool", None)
+    kwargs = getattr(pool, "connection_kwargs", None) or {}
+    if not kwargs:
+        return ("client", id(redis_client))
+    return (kwargs.get("host"), kwargs.get("port"), kwargs.get("db"), kwargs.get("path"))
+
+
+def get_invalidation_bus(redis_client, channel: str = HUB_INVALIDATION_CHANNEL,
+                         flush_interval: float = 0.05) -> Optional[CacheInvalidationBus]:
+    """
+    Obtém o barramento compartilhado do processo para um servidor Redis e canal.
+
+    Instâncias de DataServiceHub e caches do mesmo processo reaproveitam o mesmo
+    barramento (uma assinatura pub/sub e uma thread de flush por canal), iniciado
+    na primeira chamada.
+
+    Args:
+        redis_client: Cliente Redis.
+        channel: Canal pub/sub das invalidações.
+        flush_interval: Intervalo máximo (segundos) para acumular invalidações.
+
+    Returns:
+        Barramento iniciado, ou None se não foi possível assinar o canal.
+    """
+    key = _connection_id(redis_client) + (channel,)
+    with _shared_buses_lock:
+        bus = _shared_buses.get(key)
+        if bus is None:
+            bus = CacheInvalidationBus(redis_client, channel=channel, flush_interval=flush_interval)
+            if not bus.start():
+                return None
+            _shared_buses[key] = bus
+    return bus
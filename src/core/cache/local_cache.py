@@ -0,0 +1,219 @@
+"""
+Cache local (L1) em memória para o sistema ChatwootAI.
+
+Este módulo implementa o nível L1 do cache em dois níveis usado pelo
+DataServiceHub: um cache LRU em processo, com TTL por entrada e orçamento
+de memória em bytes. Os valores são armazenados já desserializados, de modo
+que um hit não precisa fazer parse de JSON novamente.
+"""
+
+import sys
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Sentinela para diferenciar "não encontrado" de um valor None armazenado
+MISSING = object()
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Estima o tamanho em bytes de um valor armazenado no cache.
+
+    Args:
+        value: Valor a ser medido.
+
+    Returns:
+        Tamanho aproximado em bytes.
+    """
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode('utf-8'))
+    try:
+        return len(json.dumps(value, default=str))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+class LocalCache:
+    """
+    Cache LRU em memória com TTL por entrada e limite de memória.
+
+    Características:
+    - Acesso e remoção LRU em O(1) usando OrderedDict
+    - TTL por entrada (expiração verificada de forma preguiçosa no acesso)
+    - Limite por número de entradas e por tamanho total em bytes
+    - Contadores de hits, misses, evicções e expirações
+    - Seguro para uso por múltiplas threads
+
+    Os valores retornados são os mesmos objetos armazenados (sem cópia);
+    quem os obtém deve tratá-los como somente leitura.
+    """
+
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 64 * 1024 * 1024,
+                 default_ttl: Optional[int] = 300):
+        """
+        Inicializa o cache local.
+
+        Args:
+            max_entries: Número máximo de entradas.
+            max_bytes: Tamanho máximo total estimado em bytes.
+            default_ttl: TTL padrão em segundos (None para não expirar).
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+
+        # chave -> (valor, expira_em, tamanho)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._current_bytes = 0
+        self._lock = threading.RLock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str, default: Any = MISSING) -> Any:
+        """
+        Obtém um valor do cache, atualizando sua posição LRU.
+
+        Args:
+            key: Chave a buscar.
+            default: Valor retornado se a chave não existir ou estiver expirada.
+
+        Returns:
+            Valor armazenado ou `default`.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, expires_at, _ = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None, size: Optional[int] = None) -> bool:
+        """
+        Armazena um valor no cache.
+
+        Args:
+            key: Chave a armazenar.
+            value: Valor (já desserializado).
+            ttl: TTL em segundos (se None, usa o padrão).
+            size: Tamanho em bytes, se já conhecido (evita nova estimativa).
+
+        Returns:
+            True se armazenado, False se o valor excede o orçamento de memória.
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl is not None and ttl <= 0:
+            self.delete(key)
+            return False
+
+        size = estimate_size(value) if size is None else size
+        if size > self.max_bytes:
+            logger.debug(f"Valor para {key} excede o limite do cache L1 ({size} bytes)")
+            self.delete(key)
+            return False
+
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, expires_at, size)
+            self._current_bytes += size
+            self._evict()
+        return True
+
+    def delete(self, key: str) -> bool:
+        """
+        Remove uma entrada do cache.
+
+        Args:
+            key: Chave a remover.
+
+        Returns:
+            True se a chave existia, False caso contrário.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+                return True
+            return False
+
+    def delete_prefix(self, prefix: str) -> int:
+        """
+        Remove todas as entradas cujas chaves começam com o prefixo.
+
+        Args:
+            prefix: Prefixo das chaves.
+
+        Returns:
+            Número de entradas removidas.
+        """
+        with self._lock:
+            keys = [key for key in self._entries if key.startswith(prefix)]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self) -> None:
+        """Remove todas as entradas do cache."""
+        with self._lock:
+            self._entries.clear()
+            self._current_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Retorna estatísticas de uso do cache.
+
+        Returns:
+            Dicionário com contadores e ocupação atual.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._current_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: str) -> None:
+        """Remove uma entrada (o lock deve estar adquirido)."""
+        _, _, size = self._entries.pop(key)
+        self._current_bytes -= size
+
+    def _evict(self) -> None:
+        """Remove entradas menos recentemente usadas até respeitar os limites."""
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._current_bytes > self.max_bytes
+        ):
+            _, (_, _, size) = self._entries.popitem(last=False)
+            self._current_bytes -= size
+            self.evictions += 1
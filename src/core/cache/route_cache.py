@@ -0,0 +1,287 @@
+"""
+Cache semântico de decisões de roteamento.
+
+O cache exato do hub (RedisAgentCache) só reaproveita uma decisão quando o
+texto, o canal e o cliente são idênticos. Este cache armazena cada decisão
+junto do embedding da mensagem e, na consulta, reaproveita a decisão do vizinho
+mais próximo acima de um limiar de similaridade, dentro do mesmo canal e
+domínio — "quanto custa o sérum?" e "qual o preço do sérum" passam a
+compartilhar a mesma decisão, independentemente do cliente.
+
+As entradas expiram pelo TTL e guardam a assinatura das regras de roteamento
+da crew escolhida: quando as palavras-chave de uma crew mudam, as decisões
+dessa crew deixam de ser servidas sem afetar as demais.
+
+Só são armazenadas decisões com confiança mínima (SEMANTIC_ROUTE_MIN_CONFIDENCE);
+o roteador grava apenas as decisões derivadas do conteúdo da mensagem.
+
+O armazenamento é o índice vetorial em memória do processo ou, com um cliente
+Qdrant, uma coleção compartilhada entre os workers. No Qdrant, cada decisão é
+gravada com um ID derivado do escopo e do embedding quantizado, de modo que
+mensagens repetidas sobrescrevem o mesmo ponto; as decisões obsoletas
+encontradas na consulta são removidas e as expiradas são apagadas
+periodicamente (SEMANTIC_ROUTE_CLEANUP_INTERVAL).
+"""
+
+import os
+import time
+import uuid
+import logging
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+# Importado como módulo: src.services.vector_index importa o pacote src.core.cache
+import src.services.vector_index as vector_index
+from src.core.cache.agent_cache import stable_hash
+
+logger = logging.getLogger(__name__)
+
+# Similaridade mínima para reaproveitar uma decisão
+SEMANTIC_ROUTE_THRESHOLD = float(os.environ.get("SEMANTIC_ROUTE_CACHE_THRESHOLD", "0.92"))
+
+# Tempo de vida das decisões em segundos
+SEMANTIC_ROUTE_TTL = int(os.environ.get("SEMANTIC_ROUTE_CACHE_TTL", "3600"))
+
+# Confiança mínima de uma decisão para ser armazenada
+SEMANTIC_ROUTE_MIN_CONFIDENCE = float(os.environ.get("SEMANTIC_ROUTE_CACHE_MIN_CONFIDENCE", "0.6"))
+
+# Intervalo entre remoções das decisões expiradas da coleção do Qdrant (segundos)
+SEMANTIC_ROUTE_CLEANUP_INTERVAL = float(os.environ.get("SEMANTIC_ROUTE_CACHE_CLEANUP_INTERVAL", "300"))
+
+# Casas decimais do embedding usadas no ID das decisões no Qdrant
+EMBEDDING_ID_PRECISION = 3
+
+# Número máximo de decisões no armazenamento em memória
+SEMANTIC_ROUTE_MAX_ENTRIES = int(os.environ.get("SEMANTIC_ROUTE_CACHE_MAX_ENTRIES", "10000"))
+
+
+class SemanticRouteCache:
+    """
+    Cache de decisões de roteamento indexado pelo embedding da mensagem.
+    """
+
+    def __init__(self, threshold: float = SEMANTIC_ROUTE_THRESHOLD, ttl: int = SEMANTIC_ROUTE_TTL,
+                 max_entries: int = SEMANTIC_ROUTE_MAX_ENTRIES, qdrant_client=None,
+                 collection: str = "route_cache", min_confidence: float = SEMANTIC_ROUTE_MIN_CONFIDENCE,
+                 cleanup_interval: float = SEMANTIC_ROUTE_CLEANUP_INTERVAL):
+        """
+        Inicializa o cache.
+
+        Args:
+            threshold: Similaridade de cosseno mínima para um acerto.
+            ttl: Tempo de vida das decisões em segundos.
+            max_entries: Limite de decisões em memória (as mais antigas são descartadas).
+            qdrant_client: Cliente Qdrant para armazenar as decisões em uma coleção
+                compartilhada (se None, usa o índice em memória do processo).
+            collection: Coleção do Qdrant usada quando qdrant_client é informado.
+            min_confidence: Confiança mínima de uma decisão para ser armazenada.
+            cleanup_interval: Intervalo entre remoções das decisões expiradas do Qdrant.
+        """
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.qdrant_client = qdrant_client
+        self.collection = collection
+        self.min_confidence = min_confidence
+        self.cleanup_interval = cleanup_interval
+        self._next_cleanup = time.monotonic() + cleanup_interval
+        self._index = vector_index.InMemoryVectorIndex(collection)
+        self._order: deque = deque()
+        self._lock = threading.Lock()
+        self._collection_ready = False
+        self._stats = {"hits": 0, "misses": 0, "stale": 0, "stores": 0, "skipped": 0}
+
+    @staticmethod
+    def _scope(channel_type: Optional[str], domain: Optional[str]) -> Dict[str, str]:
+        return {"channel_type": channel_type or "unknown", "domain": domain or "default"}
+
+    @staticmethod
+    def _point_id(embedding: List[float], scope: Dict[str, str]) -> str:
+        """ID do ponto no Qdrant: mensagens com o mesmo embedding no escopo sobrescrevem o ponto."""
+        bucket = [round(float(value), EMBEDDING_ID_PRECISION) for value in embedding]
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, stable_hash({"scope": scope, "embedding": bucket})))
+
+    def _remove_expired(self) -> None:
+        """Apaga da coleção do Qdrant as decisões expiradas, no máximo uma vez por intervalo."""
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next_cleanup:
+                return
+            self._next_cleanup = now + self.cleanup_interval
+        from qdrant_client.http.models import FieldCondition, Filter, FilterSelector, Range
+
+        self.qdrant_client.delete(
+            collection_name=self.collection,
+            points_selector=FilterSelector(
+                filter=Filter(must=[FieldCondition(key="expires_at", range=Range(lt=time.time()))])
+            )
+        )
+
+    def _ensure_collection(self, size: int) -> None:
+        """Cria a coleção do Qdrant na primeira escrita, se necessário."""
+        if self._collection_ready:
+            return
+        from qdrant_client.http.models import Distance, VectorParams
+
+        existing = {c.name for c in self.qdrant_client.get_collections().collections}
+        if self.collection not in existing:
+            self.qdrant_client.create_collection(
+                collection_name=self.collection,
+                vectors_config=VectorParams(size=size, distance=Distance.COSINE)
+            )
+        self._collection_ready = True
+
+    def _nearest(self, embedding: List[float], scope: Dict[str, str]):
+        """Busca a decisão mais próxima do escopo (retorna o ponto ou None)."""
+        if self.qdrant_client is None:
+            hits = self._index.search(embedding, limit=1, score_threshold=self.threshold, must=scope)
+            return hits[0] if hits else None
+
+        from qdrant_client.http.models import FieldCondition, Filter, MatchValue, Range
+
+        conditions = [FieldCondition(key=key, match=MatchValue(value=value)) for key, value in scope.items()]
+        conditions.append(FieldCondition(key="expires_at", range=Range(gt=time.time())))
+        response = self.qdrant_client.query_points(
+            collection_name=self.collection,
+            query=embedding,
+            query_filter=Filter(must=conditions),
+            limit=1,
+            score_threshold=self.threshold,
+            with_payload=True
+        )
+        return response.points[0] if response.points else None
+
+    def get(self, embedding: List[float], channel_type: Optional[str] = None, domain: Optional[str] = None,
+            signatures: Optional[Dict[str, str]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Busca uma decisão de roteamento para uma mensagem semelhante.
+
+        Args:
+            embedding: Embedding da mensagem.
+            channel_type: Canal da conversa.
+            domain: Domínio de negócio.
+            signatures: Assinatura atual das regras de cada crew; decisões gravadas
+                com outra assinatura são ignoradas.
+
+        Returns:
+            Decisão de roteamento (com a similaridade em "similarity") ou None.
+        """
+        try:
+            hit = self._nearest(embedding, self._scope(channel_type, domain))
+        except Exception as e:
+            logger.error(f"Erro ao consultar o cache semântico de rotas: {e}")
+            return None
+
+        if hit is None:
+            self._stats["misses"] += 1
+            return None
+
+        payload = hit.payload
+        crew = payload["decision"].get("crew")
+        expired = payload.get("expires_at", 0) <= time.time()
+        rules_changed = signatures is not None and payload.get("rules") != signatures.get(crew)
+        if expired or rules_changed:
+            self._stats["stale"] += 1
+            try:
+                if self.qdrant_client is None:
+                    self._index.remove([hit.id])
+                else:
+                    self.qdrant_client.delete(collection_name=self.collection, points_selector=[hit.id])
+            except Exception as e:
+                logger.error(f"Erro ao remover rota obsoleta do cache semântico: {e}")
+            return None
+
+        self._stats["hits"] += 1
+        return {**payload["decision"], "similarity": round(hit.score, 4)}
+
+    def set(self, embedding: List[float], decision: Dict[str, Any], channel_type: Optional[str] = None,
+            domain: Optional[str] = None, signatures: Optional[Dict[str, str]] = None) -> bool:
+        """
+        Armazena uma decisão de roteamento.
+
+        Args:
+            embedding: Embedding da mensagem.
+            decision: Decisão de roteamento (crew, confiança, raciocínio).
+            channel_type: Canal da conversa.
+            domain: Domínio de negócio.
+            signatures: Assinatura atual das regras de cada crew.
+
+        Returns:
+            True se armazenada, False se a confiança é insuficiente ou em caso de erro.
+        """
+        if decision.get("confidence", 0) < self.min_confidence:
+            self._stats["skipped"] += 1
+            return False
+
+        crew = decision.get("crew")
+        scope = self._scope(channel_type, domain)
+        payload = {
+            **scope,
+            "crew": crew,
+            "rules": (signatures or {}).get(crew),
+            "expires_at": time.time() + self.ttl,
+            "decision": {key: value for key, value in decision.items() if key not in ("tier", "similarity")}
+        }
+
+        try:
+            if self.qdrant_client is not None:
+                from qdrant_client.http.models import PointStruct
+
+                self._ensure_collection(len(embedding))
+                self.qdrant_client.upsert(
+                    collection_name=self.collection,
+                    points=[PointStruct(id=self._point_id(embedding, scope), vector=list(embedding), payload=payload)]
+                )
+            else:
+                with self._lock:
+                    if len(self._order) >= self.max_entries:
+                        # Descarta em bloco para não compactar o índice a cada escrita
+                        evicted = [self._order.popleft() for _ in range(max(1, self.max_entries // 10))]
+                        self._index.remove(evicted)
+                    point_id = uuid.uuid4().hex
+                    self._index.upsert([(point_id, embedding, payload)])
+                    self._order.append(point_id)
+        except vector_index.MemoryLimitExceeded as e:
+            logger.warning(f"Cache semântico de rotas cheio: {e}")
+            return False
+        except Exception as e:
+            logger.error(f"Erro ao armazenar no cache semântico de rotas: {e}")
+            return False
+
+        self._stats["stores"] += 1
+        if self.qdrant_client is not None:
+            try:
+                self._remove_expired()
+            except Exception as e:
+                logger.error(f"Erro ao remover rotas expiradas do cache semântico: {e}")
+        return True
+
+    def invalidate_crew(self, crew: str) -> None:
+        """
+        Remove todas as decisões que escolheram uma crew.
+
+        Args:
+            crew: Nome da crew.
+        """
+        try:
+            if self.qdrant_client is not None:
+                from qdrant_client.http.models import FieldCondition, Filter, FilterSelector, MatchValue
+
+                self.qdrant_client.delete(
+                    collection_name=self.collection,
+                    points_selector=FilterSelector(
+                        filter=Filter(must=[FieldCondition(key="crew", match=MatchValue(value=crew))])
+                    )
+                )
+                return
+            with self._lock:
+                ids = [point_id for point_id, payload in self._index.items() if payload.get("crew") == crew]
+                self._index.remove(ids)
+                removed = set(ids)
+                self._order = deque(point_id for point_id in self._order if point_id not in removed)
+        except Exception as e:
+            logger.error(f"Erro ao invalidar rotas da crew {crew}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "entries": len(self._index) if self.qdrant_client is None else None}
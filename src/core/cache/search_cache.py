@@ -0,0 +1,163 @@
+"""
+Cache de resultados de busca com invalidação por geração e por tag.
+
+Cada chave de cache inclui o contador de geração do seu escopo (o catálogo
+inteiro ou uma categoria). Incrementar o contador invalida, em O(1), todas as
+buscas do escopo: as chaves antigas deixam de ser consultadas e expiram pelo
+TTL, sem SCAN/KEYS.
+
+Além disso, cada entrada é registrada em um conjunto por item retornado
+(tag). Quando um item muda sem alterar quais itens aparecem nas buscas
+(ex.: preço atualizado, produto desativado ou removido), basta remover as
+entradas que o retornaram, sem invalidar o restante do escopo.
+"""
+
+import json
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.core.cache.agent_cache import stable_hash
+
+logger = logging.getLogger(__name__)
+
+
+class SearchResultCache:
+    """
+    Cache de resultados de busca em Redis, versionado por escopo e com tags por item.
+    """
+
+    def __init__(self, redis_client, namespace: str, ttl: int = 3600):
+        """
+        Inicializa o cache.
+
+        Args:
+            redis_client: Cliente Redis (se None, o cache fica desativado).
+            namespace: Prefixo das chaves (ex.: "product_search").
+            ttl: Tempo de vida padrão das entradas em segundos.
+        """
+        self.redis_client = redis_client
+        self.namespace = namespace
+        self.ttl = ttl
+
+    def _generation_key(self, scope: Any = None) -> str:
+        if scope is None:
+            return f"{self.namespace}:gen"
+        return f"{self.namespace}:gen:{scope}"
+
+    def _tag_key(self, item_id: Any) -> str:
+        return f"{self.namespace}:tag:{item_id}"
+
+    def build_key(self, params: Dict[str, Any], scope: Any = None) -> str:
+        """
+        Gera a chave de cache de uma busca.
+
+        Args:
+            params: Parâmetros da busca (consulta, limite, filtros...).
+            scope: Escopo da busca (ex.: ID da categoria filtrada); None para o
+                catálogo inteiro.
+
+        Returns:
+            Chave no formato `{namespace}:{escopo}:v{geração}:{hash dos parâmetros}`.
+        """
+        generation = 0
+        if self.redis_client:
+            try:
+                generation = int(self.redis_client.get(self._generation_key(scope)) or 0)
+            except Exception as e:
+                logger.warning(f"Erro ao ler geração do cache de busca {self.namespace}: {e}")
+        scope_part = "all" if scope is None else f"s{scope}"
+        return f"{self.namespace}:{scope_part}:v{generation}:{stable_hash(params, volatile_fields=())}"
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Obtém os resultados armazenados em uma chave.
+
+        Returns:
+            Lista de resultados ou None se não houver cache.
+        """
+        if not self.redis_client:
+            return None
+        try:
+            cached = self.redis_client.get(key)
+            return json.loads(cached) if cached else None
+        except Exception as e:
+            logger.warning(f"Erro ao ler cache de busca: {e}")
+            return None
+
+    def set(self, key: str, results: List[Dict[str, Any]], tags: Iterable[Any] = (),
+            ttl: Optional[int] = None) -> bool:
+        """
+        Armazena resultados e registra a chave nas tags dos itens retornados.
+
+        Args:
+            key: Chave gerada por `build_key`.
+            results: Resultados da busca.
+            tags: IDs dos itens retornados.
+            ttl: Tempo de vida em segundos (padrão: o do cache).
+
+        Returns:
+            True se os resultados foram armazenados, False caso contrário.
+        """
+        if not self.redis_client:
+            return False
+        ttl = ttl or self.ttl
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.setex(key, ttl, json.dumps(results, default=str))
+            for tag in set(tags):
+                pipe.sadd(self._tag_key(tag), key)
+                # O conjunto vive tanto quanto a entrada mais recente que o referencia
+                pipe.expire(self._tag_key(tag), ttl)
+            pipe.execute()
+            return True
+        except Exception as e:
+            logger.warning(f"Erro ao salvar cache de busca: {e}")
+            return False
+
+    def bump(self, scopes: Iterable[Any] = ()) -> None:
+        """
+        Invalida as buscas do catálogo inteiro e dos escopos informados.
+
+        Args:
+            scopes: Escopos (ex.: categorias) afetados pela mudança.
+        """
+        if not self.redis_client:
+            return
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.incr(self._generation_key())
+            for scope in set(scopes):
+                if scope is not None:
+                    pipe.incr(self._generation_key(scope))
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Erro ao incrementar geração do cache de busca {self.namespace}: {e}")
+
+    def invalidate_tags(self, item_ids: Iterable[Any]) -> int:
+        """
+        Remove as buscas em cache que retornaram algum dos itens.
+
+        Args:
+            item_ids: IDs dos itens alterados.
+
+        Returns:
+            Número de entradas removidas.
+        """
+        if not self.redis_client:
+            return 0
+        tag_keys = [self._tag_key(item_id) for item_id in set(item_ids)]
+        if not tag_keys:
+            return 0
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for tag_key in tag_keys:
+                pipe.smembers(tag_key)
+            members = pipe.execute()
+            keys = set()
+            for entries in members:
+                keys.update(entries or ())
+            self.redis_client.delete(*keys, *tag_keys)
+            return len(keys)
+        except Exception as e:
+            logger.warning(f"Erro ao invalidar cache de busca {self.namespace}: {e}")
+            return 0
@@ -30,13 +30,20 @@ except ImportError:
 try:
     import redis
     import psycopg2
-    from psycopg2.extras import RealDictCursor
+    from psycopg2.extras import RealDictCursor, execute_values
     POSTGRES_AVAILABLE = True
     REDIS_AVAILABLE = True
 except ImportError:
     POSTGRES_AVAILABLE = False
     REDIS_AVAILABLE = False
 
+from src.core.cache.local_cache import LocalCache, MISSING
+from src.core.cache.invalidation import (
+    HUB_INVALIDATION_CHANNEL, TOOLS_INVALIDATION_CHANNEL, get_invalidation_bus
+)
+from src.core.redis_health import CircuitOpenError, get_redis_breaker
+from src.core.db_pool import PostgresConnectionPool
+
 # Configuração de logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -67,7 +74,7 @@ class DataServiceHub:
         self.dev_mode = os.environ.get('DEV_MODE', 'false').lower() == 'true'
         
         # Inicializar conexões
-        self.pg_conn = None
+        self.pg_pool = None
         self.redis_client = None
         self.sqlite_conn = None
         
@@ -75,15 +82,37 @@ class DataServiceHub:
         if self.dev_mode or not POSTGRES_AVAILABLE:
             self._init_sqlite_connection()
         else:
-            # Em modo de produção, usar PostgreSQL e Redis
-            self.pg_conn = self._init_postgres_connection()
+            # Em modo de produção, usar PostgreSQL (pool de conexões) e Redis
+            self.pg_pool = self._init_postgres_pool()
             self.redis_client = self._init_redis_connection()
         
+        # Circuit breaker compartilhado: com o Redis fora, o cache L2 é ignorado sem round-trips
+        self.redis_breaker = get_redis_breaker(self.redis_client) if self.redis_client else None
+        
         # Dicionário para armazenar serviços registrados
         self.services = {}
         
         # Cache L1 (memória local) - mais rápido, capacidade limitada
-        self.l1_cache = {}
+        cache_config = self.config['cache']
+        self.l1_cache = LocalCache(
+            max_entries=cache_config['l1_max_size'],
+            max_bytes=cache_config.get('l1_max_bytes', 64 * 1024 * 1024),
+            default_ttl=cache_config['l1_ttl']
+        )
+        
+        # Barramento (compartilhado no processo) para invalidar o L1 dos demais workers
+        self.invalidation_bus = None
+        if self.redis_client and cache_config.get('invalidation_enabled', True):
+            self.invalidation_bus = get_invalidation_bus(
+                self.redis_client,
+                channel=cache_config.get('invalidation_channel', HUB_INVALIDATION_CHANNEL),
+                flush_interval=cache_config.get('invalidation_flush_interval', 0.05)
+            )
+            if self.invalidation_bus:
+                self.invalidation_bus.add_listener(self._apply_remote_invalidation)
+        
+        # Caches das ferramentas criadas pelo hub, fechados junto com ele
+        self._tool_caches = []
         
         # Registrar serviços padrão
         self._register_default_services()
@@ -110,7 +139,10 @@ class DataServiceHub:
                 'port': os.environ.get('POSTGRES_PORT', '5433'),
                 'user': os.environ.get('POSTGRES_USER', 'postgres'),
                 'password': os.environ.get('POSTGRES_PASSWORD', 'postgres'),
-                'database': os.environ.get('POSTGRES_DB', 'chatwootai')
+                'database': os.environ.get('POSTGRES_DB', 'chatwootai'),
+                'pool_min_size': int(os.environ.get('POSTGRES_POOL_MIN_SIZE', '1')),
+                'pool_max_size': int(os.environ.get('POSTGRES_POOL_MAX_SIZE', '10')),
+                'pool_timeout': float(os.environ.get('POSTGRES_POOL_TIMEOUT', '5'))
             },
             'redis': {
                 # Extrair informações da URL do Redis
@@ -122,35 +154,64 @@ class DataServiceHub:
             },
             'cache': {
                 'l1_max_size': int(os.environ.get('CACHE_L1_MAX_SIZE', '1000')),
+                'l1_max_bytes': int(os.environ.get('CACHE_L1_MAX_BYTES', str(64 * 1024 * 1024))),  # 64 MB
                 'l1_ttl': int(os.environ.get('CACHE_L1_TTL', '300')),  # 5 minutos
-                'l2_ttl': int(os.environ.get('CACHE_L2_TTL', '3600'))  # 1 hora
+                'l2_ttl': int(os.environ.get('CACHE_L2_TTL', '3600')),  # 1 hora
+                'invalidation_enabled': os.environ.get('CACHE_INVALIDATION_ENABLED', 'true').lower() == 'true',
+                'invalidation_channel': os.environ.get('CACHE_INVALIDATION_CHANNEL', HUB_INVALIDATION_CHANNEL),
+                'invalidation_flush_interval': float(os.environ.get('CACHE_INVALIDATION_FLUSH_INTERVAL', '0.05'))
             },
             'sqlite': {
                 'db_path': os.environ.get('SQLITE_DB_PATH', 'data/chatwootai.db')
             }
         }
     
-    def _init_postgres_connection(self):
+    def _init_postgres_pool(self) -> Optional[PostgresConnectionPool]:
         """
-        Inicializa conexão com PostgreSQL.
+        Inicializa o pool de conexões com PostgreSQL.
         
         Returns:
-            Conexão com PostgreSQL.
+            Pool de conexões ou None em caso de erro.
         """
         try:
             pg_config = self.config['postgres']
-            conn = psycopg2.connect(
+            pool = PostgresConnectionPool(
                 host=pg_config['host'],
                 port=pg_config['port'],
                 user=pg_config['user'],
                 password=pg_config['password'],
-                database=pg_config['database']
+                database=pg_config['database'],
+                min_size=pg_config.get('pool_min_size', 1),
+                max_size=pg_config.get('pool_max_size', 10),
+                timeout=pg_config.get('pool_timeout', 5.0)
+            )
+            logger.info(
+                f"Pool PostgreSQL estabelecido: {pg_config['host']}:{pg_config['port']}/{pg_config['database']} "
+                f"(min={pool.min_size}, max={pool.max_size})"
             )
-            logger.info(f"Conexão com PostgreSQL estabelecida: {pg_config['host']}:{pg_config['port']}/{pg_config['database']}")
-            return conn
+            return pool
         except Exception as e:
             logger.error(f"Erro ao conectar ao PostgreSQL: {str(e)}")
             return None
+    
+    @property
+    def pg_conn(self) -> Optional[PostgresConnectionPool]:
+        """
+        Mantido por compatibilidade: indica se o PostgreSQL está disponível.
+        
+        Returns:
+            O pool de conexões PostgreSQL (ou None).
+        """
+        return self.pg_pool
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """
+        Retorna métricas do pool PostgreSQL (tempo de espera, em uso, saturação).
+        
+        Returns:
+            Dicionário com as métricas, ou vazio se não houver pool.
+        """
+        return self.pg_pool.stats() if self.pg_pool else {}
             
     def get_data_proxy_agent(self):
         """
@@ -172,14 +233,13 @@ class DataServiceHub:
         # Obter configurações do ambiente
         qdrant_url = os.environ.get('QDRANT_URL', 'http://localhost:6333')
         qdrant_api_key = os.environ.get('QDRANT_API_KEY', None)
-        openai_api_key = os.environ.get('OPENAI_API_KEY', None)
         
         # Log das configurações
         logger.info(f"Inicializando ferramentas com: Qdrant URL={qdrant_url}")
         
         # Construir a string de conexão PostgreSQL
         db_uri = None
-        if self.pg_conn:
+        if self.pg_pool:
             pg_config = self.config['postgres']
             db_uri = f"postgresql://{pg_config['user']}:{pg_config['password']}@{pg_config['host']}:{pg_config['port']}/{pg_config['database']}"
         
@@ -187,8 +247,7 @@ class DataServiceHub:
         vector_tool = QdrantVectorSearchTool(
             qdrant_url=qdrant_url,
             qdrant_api_key=qdrant_api_key,
-            collection_name="business_rules",  # Usar uma coleção que sabemos que existe
-            openai_api_key=openai_api_key
+            collection_name="business_rules"  # Usar uma coleção que sabemos que existe
         )
         
         # Só criar o PGSearchTool se tivermos uma conexão com o PostgreSQL
@@ -211,7 +270,14 @@ class DataServiceHub:
             
         # Criar ferramenta de cache apenas se tiver Redis disponível
         if self.redis_client:
-            cache_tool = TwoLevelCache(redis_client=self.redis_client)
+            # Canal próprio: as chaves da ferramenta não se misturam com as do L1 do hub
+            cache_tool = TwoLevelCache(
+                redis_client=self.redis_client,
+                invalidation_bus=get_invalidation_bus(
+                    self.redis_client, channel=TOOLS_INVALIDATION_CHANNEL
+                ) if self.invalidation_bus else None
+            )
+            self._tool_caches.append(cache_tool)
         else:
             # Ferramenta mock se não tiver Redis
             class MockCacheTool(BaseTool):
@@ -399,10 +465,50 @@ class DataServiceHub:
             logger.error(f"Erro ao deserializar JSON: {str(e)}")
             return None
     
+    def _decode_cache_value(self, value: Any) -> Any:
+        """
+        Converte um valor lido do Redis para o objeto Python correspondente.
+        
+        Args:
+            value: Valor bruto (bytes ou string).
+            
+        Returns:
+            Objeto desserializado.
+        """
+        # Se o valor é bytes, decodificar para string
+        if isinstance(value, bytes):
+            value = value.decode('utf-8')
+            
+        # Se o valor é uma string JSON, desserializar
+        if isinstance(value, str) and (value.startswith('{') or value.startswith('[')):
+            return self.deserialize_from_json(value)
+        return value
+    
+    def _l1_ttl(self, l2_ttl: Optional[int]) -> int:
+        """
+        Calcula o TTL de uma entrada L1 alinhado ao TTL do L2.
+        
+        A entrada L1 nunca vive mais que a entrada correspondente no Redis.
+        
+        Args:
+            l2_ttl: TTL restante (ou configurado) da entrada no L2.
+            
+        Returns:
+            TTL em segundos para o L1.
+        """
+        l1_ttl = self.config['cache']['l1_ttl']
+        if l2_ttl is None or l2_ttl < 0:
+            return l1_ttl
+        return min(l1_ttl, l2_ttl)
+    
     def cache_get(self, key: str, entity_type: str = None) -> Any:
         """
         Obtém valor do cache (primeiro L1, depois L2).
         
+        O L1 armazena objetos já desserializados, então um hit no L1 não faz
+        parse de JSON. O objeto retornado é compartilhado com o cache e deve
+        ser tratado como somente leitura.
+        
         Args:
             key: Chave para buscar.
             entity_type: Tipo da entidade (para namespacing).
@@ -414,37 +520,98 @@ class DataServiceHub:
         full_key = f"{entity_type}:{key}" if entity_type else key
         
         # Tentar L1 (memória local)
-        if full_key in self.l1_cache:
+        value = self.l1_cache.get(full_key)
+        if value is not MISSING:
             logger.debug(f"Cache L1 hit: {full_key}")
-            value = self.l1_cache[full_key]
-            # Se o valor é uma string JSON, desserializar
-            if isinstance(value, str) and (value.startswith('{') or value.startswith('[')):
-                return self.deserialize_from_json(value)
             return value
         
         # Tentar L2 (Redis)
         if self.redis_client:
             try:
-                value = self.redis_client.get(full_key)
-                if value:
+                # GET e TTL em um único round-trip para alinhar a expiração do L1
+                pipe = self.redis_client.pipeline(transaction=False)
+                pipe.get(full_key)
+                pipe.ttl(full_key)
+                raw_value, remaining_ttl = self.redis_breaker.call(pipe.execute)
+                if raw_value:
                     logger.debug(f"Cache L2 hit: {full_key}")
-                    # Atualizar L1 para futuras requisições
-                    self.l1_cache[full_key] = value
+                    value = self._decode_cache_value(raw_value)
                     
-                    # Se o valor é bytes, decodificar para string
-                    if isinstance(value, bytes):
-                        value = value.decode('utf-8')
-                        
-                    # Se o valor é uma string JSON, desserializar
-                    if isinstance(value, str) and (value.startswith('{') or value.startswith('[')):
-                        return self.deserialize_from_json(value)
+                    # Atualizar L1 com o objeto já desserializado
+                    self.l1_cache.set(full_key, value, ttl=self._l1_ttl(remaining_ttl), size=len(raw_value))
                     return value
+            except CircuitOpenError:
+                logger.debug(f"Redis indisponível, ignorando cache L2 para: {full_key}")
             except Exception as e:
                 logger.error(f"Erro ao acessar cache L2: {str(e)}")
         
         logger.debug(f"Cache miss: {full_key}")
         return None
     
+    def cache_get_many(self, keys: List[str]) -> List[Any]:
+        """
+        Obtém várias chaves do cache com no máximo um round-trip ao Redis.
+        
+        As chaves ausentes no L1 são lidas do L2 com um único MGET (mais os TTLs,
+        no mesmo pipeline, para alinhar a expiração do L1).
+        
+        Args:
+            keys: Chaves completas.
+            
+        Returns:
+            Valores na mesma ordem das chaves (None para as não encontradas).
+        """
+        values: List[Any] = [None] * len(keys)
+        missing = []
+        for position, key in enumerate(keys):
+            value = self.l1_cache.get(key)
+            if value is MISSING:
+                missing.append(position)
+            else:
+                values[position] = value
+        
+        if missing and self.redis_client:
+            missing_keys = [keys[position] for position in missing]
+            try:
+                pipe = self.redis_client.pipeline(transaction=False)
+                pipe.mget(missing_keys)
+                for key in missing_keys:
+                    pipe.ttl(key)
+                raw_values, *remaining_ttls = self.redis_breaker.call(pipe.execute)
+                for position, raw_value, remaining_ttl in zip(missing, raw_values, remaining_ttls):
+                    if raw_value:
+                        value = self._decode_cache_value(raw_value)
+                        self.l1_cache.set(keys[position], value, ttl=self._l1_ttl(remaining_ttl), size=len(raw_value))
+                        values[position] = value
+            except CircuitOpenError:
+                logger.debug("Redis indisponível, ignorando cache L2 para leitura em lote")
+            except Exception as e:
+                logger.error(f"Erro ao acessar cache L2 em lote: {str(e)}")
+        
+        return values
+    
+    def _prepare_cache_value(self, value: Any) -> Tuple[Any, Any]:
+        """
+        Prepara um valor para o cache.
+        
+        Args:
+            value: Valor a armazenar.
+            
+        Returns:
+            Tupla (representação serializada para o L2, objeto para o L1).
+        """
+        # Sempre serializar para JSON se não for um tipo primitivo ou se já é uma string JSON
+        if not isinstance(value, (str, int, float, bool, bytes, type(None))):
+            # Garantir que temos uma string JSON válida
+            return self.serialize_for_json(value), value
+        if isinstance(value, str) and (value.startswith('{') or value.startswith('[')):
+            # String JSON: o L1 guarda o objeto desserializado uma única vez
+            return value, self.deserialize_from_json(value)
+        if isinstance(value, str):
+            # Envolver em aspas para tornar JSON válido se não for
+            return f'"{value}"', value
+        return value, value
+    
     def cache_set(self, key: str, value: Any, entity_type: str = None, ttl: int = None) -> bool:
         """
         Armazena valor no cache (L1 e L2).
@@ -460,38 +627,76 @@ class DataServiceHub:
         """
         # Construir chave completa se entity_type for fornecido
         full_key = f"{entity_type}:{key}" if entity_type else key
+        l2_ttl = ttl or self.config['cache']['l2_ttl']
         
-        # Armazenar em L1 (memória local)
-        self.l1_cache[full_key] = value
+        # Preparar a representação para o L2 (Redis)
+        serialized, l1_value = self._prepare_cache_value(value)
         
-        # Controlar tamanho do L1
-        if len(self.l1_cache) > self.config['cache']['l1_max_size']:
-            # Estratégia simples: remover o primeiro item
-            # Em uma implementação mais sofisticada, usaríamos LRU
-            self.l1_cache.pop(next(iter(self.l1_cache)))
+        # Armazenar em L1 (memória local), com TTL alinhado ao L2
+        size = len(serialized) if isinstance(serialized, (str, bytes)) else None
+        self.l1_cache.set(full_key, l1_value, ttl=self._l1_ttl(l2_ttl), size=size)
         
         # Armazenar em L2 (Redis)
         if self.redis_client:
             try:
-                # Sempre serializar para JSON se não for um tipo primitivo ou se já é uma string JSON
-                if not isinstance(value, (str, int, float, bool, bytes, type(None))):
-                    # Garantir que temos uma string JSON válida
-                    value = self.serialize_for_json(value)
-                # Se for uma string, verificar se já não é uma string JSON válida
-                elif isinstance(value, str) and not (value.startswith('{') or value.startswith('[')):
-                    # Envolver em aspas para tornar JSON válido se não for
-                    value = f'"{value}"'
-                    
-                l2_ttl = ttl or self.config['cache']['l2_ttl']
-                self.redis_client.set(full_key, value, ex=l2_ttl)
+                self.redis_breaker.call(self.redis_client.set, full_key, serialized, ex=l2_ttl)
+                self._broadcast_invalidation(key=full_key)
                 logger.debug(f"Valor armazenado no cache para: {full_key} (TTL: {l2_ttl}s)")
                 return True
+            except CircuitOpenError:
+                return False
             except Exception as e:
                 logger.error(f"Erro ao armazenar em cache L2: {str(e)}")
                 return False
         
         return True  # Pelo menos L1 funcionou
     
+    def cache_set_many(self, items: Dict[str, Any], ttl: int = None) -> bool:
+        """
+        Armazena várias chaves no cache (L1 e L2) em um único round-trip ao Redis.
+        
+        Args:
+            items: Mapeamento chave completa -> valor.
+            ttl: Tempo de vida em segundos (se None, usa padrão da configuração).
+            
+        Returns:
+            True se armazenado com sucesso, False caso contrário.
+        """
+        l2_ttl = ttl or self.config['cache']['l2_ttl']
+        prepared = {key: self._prepare_cache_value(value) for key, value in items.items()}
+        
+        for key, (serialized, l1_value) in prepared.items():
+            size = len(serialized) if isinstance(serialized, (str, bytes)) else None
+            self.l1_cache.set(key, l1_value, ttl=self._l1_ttl(l2_ttl), size=size)
+        
+        if self.redis_client and prepared:
+            try:
+                pipe = self.redis_client.pipeline(transaction=False)
+                for key, (serialized, _) in prepared.items():
+                    pipe.set(key, serialized, ex=l2_ttl)
+                self.redis_breaker.call(pipe.execute)
+                for key in prepared:
+                    self._broadcast_invalidation(key=key)
+                return True
+            except CircuitOpenError:
+                return False
+            except Exception as e:
+                logger.error(f"Erro ao armazenar em cache L2 em lote: {str(e)}")
+                return False
+        
+        return True
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """
+        Retorna estatísticas do cache L1 (hits, misses, evicções, ocupação).
+        
+        Útil para dimensionar o cache por worker.
+        
+        Returns:
+            Dicionário com as estatísticas do L1.
+        """
+        return self.l1_cache.stats()
+    
     def cache_invalidate(self, key: str, entity_type: str = None) -> bool:
         """
         Invalida uma entrada do cache (L1 e L2).
@@ -507,21 +712,110 @@ class DataServiceHub:
         full_key = f"{entity_type}:{key}" if entity_type else key
         
         # Remover de L1
-        if full_key in self.l1_cache:
-            del self.l1_cache[full_key]
+        self.l1_cache.delete(full_key)
         
         # Remover de L2 (Redis) - apenas se não estivermos no modo de desenvolvimento
         if self.redis_client:
             try:
-                self.redis_client.delete(full_key)
+                self.redis_breaker.call(self.redis_client.delete, full_key)
+                self._broadcast_invalidation(key=full_key)
                 logger.debug(f"Cache invalidado para: {full_key}")
                 return True
+            except CircuitOpenError:
+                return False
             except Exception as e:
                 logger.error(f"Erro ao invalidar cache L2: {str(e)}")
                 return False
         
         return True  # Pelo menos L1 foi invalidado
     
+    def cache_invalidate_many(self, keys: List[str]) -> bool:
+        """
+        Invalida várias entradas do cache (L1 e L2) com um único DEL.
+        
+        Args:
+            keys: Chaves completas a invalidar.
+            
+        Returns:
+            True se invalidado com sucesso, False caso contrário.
+        """
+        keys = list(dict.fromkeys(keys))
+        for key in keys:
+            self.l1_cache.delete(key)
+        
+        if self.redis_client and keys:
+            try:
+                self.redis_breaker.call(self.redis_client.delete, *keys)
+                for key in keys:
+                    self._broadcast_invalidation(key=key)
+                return True
+            except CircuitOpenError:
+                return False
+            except Exception as e:
+                logger.error(f"Erro ao invalidar cache L2 em lote: {str(e)}")
+                return False
+        
+        return True
+    
+    def cache_invalidate_prefix(self, prefix: str) -> bool:
+        """
+        Invalida todas as entradas cujas chaves começam com o prefixo (L1 e L2).
+        
+        Args:
+            prefix: Prefixo das chaves (ex.: "conversation:123:").
+            
+        Returns:
+            True se invalidado com sucesso, False caso contrário.
+        """
+        self.l1_cache.delete_prefix(prefix)
+        
+        if self.redis_client:
+            try:
+                keys = self.redis_breaker.call(
+                    lambda: list(self.redis_client.scan_iter(match=f"{prefix}*", count=500))
+                )
+                if keys:
+                    self.redis_breaker.call(self.redis_client.delete, *keys)
+                self._broadcast_invalidation(prefix=prefix)
+                logger.debug(f"Cache invalidado para o prefixo: {prefix} ({len(keys)} chaves)")
+                return True
+            except CircuitOpenError:
+                return False
+            except Exception as e:
+                logger.error(f"Erro ao invalidar prefixo no cache L2: {str(e)}")
+                return False
+        
+        return True
+    
+    def _broadcast_invalidation(self, key: str = None, prefix: str = None) -> None:
+        """
+        Propaga uma invalidação para o L1 dos demais processos.
+        
+        Args:
+            key: Chave completa invalidada.
+            prefix: Prefixo invalidado.
+        """
+        if not self.invalidation_bus:
+            return
+        # Outros hubs do processo compartilham o barramento e são notificados diretamente
+        if key:
+            self.invalidation_bus.publish_key(key, source=self._apply_remote_invalidation)
+        if prefix:
+            self.invalidation_bus.publish_prefix(prefix, source=self._apply_remote_invalidation)
+    
+    def _apply_remote_invalidation(self, keys: List[str], prefixes: List[str]) -> None:
+        """
+        Aplica ao L1 local as invalidações recebidas de outros processos.
+        
+        Args:
+            keys: Chaves a remover.
+            prefixes: Prefixos a remover.
+        """
+        for key in keys:
+            self.l1_cache.delete(key)
+        for prefix in prefixes:
+            self.l1_cache.delete_prefix(prefix)
+    
     # Métodos para acesso a dados
     
     def _init_sqlite_connection(self):
@@ -565,7 +859,7 @@ class DataServiceHub:
         # Decidir qual conexão usar com base na disponibilidade
         if self.sqlite_conn:
             return self._execute_sqlite_query(query, params, fetch_all)
-        elif self.pg_conn:
+        elif self.pg_pool:
             return self._execute_pg_query(query, params, fetch_all)
         else:
             logger.error("Tentativa de executar consulta sem conexão com banco de dados")
@@ -584,32 +878,21 @@ class DataServiceHub:
             Resultados da consulta ou None em caso de erro.
         """
         try:
-            # Criar uma nova conexão com autocommit para evitar problemas com transações abortadas
-            # Isso é mais seguro para operações pontuais que não requerem transações
-            conn = psycopg2.connect(
-                host=self.config['postgres']['host'],
-                port=self.config['postgres']['port'],
-                user=self.config['postgres']['user'],
-                password=self.config['postgres']['password'],
-                database=self.config['postgres']['database']
-            )
-            conn.autocommit = True  # Importante para evitar problemas com transações abortadas
-            
-            # Usar RealDictCursor para retornar dicionários em vez de tuplas
-            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-                cursor.execute(query, params or {})
-                
-                if query.strip().upper().startswith(('SELECT', 'WITH')):
-                    if fetch_all:
-                        result = cursor.fetchall()
+            # Conexão do pool em autocommit: uma falha não contamina outras requisições
+            with self.pg_pool.connection() as conn:
+                # Usar RealDictCursor para retornar dicionários em vez de tuplas
+                with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                    cursor.execute(query, params or {})
+                    
+                    if query.strip().upper().startswith(('SELECT', 'WITH')):
+                        if fetch_all:
+                            result = cursor.fetchall()
+                        else:
+                            result = cursor.fetchone()
                     else:
-                        result = cursor.fetchone()
-                else:
-                    # Para operações que não retornam resultados (INSERT, UPDATE, DELETE)
-                    result = cursor.rowcount if fetch_all else None
+                        # Para operações que não retornam resultados (INSERT, UPDATE, DELETE)
+                        result = cursor.rowcount if fetch_all else None
             
-            # Fechar conexão temporária
-            conn.close()
             return result
         except Exception as e:
             logger.error(f"Erro ao executar consulta PostgreSQL: {str(e)}")
@@ -670,6 +953,64 @@ class DataServiceHub:
         
         return query
     
+    def execute_values(self, query: str, rows: List[Tuple[Any, ...]], template: str = None,
+                       page_size: int = 500,
+                       preamble: Optional[List[Tuple[str, Dict[str, Any]]]] = None) -> bool:
+        """
+        Executa um INSERT multi-linha (psycopg2 execute_values) em uma transação.
+        
+        A consulta deve conter um único "VALUES %s", expandido para as linhas
+        informadas (até page_size linhas por comando).
+        
+        Args:
+            query: Consulta SQL com "VALUES %s".
+            rows: Linhas (tuplas) a inserir.
+            template: Template de cada linha (ex.: "(%s, %s, NOW())").
+            page_size: Linhas por comando.
+            preamble: Consultas (query, params) executadas antes da inserção, na
+                mesma transação; se qualquer uma falhar, nada é gravado.
+            
+        Returns:
+            True se executado com sucesso, False caso contrário.
+        """
+        preamble = preamble or []
+        if not rows and not preamble:
+            return True
+        
+        if self.sqlite_conn:
+            # SQLite: mesma consulta com uma linha por execução (executemany)
+            try:
+                with self.sqlite_conn:
+                    for statement, params in preamble:
+                        self.sqlite_conn.execute(self._convert_query_to_sqlite(statement), params or {})
+                    if rows:
+                        row_template = template or "(" + ", ".join(["%s"] * len(rows[0])) + ")"
+                        sqlite_query = self._convert_query_to_sqlite(
+                            query.replace("VALUES %s", "VALUES " + row_template.replace("%s", "?"))
+                        )
+                        self.sqlite_conn.executemany(sqlite_query, rows)
+                return True
+            except Exception as e:
+                logger.error(f"Erro ao executar inserção em lote SQLite: {str(e)}")
+                return False
+        
+        if not self.pg_pool:
+            logger.error("Tentativa de executar inserção em lote sem conexão com banco de dados")
+            return False
+        
+        try:
+            with self.pg_pool.transaction() as conn:
+                with conn.cursor() as cursor:
+                    for statement, params in preamble:
+                        cursor.execute(statement, params or {})
+                    if rows:
+                        execute_values(cursor, query, rows, template=template, page_size=page_size)
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao executar inserção em lote PostgreSQL: {str(e)}")
+            logger.error(f"Query: {query}")
+            return False
+    
     def execute_transaction(self, queries: List[Tuple[str, Dict[str, Any]]]) -> bool:
         """
         Executa múltiplas consultas em uma transação.
@@ -683,7 +1024,7 @@ class DataServiceHub:
         # Verificar qual banco de dados está sendo utilizado
         if self.sqlite_conn:
             return self._execute_sqlite_transaction(queries)
-        elif self.pg_conn:
+        elif self.pg_pool:
             return self._execute_pg_transaction(queries)
         else:
             logger.error("Tentativa de executar transação sem conexão com banco de dados")
@@ -700,8 +1041,8 @@ class DataServiceHub:
             True se a transação foi concluída com sucesso, False caso contrário.
         """
         try:
-            with self.pg_conn:  # Isso garante commit/rollback automático
-                with self.pg_conn.cursor() as cursor:
+            with self.pg_pool.transaction() as conn:  # Isso garante commit/rollback automático
+                with conn.cursor() as cursor:
                     for query, params in queries:
                         cursor.execute(query, params or {})
             
@@ -784,9 +1125,17 @@ class DataServiceHub:
         """
         Fecha todas as conexões.
         """
-        if self.pg_conn:
-            self.pg_conn.close()
-            logger.info("Conexão PostgreSQL fechada")
+        if self.invalidation_bus:
+            # O barramento é compartilhado no processo: apenas deixar de recebê-lo
+            self.invalidation_bus.remove_listener(self._apply_remote_invalidation)
+            self.invalidation_bus.flush()
+        for cache_tool in self._tool_caches:
+            cache_tool.close()
+        self._tool_caches.clear()
+            
+        if self.pg_pool:
+            self.pg_pool.close()
+            logger.info("Pool de conexões PostgreSQL fechado")
         
         if self.redis_client:
             self.redis_client.close()
@@ -0,0 +1,208 @@
+"""
+Pool de conexões PostgreSQL para o DataServiceHub.
+
+Substitui a conexão única compartilhada por um pool thread-safe
+(psycopg2 ThreadedConnectionPool) com:
+- tamanho mínimo/máximo configurável
+- timeout de checkout (o ThreadedConnectionPool falha imediatamente quando
+  esgotado; aqui a requisição espera até `timeout` segundos por uma conexão)
+- descarte automático de conexões quebradas e rollback de transações abortadas
+- métricas de uso (tempo de espera, conexões em uso, saturação)
+
+Cada checkout entrega uma conexão exclusiva para a thread que a obteve,
+então requisições concorrentes não se serializam nem se contaminam.
+"""
+
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+
+try:
+    import psycopg2
+    from psycopg2 import extensions
+    from psycopg2.pool import ThreadedConnectionPool
+    POSTGRES_AVAILABLE = True
+except ImportError:
+    POSTGRES_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeoutError(Exception):
+    """Erro lançado quando nenhuma conexão fica disponível dentro do timeout."""
+
+
+class PostgresConnectionPool:
+    """
+    Pool de conexões PostgreSQL com timeout de checkout e métricas.
+
+    As conexões são entregues em modo autocommit; `transaction()` desliga o
+    autocommit durante o bloco e faz commit/rollback ao final.
+    """
+
+    def __init__(self, host: str, port: Any, user: str, password: str, database: str,
+                 min_size: int = 1, max_size: int = 10, timeout: float = 5.0):
+        """
+        Inicializa o pool e abre as conexões mínimas.
+
+        Args:
+            host: Host do PostgreSQL.
+            port: Porta do PostgreSQL.
+            user: Usuário.
+            password: Senha.
+            database: Nome do banco.
+            min_size: Número de conexões abertas na inicialização.
+            max_size: Número máximo de conexões simultâneas.
+            timeout: Tempo máximo de espera (segundos) por uma conexão livre.
+        """
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.dsn_info = f"{host}:{port}/{database}"
+
+        self._pool = ThreadedConnectionPool(
+            min_size, max_size,
+            host=host, port=port, user=user, password=password, database=database
+        )
+        # Limita os checkouts ao tamanho do pool, permitindo esperar com timeout
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._metrics_lock = threading.Lock()
+        self._closed = False
+
+        self.in_use = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.discarded = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """
+        Obtém uma conexão do pool pelo tempo do bloco `with`.
+
+        Conexões que falharem com erro de conectividade são descartadas e
+        substituídas; transações deixadas abertas são desfeitas antes da
+        conexão voltar ao pool.
+
+        Yields:
+            Conexão psycopg2 em modo autocommit.
+
+        Raises:
+            PoolTimeoutError: Se nenhuma conexão ficar livre dentro do timeout.
+        """
+        conn = self._checkout()
+        broken = False
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        finally:
+            self._checkin(conn, broken)
+
+    @contextmanager
+    def transaction(self) -> Iterator[Any]:
+        """
+        Obtém uma conexão do pool dentro de uma transação.
+
+        Faz commit ao final do bloco, ou rollback se uma exceção for lançada.
+
+        Yields:
+            Conexão psycopg2 com autocommit desligado.
+        """
+        with self.connection() as conn:
+            conn.autocommit = False
+            try:
+                with conn:
+                    yield conn
+            finally:
+                if not conn.closed:
+                    conn.autocommit = True
+
+    def _checkout(self):
+        """Obtém uma conexão saudável, aguardando no máximo `timeout` segundos."""
+        if self._closed:
+            raise PoolTimeoutError("Pool de conexões PostgreSQL está fechado")
+
+        started = time.monotonic()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._metrics_lock:
+                self.timeouts += 1
+            raise PoolTimeoutError(
+                f"Nenhuma conexão PostgreSQL livre após {self.timeout}s (max={self.max_size})"
+            )
+        waited = time.monotonic() - started
+
+        try:
+            conn = self._pool.getconn()
+            if conn.closed:
+                # Conexão fechada pelo servidor: descartar e abrir outra
+                self._pool.putconn(conn, close=True)
+                with self._metrics_lock:
+                    self.discarded += 1
+                conn = self._pool.getconn()
+            conn.autocommit = True
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._metrics_lock:
+            self.in_use += 1
+            self.checkouts += 1
+            self.total_wait_time += waited
+            self.max_wait_time = max(self.max_wait_time, waited)
+        return conn
+
+    def _checkin(self, conn, broken: bool = False) -> None:
+        """Devolve a conexão ao pool, descartando-a se estiver quebrada."""
+        try:
+            if not broken and not conn.closed:
+                status = conn.get_transaction_status()
+                if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                    broken = True
+                elif status != extensions.TRANSACTION_STATUS_IDLE:
+                    # Transação aberta ou abortada: não contaminar o próximo uso
+                    conn.rollback()
+        except Exception as e:
+            logger.warning(f"Descartando conexão PostgreSQL após erro no checkin: {e}")
+            broken = True
+
+        close = broken or conn.closed
+        try:
+            self._pool.putconn(conn, close=close)
+        except Exception as e:
+            logger.debug(f"Erro ao devolver conexão ao pool: {e}")
+        finally:
+            with self._metrics_lock:
+                self.in_use -= 1
+                if close:
+                    self.discarded += 1
+            self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Retorna métricas do pool.
+
+        Returns:
+            Dicionário com conexões em uso, saturação, tempos de espera e contadores.
+        """
+        with self._metrics_lock:
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "in_use": self.in_use,
+                "saturation": self.in_use / self.max_size if self.max_size else 0.0,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "discarded_connections": self.discarded,
+                "avg_wait_time": self.total_wait_time / self.checkouts if self.checkouts else 0.0,
+                "max_wait_time": self.max_wait_time
+            }
+
+    def close(self) -> None:
+        """Fecha todas as conexões do pool."""
+        self._closed = True
+        self._pool.closeall()
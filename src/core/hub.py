@@ -12,13 +12,20 @@ The hub-and-spoke architecture follows these principles:
 5. Resilient operation: Failures in one component don't compromise the entire system
 """
 
+import os
+import time
 import logging
-from typing import Dict, List, Any, Optional, Union
+import threading
+from contextlib import nullcontext
+from typing import Callable, Dict, List, Any, Optional, Tuple, Union
 import json
 
+import numpy as np
+
 from crewai import Agent, Task, Crew
 # Importamos nossa própria implementação de RedisAgentCache
 from src.core.cache.agent_cache import RedisAgentCache
+from src.core.cache.route_cache import SemanticRouteCache
 
 from crewai.tools.base_tool import BaseTool
 
@@ -26,6 +33,8 @@ from src.core.memory import MemorySystem
 # Nova estrutura com componentes centralizados em src/core
 from src.core.data_proxy_agent import DataProxyAgent
 from src.core.data_service_hub import DataServiceHub
+from src.core.intent_classifier import IntentClassifier, get_intent_classifier
+from src.core.metrics import LatencyHistogram
 
 logger = logging.getLogger(__name__)
 
@@ -65,6 +74,316 @@ def validate_message(message: Dict[str, Any]) -> bool:
     return True
 
 
+def routing_cache_input(message: Dict[str, Any], context: Dict[str, Any]) -> str:
+    """
+    Monta os dados de entrada usados como chave do cache de roteamento.
+    
+    Inclui apenas o que influencia a decisão de roteamento (conteúdo da
+    mensagem, canal e cliente), para que mensagens equivalentes compartilhem
+    a mesma entrada de cache entre workers e conversas.
+    
+    Args:
+        message: A mensagem normalizada
+        context: Contexto da conversa
+    
+    Returns:
+        String JSON canônica com os dados relevantes para o roteamento
+    """
+    return json.dumps({
+        "content": (message.get("content") or "").strip().lower(),
+        "channel_type": context.get("channel_type"),
+        "customer_id": context.get("customer_id")
+    }, sort_keys=True)
+
+
+# Confiança mínima para uma camada rápida responder sem escalar
+ROUTING_CONFIDENCE_THRESHOLD = float(os.environ.get("ROUTING_CONFIDENCE_THRESHOLD", "0.8"))
+
+# Habilita a camada de centróides de embeddings (requer um backend de embeddings rápido)
+ROUTING_USE_CENTROIDS = os.environ.get("ROUTING_USE_CENTROIDS", "false").lower() == "true"
+
+# Habilita o cache semântico de decisões da camada "llm"
+ROUTING_USE_SEMANTIC_CACHE = os.environ.get("ROUTING_USE_SEMANTIC_CACHE", "false").lower() == "true"
+
+# Exemplos rotulados necessários antes de uma crew participar da camada de centróides
+ROUTING_CENTROID_MIN_EXAMPLES = int(os.environ.get("ROUTING_CENTROID_MIN_EXAMPLES", "5"))
+
+# Buckets de latência do roteamento, em segundos (a camada de palavras-chave fica em microssegundos)
+ROUTING_LATENCY_BUCKETS = (
+    0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0
+)
+
+
+def apply_customer_history(routing: Dict[str, Any], customer_history: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Ajusta uma decisão de roteamento pelo histórico do cliente.
+    
+    Clientes com tickets de suporte recentes vão para "support" quando a
+    confiança é menor que 0.9; clientes com compras recentes vão para "sales"
+    quando é menor que 0.7. Decisões alteradas recebem source="customer_history",
+    pois não dependem do conteúdo da mensagem.
+    
+    Args:
+        routing: Decisão com crew, confiança e raciocínio
+        customer_history: Histórico do cliente (vazio ou None não altera a decisão)
+    
+    Returns:
+        A decisão original ou uma cópia ajustada
+    """
+    if not customer_history:
+        return routing
+    
+    confidence = routing.get("confidence", 0)
+    override = None
+    # If customer has recent support interactions, route to support
+    if customer_history.get("recent_support_tickets", 0) > 0 and confidence < 0.9:
+        override = ("support", "Customer has recent support tickets")
+    # If customer has recent purchases, route to sales
+    if customer_history.get("recent_purchases", 0) > 0 and confidence < 0.7:
+        override = ("sales", "Customer has recent purchases")
+    
+    if override is None:
+        return routing
+    crew, reasoning = override
+    return {**routing, "crew": crew, "confidence": 0.6, "reasoning": reasoning, "source": "customer_history"}
+
+
+class RouteCentroids:
+    """
+    Classificador de centróide mais próximo sobre rotas passadas rotuladas.
+    
+    Mantém, por crew, a soma dos embeddings normalizados das mensagens já
+    roteadas com alta confiança; a similaridade de cosseno com o centróide
+    de cada crew é um produto escalar.
+    """
+    
+    def __init__(self, min_examples: int = ROUTING_CENTROID_MIN_EXAMPLES):
+        """
+        Inicializa os centróides vazios.
+        
+        Args:
+            min_examples: Exemplos necessários antes de uma crew ser considerada
+        """
+        self.min_examples = min_examples
+        self._sums: Dict[str, np.ndarray] = {}
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _unit(vector) -> Optional[np.ndarray]:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+    
+    def add(self, embedding, crew: str) -> None:
+        """
+        Registra uma mensagem rotulada.
+        
+        Args:
+            embedding: Embedding da mensagem
+            crew: Crew escolhida para a mensagem
+        """
+        vector = self._unit(embedding)
+        if vector is None:
+            return
+        with self._lock:
+            current = self._sums.get(crew)
+            if current is not None and current.shape != vector.shape:
+                return
+            self._sums[crew] = vector if current is None else current + vector
+            self._counts[crew] = self._counts.get(crew, 0) + 1
+    
+    def is_ready(self, crew: str) -> bool:
+        """Indica se a crew já tem exemplos suficientes para participar da camada."""
+        with self._lock:
+            return self._counts.get(crew, 0) >= self.min_examples
+    
+    def nearest(self, embedding) -> Tuple[Optional[str], float]:
+        """
+        Encontra a crew cujo centróide é mais similar ao embedding.
+        
+        Args:
+            embedding: Embedding da mensagem
+        
+        Returns:
+            Tupla (crew ou None se não há centróides prontos, similaridade de cosseno)
+        """
+        vector = self._unit(embedding)
+        if vector is None:
+            return None, 0.0
+        with self._lock:
+            ready = {
+                crew: total for crew, total in self._sums.items()
+                if self._counts[crew] >= self.min_examples and total.shape == vector.shape
+            }
+        best_crew, best_score = None, 0.0
+        for crew, total in ready.items():
+            norm = np.linalg.norm(total)
+            score = float(total @ vector / norm) if norm else 0.0
+            if score > best_score:
+                best_crew, best_score = crew, score
+        return best_crew, best_score
+    
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+
+class TieredRouter:
+    """
+    Roteador em camadas: classificadores locais baratos primeiro, LLM só quando necessário.
+    
+    1. "keyword": classificador de palavras-chave compilado (microssegundos)
+    2. "semantic_cache": decisão de uma mensagem semelhante no mesmo canal/domínio (opcional)
+    3. "centroid": centróide mais próximo sobre embeddings de rotas passadas (opcional)
+    4. "llm": caminho completo de roteamento (histórico do cliente, interações similares)
+    
+    Uma camada responde quando sua confiança atinge o limiar; caso contrário a
+    mensagem escala para a próxima. O histórico do cliente é aplicado também às
+    decisões da camada "keyword". As decisões da camada "llm" derivadas do
+    conteúdo da mensagem (source="keywords") são gravadas no cache semântico e
+    alimentam os centróides, assim como os acertos da camada "keyword" enquanto a
+    crew ainda não tem exemplos suficientes. A camada usada e sua latência são
+    registradas no log e em um histograma por camada.
+    """
+    
+    TIERS = ("keyword", "semantic_cache", "centroid", "llm")
+    
+    def __init__(self, classifier: Optional[IntentClassifier] = None,
+                 embedding_service=None,
+                 threshold: float = ROUTING_CONFIDENCE_THRESHOLD,
+                 use_centroids: Optional[bool] = None,
+                 centroids: Optional[RouteCentroids] = None,
+                 semantic_cache: Optional[SemanticRouteCache] = None,
+                 use_semantic_cache: bool = ROUTING_USE_SEMANTIC_CACHE):
+        """
+        Inicializa o roteador.
+        
+        Args:
+            classifier: Classificador de palavras-chave (usa o compartilhado se omitido)
+            embedding_service: Serviço de embeddings da camada de centróides
+                (obtido de get_embedding_service se omitido e use_centroids=True)
+            threshold: Confiança mínima para responder sem escalar
+            use_centroids: Habilita a camada de centróides (padrão: ROUTING_USE_CENTROIDS
+                ou quando um embedding_service é informado)
+            centroids: Centróides pré-carregados (opcional)
+            semantic_cache: Cache semântico de decisões (opcional)
+            use_semantic_cache: Cria um cache semântico em memória se semantic_cache for omitido
+        """
+        self.classifier = classifier
+        self.embedding_service = embedding_service
+        self.threshold = threshold
+        if use_centroids is None:
+            use_centroids = ROUTING_USE_CENTROIDS or embedding_service is not None
+        self.use_centroids = use_centroids
+        self.centroids = centroids or RouteCentroids()
+        self.semantic_cache = semantic_cache or (SemanticRouteCache() if use_semantic_cache else None)
+        self.latency = {tier: LatencyHistogram(ROUTING_LATENCY_BUCKETS) for tier in self.TIERS}
+    
+    def _get_embedding(self, text: str) -> Optional[List[float]]:
+        """Gera o embedding da mensagem para as camadas semânticas (None se indisponível)."""
+        if not (self.use_centroids or self.semantic_cache) or not text:
+            return None
+        try:
+            if self.embedding_service is None:
+                from src.services.embedding_service import get_embedding_service
+                self.embedding_service = get_embedding_service()
+            return self.embedding_service.get_embedding(text)
+        except Exception as e:
+            logger.warning(f"Camadas semânticas indisponíveis: {e}")
+            return None
+    
+    def _finish(self, result: Dict[str, Any], tier: str, started: float, message: Dict[str, Any]) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - started
+        self.latency[tier].observe(elapsed)
+        result = {**result, "tier": tier}
+        logger.info(
+            f"Roteamento da mensagem {message.get('id', '')}: camada={tier} crew={result.get('crew')} "
+            f"confiança={result.get('confidence', 0):.2f} latência={elapsed * 1000:.3f}ms"
+        )
+        return result
+    
+    def route(self, message: Dict[str, Any], context: Dict[str, Any],
+              fallback: Callable[[Dict[str, Any], Dict[str, Any]], Dict[str, Any]],
+              customer_history: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """
+        Roteia uma mensagem pela primeira camada suficientemente confiante.
+        
+        Args:
+            message: A mensagem normalizada
+            context: Contexto adicional para roteamento
+            fallback: Roteamento completo usado na camada "llm"
+            customer_history: Carrega o histórico do cliente a partir do contexto,
+                aplicado às decisões da camada "keyword" (opcional)
+        
+        Returns:
+            Decisão de roteamento com crew, raciocínio, confiança e a camada usada
+        """
+        started = time.perf_counter()
+        content = message.get("content") or ""
+        classifier = self.classifier or get_intent_classifier()
+        
+        crew, confidence, scores = classifier.classify(content)
+        if crew and confidence >= self.threshold:
+            result = {
+                "crew": crew,
+                "confidence": confidence,
+                "reasoning": f"Message contains {crew}-related keywords",
+                "scores": scores,
+                "source": "keywords"
+            }
+            if customer_history is not None:
+                result = apply_customer_history(result, customer_history(context))
+            if self.use_centroids and result["source"] == "keywords" and not self.centroids.is_ready(crew):
+                embedding = self._get_embedding(content)
+                if embedding is not None:
+                    self.centroids.add(embedding, crew)
+            return self._finish(result, "keyword", started, message)
+        
+        embedding = self._get_embedding(content)
+        channel_type, domain = context.get("channel_type"), context.get("domain")
+        if embedding is not None and self.semantic_cache is not None:
+            cached = self.semantic_cache.get(embedding, channel_type, domain, classifier.crew_signatures)
+            if cached:
+                return self._finish(cached, "semantic_cache", started, message)
+        
+        if embedding is not None and self.use_centroids:
+            crew, similarity = self.centroids.nearest(embedding)
+            if crew and similarity >= self.threshold:
+                return self._finish({
+                    "crew": crew,
+                    "confidence": round(similarity, 4),
+                    "reasoning": f"Message is similar to past {crew} messages",
+                    "scores": scores,
+                    "source": "centroid"
+                }, "centroid", started, message)
+        
+        result = fallback(message, context)
+        # Apenas decisões derivadas do conteúdo valem para outras mensagens e clientes:
+        # as do histórico do cliente e a rota padrão não são reaproveitadas
+        if embedding is not None and result.get("crew") and result.get("source") == "keywords":
+            if self.semantic_cache is not None:
+                self.semantic_cache.set(embedding, result, channel_type, domain, classifier.crew_signatures)
+            if self.use_centroids:
+                self.centroids.add(embedding, result["crew"])
+        return self._finish(result, "llm", started, message)
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Retorna a latência por camada e o tamanho dos centróides.
+        
+        Returns:
+            Dicionário com limiar, histogramas por camada, exemplos por crew e
+            estatísticas do cache semântico
+        """
+        return {
+            "threshold": self.threshold,
+            "tiers": {tier: histogram.snapshot() for tier, histogram in self.latency.items()},
+            "centroids": self.centroids.stats(),
+            "semantic_cache": self.semantic_cache.stats() if self.semantic_cache is not None else None
+        }
+
+
 class OrchestratorAgent(Agent):
     """
     Agent responsible for orchestrating the flow of information between crews.
@@ -85,6 +404,7 @@ class OrchestratorAgent(Agent):
                  data_proxy_agent: Optional[DataProxyAgent] = None,
                  additional_tools: Optional[List[BaseTool]] = None,
                  crew_registry: Optional[Dict[str, Any]] = None,
+                 router: Optional[TieredRouter] = None,
                  **kwargs):
         """
         Initialize the orchestrator agent.
@@ -94,6 +414,7 @@ class OrchestratorAgent(Agent):
             data_proxy_agent: Agent for data access (optional)
             additional_tools: Additional tools for the agent (optional)
             crew_registry: Dictionary mapping crew names to crew instances (optional)
+            router: Tiered router used on cache misses (optional)
             **kwargs: Additional arguments for the Agent class
         """
         tools = []
@@ -130,6 +451,7 @@ class OrchestratorAgent(Agent):
         self.__dict__["_memory_system"] = memory_system
         self.__dict__["_data_proxy_agent"] = data_proxy_agent
         self.__dict__["_crew_registry"] = crew_registry or {}
+        self.__dict__["_router"] = router or TieredRouter()
         self.__dict__["agent_cache"] = None  # Inicializado como None, será definido nos testes
     
     @property
@@ -144,6 +466,10 @@ class OrchestratorAgent(Agent):
     def crew_registry(self):
         return self.__dict__["_crew_registry"]
     
+    @property
+    def router(self):
+        return self.__dict__["_router"]
+    
     def route_message(self, message: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
         """
         Route a message to the appropriate functional crew.
@@ -169,7 +495,7 @@ class OrchestratorAgent(Agent):
         # Check cache first for performance optimization if agent_cache is available
         message_id = normalized_message.get('id', '')
         agent_id = f"orchestrator:{self.role}"
-        input_data = json.dumps({"message": normalized_message, "context": context})
+        input_data = routing_cache_input(normalized_message, context)
         cached_route = None
         
         if "agent_cache" in self.__dict__ and self.__dict__["agent_cache"]:
@@ -182,9 +508,11 @@ class OrchestratorAgent(Agent):
             logger.info(f"Usando rota em cache para a mensagem {normalized_message.get('id', '')}")
             return cached_route
         
-        # Se não há cache, use o método de roteamento com LLM
-        logger.debug(f"Iniciando roteamento com LLM para a mensagem: {message}")
-        result = self._route_with_llm(normalized_message, context)
+        # Se não há cache, use o roteador em camadas (LLM apenas para baixa confiança)
+        logger.debug(f"Iniciando roteamento em camadas para a mensagem: {message}")
+        result = self.router.route(
+            normalized_message, context, self._route_with_llm, self._load_customer_history
+        )
         logger.info(f"Roteamento concluído para a mensagem {message.get('id', '')}")
         
         # Cache the result for future use if agent_cache is available
@@ -196,6 +524,21 @@ class OrchestratorAgent(Agent):
         
         return result
     
+    def _load_customer_history(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Carrega o histórico do cliente do contexto, se houver memória disponível.
+        
+        Args:
+            context: Contexto de roteamento (usa customer_id)
+        
+        Returns:
+            Histórico do cliente ou dicionário vazio
+        """
+        customer_id = context.get("customer_id")
+        if customer_id and self.memory_system:
+            return self.memory_system.retrieve_customer_data(customer_id) or {}
+        return {}
+    
     def _route_with_llm(self, message: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
         """
         Roteamento usando LLM quando não há cache disponível.
@@ -214,12 +557,9 @@ class OrchestratorAgent(Agent):
         # Extract key information from message and context
         message_content = message.get("content", "").lower()
         channel_type = context.get("channel_type", "unknown")
-        customer_id = context.get("customer_id")
         
         # Load customer history if available
-        customer_history = {}
-        if customer_id and self.memory_system:
-            customer_history = self.memory_system.retrieve_customer_data(customer_id)
+        customer_history = self._load_customer_history(context)
         
         # Use DataProxyAgent para encontrar interações similares, se disponível
         similar_interactions = []
@@ -237,54 +577,27 @@ class OrchestratorAgent(Agent):
         # This is a simplified routing logic - in a real system, this would be more complex
         
         # Default values
-        selected_crew = "general"
-        confidence = 0.5
-        reasoning = "Default routing to general crew"
-        
-        # Check for sales-related keywords
-        sales_keywords = ["buy", "price", "cost", "purchase", "order", "discount"]
-        if any(keyword in message_content for keyword in sales_keywords):
-            selected_crew = "sales"
-            confidence = 0.8
-            reasoning = "Message contains sales-related keywords"
-        
-        # Check for support-related keywords
-        support_keywords = ["help", "issue", "problem", "broken", "not working", "error"]
-        if any(keyword in message_content for keyword in support_keywords):
-            selected_crew = "support"
-            confidence = 0.8
-            reasoning = "Message contains support-related keywords"
-        
-        # Check for product-related keywords
-        product_keywords = ["product", "feature", "specification", "specs", "details"]
-        if any(keyword in message_content for keyword in product_keywords):
-            selected_crew = "product"
-            confidence = 0.7
-            reasoning = "Message contains product-related keywords"
-        
-        # Adjust based on customer history if available
-        if customer_history:
-            # If customer has recent support interactions, route to support
-            if customer_history.get("recent_support_tickets", 0) > 0:
-                if confidence < 0.9:  # Only override if not very confident
-                    selected_crew = "support"
-                    confidence = 0.6
-                    reasoning = "Customer has recent support tickets"
-            
-            # If customer has recent purchases, route to sales
-            if customer_history.get("recent_purchases", 0) > 0:
-                if confidence < 0.7:  # Only override if not confident
-                    selected_crew = "sales"
-                    confidence = 0.6
-                    reasoning = "Customer has recent purchases"
-        
-        # Create routing result
         routing_result = {
-            "crew": selected_crew,
-            "confidence": confidence,
-            "reasoning": reasoning
+            "crew": "general",
+            "confidence": 0.5,
+            "reasoning": "Default routing to general crew",
+            "source": "default"
         }
         
+        # Score all crews in one pass with the compiled keyword classifier
+        crew, score, crew_scores = get_intent_classifier().classify(message_content)
+        routing_result["scores"] = crew_scores
+        if crew:
+            routing_result.update({
+                "crew": crew,
+                "confidence": score,
+                "reasoning": f"Message contains {crew}-related keywords",
+                "source": "keywords"
+            })
+        
+        # Adjust based on customer history if available
+        routing_result = apply_customer_history(routing_result, customer_history)
+        
         logger.info(f"Roteamento da mensagem {message.get('id', '')} para a crew funcional")
         return routing_result
 
@@ -672,6 +985,7 @@ class HubCrew(Crew):
                  data_service_hub: Optional['DataServiceHub'] = None,
                  additional_tools: Optional[Dict[str, List[BaseTool]]] = None,
                  agent_cache: Optional[RedisAgentCache] = None,
+                 router: Optional[TieredRouter] = None,
                  **kwargs):
         """
         Initialize the hub crew.
@@ -681,6 +995,7 @@ class HubCrew(Crew):
             data_service_hub: Central hub for all data services
             additional_tools: Additional tools for the agents (optional)
             agent_cache: Cache for agent responses (optional)
+            router: Tiered router shared with the orchestrator (optional)
             **kwargs: Additional arguments for the Crew class
         """
         # Create agents
@@ -703,11 +1018,14 @@ class HubCrew(Crew):
             additional_tools=data_proxy_tools
         )
         
+        router = router or TieredRouter()
+        
         # Agora criamos os outros agentes, passando o DataProxyAgent
         orchestrator = OrchestratorAgent(
             memory_system=memory_system,
             data_proxy_agent=data_proxy,
-            additional_tools=orchestrator_tools
+            additional_tools=orchestrator_tools,
+            router=router
         )
         
         context_manager = ContextManagerAgent(
@@ -752,6 +1070,7 @@ class HubCrew(Crew):
         self.__dict__["_context_manager"] = context_manager
         self.__dict__["_data_proxy"] = data_proxy
         self.__dict__["_data_service_hub"] = data_service_hub
+        self.__dict__["_router"] = router
     
     @property
     def memory_system(self):
@@ -777,6 +1096,10 @@ class HubCrew(Crew):
     def data_service_hub(self):
         return self.__dict__["_data_service_hub"]
     
+    @property
+    def router(self):
+        return self.__dict__["_router"]
+    
     def _route_message(self, message: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
         """
         Route a message to the appropriate functional crew.
@@ -802,7 +1125,7 @@ class HubCrew(Crew):
         # Check cache first for performance optimization if agent_cache is available
         message_id = normalized_message.get('id', '')
         agent_id = f"hubcrew:{self.role}"
-        input_data = json.dumps({"message": normalized_message, "context": context})
+        input_data = routing_cache_input(normalized_message, context)
         cached_route = None
         
         if self.__dict__["_agent_cache"]:
@@ -815,9 +1138,11 @@ class HubCrew(Crew):
             logger.info(f"Usando rota em cache para a mensagem {normalized_message.get('id', '')}")
             return cached_route
         
-        # Se não há cache, use o método de roteamento com LLM
-        logger.debug(f"Iniciando roteamento com LLM para a mensagem: {message}")
-        result = self._route_with_llm(normalized_message, context)
+        # Se não há cache, use o roteador em camadas (LLM apenas para baixa confiança)
+        logger.debug(f"Iniciando roteamento em camadas para a mensagem: {message}")
+        result = self.router.route(
+            normalized_message, context, self._route_with_llm, self._load_customer_history
+        )
         logger.info(f"Roteamento concluído para a mensagem {message.get('id', '')}")
         
         # Cache the result for future use if agent_cache is available
@@ -829,6 +1154,21 @@ class HubCrew(Crew):
         
         return result
     
+    def _load_customer_history(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Carrega o histórico do cliente do contexto, se houver memória disponível.
+        
+        Args:
+            context: Contexto de roteamento (usa customer_id)
+        
+        Returns:
+            Histórico do cliente ou dicionário vazio
+        """
+        customer_id = context.get("customer_id")
+        if customer_id and self.memory_system:
+            return self.memory_system.retrieve_customer_data(customer_id) or {}
+        return {}
+    
     def _route_with_llm(self, message: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
         """
         Roteamento usando LLM quando não há cache disponível.
@@ -847,12 +1187,9 @@ class HubCrew(Crew):
         # Extract key information from message and context
         message_content = message.get("content", "").lower()
         channel_type = context.get("channel_type", "unknown")
-        customer_id = context.get("customer_id")
         
         # Load customer history if available
-        customer_history = {}
-        if customer_id and self.memory_system:
-            customer_history = self.memory_system.retrieve_customer_data(customer_id)
+        customer_history = self._load_customer_history(context)
         
         # Use DataProxyAgent para encontrar interações similares, se disponível
         similar_interactions = []
@@ -870,57 +1207,42 @@ class HubCrew(Crew):
         # This is a simplified routing logic - in a real system, this would be more complex
         
         # Default values
-        selected_crew = "general"
-        confidence = 0.5
-        reasoning = "Default routing to general crew"
-        
-        # Check for sales-related keywords
-        sales_keywords = ["buy", "price", "cost", "purchase", "order", "discount"]
-        if any(keyword in message_content for keyword in sales_keywords):
-            selected_crew = "sales"
-            confidence = 0.8
-            reasoning = "Message contains sales-related keywords"
-        
-        # Check for support-related keywords
-        support_keywords = ["help", "issue", "problem", "broken", "not working", "error"]
-        if any(keyword in message_content for keyword in support_keywords):
-            selected_crew = "support"
-            confidence = 0.8
-            reasoning = "Message contains support-related keywords"
-        
-        # Check for product-related keywords
-        product_keywords = ["product", "feature", "specification", "specs", "details"]
-        if any(keyword in message_content for keyword in product_keywords):
-            selected_crew = "product"
-            confidence = 0.7
-            reasoning = "Message contains product-related keywords"
-        
-        # Adjust based on customer history if available
-        if customer_history:
-            # If customer has recent support interactions, route to support
-            if customer_history.get("recent_support_tickets", 0) > 0:
-                if confidence < 0.9:  # Only override if not very confident
-                    selected_crew = "support"
-                    confidence = 0.6
-                    reasoning = "Customer has recent support tickets"
-            
-            # If customer has recent purchases, route to sales
-            if customer_history.get("recent_purchases", 0) > 0:
-                if confidence < 0.7:  # Only override if not confident
-                    selected_crew = "sales"
-                    confidence = 0.6
-                    reasoning = "Customer has recent purchases"
-        
-        # Create routing result
         routing_result = {
-            "crew": selected_crew,
-            "confidence": confidence,
-            "reasoning": reasoning
+            "crew": "general",
+            "confidence": 0.5,
+            "reasoning": "Default routing to general crew",
+            "source": "default"
         }
         
+        # Score all crews in one pass with the compiled keyword classifier
+        crew, score, crew_scores = get_intent_classifier().classify(message_content)
+        routing_result["scores"] = crew_scores
+        if crew:
+            routing_result.update({
+                "crew": crew,
+                "confidence": score,
+                "reasoning": f"Message contains {crew}-related keywords",
+                "source": "keywords"
+            })
+        
+        # Adjust based on customer history if available
+        routing_result = apply_customer_history(routing_result, customer_history)
+        
         logger.info(f"Roteamento da mensagem {message.get('id', '')} para a crew funcional")
         return routing_result
     
+    def _context_writes(self):
+        """
+        Agrupa as escritas de variáveis de contexto do processamento de uma mensagem.
+        
+        Returns:
+            O bloco batch_writes do ConversationContextService, ou um contexto
+            vazio se o serviço não estiver registrado no DataServiceHub
+        """
+        services = getattr(self.data_service_hub, "services", None) or {}
+        context_service = services.get("ConversationContextService")
+        return context_service.batch_writes() if context_service is not None else nullcontext()
+    
     def process_message(self, 
                        message: Dict[str, Any],
                        conversation_id: str,
@@ -940,25 +1262,27 @@ class HubCrew(Crew):
         Returns:
             Processing result with message, context, and routing information
         """
-        # Load or create conversation context
-        context = self.memory_system.retrieve_conversation_context(conversation_id) or {}
-        
-        # Add channel information to context
-        context["channel_type"] = channel_type
-        context["conversation_id"] = conversation_id
-        
-        # Update context with the new message
-        updated_context = self.context_manager.update_context(
-            conversation_id=conversation_id,
-            message=message,
-            current_context=context
-        )
-        
-        # Route the message to the appropriate functional crew
-        routing = self._route_message(
-            message=message,
-            context=updated_context
-        )
+        # Variáveis de contexto gravadas durante o processamento saem em um único upsert
+        with self._context_writes():
+            # Load or create conversation context
+            context = self.memory_system.retrieve_conversation_context(conversation_id) or {}
+            
+            # Add channel information to context
+            context["channel_type"] = channel_type
+            context["conversation_id"] = conversation_id
+            
+            # Update context with the new message
+            updated_context = self.context_manager.update_context(
+                conversation_id=conversation_id,
+                message=message,
+                current_context=context
+            )
+            
+            # Route the message to the appropriate functional crew
+            routing = self._route_message(
+                message=message,
+                context=updated_context
+            )
         
         # Return the processing result
         result = {
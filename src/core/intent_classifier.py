@@ -0,0 +1,240 @@
+"""
+Classificador de intenção compilado para o roteamento do hub.
+
+As palavras-chave de cada crew (tabela padrão do hub e keywords das regras de
+negócio dos domínios em src/business_domain/) são compiladas uma única vez em
+uma expressão regular. Cada mensagem é normalizada (minúsculas, sem acentos) e
+percorrida em uma única passada, que devolve a pontuação de todas as crews.
+
+O classificador acompanha a data de modificação dos YAMLs de domínio e se
+reconstrói quando algum deles muda, sem reiniciar o processo.
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import yaml
+
+from src.core.cache.agent_cache import stable_hash
+
+logger = logging.getLogger(__name__)
+
+# Palavras-chave padrão do hub e o peso de cada crew
+DEFAULT_KEYWORDS: Dict[str, Tuple[float, List[str]]] = {
+    "sales": (0.8, ["buy", "price", "cost", "purchase", "order", "discount",
+                    "comprar", "preço", "pedido", "desconto"]),
+    "support": (0.8, ["help", "issue", "problem", "broken", "not working", "error",
+                      "ajuda", "problema", "defeito", "não funciona", "erro"]),
+    "product": (0.7, ["product", "feature", "specification", "specs", "details",
+                      "produto", "especificação", "detalhes", "ingredientes"]),
+}
+
+# Diretório padrão dos YAMLs de domínio, relativo a este módulo (não ao diretório de trabalho)
+DEFAULT_DOMAINS_DIR = os.path.normpath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "business_domain")
+)
+
+# Peso das palavras-chave vindas das regras de negócio dos domínios
+DOMAIN_KEYWORD_WEIGHT = 0.6
+
+# Intervalo mínimo entre verificações de alteração dos YAMLs (segundos)
+RELOAD_CHECK_INTERVAL = float(os.environ.get("INTENT_RELOAD_CHECK_INTERVAL", "5"))
+
+# Confiança máxima atribuída apenas por palavras-chave
+MAX_KEYWORD_CONFIDENCE = 0.95
+
+
+def normalize_for_matching(text: str) -> str:
+    """
+    Normaliza um texto para comparação de palavras-chave (minúsculas, sem acentos).
+
+    Args:
+        text: Texto original
+
+    Returns:
+        Texto normalizado
+    """
+    text = unicodedata.normalize("NFKD", (text or "").lower())
+    return "".join(char for char in text if not unicodedata.combining(char))
+
+
+class IntentClassifier:
+    """
+    Pontua as crews de uma mensagem com uma única expressão regular compilada.
+
+    Cada palavra-chave tem um peso por crew; a pontuação da crew combina os
+    pesos das palavras distintas encontradas (1 - Π(1 - peso)), de modo que
+    várias evidências aumentam a confiança sem ultrapassar 1.
+    """
+
+    def __init__(self, domains_dir: Optional[str] = None,
+                 keywords: Optional[Dict[str, Tuple[float, List[str]]]] = None,
+                 domain_weight: float = DOMAIN_KEYWORD_WEIGHT,
+                 reload_interval: float = RELOAD_CHECK_INTERVAL):
+        """
+        Inicializa e compila o classificador.
+
+        Args:
+            domains_dir: Diretório dos YAMLs de domínio (None desativa as keywords de domínio)
+            keywords: Tabela crew -> (peso, palavras-chave); usa DEFAULT_KEYWORDS se omitida
+            domain_weight: Peso das palavras-chave das regras de negócio
+            reload_interval: Intervalo mínimo entre verificações de alteração dos YAMLs
+        """
+        self.domains_dir = domains_dir
+        self.keywords = keywords if keywords is not None else DEFAULT_KEYWORDS
+        self.domain_weight = domain_weight
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._next_check = 0.0
+        self._mtimes: Dict[str, float] = {}
+        # Assinatura das palavras-chave de cada crew (estável entre processos)
+        self.crew_signatures: Dict[str, str] = {}
+        # (regex, palavra normalizada -> [(crew, peso)], crews)
+        self._compiled: Tuple[Optional[re.Pattern], Dict[str, List[Tuple[str, float]]], Tuple[str, ...]] = (None, {}, ())
+        self.reload()
+
+    def _domain_files(self) -> Dict[str, float]:
+        """Retorna os YAMLs de domínio e suas datas de modificação."""
+        if not self.domains_dir or not os.path.isdir(self.domains_dir):
+            return {}
+        files = {}
+        for file_name in os.listdir(self.domains_dir):
+            if file_name.endswith(".yaml"):
+                path = os.path.join(self.domains_dir, file_name)
+                files[path] = os.path.getmtime(path)
+        return files
+
+    def _domain_keywords(self, paths: Iterable[str]) -> Iterable[Tuple[str, str]]:
+        """Extrai pares (crew, palavra-chave) das regras de negócio ativas dos domínios."""
+        for path in sorted(paths):
+            try:
+                with open(path, "r", encoding="utf-8") as file:
+                    config = yaml.safe_load(file) or {}
+            except Exception as e:
+                logger.error(f"Erro ao ler palavras-chave do domínio {path}: {e}")
+                continue
+            if not config.get("active", True):
+                continue
+            for rule in config.get("business_rules") or []:
+                crew = rule.get("type")
+                if crew in self.keywords and rule.get("active", True):
+                    for keyword in rule.get("keywords") or []:
+                        yield crew, keyword
+
+    def reload(self) -> None:
+        """Recompila a expressão regular a partir das tabelas e dos YAMLs de domínio."""
+        mtimes = self._domain_files()
+        table: Dict[str, Dict[str, float]] = {}
+
+        def add(crew: str, keyword: str, weight: float) -> None:
+            keyword = normalize_for_matching(str(keyword)).strip()
+            if keyword:
+                crews = table.setdefault(keyword, {})
+                crews[crew] = max(weight, crews.get(crew, 0.0))
+
+        for crew, (weight, words) in self.keywords.items():
+            for keyword in words:
+                add(crew, keyword, weight)
+        for crew, keyword in self._domain_keywords(mtimes):
+            add(crew, keyword, self.domain_weight)
+
+        # Alternativas mais longas primeiro, para "pele sensivel" vencer "pele";
+        # as fronteiras dos dois lados evitam que "costume" conte como "cost"
+        alternatives = sorted(table, key=len, reverse=True)
+        pattern = re.compile(
+            r"(?<!\w)(?:" + "|".join(map(re.escape, alternatives)) + r")(?!\w)"
+        ) if alternatives else None
+        lookup = {keyword: list(crews.items()) for keyword, crews in table.items()}
+        signatures = {
+            crew: stable_hash(sorted((keyword, crews[crew]) for keyword, crews in table.items() if crew in crews))
+            for crew in self.keywords
+        }
+
+        with self._lock:
+            self._compiled = (pattern, lookup, tuple(self.keywords))
+            self.crew_signatures = signatures
+            self._mtimes = mtimes
+            self._next_check = time.monotonic() + self.reload_interval
+        logger.info(f"Classificador de intenção compilado com {len(lookup)} palavras-chave")
+
+    def maybe_reload(self) -> bool:
+        """
+        Recompila o classificador se algum YAML de domínio mudou desde a última compilação.
+
+        Returns:
+            True se o classificador foi recompilado
+        """
+        now = time.monotonic()
+        if now < self._next_check:
+            return False
+        self._next_check = now + self.reload_interval
+        try:
+            if self._domain_files() == self._mtimes:
+                return False
+        except OSError as e:
+            logger.error(f"Erro ao verificar alterações nos domínios: {e}")
+            return False
+        logger.info("Configuração de domínio alterada, recompilando o classificador de intenção")
+        self.reload()
+        return True
+
+    def score(self, text: str) -> Dict[str, float]:
+        """
+        Pontua todas as crews para um texto em uma única passada.
+
+        Args:
+            text: Conteúdo da mensagem
+
+        Returns:
+            Pontuação (0 a 1) de cada crew
+        """
+        self.maybe_reload()
+        pattern, lookup, crews = self._compiled
+        misses = dict.fromkeys(crews, 1.0)
+        if pattern is not None and text:
+            for keyword in set(pattern.findall(normalize_for_matching(text))):
+                for crew, weight in lookup[keyword]:
+                    misses[crew] *= 1.0 - weight
+        return {crew: round(1.0 - miss, 4) for crew, miss in misses.items()}
+
+    def classify(self, text: str) -> Tuple[Optional[str], float, Dict[str, float]]:
+        """
+        Escolhe a crew com maior pontuação.
+
+        Empates são resolvidos pela ordem das crews na tabela de palavras-chave.
+
+        Args:
+            text: Conteúdo da mensagem
+
+        Returns:
+            Tupla (crew ou None se nenhuma palavra-chave casou, confiança, pontuações)
+        """
+        scores = self.score(text)
+        best = max(scores, key=scores.get, default=None)
+        if best is None or scores[best] <= 0:
+            return None, 0.0, scores
+        return best, min(scores[best], MAX_KEYWORD_CONFIDENCE), scores
+
+
+_default_classifier: Optional[IntentClassifier] = None
+_default_lock = threading.Lock()
+
+
+def get_intent_classifier() -> IntentClassifier:
+    """
+    Obtém o classificador compartilhado do processo, compilado na primeira chamada.
+
+    Returns:
+        Classificador usando src/business_domain/ (ou BUSINESS_DOMAINS_DIR)
+    """
+    global _default_classifier
+    with _default_lock:
+        if _default_classifier is None:
+            domains_dir = os.environ.get("BUSINESS_DOMAINS_DIR", DEFAULT_DOMAINS_DIR)
+            _default_classifier = IntentClassifier(domains_dir=domains_dir)
+    return _default_classifier
@@ -12,6 +12,8 @@ import logging
 from typing import Dict, Any, Optional, Union
 from redis import Redis
 
+from src.core.redis_health import CircuitOpenError, get_redis_breaker
+
 logger = logging.getLogger(__name__)
 
 
@@ -26,6 +28,8 @@ class SharedMemory:
             redis_client: Redis client instance
         """
         self.redis = redis_client
+        # Circuit breaker shared with every other component using this client
+        self.breaker = get_redis_breaker(redis_client)
     
     def store_short_term(self, conversation_id: str, data: Dict[str, Any], ttl: int = 3600) -> bool:
         """
@@ -41,8 +45,10 @@ class SharedMemory:
         """
         try:
             key = f"short_term:{conversation_id}"
-            self.redis.setex(key, ttl, json.dumps(data))
+            self.breaker.call(self.redis.setex, key, ttl, json.dumps(data))
             return True
+        except CircuitOpenError:
+            return False
         except Exception as e:
             logger.error(f"Error storing short-term memory: {e}")
             return False
@@ -61,8 +67,10 @@ class SharedMemory:
         """
         try:
             key = f"medium_term:{customer_id}"
-            self.redis.setex(key, ttl, json.dumps(data))
+            self.breaker.call(self.redis.setex, key, ttl, json.dumps(data))
             return True
+        except CircuitOpenError:
+            return False
         except Exception as e:
             logger.error(f"Error storing medium-term memory: {e}")
             return False
@@ -80,8 +88,10 @@ class SharedMemory:
         """
         try:
             key = f"long_term:{customer_id}"
-            self.redis.set(key, json.dumps(data))
+            self.breaker.call(self.redis.set, key, json.dumps(data))
             return True
+        except CircuitOpenError:
+            return False
         except Exception as e:
             logger.error(f"Error storing long-term memory: {e}")
             return False
@@ -99,8 +109,10 @@ class SharedMemory:
         """
         try:
             key = f"{memory_type}:{id}"
-            data = self.redis.get(key)
+            data = self.breaker.call(self.redis.get, key)
             return json.loads(data) if data else None
+        except CircuitOpenError:
+            return None
         except Exception as e:
             logger.error(f"Error retrieving memory: {e}")
             return None
@@ -129,11 +141,13 @@ class SharedMemory:
             # Store updated data
             key = f"{memory_type}:{id}"
             if ttl is not None:
-                self.redis.setex(key, ttl, json.dumps(existing_data))
+                self.breaker.call(self.redis.setex, key, ttl, json.dumps(existing_data))
             else:
-                self.redis.set(key, json.dumps(existing_data))
+                self.breaker.call(self.redis.set, key, json.dumps(existing_data))
             
             return True
+        except CircuitOpenError:
+            return False
         except Exception as e:
             logger.error(f"Error updating memory: {e}")
             return False
@@ -151,8 +165,10 @@ class SharedMemory:
         """
         try:
             key = f"{memory_type}:{id}"
-            self.redis.delete(key)
+            self.breaker.call(self.redis.delete, key)
             return True
+        except CircuitOpenError:
+            return False
         except Exception as e:
             logger.error(f"Error deleting memory: {e}")
             return False
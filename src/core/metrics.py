@@ -0,0 +1,101 @@
+"""
+Métricas leves em memória para os componentes do hub.
+
+Fornece um histograma de latências com buckets fixos, barato o suficiente para
+ser atualizado no caminho crítico (uma busca binária e um incremento), com
+estimativa de percentis a partir dos buckets.
+"""
+
+import bisect
+import threading
+from typing import Any, Dict, Optional, Sequence
+
+# Limites superiores dos buckets, em segundos
+DEFAULT_LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0
+)
+
+
+class LatencyHistogram:
+    """
+    Histograma thread-safe de durações (em segundos).
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        """
+        Inicializa o histograma.
+
+        Args:
+            buckets: Limites superiores dos buckets em ordem crescente; valores
+                acima do último limite caem no bucket "+Inf".
+        """
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """
+        Registra uma duração.
+
+        Args:
+            value: Duração em segundos.
+        """
+        value = max(value, 0.0)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._count += 1
+            self._sum += value
+            self._max = max(self._max, value)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        Estima um percentil pelo limite superior do bucket que o contém.
+
+        Args:
+            q: Percentil entre 0 e 1 (ex.: 0.95).
+
+        Returns:
+            Limite superior estimado em segundos, ou None se não houver amostras.
+        """
+        with self._lock:
+            return self._percentile(q)
+
+    def _percentile(self, q: float) -> Optional[float]:
+        """Calcula o percentil (o lock deve estar adquirido)."""
+        if not self._count:
+            return None
+        target = q * self._count
+        cumulative = 0
+        for index, count in enumerate(self._counts):
+            cumulative += count
+            if cumulative >= target and count:
+                # O bucket "+Inf" não tem limite: usar o maior valor observado
+                return self.buckets[index] if index < len(self.buckets) else self._max
+        return self._max
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Retorna o estado atual do histograma.
+
+        Returns:
+            Dicionário com contagem, soma, média, máximo, p50/p95/p99 e a
+            contagem por bucket (chave = limite superior).
+        """
+        with self._lock:
+            buckets = {str(bound): count for bound, count in zip(self.buckets, self._counts)}
+            buckets["+Inf"] = self._counts[-1]
+            return {
+                "count": self._count,
+                "sum": self._sum,
+                "avg": self._sum / self._count if self._count else 0.0,
+                "max": self._max,
+                "p50": self._percentile(0.50),
+                "p95": self._percentile(0.95),
+                "p99": self._percentile(0.99),
+                "buckets": buckets
+            }
@@ -0,0 +1,321 @@
+"""
+Circuit breaker e monitor de saúde compartilhados para o Redis.
+
+Em vez de cada operação fazer um PING antes do comando real (dobrando os
+round-trips) e tentar reconectar dentro da requisição, os componentes que
+usam Redis (RedisAgentCache, DataServiceHub, SharedMemory, AsyncTaskProcessor)
+compartilham um circuit breaker por cliente:
+
+- CLOSED: as operações seguem normalmente.
+- OPEN: o Redis está indisponível; as operações falham imediatamente
+  (CircuitOpenError) sem tocar a rede.
+- HALF_OPEN: após o tempo de recuperação, uma operação de teste é permitida;
+  sucesso fecha o circuito, falha o reabre.
+
+Um monitor em segundo plano faz o PING periódico e a reconexão, fora do
+caminho crítico das requisições.
+"""
+
+import os
+import time
+import weakref
+import logging
+import threading
+from enum import Enum
+from typing import Any, Callable, Dict, Optional, Tuple
+
+try:
+    from redis.exceptions import ConnectionError as RedisConnectionError
+    from redis.exceptions import TimeoutError as RedisTimeoutError
+    REDIS_FAILURE_EXCEPTIONS: Tuple[type, ...] = (
+        RedisConnectionError, RedisTimeoutError, ConnectionError, TimeoutError, OSError
+    )
+except ImportError:
+    REDIS_FAILURE_EXCEPTIONS = (ConnectionError, TimeoutError, OSError)
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitState(Enum):
+    """Estado do circuit breaker."""
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Erro lançado quando uma operação é recusada porque o circuito está aberto."""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker thread-safe (closed/open/half-open).
+    """
+
+    def __init__(self, name: str = "redis", failure_threshold: int = 3,
+                 recovery_timeout: float = 5.0,
+                 failure_exceptions: Tuple[type, ...] = REDIS_FAILURE_EXCEPTIONS):
+        """
+        Inicializa o circuit breaker.
+
+        Args:
+            name: Nome usado nos logs.
+            failure_threshold: Falhas consecutivas necessárias para abrir o circuito.
+            recovery_timeout: Segundos em OPEN antes de permitir uma operação de teste.
+            failure_exceptions: Exceções que contam como falha de conectividade.
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.failure_exceptions = failure_exceptions
+
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+        self.rejected_calls = 0
+        self.times_opened = 0
+
+    @property
+    def state(self) -> CircuitState:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> CircuitState:
+        """Calcula o estado atual (o lock deve estar adquirido)."""
+        if self._state == CircuitState.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._state = CircuitState.HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def allow_request(self) -> bool:
+        """
+        Indica se uma operação pode ser executada agora.
+
+        Returns:
+            True se o circuito está fechado, ou se esta é a operação de teste
+            do estado HALF_OPEN.
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == CircuitState.CLOSED:
+                return True
+            if state == CircuitState.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.rejected_calls += 1
+            return False
+
+    def record_success(self) -> None:
+        """Registra uma operação bem-sucedida, fechando o circuito."""
+        with self._lock:
+            if self._state != CircuitState.CLOSED:
+                logger.info(f"Circuit breaker '{self.name}' fechado: serviço recuperado")
+            self._state = CircuitState.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        """Registra uma falha de conectividade, abrindo o circuito se necessário."""
+        with self._lock:
+            self._failures += 1
+            state = self._current_state()
+            if state == CircuitState.HALF_OPEN or self._failures >= self.failure_threshold:
+                if state != CircuitState.OPEN:
+                    self.times_opened += 1
+                    logger.warning(f"Circuit breaker '{self.name}' aberto após {self._failures} falha(s)")
+                self._state = CircuitState.OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def call(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Executa uma operação protegida pelo circuit breaker.
+
+        Args:
+            func: Função a executar (ex.: redis_client.get).
+            *args: Argumentos posicionais da função.
+            **kwargs: Argumentos nomeados da função.
+
+        Returns:
+            Resultado da função.
+
+        Raises:
+            CircuitOpenError: Se o circuito estiver aberto.
+        """
+        if not self.allow_request():
+            raise CircuitOpenError(f"Circuito '{self.name}' aberto; operação ignorada")
+        try:
+            result = func(*args, **kwargs)
+        except self.failure_exceptions:
+            self.record_failure()
+            raise
+        finally:
+            # Erros de outra natureza não decidem o teste do HALF_OPEN, mas liberam a vaga
+            with self._lock:
+                self._trial_in_flight = False
+        self.record_success()
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Retorna o estado e os contadores do circuit breaker.
+
+        Returns:
+            Dicionário com estado, falhas consecutivas e chamadas rejeitadas.
+        """
+        with self._lock:
+            return {
+                "state": self._current_state().value,
+                "consecutive_failures": self._failures,
+                "rejected_calls": self.rejected_calls,
+                "times_opened": self.times_opened
+            }
+
+
+class RedisHealthMonitor:
+    """
+    Monitor em segundo plano que verifica o Redis e conduz a reconexão.
+
+    A reconexão descarta as conexões do pool do cliente; novas conexões são
+    abertas preguiçosamente no próximo comando, então todos os componentes que
+    compartilham o mesmo cliente voltam a funcionar sem trocar de objeto.
+
+    O monitor guarda apenas uma referência fraca ao cliente e encerra sua
+    thread quando o cliente é coletado.
+    """
+
+    def __init__(self, redis_client, breaker: CircuitBreaker, interval: float = 5.0):
+        """
+        Inicializa o monitor.
+
+        Args:
+            redis_client: Cliente Redis monitorado.
+            breaker: Circuit breaker atualizado pelo monitor.
+            interval: Intervalo entre verificações em segundos.
+        """
+        self._redis_ref = weakref.ref(redis_client)
+        self.breaker = breaker
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def redis(self):
+        """Cliente monitorado, ou None se já foi coletado."""
+        return self._redis_ref()
+
+    @redis.setter
+    def redis(self, redis_client) -> None:
+        self._redis_ref = weakref.ref(redis_client)
+
+    def start(self) -> None:
+        """Inicia a thread de monitoramento (idempotente)."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="redis-health-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Encerra a thread de monitoramento."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def check(self) -> bool:
+        """
+        Executa uma verificação de saúde imediata.
+
+        Returns:
+            True se o Redis respondeu ao PING.
+        """
+        redis_client = self.redis
+        if redis_client is None:
+            return False
+        try:
+            redis_client.ping()
+            self.breaker.record_success()
+            return True
+        except Exception as e:
+            logger.warning(f"Verificação de saúde do Redis falhou: {e}")
+            self.breaker.record_failure()
+            self._reset_connections(redis_client)
+            return False
+
+    def _reset_connections(self, redis_client) -> None:
+        """Descarta conexões quebradas para forçar a reconexão no próximo comando."""
+        pool = getattr(redis_client, "connection_pool", None)
+        if pool is None:
+            return
+        try:
+            pool.disconnect()
+        except Exception as e:
+            logger.debug(f"Erro ao descartar conexões do Redis: {e}")
+
+    def _run(self) -> None:
+        # Com o circuito aberto, verificar com mais frequência para recuperar rápido
+        while not self._stop_event.is_set():
+            if self.redis is None:
+                break
+            healthy = self.check()
+            wait = self.interval if healthy else min(self.interval, self.breaker.recovery_timeout)
+            self._stop_event.wait(wait)
+
+
+# Registro de breakers/monitores por pool de conexões (compartilhados entre componentes).
+# As entradas somem junto com o pool, e o monitor para quando o cliente é coletado.
+_registry: "weakref.WeakKeyDictionary[Any, Tuple[CircuitBreaker, RedisHealthMonitor]]" = weakref.WeakKeyDictionary()
+_registry_lock = threading.Lock()
+
+
+def get_redis_breaker(redis_client, start_monitor: bool = True) -> CircuitBreaker:
+    """
+    Obtém o circuit breaker compartilhado de um cliente Redis.
+
+    Todos os componentes que usam o mesmo cliente (mesmo pool de conexões)
+    recebem o mesmo breaker, e um único monitor de saúde é iniciado por cliente.
+
+    Args:
+        redis_client: Cliente Redis.
+        start_monitor: Se True, inicia o monitor de saúde em segundo plano.
+
+    Returns:
+        CircuitBreaker associado ao cliente.
+    """
+    pool = getattr(redis_client, "connection_pool", None)
+    registry_key = pool if pool is not None else redis_client
+
+    with _registry_lock:
+        entry = _registry.get(registry_key)
+        if entry is None:
+            breaker = CircuitBreaker(
+                name=f"redis-{id(registry_key):x}",
+                failure_threshold=int(os.environ.get('REDIS_BREAKER_FAILURE_THRESHOLD', '3')),
+                recovery_timeout=float(os.environ.get('REDIS_BREAKER_RECOVERY_TIMEOUT', '5'))
+            )
+            monitor = RedisHealthMonitor(
+                redis_client, breaker,
+                interval=float(os.environ.get('REDIS_HEALTH_CHECK_INTERVAL', '5'))
+            )
+            entry = (breaker, monitor)
+            _registry[registry_key] = entry
+        elif entry[1].redis is None:
+            # O cliente original foi coletado, mas outro ainda usa o mesmo pool
+            entry[1].redis = redis_client
+
+    breaker, monitor = entry
+    if start_monitor:
+        monitor.start()
+    return breaker
+
+
+def stop_health_monitors() -> None:
+    """Encerra todos os monitores de saúde registrados."""
+    with _registry_lock:
+        entries = list(_registry.values())
+    for _, monitor in entries:
+        monitor.stop()
@@ -502,11 +502,13 @@ class ConversationAnalyticsService(BaseDataService):
             topics = analysis.get('topics', [])
             entities = analysis.get('entities', [])
             
-            # Atualizar preferências do cliente
+            # Atualizar preferências do cliente (gravadas juntas em um único upsert no final)
+            current = customer_service.get_preferences(customer_id)
+            updates = {}
             
             # 1. Armazenar tópicos de interesse
             if topics:
-                topics_of_interest = customer_service.get_preference(customer_id, 'topics_of_interest') or []
+                topics_of_interest = current.get('topics_of_interest') or []
                 
                 # Adicionar novos tópicos
                 for topic in topics:
@@ -524,14 +526,14 @@ class ConversationAnalyticsService(BaseDataService):
                                 t['mentions'] = t.get('mentions', 0) + 1
                 
                 # Armazenar preferências atualizadas
-                customer_service.set_preference(customer_id, 'topics_of_interest', topics_of_interest)
+                updates['topics_of_interest'] = topics_of_interest
             
             # 2. Armazenar entidades (produtos, locais, etc)
             for entity in entities:
                 category = entity.get('category', '')
                 if category in ['PRODUCT', 'LOCATION', 'ORGANIZATION']:
                     pref_key = f"{category.lower()}_mentions"
-                    mentions = customer_service.get_preference(customer_id, pref_key) or []
+                    mentions = updates.get(pref_key) or current.get(pref_key) or []
                     
                     entity_text = entity.get('text', '')
                     if entity_text:
@@ -552,10 +554,10 @@ class ConversationAnalyticsService(BaseDataService):
                             })
                         
                         # Armazenar preferências atualizadas
-                        customer_service.set_preference(customer_id, pref_key, mentions)
+                        updates[pref_key] = mentions
             
             # 3. Atualizar sentimento geral do cliente
-            sentiment_history = customer_service.get_preference(customer_id, 'sentiment_history') or []
+            sentiment_history = current.get('sentiment_history') or []
             sentiment_history.append({
                 'timestamp': datetime.now().isoformat(),
                 'score': analysis.get('sentiment_score', 0),
@@ -566,7 +568,11 @@ class ConversationAnalyticsService(BaseDataService):
             if len(sentiment_history) > 10:
                 sentiment_history = sentiment_history[-10:]
             
-            customer_service.set_preference(customer_id, 'sentiment_history', sentiment_history)
+            updates['sentiment_history'] = sentiment_history
+            
+            if not customer_service.set_preferences(customer_id, updates):
+                logger.error(f"Falha ao gravar preferências do cliente {customer_id}")
+                return False
             
             logger.info(f"Perfil do cliente {customer_id} atualizado com insights da conversa")
             return True
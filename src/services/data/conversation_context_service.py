@@ -9,6 +9,8 @@ intenções detectadas e variáveis de contexto.
 import logging
 import json
 import time
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Union, Optional, Tuple
 
@@ -18,6 +20,11 @@ from .base_data_service import BaseDataService
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Variáveis aguardando gravação no bloco batch_writes atual (por requisição/tarefa)
+_pending_variables: ContextVar[Optional[Dict[str, Dict[str, Any]]]] = ContextVar(
+    "pending_conversation_variables", default=None
+)
+
 class ConversationContextService(BaseDataService):
     """
     Serviço de dados especializado em contexto de conversas.
@@ -29,6 +36,37 @@ class ConversationContextService(BaseDataService):
     - Persistência de estado da conversa
     """
     
+    # Registro do contexto, últimas mensagens (em ordem cronológica) e variáveis em uma única consulta
+    CONTEXT_LOAD_QUERY = """
+        WITH ctx AS (
+            SELECT id, conversation_id, customer_id, agent_id, status, metadata, created_at, updated_at
+            FROM conversation_contexts
+            WHERE conversation_id = %(conversation_id)s
+        ), recent_messages AS (
+            SELECT id, conversation_id, sender_id, sender_type, content, metadata, created_at
+            FROM conversation_messages
+            WHERE conversation_id = %(conversation_id)s
+            ORDER BY created_at DESC
+            LIMIT %(limit)s
+        )
+        SELECT
+            (SELECT row_to_json(ctx) FROM ctx) AS context,
+            (SELECT COALESCE(json_agg(recent_messages ORDER BY created_at), '[]'::json)
+             FROM recent_messages) AS messages,
+            (SELECT COALESCE(json_object_agg(variable_key, variable_value), '{}'::json)
+             FROM conversation_variables
+             WHERE conversation_id = %(conversation_id)s) AS variables
+    """
+    
+    # Upsert multi-linha de variáveis (expandido por execute_values)
+    VARIABLES_UPSERT_QUERY = """
+        INSERT INTO conversation_variables
+        (conversation_id, variable_key, variable_value, created_at, updated_at)
+        VALUES %s
+        ON CONFLICT (conversation_id, variable_key)
+        DO UPDATE SET variable_value = EXCLUDED.variable_value, updated_at = NOW()
+    """
+    
     def __init__(self, data_service_hub):
         """
         Inicializa o serviço de contexto de conversas.
@@ -46,6 +84,9 @@ class ConversationContextService(BaseDataService):
         # TTL padrão (30 minutos para contexto de conversa)
         self.context_ttl = 1800
         
+        # Número de mensagens carregadas com o contexto
+        self.messages_limit = 50
+        
         logger.info("ConversationContextService inicializado")
     
     def get_entity_type(self) -> str:
@@ -97,21 +138,167 @@ class ConversationContextService(BaseDataService):
         """
         Obtém o contexto completo da conversa.
         
+        As três chaves de cache (contexto, mensagens e variáveis) são lidas com
+        um único MGET. Se o contexto não estiver em cache, o registro, as
+        últimas mensagens e as variáveis são carregados em uma única consulta.
+        Mensagens presentes no cache têm precedência, pois set_messages grava
+        apenas no cache. Variáveis em cache são sempre um espelho do banco:
+        set_variables grava no banco (DELETE das chaves antigas e upsert com
+        execute_values na mesma transação) e apenas invalida o cache.
+        
         Args:
             conversation_id: ID da conversa.
             
         Returns:
             Contexto completo da conversa ou dicionário vazio se não encontrado.
         """
-        # Tentar obter do cache
         context_key = self._get_context_key(conversation_id)
-        cached_context = self.hub.cache_get(context_key)
+        messages_key = self._get_messages_key(conversation_id)
+        variables_key = self._get_variables_key(conversation_id)
+        cached_context, cached_messages, cached_variables = self.hub.cache_get_many(
+            [context_key, messages_key, variables_key]
+        )
         
         if cached_context:
             logger.debug(f"Contexto da conversa {conversation_id} recuperado do cache")
-            return cached_context
+            return self._context_with_pending(conversation_id, cached_context)
+        
+        if getattr(self.hub, "sqlite_conn", None):
+            # O SQLite de desenvolvimento não suporta a consulta agregada em JSON
+            return self._load_context_separately(conversation_id)
+        
+        row = self.hub.execute_query(self.CONTEXT_LOAD_QUERY, {
+            "conversation_id": conversation_id,
+            "limit": self.messages_limit
+        }, fetch_all=False) or {}
+        
+        messages = self._decode_cached(cached_messages)
+        if messages is None:
+            messages = [self._parse_metadata(message) for message in self._as_json(row.get("messages"), [])]
+        
+        variables = self._decode_cached(cached_variables)
+        if variables is None:
+            variables = {
+                key: self._parse_variable(value)
+                for key, value in self._as_json(row.get("variables"), {}).items()
+            }
         
-        # Se não estiver no cache, tentar obter do banco de dados
+        context = self._as_json(row.get("context"), None)
+        if context:
+            context = self._parse_metadata(context)
+        else:
+            # Criar um novo contexto vazio
+            now = datetime.now().isoformat()
+            context = {
+                "conversation_id": conversation_id,
+                "customer_id": None,
+                "agent_id": None,
+                "status": "new",
+                "metadata": {},
+                "created_at": now,
+                "updated_at": now
+            }
+        context["messages"] = messages
+        context["variables"] = variables
+        
+        # Os valores vindos do JSON agregado já são serializáveis: sem dumps/loads intermediário
+        to_cache = {context_key: context}
+        if cached_messages is None:
+            to_cache[messages_key] = messages
+        if cached_variables is None:
+            to_cache[variables_key] = variables
+        self.hub.cache_set_many(to_cache, ttl=self.context_ttl)
+        
+        return self._context_with_pending(conversation_id, context)
+    
+    @staticmethod
+    def _as_json(value: Any, default: Any) -> Any:
+        """
+        Converte uma coluna JSON retornada pelo banco (objeto ou string) para objeto.
+        
+        Args:
+            value: Valor da coluna.
+            default: Valor usado quando a coluna é nula ou inválida.
+            
+        Returns:
+            Objeto Python correspondente.
+        """
+        if value is None:
+            return default
+        if isinstance(value, str):
+            try:
+                return json.loads(value)
+            except json.JSONDecodeError:
+                return default
+        return value
+    
+    @staticmethod
+    def _decode_cached(value: Any) -> Any:
+        """
+        Normaliza um valor lido do cache (objeto já desserializado ou string JSON).
+        
+        Args:
+            value: Valor do cache.
+            
+        Returns:
+            Objeto Python ou None se ausente/inválido.
+        """
+        if value is None or not isinstance(value, (str, bytes)):
+            return value
+        try:
+            return json.loads(value)
+        except (json.JSONDecodeError, TypeError):
+            return None
+    
+    @staticmethod
+    def _parse_metadata(row: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Converte o campo metadata de um registro e serializa suas datas em ISO.
+        
+        Args:
+            row: Registro do banco.
+            
+        Returns:
+            O próprio registro, convertido.
+        """
+        for field in ("created_at", "updated_at"):
+            if isinstance(row.get(field), datetime):
+                row[field] = row[field].isoformat()
+        if isinstance(row.get("metadata"), str):
+            try:
+                row["metadata"] = json.loads(row["metadata"])
+            except json.JSONDecodeError:
+                row["metadata"] = {}
+        elif row.get("metadata") is None:
+            row["metadata"] = {}
+        return row
+    
+    @staticmethod
+    def _parse_variable(value: Any) -> Any:
+        """
+        Converte o valor armazenado de uma variável (JSON quando possível).
+        
+        Args:
+            value: Valor da coluna variable_value.
+            
+        Returns:
+            Valor convertido.
+        """
+        try:
+            return json.loads(value)
+        except (json.JSONDecodeError, TypeError):
+            return value
+    
+    def _load_context_separately(self, conversation_id: str) -> Dict[str, Any]:
+        """
+        Carrega o contexto com consultas separadas (usado com o SQLite de desenvolvimento).
+        
+        Args:
+            conversation_id: ID da conversa.
+            
+        Returns:
+            Contexto completo da conversa.
+        """
         query = """
             SELECT 
                 id,
@@ -126,58 +313,27 @@ class ConversationContextService(BaseDataService):
             WHERE conversation_id = %(conversation_id)s
         """
         
-        params = {"conversation_id": conversation_id}
+        result = self.hub.execute_query(query, {"conversation_id": conversation_id}, fetch_all=False)
         
-        result = self.hub.execute_query(query, params, fetch_all=False)
-        
-        if not result:
-            # Criar um novo contexto vazio
-            now = datetime.now()
-            empty_context = {
+        if result:
+            result = self._parse_metadata(dict(result))
+        else:
+            now = datetime.now().isoformat()
+            result = {
                 "conversation_id": conversation_id,
                 "customer_id": None,
                 "agent_id": None,
                 "status": "new",
                 "metadata": {},
-                "created_at": now.isoformat(),  # serializar datetime para string
-                "updated_at": now.isoformat(),  # serializar datetime para string
-                "messages": [],
-                "variables": {}
+                "created_at": now,
+                "updated_at": now
             }
-            
-            # Armazenar no cache
-            self.hub.cache_set(context_key, empty_context, ttl=self.context_ttl)
-            
-            return empty_context
         
-        # Serializar campos de data para string ISO
-        if isinstance(result.get("created_at"), datetime):
-            result["created_at"] = result["created_at"].isoformat()
-        
-        if isinstance(result.get("updated_at"), datetime):
-            result["updated_at"] = result["updated_at"].isoformat()
-            
-        # Converter campos JSON
-        if isinstance(result.get("metadata"), str):
-            try:
-                result["metadata"] = json.loads(result["metadata"])
-            except json.JSONDecodeError:
-                result["metadata"] = {}
-        
-        # Obter mensagens da conversa
-        result["messages"] = self.get_messages(conversation_id)
-        
-        # Obter variáveis de contexto
+        result["messages"] = self.get_messages(conversation_id, limit=self.messages_limit)
         result["variables"] = self.get_variables(conversation_id)
         
-        # Serializar completamente o resultado para garantir que todos os objetos são serializáveis
-        serialized_result = json.dumps(result, default=self.hub._json_encoder)
-        
-        # Armazenar no cache
-        self.hub.cache_set(context_key, serialized_result, ttl=self.context_ttl)
-        
-        # Retornar objeto deserializado
-        return json.loads(serialized_result)
+        self.hub.cache_set(self._get_context_key(conversation_id), result, ttl=self.context_ttl)
+        return self._context_with_pending(conversation_id, result)
     
     def update_context(self, conversation_id: str, context_data: Dict[str, Any]) -> bool:
         """
@@ -200,7 +356,8 @@ class ConversationContextService(BaseDataService):
         status = context_data.get("status") or current_context.get("status")
         
         # Merge de metadata (preservando campos existentes)
-        metadata = current_context.get("metadata", {})
+        # Cópia: o contexto pode ser o objeto compartilhado do cache L1
+        metadata = dict(current_context.get("metadata") or {})
         if context_data.get("metadata"):
             metadata.update(context_data.get("metadata", {}))
         
@@ -279,13 +436,10 @@ class ConversationContextService(BaseDataService):
         """
         # Tentar obter do cache
         messages_key = self._get_messages_key(conversation_id)
-        cached_messages = self.hub.cache_get(messages_key)
+        cached_messages = self._decode_cached(self.hub.cache_get(messages_key))
         
         if cached_messages:
-            try:
-                return json.loads(cached_messages)
-            except json.JSONDecodeError:
-                logger.error(f"Erro ao decodificar mensagens da conversa: {conversation_id}")
+            return cached_messages
         
         # Se não estiver no cache, obter do banco de dados
         query = """
@@ -422,13 +576,10 @@ class ConversationContextService(BaseDataService):
         """
         # Tentar obter do cache
         variables_key = self._get_variables_key(conversation_id)
-        cached_variables = self.hub.cache_get(variables_key)
+        cached_variables = self._decode_cached(self.hub.cache_get(variables_key))
         
         if cached_variables:
-            try:
-                return json.loads(cached_variables)
-            except json.JSONDecodeError:
-                logger.error(f"Erro ao decodificar variáveis da conversa: {conversation_id}")
+            return self._with_pending(conversation_id, cached_variables)
         
         # Se não estiver no cache, obter do banco de dados
         query = """
@@ -457,90 +608,127 @@ class ConversationContextService(BaseDataService):
         self.hub.cache_set(variables_key, serialized_variables, ttl=self.context_ttl)
         
         # Retornar objeto deserializado para garantir que tudo está no formato correto
-        return json.loads(serialized_variables)
+        return self._with_pending(conversation_id, json.loads(serialized_variables))
     
-    def set_variable(self, conversation_id: str, key: str, value: Any) -> bool:
+    @contextmanager
+    def batch_writes(self):
+        """
+        Agrupa as escritas de variáveis até o fim do bloco.
+        
+        Dentro do bloco, set_variable apenas acumula os valores (a última escrita
+        de cada chave prevalece) e get_variables/get_context já os enxergam. Ao
+        sair, todas as variáveis de todas as conversas são gravadas com um único
+        upsert multi-linha. Blocos aninhados são absorvidos pelo mais externo.
+        
+        Exemplo:
+            with context_service.batch_writes():
+                for key, value in extracted.items():
+                    context_service.set_variable(conversation_id, key, value)
+        """
+        if _pending_variables.get() is not None:
+            yield
+            return
+        
+        token = _pending_variables.set({})
+        try:
+            yield
+        finally:
+            pending = _pending_variables.get()
+            _pending_variables.reset(token)
+            self._write_variables(pending)
+    
+    def _with_pending(self, conversation_id: str, variables: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Define ou atualiza uma variável de contexto.
+        Sobrepõe as variáveis ainda não gravadas do bloco batch_writes atual.
         
         Args:
             conversation_id: ID da conversa.
-            key: Chave da variável.
-            value: Valor da variável.
+            variables: Variáveis lidas do cache ou do banco.
             
         Returns:
-            True se definido com sucesso, False caso contrário.
+            Variáveis atualizadas (uma cópia, se houver pendências).
         """
-        # Obter variáveis atuais
-        variables = self.get_variables(conversation_id)
-        
-        # Atualizar variável
-        variables[key] = value
-        
-        # Armazenar no cache
-        variables_key = self._get_variables_key(conversation_id)
-        self.hub.cache_set(variables_key, json.dumps(variables, default=self.hub._json_encoder), ttl=self.context_ttl)
-        
-        # Invalidar cache do contexto
-        context_key = self._get_context_key(conversation_id)
-        self.hub.cache_invalidate(context_key)
-        
-        # Serializar valor se necessário
-        if not isinstance(value, str):
-            value = json.dumps(value)
+        pending = (_pending_variables.get() or {}).get(conversation_id)
+        return {**variables, **pending} if pending else variables
+    
+    def _context_with_pending(self, conversation_id: str, context: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Retorna o contexto com as variáveis pendentes do bloco batch_writes atual.
         
-        # Verificar se a variável já existe
-        check_query = """
-            SELECT id FROM conversation_variables
-            WHERE conversation_id = %(conversation_id)s AND variable_key = %(key)s
+        Args:
+            conversation_id: ID da conversa.
+            context: Contexto carregado (possivelmente compartilhado com o cache L1).
+            
+        Returns:
+            O próprio contexto, ou uma cópia rasa com as variáveis atualizadas.
+        """
+        variables = context.get("variables") or {}
+        merged = self._with_pending(conversation_id, variables)
+        return context if merged is variables else {**context, "variables": merged}
+    
+    def _write_variables(self, pending: Dict[str, Dict[str, Any]],
+                         preamble: Optional[List[Tuple[str, Dict[str, Any]]]] = None) -> bool:
         """
+        Grava variáveis de uma ou mais conversas com um único upsert multi-linha.
         
-        check_params = {
-            "conversation_id": conversation_id,
-            "key": key
-        }
+        Args:
+            pending: Mapeamento conversation_id -> {chave: valor}.
+            preamble: Consultas executadas na mesma transação, antes do upsert.
+            
+        Returns:
+            True se gravado com sucesso, False caso contrário.
+        """
+        rows = [
+            (conversation_id, key, value if isinstance(value, str) else json.dumps(value, default=self.hub._json_encoder))
+            for conversation_id, variables in pending.items()
+            for key, value in variables.items()
+        ]
+        if not rows and not preamble:
+            return True
+        
+        success = self.hub.execute_values(
+            self.VARIABLES_UPSERT_QUERY, rows, template="(%s, %s, %s, NOW(), NOW())", preamble=preamble
+        )
+        if not success:
+            logger.error(f"Falha ao gravar {len(rows)} variáveis de contexto")
+        
+        # Os valores já estão no banco: basta descartar as entradas de cache afetadas
+        keys = []
+        for conversation_id in pending:
+            keys.extend([self._get_variables_key(conversation_id), self._get_context_key(conversation_id)])
+        self.hub.cache_invalidate_many(keys)
+        
+        return success
+    
+    def set_variable(self, conversation_id: str, key: str, value: Any) -> bool:
+        """
+        Define ou atualiza uma variável de contexto.
         
-        existing = self.hub.execute_query(check_query, check_params, fetch_all=False)
+        Dentro de batch_writes a escrita é adiada e agrupada; fora dele, é
+        gravada imediatamente com um upsert.
         
-        if existing:
-            # Atualizar variável existente
-            update_query = """
-                UPDATE conversation_variables
-                SET variable_value = %(value)s, updated_at = NOW()
-                WHERE conversation_id = %(conversation_id)s AND variable_key = %(key)s
-                RETURNING id
-            """
-            
-            update_params = {
-                "conversation_id": conversation_id,
-                "key": key,
-                "value": value
-            }
-            
-            result = self.hub.execute_query(update_query, update_params, fetch_all=False)
-        else:
-            # Inserir nova variável
-            insert_query = """
-                INSERT INTO conversation_variables
-                (conversation_id, variable_key, variable_value, created_at, updated_at)
-                VALUES (%(conversation_id)s, %(key)s, %(value)s, NOW(), NOW())
-                RETURNING id
-            """
-            
-            insert_params = {
-                "conversation_id": conversation_id,
-                "key": key,
-                "value": value
-            }
+        Args:
+            conversation_id: ID da conversa.
+            key: Chave da variável.
+            value: Valor da variável.
             
-            result = self.hub.execute_query(insert_query, insert_params, fetch_all=False)
+        Returns:
+            True se definido com sucesso, False caso contrário.
+        """
+        pending = _pending_variables.get()
+        if pending is not None:
+            pending.setdefault(conversation_id, {})[key] = value
+            return True
         
-        return result is not None
+        return self._write_variables({conversation_id: {key: value}})
     
     def set_variables(self, conversation_id: str, variables: Dict[str, Any]) -> bool:
         """
         Define as variáveis de contexto de uma conversa (substitui as existentes).
         
+        A remoção das variáveis antigas e o upsert das novas são gravados em uma
+        única transação: se qualquer um falhar, nada muda e o retorno é False.
+        
         Args:
             conversation_id: ID da conversa.
             variables: Dicionário de variáveis.
@@ -548,18 +736,21 @@ class ConversationContextService(BaseDataService):
         Returns:
             True se definido com sucesso, False caso contrário.
         """
-        # Armazenar no cache
-        variables_key = self._get_variables_key(conversation_id)
-        self.hub.cache_set(variables_key, json.dumps(variables, default=self.hub._json_encoder), ttl=self.context_ttl)
-        
-        # Invalidar cache do contexto
-        context_key = self._get_context_key(conversation_id)
-        self.hub.cache_invalidate(context_key)
+        # Pendências da conversa são substituídas pelo novo conjunto
+        pending = _pending_variables.get()
+        if pending is not None:
+            pending.pop(conversation_id, None)
         
-        # Opcionalmente, podemos sincronizar com o banco de dados
-        # Para manter simples, apenas armazenamos no cache por enquanto
-        
-        return True
+        # Remover variáveis que não fazem parte do novo conjunto, na mesma transação do upsert
+        delete_query = """
+            DELETE FROM conversation_variables
+            WHERE conversation_id = %(conversation_id)s
+            AND NOT (variable_key = ANY(%(keys)s))
+        """
+        return self._write_variables(
+            {conversation_id: dict(variables)},
+            preamble=[(delete_query, {"conversation_id": conversation_id, "keys": list(variables)})]
+        )
     
     def clear_context(self, conversation_id: str) -> bool:
         """
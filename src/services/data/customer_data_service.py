@@ -124,6 +124,20 @@ class CustomerDataService(BaseDataService):
         
         return preferences
     
+    def get_preference(self, customer_id: int, key: str, default: Any = None) -> Any:
+        """
+        Obtém uma preferência específica de um cliente.
+        
+        Args:
+            customer_id: ID do cliente.
+            key: Chave da preferência.
+            default: Valor retornado se a preferência não existir.
+            
+        Returns:
+            Valor da preferência ou o valor padrão.
+        """
+        return self.get_preferences(customer_id).get(key, default)
+    
     def set_preference(self, customer_id: int, key: str, value: Any) -> bool:
         """
         Define ou atualiza uma preferência de cliente.
@@ -136,52 +150,42 @@ class CustomerDataService(BaseDataService):
         Returns:
             True se a operação foi bem-sucedida, False caso contrário.
         """
-        # Converter valor para JSON se não for string
-        if not isinstance(value, str):
-            value = json.dumps(value)
-        
-        # Verificar se a preferência já existe
-        query_check = """
-            SELECT id FROM customer_preferences
-            WHERE customer_id = %(customer_id)s AND preference_key = %(key)s
+        return self.set_preferences(customer_id, {key: value})
+    
+    def set_preferences(self, customer_id: int, preferences: Dict[str, Any]) -> bool:
         """
+        Define ou atualiza várias preferências de um cliente com um único upsert.
         
-        params_check = {
-            "customer_id": customer_id,
-            "key": key
-        }
-        
-        existing = self.hub.execute_query(query_check, params_check, fetch_all=False)
+        Args:
+            customer_id: ID do cliente.
+            preferences: Dicionário chave -> valor.
+            
+        Returns:
+            True se a operação foi bem-sucedida, False caso contrário.
+        """
+        if not preferences:
+            return True
         
-        if existing:
-            # Atualizar preferência existente
-            query = """
-                UPDATE customer_preferences
-                SET preference_value = %(value)s, updated_at = NOW()
-                WHERE customer_id = %(customer_id)s AND preference_key = %(key)s
-                RETURNING id
-            """
-        else:
-            # Inserir nova preferência
-            query = """
-                INSERT INTO customer_preferences
-                (customer_id, preference_key, preference_value, created_at, updated_at)
-                VALUES (%(customer_id)s, %(key)s, %(value)s, NOW(), NOW())
-                RETURNING id
-            """
+        # Converter valores para JSON se não forem strings
+        rows = [
+            (customer_id, key, value if isinstance(value, str) else json.dumps(value))
+            for key, value in preferences.items()
+        ]
         
-        params = {
-            "customer_id": customer_id,
-            "key": key,
-            "value": value
-        }
+        query = """
+            INSERT INTO customer_preferences
+            (customer_id, preference_key, preference_value, created_at, updated_at)
+            VALUES %s
+            ON CONFLICT (customer_id, preference_key)
+            DO UPDATE SET preference_value = EXCLUDED.preference_value, updated_at = NOW()
+        """
         
-        result = self.hub.execute_query(query, params, fetch_all=False)
+        result = self.hub.execute_values(query, rows, template="(%s, %s, %s, NOW(), NOW())")
         
         # Invalidar cache do cliente
         self.hub.cache_invalidate(str(customer_id), self.get_entity_type())
         
-        return result is not None
+        return result
     
     def get_addresses(self, customer_id: int) -> List[Dict[str, Any]]:
         """
@@ -4,9 +4,16 @@ ProductDataService - Serviço para acesso e gerenciamento de dados de produtos.
 Este serviço implementa funcionalidades específicas para produtos,
 incluindo busca por categorias, filtragem por atributos e integração
 com busca vetorial.
+
+A busca híbrida combina a busca textual do PostgreSQL (tsvector em português
+com índice GIN e fallback por trigramas, ver
+init-scripts/08_create_product_search_indexes.sql) com a busca vetorial no
+Qdrant, fundindo as duas listas por Reciprocal Rank Fusion (RRF).
 """
 
+import os
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List, Union, Optional
 
 from .base_data_service import BaseDataService
@@ -15,6 +22,40 @@ from .base_data_service import BaseDataService
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Configuração de idioma do full-text search do PostgreSQL
+FTS_CONFIG = "portuguese"
+
+# Constante k do Reciprocal Rank Fusion: score = soma de 1 / (k + posição)
+RRF_K = 60
+
+# Threads usadas para executar as buscas textual e vetorial em paralelo
+_search_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("PRODUCT_SEARCH_THREADS", "8")),
+    thread_name_prefix="product-search"
+)
+
+
+def reciprocal_rank_fusion(rankings: List[List[Any]], k: int = RRF_K) -> Dict[Any, float]:
+    """
+    Funde listas ordenadas de IDs por Reciprocal Rank Fusion.
+    
+    Cada ID recebe a soma de 1 / (k + posição) nas listas em que aparece, o
+    que dispensa normalizar scores de naturezas diferentes (ts_rank e
+    similaridade de cosseno).
+    
+    Args:
+        rankings: Listas de IDs, cada uma ordenada da mais para a menos relevante.
+        k: Constante de suavização (valores maiores reduzem o peso do topo).
+        
+    Returns:
+        Dicionário ID -> score fundido.
+    """
+    scores: Dict[Any, float] = {}
+    for ranking in rankings:
+        for position, item_id in enumerate(ranking, 1):
+            scores[item_id] = scores.get(item_id, 0.0) + 1.0 / (k + position)
+    return scores
+
 class ProductDataService(BaseDataService):
     """
     Serviço de dados especializado em produtos.
@@ -26,16 +67,20 @@ class ProductDataService(BaseDataService):
     - Gerenciamento de estoque
     """
     
-    def __init__(self, data_service_hub, qdrant_client=None):
+    def __init__(self, data_service_hub, qdrant_client=None, embedding_service=None):
         """
         Inicializa o serviço de dados de produtos.
         
         Args:
             data_service_hub: Instância do DataServiceHub.
-            qdrant_client: Cliente Qdrant para busca vetorial (opcional).
+            qdrant_client: Cliente Qdrant para busca vetorial (opcional). Se não
+                          fornecido, é criado sob demanda a partir de QDRANT_URL.
+            embedding_service: Serviço de embeddings (opcional; padrão: o
+                              serviço compartilhado).
         """
         super().__init__(data_service_hub)
         self.qdrant_client = qdrant_client
+        self.embedding_service = embedding_service
         self.collection_name = "products"
         
         logger.info("ProductDataService inicializado")
@@ -121,10 +166,33 @@ class ProductDataService(BaseDataService):
         
         return self.hub.execute_query(query, params) or []
     
+    def _text_search_query(self, columns: str) -> str:
+        """
+        Monta a consulta de busca textual.
+        
+        Combina o full-text search (índice GIN em `search_vector`) com a
+        similaridade por trigramas no nome (índice GIN trgm), que cobre erros
+        de digitação; os resultados são ordenados por ts_rank_cd e, em
+        seguida, pela similaridade.
+        """
+        return f"""
+            WITH q AS (SELECT websearch_to_tsquery('{FTS_CONFIG}', %(query)s) AS tsq)
+            SELECT {columns}
+            FROM products p, q
+            WHERE p.search_vector @@ q.tsq OR p.name %% %(query)s
+            ORDER BY ts_rank_cd(p.search_vector, q.tsq) DESC,
+                     similarity(p.name, %(query)s) DESC,
+                     p.id
+            LIMIT %(limit)s OFFSET %(offset)s
+        """
+    
     def search_by_text(self, query_text: str, limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
         """
         Realiza busca textual em produtos.
         
+        Usa o full-text search do PostgreSQL em português (com stemming e
+        ranking) e similaridade por trigramas no nome, ambos indexados.
+        
         Args:
             query_text: Texto de consulta.
             limit: Limite de resultados.
@@ -133,31 +201,72 @@ class ProductDataService(BaseDataService):
         Returns:
             Lista de produtos que correspondem à consulta.
         """
-        # Utilizando ILIKE para busca simples
-        # Em uma implementação real, você pode usar recursos mais avançados como
-        # Full Text Search do PostgreSQL ou Elasticsearch
-        
-        search_query = f"""
-            SELECT * FROM products
-            WHERE 
-                name ILIKE %(search_term)s OR
-                description ILIKE %(search_term)s OR
-                detailed_description ILIKE %(search_term)s
-            ORDER BY name
-            LIMIT %(limit)s OFFSET %(offset)s
-        """
-        
         params = {
-            "search_term": f"%{query_text}%",
+            "query": query_text,
             "limit": limit,
             "offset": offset
         }
         
         logger.info(f"Realizando busca de produtos com texto: '{query_text}'")
-        result = self.hub.execute_query(search_query, params) or []
+        result = self.hub.execute_query(self._text_search_query("p.*"), params) or []
         logger.info(f"Busca retornou {len(result)} resultados")
         return result
     
+    def _text_search_ids(self, query_text: str, limit: int) -> List[int]:
+        """
+        Retorna os IDs dos produtos da busca textual, em ordem de relevância.
+        """
+        params = {"query": query_text, "limit": limit, "offset": 0}
+        rows = self.hub.execute_query(self._text_search_query("p.id"), params) or []
+        return [row["id"] for row in rows]
+    
+    def _get_qdrant_client(self):
+        """
+        Obtém o cliente Qdrant, criando-o a partir de QDRANT_URL se necessário.
+        """
+        if self.qdrant_client is None and os.environ.get("QDRANT_URL"):
+            from qdrant_client import QdrantClient
+            self.qdrant_client = QdrantClient(
+                url=os.environ["QDRANT_URL"],
+                api_key=os.environ.get("QDRANT_API_KEY")
+            )
+        return self.qdrant_client
+    
+    def _vector_search_ids(self, query_text: str, limit: int) -> List[int]:
+        """
+        Retorna os IDs dos produtos mais similares à consulta no Qdrant.
+        """
+        qdrant_client = self._get_qdrant_client()
+        if not qdrant_client:
+            logger.warning("Tentativa de busca vetorial sem cliente Qdrant configurado")
+            return []
+        
+        if self.embedding_service is None:
+            from src.services.embedding_service import get_embedding_service
+            self.embedding_service = get_embedding_service()
+        
+        embedding = self.embedding_service.get_embedding(query_text)
+        response = qdrant_client.query_points(
+            collection_name=self.collection_name,
+            query=embedding,
+            limit=limit,
+            with_payload=False
+        )
+        return [int(hit.id) for hit in response.points]
+    
+    def _get_products_by_ids(self, product_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        Obtém vários produtos em uma única consulta.
+        
+        Returns:
+            Dicionário ID -> produto.
+        """
+        if not product_ids:
+            return {}
+        query = "SELECT * FROM products WHERE id = ANY(%(ids)s)"
+        rows = self.hub.execute_query(query, {"ids": list(product_ids)}) or []
+        return {row["id"]: dict(row) for row in rows}
+    
     def vector_search(self, query_text: str, limit: int = 20) -> List[Dict[str, Any]]:
         """
         Realiza busca vetorial em produtos usando Qdrant.
@@ -169,71 +278,72 @@ class ProductDataService(BaseDataService):
         Returns:
             Lista de produtos semanticamente similares à consulta.
         """
-        if not self.qdrant_client:
-            logger.warning("Tentativa de busca vetorial sem cliente Qdrant configurado")
-            return []
-        
         try:
-            # Aqui você precisaria:
-            # 1. Converter o query_text para um vetor usando um modelo de embeddings
-            # 2. Realizar a busca no Qdrant
-            # 3. Recuperar os produtos pelo ID
-            
-            # Exemplo conceitual (não funcional):
-            # embedding = self.get_embedding(query_text)
-            # search_result = self.qdrant_client.search(
-            #     collection_name=self.collection_name,
-            #     query_vector=embedding,
-            #     limit=limit
-            # )
-            # product_ids = [hit.id for hit in search_result]
-            
-            # Como não temos o código completo da integração com Qdrant,
-            # retornaremos uma lista vazia por enquanto
             logger.info(f"Busca vetorial para: '{query_text}'")
-            return []
+            product_ids = self._vector_search_ids(query_text, limit)
+            products = self._get_products_by_ids(product_ids)
+            return [products[product_id] for product_id in product_ids if product_id in products]
         
         except Exception as e:
             logger.error(f"Erro na busca vetorial: {str(e)}")
             return []
     
-    def hybrid_search(self, query_text: str, limit: int = 20) -> List[Dict[str, Any]]:
+    def hybrid_search(self, query_text: str, limit: int = 20, candidates: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Realiza busca híbrida combinando resultados textuais e vetoriais.
         
+        As buscas textual (PostgreSQL) e vetorial (Qdrant) rodam em paralelo,
+        cada uma retornando apenas IDs; as listas são fundidas por RRF e os
+        produtos finais são lidos em uma única consulta. Se uma das buscas
+        falhar, o resultado usa apenas a outra.
+        
         Args:
             query_text: Texto de consulta.
             limit: Limite de resultados.
+            candidates: Candidatos buscados em cada fonte (padrão: 2 x limit).
             
         Returns:
-            Lista combinada de produtos, ordenados por relevância.
+            Lista combinada de produtos, ordenados por relevância. Cada produto
+            inclui `score` (RRF), `text_rank` e `vector_rank` (posição em cada
+            busca, ou None).
         """
-        # Obter resultados de busca textual
-        text_results = self.search_by_text(query_text, limit=limit)
-        
-        # Obter resultados de busca vetorial
-        vector_results = self.vector_search(query_text, limit=limit)
-        
-        # Em uma implementação real, você combinaria e reordenaria os resultados
-        # com base em um algoritmo de relevância. Por simplicidade, vamos
-        # apenas concatenar e limitar os resultados.
-        
-        # Criar um dicionário para eliminar duplicatas (por ID)
-        combined_results = {}
-        
-        # Adicionar resultados textuais
-        for product in text_results:
-            combined_results[product['id']] = product
-        
-        # Adicionar resultados vetoriais
-        for product in vector_results:
-            if product['id'] not in combined_results:
-                combined_results[product['id']] = product
-        
-        # Converter de volta para lista e limitar
-        results = list(combined_results.values())
-        
-        return results[:limit]
+        candidates = candidates or limit * 2
+        
+        text_future = _search_executor.submit(self._text_search_ids, query_text, candidates)
+        vector_future = _search_executor.submit(self._vector_search_ids, query_text, candidates)
+        
+        rankings = []
+        for name, future in (("textual", text_future), ("vetorial", vector_future)):
+            try:
+                rankings.append(future.result())
+            except Exception as e:
+                logger.error(f"Erro na busca {name} de produtos: {str(e)}")
+                rankings.append([])
+        text_ids, vector_ids = rankings
+        
+        scores = reciprocal_rank_fusion([text_ids, vector_ids])
+        ranked_ids = sorted(scores, key=lambda product_id: scores[product_id], reverse=True)[:limit]
+        
+        products = self._get_products_by_ids(ranked_ids)
+        text_positions = {product_id: position for position, product_id in enumerate(text_ids, 1)}
+        vector_positions = {product_id: position for position, product_id in enumerate(vector_ids, 1)}
+        
+        results = []
+        for product_id in ranked_ids:
+            product = products.get(product_id)
+            if product is None:
+                # Presente no Qdrant mas removido do PostgreSQL
+                continue
+            product["score"] = scores[product_id]
+            product["text_rank"] = text_positions.get(product_id)
+            product["vector_rank"] = vector_positions.get(product_id)
+            results.append(product)
+        
+        logger.info(
+            f"Busca híbrida para '{query_text}': {len(text_ids)} textuais, "
+            f"{len(vector_ids)} vetoriais, {len(results)} resultados"
+        )
+        return results
     
     def get_stock_status(self, product_id: int) -> Dict[str, Any]:
         """
@@ -4,16 +4,23 @@ Este serviço é responsável por manter os dados sincronizados entre o banco de
 relacional (PostgreSQL) e o banco de dados vetorial (Qdrant).
 """
 import os
+import time
 import logging
-import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Any, Optional, Union
+from typing import Callable, Iterable, Iterator, List, Dict, Any, Optional, Union
 import psycopg2
+from psycopg2 import sql
 from psycopg2.extras import RealDictCursor
 from qdrant_client import QdrantClient
-from qdrant_client.http.models import PointStruct
+from qdrant_client.http.models import PointStruct, SetPayload, SetPayloadOperation
 
-from src.services.embedding_service import EmbeddingService
+from src.core.cache.agent_cache import stable_hash
+from src.core.cache.invalidation import CacheInvalidationBus
+from src.core.cache.search_cache import SearchResultCache
+from src.services.embedding_service import EmbeddingService, get_embedding_service
+from src.services.vector_index import VECTOR_INDEX_CHANNEL, publish_vector_changes
 from src.utils.text_processor import prepare_product_text, prepare_business_rule_text
 
 class DataSyncService:
@@ -40,8 +47,8 @@ class DataSyncService:
                                  será buscada na variável de ambiente DATABASE_URL.
             qdrant_url: URL do serviço Qdrant. Se não fornecida, será buscada na
                        variável de ambiente QDRANT_URL.
-            embedding_service: Instância do EmbeddingService. Se não fornecida, uma nova
-                              instância será criada.
+            embedding_service: Instância do EmbeddingService. Se não fornecida, usa o
+                              serviço compartilhado (get_embedding_service).
             redis_client: Cliente Redis para cache (opcional).
         """
         self.db_connection_string = db_connection_string or os.environ.get("DATABASE_URL")
@@ -52,11 +59,26 @@ class DataSyncService:
         if not self.qdrant_url:
             raise ValueError("URL do Qdrant não fornecida e não encontrada nas variáveis de ambiente")
             
-        self.embedding_service = embedding_service or EmbeddingService()
+        self.embedding_service = embedding_service or get_embedding_service()
         self.redis_client = redis_client
         self.qdrant_client = QdrantClient(url=self.qdrant_url)
         self.logger = logging.getLogger(__name__)
         
+        # Lotes processados em paralelo durante a sincronização completa
+        self.max_in_flight = int(os.environ.get("SYNC_MAX_IN_FLIGHT", "4"))
+        # Estatísticas da última sincronização completa, por coleção
+        self.last_sync_stats: Dict[str, Dict[str, Any]] = {}
+        # Caches de busca invalidados pela sincronização: prefixo -> (cache, campo que define o escopo)
+        self.search_caches = {
+            "product": (SearchResultCache(redis_client, "product_search"), "category_id"),
+            "business_rule": (SearchResultCache(redis_client, "business_rule_search"), "category"),
+        }
+        self.collections = {"product": "products", "business_rule": "business_rules"}
+        # Anuncia pontos alterados aos índices vetoriais em memória (publicação síncrona, sem thread)
+        self.vector_index_bus = (
+            CacheInvalidationBus(redis_client, channel=VECTOR_INDEX_CHANNEL) if redis_client else None
+        )
+        
         self.logger.info("Serviço de Sincronização de Dados inicializado")
         
     def _get_db_connection(self):
@@ -144,10 +166,86 @@ class DataSyncService:
             self.logger.error(f"Erro ao obter IDs de regras de negócio: {e}")
             return []
             
+    @staticmethod
+    def _product_payload(product: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Monta o payload do Qdrant para um produto.
+        
+        Inclui os campos exibidos nos resultados de busca, para que o
+        ProductSearchService possa servi-los sem consultar o PostgreSQL.
+        """
+        return {
+            "name": product["name"],
+            "category_id": product["category_id"],
+            "active": product["active"],
+            "price": float(product["price"]),
+            "description": product.get("description"),
+            "benefits": product.get("benefits"),
+            "last_updated": datetime.now().isoformat()
+        }
+    
+    @staticmethod
+    def _business_rule_payload(rule: Dict[str, Any]) -> Dict[str, Any]:
+        """Monta o payload do Qdrant para uma regra de negócio (com os campos exibidos nas buscas)."""
+        return {
+            "name": rule["name"],
+            "category": rule["category"],
+            "active": rule["active"],
+            "description": rule.get("description"),
+            "rule_text": rule.get("rule_text"),
+            "last_updated": datetime.now().isoformat()
+        }
+    
+    @staticmethod
+    def _content_hash(value: Any) -> str:
+        """Hash estável de um texto ou de um dicionário serializável."""
+        return stable_hash(value, volatile_fields=())
+    
+    def _point_payload(self, row: Dict[str, Any], text: str,
+                       build_payload: Callable[[Dict[str, Any]], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Monta o payload do Qdrant com os hashes usados pela sincronização incremental.
+        
+        `text_hash` identifica o texto de embedding e `meta_hash` os metadados
+        (sem `last_updated`), permitindo detectar o que mudou em cada linha.
+        """
+        payload = build_payload(row)
+        metadata = {key: value for key, value in payload.items() if key != "last_updated"}
+        payload["text_hash"] = self._content_hash(text)
+        payload["meta_hash"] = self._content_hash(metadata)
+        return payload
+    
+    def _invalidate_searches(self, cache_prefix: str, changed_ids: Iterable[int] = (),
+                             added_rows: Iterable[Dict[str, Any]] = ()) -> None:
+        """
+        Invalida as buscas em cache afetadas por uma mudança e anuncia os
+        pontos alterados aos índices vetoriais em memória.
+        
+        Args:
+            cache_prefix: Prefixo da entidade ("product" ou "business_rule").
+            changed_ids: Itens alterados ou removidos; apenas as buscas que os
+                         retornaram são invalidadas (tags).
+            added_rows: Linhas que podem passar a aparecer em buscas (novas, com
+                        texto alterado, reativadas ou que mudaram de categoria);
+                        incrementam a geração do catálogo e das suas categorias.
+        """
+        search_cache, scope_field = self.search_caches[cache_prefix]
+        added_rows = list(added_rows)
+        if added_rows:
+            search_cache.bump(row.get(scope_field) for row in added_rows)
+        changed_ids = list(changed_ids)
+        search_cache.invalidate_tags(changed_ids)
+        if changed_ids:
+            publish_vector_changes(self.vector_index_bus, self.collections[cache_prefix], changed_ids)
+    
     def sync_product(self, product_id: int) -> bool:
         """
         Sincroniza um único produto entre PostgreSQL e Qdrant.
         
+        Usa o mesmo caminho da sincronização em lote: produtos removidos ou
+        desativados saem do Qdrant e só o que mudou é regravado (embedding
+        apenas quando o texto muda).
+        
         Args:
             product_id: ID do produto a ser sincronizado.
             
@@ -155,48 +253,15 @@ class DataSyncService:
             True se a sincronização foi bem-sucedida, False caso contrário.
         """
         try:
-            # 1. Obter dados do produto do PostgreSQL
-            product = self.get_product(product_id)
-            
-            if not product:
-                # Se o produto foi removido, remova-o do Qdrant também
-                self.qdrant_client.delete(
-                    collection_name="products",
-                    points_selector=[product_id]
-                )
-                self.logger.info(f"Produto {product_id} removido do Qdrant (não encontrado no PostgreSQL)")
-                return True
-            
-            # 2. Preparar o texto para embedding
-            product_text = prepare_product_text(product)
-            
-            # 3. Gerar embedding
-            embedding = self.embedding_service.get_embedding(product_text)
-            
-            # 4. Atualizar ou inserir no Qdrant
-            self.qdrant_client.upsert(
-                collection_name="products",
-                points=[
-                    PointStruct(
-                        id=product_id,
-                        vector=embedding,
-                        payload={
-                            "name": product["name"],
-                            "category_id": product["category_id"],
-                            "active": product["active"],
-                            "price": float(product["price"]),
-                            "last_updated": datetime.now().isoformat()
-                        }
-                    )
-                ]
+            stats = self._sync_ids(
+                "products", "products", [product_id], prepare_product_text, self._product_payload,
+                "product", 1
             )
-            
-            # 5. Invalidar cache se necessário
-            if self.redis_client:
-                self.redis_client.delete(f"product:{product_id}")
-                self.redis_client.delete("product_search:*")
+            if stats["failed"]:
+                self.logger.error(f"Falha ao gerar o embedding do produto {product_id}")
+                return False
                 
-            self.logger.info(f"Produto {product_id} sincronizado com sucesso")
+            self.logger.info(f"Produto {product_id} sincronizado com sucesso: {stats}")
             return True
             
         except Exception as e:
@@ -207,6 +272,10 @@ class DataSyncService:
         """
         Sincroniza uma única regra de negócio entre PostgreSQL e Qdrant.
         
+        Usa o mesmo caminho da sincronização em lote: regras removidas ou
+        desativadas saem do Qdrant e só o que mudou é regravado (embedding
+        apenas quando o texto muda).
+        
         Args:
             rule_id: ID da regra de negócio a ser sincronizada.
             
@@ -214,47 +283,15 @@ class DataSyncService:
             True se a sincronização foi bem-sucedida, False caso contrário.
         """
         try:
-            # 1. Obter dados da regra de negócio do PostgreSQL
-            rule = self.get_business_rule(rule_id)
-            
-            if not rule:
-                # Se a regra foi removida, remova-a do Qdrant também
-                self.qdrant_client.delete(
-                    collection_name="business_rules",
-                    points_selector=[rule_id]
-                )
-                self.logger.info(f"Regra de negócio {rule_id} removida do Qdrant (não encontrada no PostgreSQL)")
-                return True
-            
-            # 2. Preparar o texto para embedding
-            rule_text = prepare_business_rule_text(rule)
-            
-            # 3. Gerar embedding
-            embedding = self.embedding_service.get_embedding(rule_text)
-            
-            # 4. Atualizar ou inserir no Qdrant
-            self.qdrant_client.upsert(
-                collection_name="business_rules",
-                points=[
-                    PointStruct(
-                        id=rule_id,
-                        vector=embedding,
-                        payload={
-                            "name": rule["name"],
-                            "category": rule["category"],
-                            "active": rule["active"],
-                            "last_updated": datetime.now().isoformat()
-                        }
-                    )
-                ]
+            stats = self._sync_ids(
+                "business_rules", "business_rules", [rule_id], prepare_business_rule_text,
+                self._business_rule_payload, "business_rule", 1
             )
-            
-            # 5. Invalidar cache se necessário
-            if self.redis_client:
-                self.redis_client.delete(f"business_rule:{rule_id}")
-                self.redis_client.delete("business_rule_search:*")
+            if stats["failed"]:
+                self.logger.error(f"Falha ao gerar o embedding da regra de negócio {rule_id}")
+                return False
                 
-            self.logger.info(f"Regra de negócio {rule_id} sincronizada com sucesso")
+            self.logger.info(f"Regra de negócio {rule_id} sincronizada com sucesso: {stats}")
             return True
             
         except Exception as e:
@@ -280,7 +317,7 @@ class DataSyncService:
             # Invalidar cache se necessário
             if self.redis_client:
                 self.redis_client.delete(f"product:{product_id}")
-                self.redis_client.delete("product_search:*")
+            self._invalidate_searches("product", [product_id])
                 
             self.logger.info(f"Produto {product_id} removido do Qdrant")
             return True
@@ -308,7 +345,7 @@ class DataSyncService:
             # Invalidar cache se necessário
             if self.redis_client:
                 self.redis_client.delete(f"business_rule:{rule_id}")
-                self.redis_client.delete("business_rule_search:*")
+            self._invalidate_searches("business_rule", [rule_id])
                 
             self.logger.info(f"Regra de negócio {rule_id} removida do Qdrant")
             return True
@@ -317,35 +354,393 @@ class DataSyncService:
             self.logger.error(f"Erro ao remover regra de negócio {rule_id} do Qdrant: {e}")
             return False
             
-    def full_sync_products(self, batch_size: int = 100) -> bool:
+    def _iter_pages(self, table: str, batch_size: int, after_id: int = 0) -> Iterator[List[Dict[str, Any]]]:
         """
-        Sincroniza todos os produtos entre PostgreSQL e Qdrant.
+        Lê uma tabela em páginas ordenadas por ID (paginação por chave).
+        
+        Usa uma única conexão para toda a leitura; cada página é um SELECT
+        com `id > último_id`, o que permite retomar a leitura de qualquer ponto.
+        
+        Args:
+            table: Nome da tabela.
+            batch_size: Linhas por página.
+            after_id: Ler apenas linhas com ID maior que este.
+            
+        Yields:
+            Lista de linhas (dicionários) de cada página.
+        """
+        query = sql.SQL("SELECT * FROM {} WHERE id > %s ORDER BY id LIMIT %s").format(sql.Identifier(table))
+        conn = self._get_db_connection()
+        try:
+            conn.autocommit = True
+            while True:
+                with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                    cursor.execute(query, (after_id, batch_size))
+                    rows = [dict(row) for row in cursor.fetchall()]
+                if not rows:
+                    return
+                yield rows
+                after_id = rows[-1]["id"]
+        finally:
+            conn.close()
+    
+    def _sync_rows(self, collection: str, rows: List[Dict[str, Any]],
+                   prepare_text: Callable[[Dict[str, Any]], str],
+                   build_payload: Callable[[Dict[str, Any]], Dict[str, Any]],
+                   cache_prefix: str) -> int:
+        """
+        Sincroniza um lote de linhas: uma chamada de embeddings e um upsert.
         
         Args:
-            batch_size: Tamanho do lote para processamento em batch.
+            collection: Coleção do Qdrant.
+            rows: Linhas do PostgreSQL.
+            prepare_text: Função que gera o texto de embedding de uma linha.
+            build_payload: Função que gera o payload do Qdrant de uma linha.
+            cache_prefix: Prefixo das chaves de cache por entidade no Redis.
             
         Returns:
-            True se a sincronização foi bem-sucedida, False caso contrário.
+            Número de linhas sincronizadas (linhas sem embedding são ignoradas).
         """
+        texts = [prepare_text(row) for row in rows]
+        embeddings = self.embedding_service.get_batch_embeddings(texts, batch_size=len(texts))
+        
+        synced_rows = [row for row, embedding in zip(rows, embeddings) if embedding]
+        points = [
+            PointStruct(id=row["id"], vector=embedding, payload=self._point_payload(row, text, build_payload))
+            for row, text, embedding in zip(rows, texts, embeddings)
+            if embedding
+        ]
+        if len(points) < len(rows):
+            self.logger.warning(f"{len(rows) - len(points)} itens de {collection} sem embedding neste lote")
+        
+        if points:
+            self.qdrant_client.upsert(collection_name=collection, points=points)
+            
+            if self.redis_client:
+                self.redis_client.delete(*[f"{cache_prefix}:{point.id}" for point in points])
+            self._invalidate_searches(cache_prefix, [point.id for point in points], synced_rows)
+        
+        return len(points)
+    
+    def _checkpoint_key(self, collection: str) -> str:
+        return f"sync:checkpoint:{collection}"
+    
+    def _load_checkpoint(self, collection: str) -> int:
+        """Retorna o último ID sincronizado de uma sincronização interrompida (0 se não houver)."""
+        if not self.redis_client:
+            return 0
+        try:
+            value = self.redis_client.get(self._checkpoint_key(collection))
+            return int(value) if value else 0
+        except Exception as e:
+            self.logger.warning(f"Não foi possível ler o checkpoint de {collection}: {e}")
+            return 0
+    
+    def _save_checkpoint(self, collection: str, last_id: Optional[int]) -> None:
+        """Grava (ou remove, se last_id for None) o checkpoint de uma coleção."""
+        if not self.redis_client:
+            return
         try:
-            # Obter todos os IDs de produtos
-            product_ids = self.get_all_product_ids()
-            total_products = len(product_ids)
+            if last_id is None:
+                self.redis_client.delete(self._checkpoint_key(collection))
+            else:
+                self.redis_client.set(self._checkpoint_key(collection), last_id)
+        except Exception as e:
+            self.logger.warning(f"Não foi possível gravar o checkpoint de {collection}: {e}")
+    
+    def _sync_rows_incremental(self, collection: str, rows: List[Dict[str, Any]],
+                               prepare_text: Callable[[Dict[str, Any]], str],
+                               build_payload: Callable[[Dict[str, Any]], Dict[str, Any]],
+                               cache_prefix: str) -> Dict[str, int]:
+        """
+        Sincroniza um lote de linhas tratando apenas o que mudou.
+        
+        Compara os hashes de cada linha com os gravados no payload do Qdrant
+        (uma única consulta `retrieve` por lote, sem vetores):
+        - linha desativada: o ponto é removido (reativada, volta como ponto novo);
+        - texto de embedding alterado (ou ponto inexistente): novo embedding e upsert;
+        - apenas metadados alterados (preço...): `set_payload`, sem embedding;
+        - nada alterado: a linha é ignorada.
+        
+        Returns:
+            Contadores do lote: embedded, payload_updated, skipped, deleted e failed.
+        """
+        rows, deactivated = self._split_inactive(rows)
+        counts = {"embedded": 0, "payload_updated": 0, "skipped": 0, "deleted": 0, "failed": 0}
+        if deactivated:
+            counts["deleted"] = self._delete_existing_points(collection, deactivated, cache_prefix)
+        if not rows:
+            return counts
+        
+        scope_field = self.search_caches[cache_prefix][1]
+        existing = {
+            str(record.id): record.payload or {}
+            for record in self.qdrant_client.retrieve(
+                collection_name=collection,
+                ids=[row["id"] for row in rows],
+                with_payload=["text_hash", "meta_hash", "active", scope_field],
+                with_vectors=False
+            )
+        }
+        
+        to_embed = []
+        payload_updates = []
+        # Linhas reativadas ou que mudaram de escopo podem entrar em buscas que não as retornavam
+        entering_rows = []
+        for row in rows:
+            text = prepare_text(row)
+            payload = self._point_payload(row, text, build_payload)
+            current = existing.get(str(row["id"]))
+            if current is None or current.get("text_hash") != payload["text_hash"]:
+                to_embed.append(row)
+            elif current.get("meta_hash") != payload["meta_hash"]:
+                payload_updates.append((row["id"], payload))
+                if (payload.get("active") and not current.get("active")) or \
+                        current.get(scope_field) != payload.get(scope_field):
+                    entering_rows.append(row)
+        
+        counts["skipped"] = len(rows) - len(to_embed) - len(payload_updates)
+        
+        if to_embed:
+            embedded = self._sync_rows(collection, to_embed, prepare_text, build_payload, cache_prefix)
+            counts["embedded"] = embedded
+            counts["failed"] = len(to_embed) - embedded
+        
+        if payload_updates:
+            # Uma única requisição para todas as atualizações de metadados do lote
+            self.qdrant_client.batch_update_points(
+                collection_name=collection,
+                update_operations=[
+                    SetPayloadOperation(set_payload=SetPayload(payload=payload, points=[point_id]))
+                    for point_id, payload in payload_updates
+                ]
+            )
+            counts["payload_updated"] = len(payload_updates)
+            
+            if self.redis_client:
+                self.redis_client.delete(*[f"{cache_prefix}:{point_id}" for point_id, _ in payload_updates])
+            self._invalidate_searches(cache_prefix, [point_id for point_id, _ in payload_updates], entering_rows)
+        
+        return counts
+    
+    @staticmethod
+    def _split_inactive(rows: List[Dict[str, Any]]):
+        """Separa as linhas ativas dos IDs das linhas desativadas."""
+        active = [row for row in rows if row.get("active", True)]
+        inactive = [row["id"] for row in rows if not row.get("active", True)]
+        return active, inactive
+    
+    def _delete_existing_points(self, collection: str, ids: List[int], cache_prefix: str) -> int:
+        """Remove do Qdrant os pontos que ainda existem entre `ids` e retorna quantos eram."""
+        existing = [
+            record.id for record in self.qdrant_client.retrieve(
+                collection_name=collection, ids=list(ids), with_payload=False, with_vectors=False
+            )
+        ]
+        if existing:
+            self._delete_points(collection, existing, cache_prefix)
+        return len(existing)
+    
+    def _reconcile_deleted(self, collection: str, seen_ids: set, cache_prefix: str,
+                           page_size: int = 1000) -> int:
+        """
+        Remove do Qdrant os pontos cujas linhas não existem mais no PostgreSQL.
+        
+        Percorre os IDs da coleção (sem payload nem vetores) e apaga, em lotes,
+        os que não foram lidos na varredura completa da tabela.
+        
+        Args:
+            collection: Coleção do Qdrant.
+            seen_ids: IDs de todas as linhas lidas da tabela.
+            cache_prefix: Prefixo das chaves de cache por entidade no Redis.
             
-            self.logger.info(f"Iniciando sincronização completa de {total_products} produtos")
+        Returns:
+            Número de pontos removidos.
+        """
+        orphans = []
+        offset = None
+        while True:
+            records, offset = self.qdrant_client.scroll(
+                collection_name=collection, limit=page_size, offset=offset,
+                with_payload=False, with_vectors=False
+            )
+            orphans.extend(record.id for record in records if record.id not in seen_ids)
+            if offset is None:
+                break
+        
+        for start in range(0, len(orphans), page_size):
+            self._delete_points(collection, orphans[start:start + page_size], cache_prefix)
+        if orphans:
+            self.logger.info(f"{len(orphans)} pontos de {collection} removidos (linhas apagadas no PostgreSQL)")
+        return len(orphans)
+    
+    def _run_batches(self, table: str, collection: str,
+                     sync_batch: Callable[[List[Dict[str, Any]]], Dict[str, int]],
+                     batch_size: int, max_in_flight: Optional[int],
+                     start_after: int = 0, checkpoint: bool = False,
+                     cache_prefix: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Processa uma tabela em lotes, em pipeline, aplicando `sync_batch` a cada lote.
+        
+        Enquanto os lotes já lidos são processados (embeddings + escrita no
+        Qdrant) em paralelo, a próxima página é lida do PostgreSQL; no máximo
+        `max_in_flight` lotes ficam em andamento ao mesmo tempo.
+        
+        Com `checkpoint`, o último ID de uma sequência contínua de lotes
+        concluídos é gravado no Redis após cada lote, e removido ao final de
+        uma execução sem falhas.
+        
+        Com `cache_prefix`, uma varredura completa (desde o início) e sem
+        falhas também remove do Qdrant os pontos de linhas apagadas.
+        
+        Args:
+            table: Tabela do PostgreSQL.
+            collection: Coleção do Qdrant.
+            sync_batch: Função que sincroniza um lote e retorna seus contadores.
+            batch_size: Linhas por lote.
+            max_in_flight: Lotes processados em paralelo.
+            start_after: Processar apenas linhas com ID maior que este.
+            checkpoint: Se True, grava o progresso no Redis.
+            cache_prefix: Prefixo de cache da entidade; ativa a remoção de pontos órfãos.
             
-            # Sincronizar em lotes para evitar sobrecarga de memória
-            success_count = 0
-            for i in range(0, total_products, batch_size):
-                batch = product_ids[i:i+batch_size]
-                self.logger.info(f"Processando lote de produtos {i+1} a {min(i+batch_size, total_products)} de {total_products}")
+        Returns:
+            Estatísticas da execução (linhas lidas, contadores somados, falhas, duração).
+        """
+        max_in_flight = max_in_flight or self.max_in_flight
+        stats = {"scanned": 0, "failed": 0}
+        seen_ids = set()
+        started = time.monotonic()
+        checkpoint_blocked = False
+        in_flight = deque()
+        
+        def complete_oldest():
+            nonlocal checkpoint_blocked
+            last_id, size, future = in_flight.popleft()
+            try:
+                for name, value in future.result().items():
+                    stats[name] = stats.get(name, 0) + value
+            except Exception as e:
+                self.logger.error(f"Erro ao sincronizar lote de {collection} até o ID {last_id}: {e}")
+                stats["failed"] += size
+                # Lotes seguintes podem concluir, mas o checkpoint não passa de um lote com falha
+                checkpoint_blocked = True
+            if checkpoint and not checkpoint_blocked:
+                self._save_checkpoint(collection, last_id)
+        
+        with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix=f"sync-{collection}") as executor:
+            for rows in self._iter_pages(table, batch_size, start_after):
+                stats["scanned"] += len(rows)
+                seen_ids.update(row["id"] for row in rows)
+                in_flight.append((rows[-1]["id"], len(rows), executor.submit(sync_batch, rows)))
                 
-                for product_id in batch:
-                    if self.sync_product(product_id):
-                        success_count += 1
+                # Limitar os lotes em andamento (e a memória usada pelas páginas lidas)
+                while len(in_flight) >= max_in_flight or (in_flight and in_flight[0][2].done()):
+                    complete_oldest()
+                    
+                self.logger.info(f"{collection}: {stats['scanned']} lidos")
+            
+            while in_flight:
+                complete_oldest()
+        
+        if checkpoint and not stats["failed"]:
+            self._save_checkpoint(collection, None)
+        
+        if cache_prefix and not stats["failed"] and not start_after:
+            stats["deleted"] = stats.get("deleted", 0) + self._reconcile_deleted(collection, seen_ids, cache_prefix)
+        
+        if not stats["failed"] and not start_after and self.redis_client:
+            # A tabela inteira foi percorrida sem falhas: todos os payloads estão
+            # consistentes com o PostgreSQL neste instante
+            try:
+                self.redis_client.set(f"sync:verified_at:{collection}", time.time())
+            except Exception as e:
+                self.logger.warning(f"Não foi possível registrar a verificação de {collection}: {e}")
+        
+        stats["duration_seconds"] = time.monotonic() - started
+        self.last_sync_stats[collection] = stats
+        return stats
+    
+    def _full_sync(self, table: str, collection: str,
+                   prepare_text: Callable[[Dict[str, Any]], str],
+                   build_payload: Callable[[Dict[str, Any]], Dict[str, Any]],
+                   cache_prefix: str, batch_size: int,
+                   max_in_flight: Optional[int], resume: bool) -> Dict[str, Any]:
+        """
+        Sincronização completa em pipeline de uma tabela para uma coleção.
+        
+        Todas as linhas ativas recebem novo embedding; pontos de linhas
+        desativadas ou apagadas são removidos. Uma sincronização interrompida
+        recomeça a partir do checkpoint gravado no Redis.
+        
+        Returns:
+            Estatísticas da sincronização (linhas lidas, sincronizadas, falhas, duração).
+        """
+        start_after = self._load_checkpoint(collection) if resume else 0
+        if start_after:
+            self.logger.info(f"Retomando sincronização de {collection} após o ID {start_after}")
+        
+        def sync_batch(rows):
+            rows, deactivated = self._split_inactive(rows)
+            deleted = self._delete_existing_points(collection, deactivated, cache_prefix) if deactivated else 0
+            synced = self._sync_rows(collection, rows, prepare_text, build_payload, cache_prefix) if rows else 0
+            return {"synced": synced, "deleted": deleted, "failed": len(rows) - synced}
+        
+        stats = self._run_batches(
+            table, collection, sync_batch, batch_size, max_in_flight,
+            start_after=start_after, checkpoint=True, cache_prefix=cache_prefix
+        )
+        stats.setdefault("synced", 0)
+        stats["resumed_after"] = start_after
+        return stats
+    
+    def _incremental_sync(self, table: str, collection: str,
+                          prepare_text: Callable[[Dict[str, Any]], str],
+                          build_payload: Callable[[Dict[str, Any]], Dict[str, Any]],
+                          cache_prefix: str, batch_size: int,
+                          max_in_flight: Optional[int]) -> Dict[str, Any]:
+        """
+        Sincronização incremental em pipeline de uma tabela para uma coleção.
+        
+        Returns:
+            Estatísticas da sincronização (scanned, embedded, payload_updated,
+            skipped, deleted, failed, duration_seconds).
+        """
+        def sync_batch(rows):
+            return self._sync_rows_incremental(collection, rows, prepare_text, build_payload, cache_prefix)
+        
+        stats = self._run_batches(table, collection, sync_batch, batch_size, max_in_flight,
+                                  cache_prefix=cache_prefix)
+        for name in ("embedded", "payload_updated", "skipped", "deleted"):
+            stats.setdefault(name, 0)
+        return stats
+    
+    def full_sync_products(self, batch_size: int = 100, max_in_flight: Optional[int] = None,
+                           resume: bool = True) -> bool:
+        """
+        Sincroniza todos os produtos entre PostgreSQL e Qdrant.
+        
+        Args:
+            batch_size: Produtos por lote (um SELECT, uma chamada de embeddings e um upsert por lote).
+            max_in_flight: Lotes processados em paralelo (padrão: SYNC_MAX_IN_FLIGHT ou 4).
+            resume: Se True, retoma a partir do checkpoint de uma sincronização interrompida.
+            
+        Returns:
+            True se a sincronização foi bem-sucedida, False caso contrário.
+        """
+        try:
+            self.logger.info("Iniciando sincronização completa de produtos")
+            stats = self._full_sync(
+                "products", "products", prepare_product_text, self._product_payload,
+                "product", batch_size, max_in_flight, resume
+            )
+            total_products = stats["scanned"]
+            success_count = stats["scanned"] - stats["failed"]
             
             success_rate = (success_count / total_products) * 100 if total_products > 0 else 100
-            self.logger.info(f"Sincronização completa de produtos concluída. Taxa de sucesso: {success_rate:.2f}% ({success_count}/{total_products})")
+            self.logger.info(
+                f"Sincronização completa de produtos concluída em {stats['duration_seconds']:.1f}s. "
+                f"Taxa de sucesso: {success_rate:.2f}% ({success_count}/{total_products})"
+            )
             
             return success_rate > 95  # Consideramos sucesso se mais de 95% dos produtos foram sincronizados
             
@@ -353,38 +748,207 @@ class DataSyncService:
             self.logger.error(f"Erro durante sincronização completa de produtos: {e}")
             return False
             
-    def full_sync_business_rules(self, batch_size: int = 100) -> bool:
+    def full_sync_business_rules(self, batch_size: int = 100, max_in_flight: Optional[int] = None,
+                                 resume: bool = True) -> bool:
         """
         Sincroniza todas as regras de negócio entre PostgreSQL e Qdrant.
         
         Args:
-            batch_size: Tamanho do lote para processamento em batch.
+            batch_size: Regras por lote (um SELECT, uma chamada de embeddings e um upsert por lote).
+            max_in_flight: Lotes processados em paralelo (padrão: SYNC_MAX_IN_FLIGHT ou 4).
+            resume: Se True, retoma a partir do checkpoint de uma sincronização interrompida.
             
         Returns:
             True se a sincronização foi bem-sucedida, False caso contrário.
         """
         try:
-            # Obter todos os IDs de regras de negócio
-            rule_ids = self.get_all_business_rule_ids()
-            total_rules = len(rule_ids)
-            
-            self.logger.info(f"Iniciando sincronização completa de {total_rules} regras de negócio")
-            
-            # Sincronizar em lotes para evitar sobrecarga de memória
-            success_count = 0
-            for i in range(0, total_rules, batch_size):
-                batch = rule_ids[i:i+batch_size]
-                self.logger.info(f"Processando lote de regras de negócio {i+1} a {min(i+batch_size, total_rules)} de {total_rules}")
-                
-                for rule_id in batch:
-                    if self.sync_business_rule(rule_id):
-                        success_count += 1
+            self.logger.info("Iniciando sincronização completa de regras de negócio")
+            stats = self._full_sync(
+                "business_rules", "business_rules", prepare_business_rule_text, self._business_rule_payload,
+                "business_rule", batch_size, max_in_flight, resume
+            )
+            total_rules = stats["scanned"]
+            success_count = stats["scanned"] - stats["failed"]
             
             success_rate = (success_count / total_rules) * 100 if total_rules > 0 else 100
-            self.logger.info(f"Sincronização completa de regras de negócio concluída. Taxa de sucesso: {success_rate:.2f}% ({success_count}/{total_rules})")
+            self.logger.info(
+                f"Sincronização completa de regras de negócio concluída em {stats['duration_seconds']:.1f}s. "
+                f"Taxa de sucesso: {success_rate:.2f}% ({success_count}/{total_rules})"
+            )
             
             return success_rate > 95  # Consideramos sucesso se mais de 95% das regras foram sincronizadas
             
         except Exception as e:
             self.logger.error(f"Erro durante sincronização completa de regras de negócio: {e}")
             return False
+    
+    def incremental_sync_products(self, batch_size: int = 100,
+                                  max_in_flight: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Sincroniza apenas os produtos alterados desde a última sincronização.
+        
+        Produtos cujo texto de embedding mudou recebem novo embedding; produtos
+        com apenas metadados alterados (preço, ativo) têm só o payload atualizado.
+        
+        Args:
+            batch_size: Produtos por lote.
+            max_in_flight: Lotes processados em paralelo (padrão: SYNC_MAX_IN_FLIGHT ou 4).
+            
+        Returns:
+            Estatísticas da sincronização, ou None em caso de erro.
+        """
+        try:
+            stats = self._incremental_sync(
+                "products", "products", prepare_product_text, self._product_payload,
+                "product", batch_size, max_in_flight
+            )
+            self.logger.info(
+                f"Sincronização incremental de produtos concluída em {stats['duration_seconds']:.1f}s: "
+                f"{stats['scanned']} lidos, {stats['embedded']} com novo embedding, "
+                f"{stats['payload_updated']} com payload atualizado, {stats['skipped']} inalterados, "
+                f"{stats['deleted']} removidos, {stats['failed']} falhas"
+            )
+            return stats
+            
+        except Exception as e:
+            self.logger.error(f"Erro durante sincronização incremental de produtos: {e}")
+            return None
+    
+    def incremental_sync_business_rules(self, batch_size: int = 100,
+                                        max_in_flight: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Sincroniza apenas as regras de negócio alteradas desde a última sincronização.
+        
+        Args:
+            batch_size: Regras por lote.
+            max_in_flight: Lotes processados em paralelo (padrão: SYNC_MAX_IN_FLIGHT ou 4).
+            
+        Returns:
+            Estatísticas da sincronização, ou None em caso de erro.
+        """
+        try:
+            stats = self._incremental_sync(
+                "business_rules", "business_rules", prepare_business_rule_text, self._business_rule_payload,
+                "business_rule", batch_size, max_in_flight
+            )
+            self.logger.info(
+                f"Sincronização incremental de regras de negócio concluída em {stats['duration_seconds']:.1f}s: "
+                f"{stats['scanned']} lidas, {stats['embedded']} com novo embedding, "
+                f"{stats['payload_updated']} com payload atualizado, {stats['skipped']} inalteradas, "
+                f"{stats['deleted']} removidas, {stats['failed']} falhas"
+            )
+            return stats
+            
+        except Exception as e:
+            self.logger.error(f"Erro durante sincronização incremental de regras de negócio: {e}")
+            return None
+    
+    def _fetch_rows(self, table: str, ids: List[int]) -> List[Dict[str, Any]]:
+        """
+        Lê várias linhas de uma tabela em uma única consulta.
+        
+        Args:
+            table: Nome da tabela.
+            ids: IDs das linhas.
+            
+        Returns:
+            Linhas encontradas, ordenadas por ID.
+        """
+        query = sql.SQL("SELECT * FROM {} WHERE id = ANY(%s) ORDER BY id").format(sql.Identifier(table))
+        conn = self._get_db_connection()
+        try:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute(query, (list(ids),))
+                return [dict(row) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+    
+    def _delete_points(self, collection: str, ids: List[int], cache_prefix: str) -> None:
+        """Remove vários pontos do Qdrant e invalida o cache correspondente."""
+        self.qdrant_client.delete(collection_name=collection, points_selector=list(ids))
+        if self.redis_client:
+            self.redis_client.delete(*[f"{cache_prefix}:{point_id}" for point_id in ids])
+        self._invalidate_searches(cache_prefix, ids)
+    
+    def _sync_ids(self, table: str, collection: str, ids: List[int],
+                  prepare_text: Callable[[Dict[str, Any]], str],
+                  build_payload: Callable[[Dict[str, Any]], Dict[str, Any]],
+                  cache_prefix: str, batch_size: int) -> Dict[str, int]:
+        """
+        Sincroniza um conjunto de IDs em lotes.
+        
+        Cada lote é lido com uma consulta, sincronizado de forma incremental
+        (embeddings só para texto alterado) e IDs que não existem mais no
+        PostgreSQL são removidos do Qdrant.
+        
+        Returns:
+            Contadores somados de todos os lotes (incluindo `deleted`).
+        """
+        stats = {"scanned": 0, "embedded": 0, "payload_updated": 0, "skipped": 0, "failed": 0, "deleted": 0}
+        ids = sorted(set(ids))
+        for start in range(0, len(ids), batch_size):
+            chunk = ids[start:start + batch_size]
+            rows = self._fetch_rows(table, chunk)
+            stats["scanned"] += len(rows)
+            
+            missing = set(chunk) - {row["id"] for row in rows}
+            if missing:
+                self._delete_points(collection, sorted(missing), cache_prefix)
+                stats["deleted"] += len(missing)
+            
+            if rows:
+                counts = self._sync_rows_incremental(collection, rows, prepare_text, build_payload, cache_prefix)
+                for name, value in counts.items():
+                    stats[name] += value
+        
+        return stats
+    
+    def sync_products(self, product_ids: List[int], batch_size: int = 100) -> Optional[Dict[str, Any]]:
+        """
+        Sincroniza vários produtos de uma vez (lotes de embeddings e upserts).
+        
+        Produtos que não existem mais no PostgreSQL são removidos do Qdrant.
+        
+        Args:
+            product_ids: IDs dos produtos.
+            batch_size: Produtos por lote.
+            
+        Returns:
+            Estatísticas da sincronização, ou None em caso de erro.
+        """
+        try:
+            stats = self._sync_ids(
+                "products", "products", product_ids, prepare_product_text, self._product_payload,
+                "product", batch_size
+            )
+            self.logger.info(f"{len(product_ids)} produtos sincronizados em lote: {stats}")
+            return stats
+            
+        except Exception as e:
+            self.logger.error(f"Erro ao sincronizar lote de produtos: {e}")
+            return None
+    
+    def sync_business_rules(self, rule_ids: List[int], batch_size: int = 100) -> Optional[Dict[str, Any]]:
+        """
+        Sincroniza várias regras de negócio de uma vez (lotes de embeddings e upserts).
+        
+        Regras que não existem mais no PostgreSQL são removidas do Qdrant.
+        
+        Args:
+            rule_ids: IDs das regras de negócio.
+            batch_size: Regras por lote.
+            
+        Returns:
+            Estatísticas da sincronização, ou None em caso de erro.
+        """
+        try:
+            stats = self._sync_ids(
+                "business_rules", "business_rules", rule_ids, prepare_business_rule_text,
+                self._business_rule_payload, "business_rule", batch_size
+            )
+            self.logger.info(f"{len(rule_ids)} regras de negócio sincronizadas em lote: {stats}")
+            return stats
+            
+        except Exception as e:
+            self.logger.error(f"Erro ao sincronizar lote de regras de negócio: {e}")
+            return None
@@ -2,9 +2,17 @@
 Serviço de Monitoramento de Alterações no Banco de Dados.
 Este serviço monitora alterações no PostgreSQL e notifica o DataSyncService
 para manter o Qdrant atualizado.
+
+As notificações não são processadas uma a uma: os IDs alterados são
+acumulados em um buffer por entidade (notificações repetidas do mesmo ID
+viram uma só), e o buffer é descarregado após uma janela de debounce pelo
+caminho de sincronização em lote do DataSyncService. Assim, uma atualização
+em massa de preços gera alguns lotes de embeddings/upserts, e não milhares
+de chamadas independentes.
 """
 import os
 import json
+import time
 import logging
 import asyncio
 import asyncpg
@@ -19,12 +27,29 @@ class DatabaseChangeListener:
     Este serviço utiliza o sistema de notificações do PostgreSQL para detectar
     alterações em tempo real e notificar o DataSyncService para manter o Qdrant
     atualizado.
+    
+    Quando o buffer enche (backpressure), novas notificações são descartadas e
+    a entidade é marcada para uma sincronização incremental, que também é
+    usada se um lote falhar, ao iniciar o listener (notificações emitidas
+    enquanto ele estava parado foram perdidas) e depois de reconectar, quando
+    a conexão do LISTEN cai.
     """
     
+    # Entidade -> (método de sincronização em lote, método de sincronização incremental)
+    ENTITIES = {
+        "products": ("sync_products", "incremental_sync_products"),
+        "business_rules": ("sync_business_rules", "incremental_sync_business_rules"),
+    }
+    
     def __init__(
         self, 
         data_sync_service: DataSyncService,
-        db_connection_string: Optional[str] = None
+        db_connection_string: Optional[str] = None,
+        debounce_seconds: Optional[float] = None,
+        max_batch_size: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        resync_on_start: bool = True,
+        retry_delay: Optional[float] = None
     ):
         """
         Inicializa o serviço de monitoramento de alterações no banco de dados.
@@ -33,12 +58,47 @@ class DatabaseChangeListener:
             data_sync_service: Instância do DataSyncService para sincronização.
             db_connection_string: String de conexão com o PostgreSQL. Se não fornecida,
                                  será buscada na variável de ambiente DATABASE_URL.
+            debounce_seconds: Janela para acumular notificações antes de sincronizar
+                              (padrão: SYNC_DEBOUNCE_SECONDS ou 1.0).
+            max_batch_size: IDs por lote de sincronização; um buffer com esse tamanho
+                            é descarregado sem esperar a janela (padrão: SYNC_EVENT_BATCH_SIZE ou 200).
+            max_pending: Máximo de IDs pendentes por entidade; acima disso as notificações
+                         são descartadas e é feita uma sincronização incremental
+                         (padrão: SYNC_MAX_PENDING_EVENTS ou 10000).
+            resync_on_start: Se True, executa uma sincronização incremental ao iniciar.
+            retry_delay: Espera antes de reconectar ou de repetir uma sincronização
+                         que falhou (padrão: SYNC_RETRY_DELAY_SECONDS ou 5).
         """
         self.data_sync_service = data_sync_service
         self.db_connection_string = db_connection_string or os.environ.get("DATABASE_URL")
         if not self.db_connection_string:
             raise ValueError("String de conexão com o PostgreSQL não fornecida e não encontrada nas variáveis de ambiente")
             
+        self.debounce_seconds = debounce_seconds if debounce_seconds is not None else float(
+            os.environ.get("SYNC_DEBOUNCE_SECONDS", "1.0")
+        )
+        self.max_batch_size = max_batch_size or int(os.environ.get("SYNC_EVENT_BATCH_SIZE", "200"))
+        self.max_pending = max_pending or int(os.environ.get("SYNC_MAX_PENDING_EVENTS", "10000"))
+        self.retry_delay = retry_delay if retry_delay is not None else float(
+            os.environ.get("SYNC_RETRY_DELAY_SECONDS", "5")
+        )
+        
+        # IDs pendentes por entidade (um dict preserva a ordem de chegada e elimina repetições)
+        self._pending: Dict[str, Dict[int, str]] = {entity: {} for entity in self.ENTITIES}
+        # Entidades que perderam notificações e precisam de sincronização incremental
+        self._needs_resync = set(self.ENTITIES) if resync_on_start else set()
+        self._first_pending_at: Optional[float] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self.stats = {
+            "received": 0,
+            "coalesced": 0,
+            "dropped": 0,
+            "batches": 0,
+            "resyncs": 0,
+            "reconnects": 0
+        }
+            
         self.running = False
         self.logger = logging.getLogger(__name__)
         
@@ -49,13 +109,51 @@ class DatabaseChangeListener:
         Inicia o listener para mudanças no banco de dados.
         
         Este método configura os triggers necessários no PostgreSQL e inicia
-        o monitoramento de notificações.
+        o monitoramento de notificações. Se a conexão cair, reconecta após
+        `retry_delay` segundos, volta a escutar os canais e agenda uma
+        sincronização incremental das entidades, pois as notificações emitidas
+        sem conexão foram perdidas.
         """
         self.running = True
+        self._wakeup = asyncio.Event()
+        self._flush_task = asyncio.create_task(self._flush_loop())
+        if self._needs_resync:
+            self._wakeup.set()
         
+        first_attempt = True
+        try:
+            while self.running:
+                try:
+                    # Depois de uma queda (ou de uma primeira tentativa que falhou), as
+                    # notificações do intervalo foram perdidas
+                    await self._listen(resync=not first_attempt)
+                except Exception as e:
+                    self.logger.error(f"Erro no listener de alterações no banco de dados: {e}")
+                first_attempt = False
+                
+                if self.running:
+                    self.stats["reconnects"] += 1
+                    self.logger.warning(f"Reconectando o listener em {self.retry_delay}s")
+                    await asyncio.sleep(self.retry_delay)
+            
+        finally:
+            # Descarregar o que ainda estiver no buffer antes de encerrar
+            self._wakeup.set()
+            await self._flush_task
+    
+    async def _listen(self, resync: bool) -> None:
+        """
+        Conecta, escuta os canais de notificação e aguarda até parar ou perder a conexão.
+        
+        Args:
+            resync: Se True, agenda uma sincronização incremental de todas as
+                    entidades assim que os canais forem escutados (reconexão).
+        """
+        # Estabelecer conexão com o PostgreSQL
+        conn = await asyncpg.connect(self.db_connection_string)
+        lost = asyncio.Event()
         try:
-            # Estabelecer conexão com o PostgreSQL
-            conn = await asyncpg.connect(self.db_connection_string)
+            conn.add_termination_listener(lambda connection: lost.set())
             
             # Configurar triggers no PostgreSQL (se ainda não existirem)
             await self._setup_triggers(conn)
@@ -64,20 +162,28 @@ class DatabaseChangeListener:
             await conn.add_listener('product_changes', self._on_product_change)
             await conn.add_listener('business_rule_changes', self._on_business_rule_change)
             
+            if resync:
+                self._needs_resync.update(self.ENTITIES)
+                self._wakeup.set()
             self.logger.info("Listener de alterações no banco de dados iniciado com sucesso")
             
             # Manter a conexão aberta enquanto o serviço estiver rodando
-            while self.running:
-                await asyncio.sleep(1)
-                
+            while self.running and not lost.is_set() and not conn.is_closed():
+                try:
+                    await asyncio.wait_for(lost.wait(), timeout=1)
+                except asyncio.TimeoutError:
+                    pass
+            
+            if self.running:
+                self.logger.warning("Conexão do listener de alterações no banco de dados perdida")
+                return
+            
             # Limpar ao parar
             await conn.remove_listener('product_changes', self._on_product_change)
             await conn.remove_listener('business_rule_changes', self._on_business_rule_change)
-            await conn.close()
-            
-        except Exception as e:
-            self.logger.error(f"Erro ao iniciar listener de alterações no banco de dados: {e}")
-            self.running = False
+        finally:
+            if not conn.is_closed():
+                await conn.close()
             
     def stop(self):
         """
@@ -99,24 +205,7 @@ class DatabaseChangeListener:
             channel: Canal de notificação.
             payload: Dados da notificação em formato JSON.
         """
-        try:
-            # Converter o payload para um dicionário
-            data = json.loads(payload)
-            product_id = data['id']
-            operation = data['operation']  # INSERT, UPDATE, DELETE
-            
-            self.logger.info(f"Notificação recebida: {operation} em produto {product_id}")
-            
-            # Processar a alteração de acordo com a operação
-            if operation == 'DELETE':
-                # Remover do Qdrant
-                await asyncio.to_thread(self.data_sync_service.delete_product, product_id)
-            else:
-                # Sincronizar com Qdrant (INSERT ou UPDATE)
-                await asyncio.to_thread(self.data_sync_service.sync_product, product_id)
-                
-        except Exception as e:
-            self.logger.error(f"Erro ao processar mudança de produto: {e}")
+        self._enqueue_change("products", payload)
     
     async def _on_business_rule_change(self, connection, pid, channel, payload):
         """
@@ -131,24 +220,112 @@ class DatabaseChangeListener:
             channel: Canal de notificação.
             payload: Dados da notificação em formato JSON.
         """
+        self._enqueue_change("business_rules", payload)
+    
+    def _enqueue_change(self, entity: str, payload: str) -> None:
+        """
+        Registra uma notificação no buffer da entidade.
+        
+        Args:
+            entity: Entidade alterada ("products" ou "business_rules").
+            payload: Dados da notificação em formato JSON.
+        """
         try:
             # Converter o payload para um dicionário
             data = json.loads(payload)
-            rule_id = data['id']
+            entity_id = data['id']
             operation = data['operation']  # INSERT, UPDATE, DELETE
+        except Exception as e:
+            self.logger.error(f"Notificação inválida para {entity}: {e}")
+            return
+        
+        self.stats["received"] += 1
+        pending = self._pending[entity]
+        
+        if entity_id in pending:
+            # INSERT/UPDATE/DELETE do mesmo ID dentro da janela: vale a última operação
+            self.stats["coalesced"] += 1
+            pending[entity_id] = operation
+            return
+        
+        if len(pending) >= self.max_pending:
+            # Buffer cheio: descartar e recuperar depois com a sincronização incremental
+            if entity not in self._needs_resync:
+                self.logger.warning(
+                    f"Buffer de {entity} cheio ({self.max_pending}); notificações serão "
+                    f"recuperadas por sincronização incremental"
+                )
+            self.stats["dropped"] += 1
+            self._needs_resync.add(entity)
+            return
+        
+        pending[entity_id] = operation
+        if self._first_pending_at is None:
+            self._first_pending_at = time.monotonic()
+        self._wakeup.set()
+    
+    async def _flush_loop(self):
+        """
+        Descarrega os buffers após a janela de debounce.
+        
+        A janela conta a partir da primeira notificação pendente, então uma
+        sequência contínua de notificações não adia a sincronização
+        indefinidamente; buffers com `max_batch_size` IDs são descarregados
+        imediatamente.
+        """
+        while True:
+            await self._wakeup.wait()
             
-            self.logger.info(f"Notificação recebida: {operation} em regra de negócio {rule_id}")
+            while self.running and self._first_pending_at is not None:
+                if any(len(pending) >= self.max_batch_size for pending in self._pending.values()):
+                    break
+                remaining = self._first_pending_at + self.debounce_seconds - time.monotonic()
+                if remaining <= 0:
+                    break
+                await asyncio.sleep(min(remaining, 0.05))
             
-            # Processar a alteração de acordo com a operação
-            if operation == 'DELETE':
-                # Remover do Qdrant
-                await asyncio.to_thread(self.data_sync_service.delete_business_rule, rule_id)
-            else:
-                # Sincronizar com Qdrant (INSERT ou UPDATE)
-                await asyncio.to_thread(self.data_sync_service.sync_business_rule, rule_id)
+            self._wakeup.clear()
+            try:
+                await self._flush()
+            except Exception as e:
+                self.logger.error(f"Erro ao processar alterações pendentes: {e}")
+                self._needs_resync.update(self.ENTITIES)
+                # Repetir sem depender de uma nova notificação
+                if self.running:
+                    await asyncio.sleep(self.retry_delay)
+                self._wakeup.set()
+            
+            if not self.running and not any(self._pending.values()):
+                return
+    
+    async def _flush(self):
+        """
+        Sincroniza os IDs pendentes em lote e executa as sincronizações incrementais necessárias.
+        """
+        self._first_pending_at = None
+        
+        for entity, (batch_method, resync_method) in self.ENTITIES.items():
+            pending = self._pending[entity]
+            if pending:
+                # Trocar o buffer antes de sincronizar: novas notificações vão para um buffer novo
+                self._pending[entity] = {}
+                ids = list(pending)
+                deleted = sum(1 for operation in pending.values() if operation == 'DELETE')
+                self.logger.info(f"Sincronizando {len(ids)} {entity} alterados ({deleted} removidos)")
                 
-        except Exception as e:
-            self.logger.error(f"Erro ao processar mudança de regra de negócio: {e}")
+                stats = await asyncio.to_thread(
+                    getattr(self.data_sync_service, batch_method), ids, self.max_batch_size
+                )
+                self.stats["batches"] += 1
+                if not stats or stats["failed"]:
+                    self.logger.warning(f"Falha ao sincronizar lote de {entity}; agendando sincronização incremental")
+                    self._needs_resync.add(entity)
+            
+            if entity in self._needs_resync:
+                self._needs_resync.discard(entity)
+                self.stats["resyncs"] += 1
+                self.logger.info(f"Executando sincronização incremental de {entity}")
+                await asyncio.to_thread(getattr(self.data_sync_service, resync_method))
         
     async def _setup_triggers(self, conn):
         """
@@ -1,19 +1,498 @@
 """
-Serviço de Embeddings usando a API da OpenAI.
-Este serviço é responsável por gerar embeddings para textos usando a API da OpenAI.
+Serviço de Embeddings.
+Este serviço é responsável por gerar embeddings para textos usando um backend
+plugável: a API da OpenAI (padrão), um modelo local em CPU ou um backend
+determinístico de hashing para testes e execução offline.
 Inclui estratégias de otimização de custos como cache Redis e processamento em lote.
 """
 from openai import OpenAI
 import os
+import re
+import time
+import asyncio
 import hashlib
-import json
-from typing import List, Dict, Any, Optional, Union
+import struct
+import threading
+import unicodedata
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Dict, Any, Optional, Sequence, Tuple, Union
 import logging
+import numpy as np
 import redis
 
+from src.core.cache.local_cache import LocalCache, MISSING
+from src.core.metrics import LatencyHistogram
+
+# Versão do formato das entradas do cache; incrementar invalida as entradas antigas
+EMBEDDING_CACHE_VERSION = "v2"
+
+# Formatos binários suportados pelo cache de embeddings
+CACHE_DTYPES = ("float32", "float16", "int8")
+
+# Cabeçalho de 4 bytes: "E" + versão + código do tipo + padding (mantém os
+# dados alinhados a 4 bytes para leitura direta com np.frombuffer)
+_HEADER_MAGIC = b"E1"
+_DTYPE_CODES = {"float32": b"f", "float16": b"h", "int8": b"b"}
+_CODE_DTYPES = {code: dtype for dtype, code in _DTYPE_CODES.items()}
+
+
+def encode_embedding(embedding: Union[Sequence[float], np.ndarray], dtype: str = "float32") -> bytes:
+    """
+    Serializa um embedding em formato binário compacto.
+    
+    Um vetor de 1536 dimensões ocupa ~6 KB em float32, ~3 KB em float16 e
+    ~1,5 KB em int8 (quantização simétrica com uma escala por vetor), contra
+    ~30 KB como lista JSON.
+    
+    Args:
+        embedding: Vetor a serializar.
+        dtype: Formato de armazenamento ("float32", "float16" ou "int8").
+        
+    Returns:
+        Bytes com cabeçalho de 4 bytes seguido dos dados.
+        
+    Raises:
+        ValueError: Se o formato não for suportado.
+    """
+    if dtype not in _DTYPE_CODES:
+        raise ValueError(f"Formato de cache de embeddings não suportado: {dtype}")
+    
+    vector = np.asarray(embedding, dtype="<f4")
+    header = _HEADER_MAGIC + _DTYPE_CODES[dtype] + b"\x00"
+    
+    if dtype == "float32":
+        return header + vector.tobytes()
+    if dtype == "float16":
+        return header + vector.astype("<f2").tobytes()
+    
+    max_abs = float(np.abs(vector).max()) if vector.size else 0.0
+    scale = max_abs / 127.0 if max_abs else 1.0
+    quantized = np.clip(np.rint(vector / scale), -127, 127).astype(np.int8)
+    return header + struct.pack("<f", scale) + quantized.tobytes()
+
+
+def decode_embedding(data: bytes) -> np.ndarray:
+    """
+    Desserializa um embedding gravado por `encode_embedding`.
+    
+    Em float32 o array é uma visão dos próprios bytes (sem cópia); os demais
+    formatos são convertidos para float32.
+    
+    Args:
+        data: Bytes armazenados no cache.
+        
+    Returns:
+        Array float32 somente leitura.
+        
+    Raises:
+        ValueError: Se os dados não estiverem no formato esperado.
+    """
+    if len(data) < 4 or data[:2] != _HEADER_MAGIC or data[2:3] not in _CODE_DTYPES:
+        raise ValueError("Entrada de cache de embedding em formato desconhecido")
+    
+    dtype = _CODE_DTYPES[data[2:3]]
+    if dtype == "float32":
+        return np.frombuffer(data, dtype="<f4", offset=4)
+    if dtype == "float16":
+        vector = np.frombuffer(data, dtype="<f2", offset=4).astype(np.float32)
+    else:
+        scale = struct.unpack_from("<f", data, 4)[0]
+        vector = np.frombuffer(data, dtype=np.int8, offset=8).astype(np.float32) * scale
+    vector.flags.writeable = False
+    return vector
+
+
+class EmbeddingBackend(ABC):
+    """
+    Interface dos backends que efetivamente calculam os embeddings.
+    
+    O EmbeddingService cuida de pré-processamento, cache e métricas; o backend
+    só converte uma lista de textos em vetores.
+    """
+    
+    # Identificador do backend (usado na configuração e nas estatísticas)
+    name = "base"
+    # Se False, o EmbeddingService não usa cache (calcular é mais barato que buscar)
+    cacheable = True
+    # Custo em USD por milhão de tokens (0 para backends locais)
+    cost_per_million_tokens = 0.0
+    
+    # Nome do modelo, incluído nas chaves de cache
+    model: str = ""
+    
+    @property
+    def dimension(self) -> Optional[int]:
+        """Dimensão dos vetores gerados, se conhecida."""
+        return None
+    
+    @abstractmethod
+    def embed(self, texts: List[str]) -> Tuple[List[List[float]], int]:
+        """
+        Gera embeddings para uma lista de textos.
+        
+        Args:
+            texts: Textos já pré-processados (não vazios)
+            
+        Returns:
+            Tupla (embeddings na mesma ordem dos textos, tokens consumidos)
+        """
+
+
+class OpenAIEmbeddingBackend(EmbeddingBackend):
+    """
+    Backend que usa a API de embeddings da OpenAI.
+    """
+    
+    name = "openai"
+    # Para text-embedding-3-small: $0.02 por milhão de tokens
+    cost_per_million_tokens = 0.02
+    
+    _DIMENSIONS = {
+        "text-embedding-3-small": 1536,
+        "text-embedding-3-large": 3072,
+        "text-embedding-ada-002": 1536
+    }
+    
+    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None):
+        """
+        Inicializa o cliente da OpenAI.
+        
+        Args:
+            api_key: Chave de API da OpenAI. Se não fornecida, será buscada na variável de ambiente OPENAI_API_KEY.
+            model: Modelo de embeddings. Se não fornecido, usa EMBEDDING_MODEL ou text-embedding-3-small.
+        """
+        self.api_key = api_key or os.environ.get("OPENAI_API_KEY")
+        if not self.api_key:
+            raise ValueError("API key da OpenAI não fornecida e não encontrada nas variáveis de ambiente")
+        
+        self.model = model or os.environ.get("EMBEDDING_MODEL", "text-embedding-3-small")
+        self.client = OpenAI(api_key=self.api_key)
+    
+    @property
+    def dimension(self) -> Optional[int]:
+        return self._DIMENSIONS.get(self.model)
+    
+    def embed(self, texts: List[str]) -> Tuple[List[List[float]], int]:
+        response = self.client.embeddings.create(
+            model=self.model,
+            input=texts
+        )
+        return [data.embedding for data in response.data], response.usage.total_tokens
+
+
+class LocalEmbeddingBackend(EmbeddingBackend):
+    """
+    Backend local, somente CPU, usando um modelo sentence-transformers.
+    
+    Elimina a latência de rede de cada embedding e permite rodar sem serviços
+    externos. O modelo é carregado na primeira chamada; com engine="onnx" o
+    sentence-transformers usa o ONNX Runtime em vez do PyTorch.
+    Requer o pacote opcional `sentence-transformers`.
+    """
+    
+    name = "local"
+    
+    def __init__(self, model_name: Optional[str] = None, batch_size: Optional[int] = None,
+                 num_threads: Optional[int] = None, engine: Optional[str] = None):
+        """
+        Configura o backend local.
+        
+        Args:
+            model_name: Modelo (Hugging Face ou caminho local). Se não fornecido,
+                usa EMBEDDING_LOCAL_MODEL ou um modelo multilíngue compacto.
+            batch_size: Tamanho dos lotes de inferência (EMBEDDING_LOCAL_BATCH_SIZE, padrão 32).
+            num_threads: Threads de CPU usadas pela inferência (EMBEDDING_LOCAL_THREADS).
+            engine: "torch" ou "onnx" (EMBEDDING_LOCAL_ENGINE, padrão "torch").
+        """
+        self.model_name = model_name or os.environ.get(
+            "EMBEDDING_LOCAL_MODEL", "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+        )
+        self.model = f"local/{self.model_name}"
+        self.batch_size = batch_size or int(os.environ.get("EMBEDDING_LOCAL_BATCH_SIZE", "32"))
+        threads = num_threads or os.environ.get("EMBEDDING_LOCAL_THREADS")
+        self.num_threads = int(threads) if threads else None
+        self.engine = engine or os.environ.get("EMBEDDING_LOCAL_ENGINE", "torch")
+        self._model = None
+        self._lock = threading.Lock()
+    
+    def _get_model(self):
+        """Carrega o modelo uma única vez (thread-safe)."""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    try:
+                        from sentence_transformers import SentenceTransformer
+                    except ImportError:
+                        raise RuntimeError(
+                            "O backend de embeddings 'local' requer o pacote sentence-transformers"
+                        )
+                    if self.num_threads:
+                        import torch
+                        torch.set_num_threads(self.num_threads)
+                    kwargs = {"device": "cpu"}
+                    if self.engine != "torch":
+                        kwargs["backend"] = self.engine
+                    self._model = SentenceTransformer(self.model_name, **kwargs)
+        return self._model
+    
+    @property
+    def dimension(self) -> Optional[int]:
+        return self._get_model().get_sentence_embedding_dimension()
+    
+    def embed(self, texts: List[str]) -> Tuple[List[List[float]], int]:
+        vectors = self._get_model().encode(
+            texts,
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        )
+        return vectors.astype(np.float32).tolist(), 0
+
+
+class HashingEmbeddingBackend(EmbeddingBackend):
+    """
+    Backend determinístico baseado em feature hashing.
+    
+    Não usa modelo nem rede: cada palavra (sem acentos, em minúsculas) e cada
+    par de palavras consecutivas soma ±1 em uma posição do vetor escolhida por
+    hash. Textos com palavras em comum ficam próximos, o que basta para testes
+    e para rodar o pipeline completo offline.
+    """
+    
+    name = "hashing"
+    cacheable = False
+    
+    def __init__(self, dimension: Optional[int] = None):
+        """
+        Configura o backend.
+        
+        Args:
+            dimension: Dimensão dos vetores (EMBEDDING_HASHING_DIM, padrão 1536).
+        """
+        self._dimension = dimension or int(os.environ.get("EMBEDDING_HASHING_DIM", "1536"))
+        self.model = f"hashing-{self._dimension}"
+    
+    @property
+    def dimension(self) -> Optional[int]:
+        return self._dimension
+    
+    def _features(self, text: str) -> List[str]:
+        normalized = unicodedata.normalize("NFKD", text.lower())
+        normalized = "".join(char for char in normalized if not unicodedata.combining(char))
+        words = re.findall(r"\w+", normalized)
+        return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+    
+    def embed(self, texts: List[str]) -> Tuple[List[List[float]], int]:
+        embeddings = []
+        for text in texts:
+            vector = np.zeros(self._dimension, dtype=np.float32)
+            for feature in self._features(text):
+                value = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+                vector[value % self._dimension] += 1.0 if value >> 63 else -1.0
+            norm = float(np.linalg.norm(vector))
+            if norm:
+                vector /= norm
+            embeddings.append(vector.tolist())
+        return embeddings, 0
+
+
+EMBEDDING_BACKENDS = {
+    OpenAIEmbeddingBackend.name: OpenAIEmbeddingBackend,
+    LocalEmbeddingBackend.name: LocalEmbeddingBackend,
+    HashingEmbeddingBackend.name: HashingEmbeddingBackend
+}
+
+
+def create_embedding_backend(name: str, **kwargs) -> EmbeddingBackend:
+    """
+    Cria um backend de embeddings pelo nome.
+    
+    Args:
+        name: "openai", "local" ou "hashing"
+        **kwargs: Argumentos do construtor do backend
+        
+    Returns:
+        Instância do backend
+        
+    Raises:
+        ValueError: Se o backend não existir
+    """
+    backend_class = EMBEDDING_BACKENDS.get(name)
+    if backend_class is None:
+        raise ValueError(f"Backend de embeddings desconhecido: {name} (use {', '.join(EMBEDDING_BACKENDS)})")
+    return backend_class(**kwargs)
+
+
+def resolve_backend_name(tenant_id: Optional[str] = None) -> str:
+    """
+    Determina o backend de embeddings de um tenant.
+    
+    Usa EMBEDDING_BACKEND_<TENANT> (ex.: EMBEDDING_BACKEND_COSMETICOS=local),
+    depois EMBEDDING_BACKEND e, por fim, "openai".
+    
+    Args:
+        tenant_id: Identificador do tenant (conta ou domínio de negócio)
+        
+    Returns:
+        Nome do backend
+    """
+    if tenant_id:
+        tenant_var = "EMBEDDING_BACKEND_" + re.sub(r"\W", "_", str(tenant_id)).upper()
+        if os.environ.get(tenant_var):
+            return os.environ[tenant_var]
+    return os.environ.get("EMBEDDING_BACKEND", "openai")
+
+
+# Buckets do histograma de tamanho de lote (número de textos)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class EmbeddingMicroBatcher:
+    """
+    Agrupa pedidos concorrentes de embedding em chamadas em lote.
+    
+    Pedidos que chegam dentro de `max_wait_ms` do primeiro pedido pendente (ou
+    até completar `max_batch_size` textos) são enviados em uma única chamada.
+    Textos idênticos pendentes ou em andamento compartilham o mesmo resultado
+    (single-flight), então um pico de clientes perguntando a mesma coisa gera
+    um único embedding.
+    
+    É thread-safe: atende tanto chamadas síncronas vindas de várias threads
+    quanto corrotinas (via `asyncio.wrap_future`).
+    """
+    
+    def __init__(self, embed_batch: Callable[[List[str]], List[List[float]]],
+                 max_batch_size: int = 32, max_wait_ms: float = 5.0,
+                 max_concurrent_batches: int = 4):
+        """
+        Inicializa o micro-batcher.
+        
+        Args:
+            embed_batch: Função que gera os embeddings de uma lista de textos.
+            max_batch_size: Máximo de textos por chamada.
+            max_wait_ms: Espera máxima (ms) do primeiro pedido antes do envio do lote.
+            max_concurrent_batches: Lotes enviados em paralelo.
+        """
+        self.embed_batch = embed_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        
+        # texto -> (future, instante em que entrou na fila)
+        self._pending: "OrderedDict[str, Tuple[Future, float]]" = OrderedDict()
+        self._in_flight: Dict[str, Future] = {}
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrent_batches,
+            thread_name_prefix="embedding-batch"
+        )
+        self._thread: Optional[threading.Thread] = None
+        
+        self.requests = 0
+        self.deduplicated = 0
+        self.batches = 0
+        self.batch_sizes = LatencyHistogram(buckets=BATCH_SIZE_BUCKETS)
+        self.wait_times = LatencyHistogram()
+    
+    def submit(self, text: str) -> Future:
+        """
+        Agenda um texto para o próximo lote.
+        
+        Args:
+            text: Texto já pré-processado.
+            
+        Returns:
+            Future com o embedding (lista de floats).
+        """
+        with self._cond:
+            self.requests += 1
+            pending = self._pending.get(text)
+            future = pending[0] if pending else self._in_flight.get(text)
+            if future is not None:
+                self.deduplicated += 1
+                return future
+            
+            future = Future()
+            self._pending[text] = (future, time.monotonic())
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+            return future
+    
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                
+                # Aguardar mais pedidos até encher o lote ou vencer a espera do primeiro
+                first_enqueued = next(iter(self._pending.values()))[1]
+                while len(self._pending) < self.max_batch_size:
+                    remaining = first_enqueued + self.max_wait - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                
+                now = time.monotonic()
+                batch = []
+                while self._pending and len(batch) < self.max_batch_size:
+                    text, (future, enqueued_at) = self._pending.popitem(last=False)
+                    self._in_flight[text] = future
+                    self.wait_times.observe(now - enqueued_at)
+                    batch.append((text, future))
+                self.batches += 1
+                self.batch_sizes.observe(len(batch))
+            
+            self._executor.submit(self._dispatch, batch)
+    
+    def _dispatch(self, batch: List[Tuple[str, Future]]) -> None:
+        """Gera os embeddings de um lote e resolve os futures."""
+        try:
+            embeddings = self.embed_batch([text for text, _ in batch])
+            outcomes = list(zip(batch, embeddings))
+            error = None
+        except Exception as e:
+            outcomes = []
+            error = e
+        
+        with self._cond:
+            for text, _ in batch:
+                self._in_flight.pop(text, None)
+        
+        if error is not None:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for (_, future), embedding in outcomes:
+            if not future.done():
+                future.set_result(embedding)
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Retorna estatísticas do micro-batcher.
+        
+        Returns:
+            Pedidos, pedidos deduplicados, lotes enviados e os histogramas de
+            tamanho de lote e de tempo de espera (segundos).
+        """
+        return {
+            "requests": self.requests,
+            "deduplicated": self.deduplicated,
+            "batches": self.batches,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batch_size": self.batch_sizes.snapshot(),
+            "wait_time": self.wait_times.snapshot()
+        }
+
+
 class EmbeddingService:
     """
-    Serviço para geração de embeddings usando a API da OpenAI.
+    Serviço para geração de embeddings.
     
     Este serviço encapsula a lógica de geração de embeddings para textos,
     permitindo que outros componentes do sistema possam facilmente obter
@@ -26,7 +505,9 @@ class EmbeddingService:
     4. Monitoramento de uso e custos
     """
     
-    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None, use_cache: bool = True):
+    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None, use_cache: bool = True,
+                 cache_dtype: Optional[str] = None, backend: Union[str, EmbeddingBackend, None] = None,
+                 micro_batching: Optional[bool] = None):
         """
         Inicializa o serviço de embeddings.
         
@@ -34,19 +515,45 @@ class EmbeddingService:
             api_key: Chave de API da OpenAI. Se não fornecida, será buscada na variável de ambiente OPENAI_API_KEY.
             model: Modelo de embeddings a ser usado. Se não fornecido, será usado o padrão definido na variável de ambiente.
             use_cache: Se True, utiliza cache Redis para armazenar embeddings e economizar chamadas à API.
+            cache_dtype: Formato binário dos embeddings no Redis ("float32", "float16" ou "int8").
+                Se não fornecido, usa EMBEDDING_CACHE_DTYPE ou "float32".
+            backend: Backend de embeddings (instância ou nome: "openai", "local", "hashing").
+                Se não fornecido, usa EMBEDDING_BACKEND ou "openai".
+            micro_batching: Se True, agrupa chamadas concorrentes de get_embedding em lotes
+                (EMBEDDING_MICROBATCH, padrão ativado para backends com cache; o backend
+                de hashing é barato demais para compensar a espera).
         """
-        self.api_key = api_key or os.environ.get("OPENAI_API_KEY")
-        if not self.api_key:
-            raise ValueError("API key da OpenAI não fornecida e não encontrada nas variáveis de ambiente")
-            
-        self.model = model or os.environ.get("EMBEDDING_MODEL", "text-embedding-3-small")
-        self.client = OpenAI(api_key=self.api_key)
+        if not isinstance(backend, EmbeddingBackend):
+            backend_name = backend or resolve_backend_name()
+            if backend_name == OpenAIEmbeddingBackend.name:
+                backend = OpenAIEmbeddingBackend(api_key=api_key, model=model)
+            elif backend_name == LocalEmbeddingBackend.name:
+                backend = LocalEmbeddingBackend(model_name=model)
+            else:
+                backend = create_embedding_backend(backend_name)
+        
+        self.backend = backend
+        self.model = backend.model
+        # Mantidos por compatibilidade (apenas no backend OpenAI)
+        self.api_key = getattr(backend, "api_key", None)
+        self.client = getattr(backend, "client", None)
         self.logger = logging.getLogger(__name__)
         
         # Configurar cache Redis se disponível
+        use_cache = use_cache and backend.cacheable
         self.use_cache = use_cache
         self.redis_client = None
         self.cache_ttl = 60 * 60 * 24 * 7  # 7 dias em segundos
+        self.cache_dtype = cache_dtype or os.environ.get("EMBEDDING_CACHE_DTYPE", "float32")
+        if self.cache_dtype not in CACHE_DTYPES:
+            raise ValueError(f"EMBEDDING_CACHE_DTYPE inválido: {self.cache_dtype} (use {', '.join(CACHE_DTYPES)})")
+        
+        # Cache LRU em processo na frente do Redis (vetores já decodificados)
+        self.local_cache = LocalCache(
+            max_entries=int(os.environ.get("EMBEDDING_L1_MAX_ENTRIES", "2048")),
+            max_bytes=int(os.environ.get("EMBEDDING_L1_MAX_BYTES", str(32 * 1024 * 1024))),
+            default_ttl=self.cache_ttl
+        ) if use_cache else None
         
         if self.use_cache:
             redis_url = os.environ.get("REDIS_URL")
@@ -64,8 +571,23 @@ class EmbeddingService:
         # Contadores para monitoramento de uso e custos
         self.token_usage = 0
         self.api_calls = 0
-        
-        self.logger.info(f"Serviço de Embeddings inicializado com o modelo: {self.model}")
+        self._usage_lock = threading.Lock()
+        
+        # Micro-batching das consultas de texto único
+        if micro_batching is None:
+            micro_batching = backend.cacheable and os.environ.get("EMBEDDING_MICROBATCH", "true").lower() == "true"
+        self.batcher = EmbeddingMicroBatcher(
+            self._embed_texts,
+            max_batch_size=int(os.environ.get("EMBEDDING_BATCH_MAX_SIZE", "32")),
+            max_wait_ms=float(os.environ.get("EMBEDDING_BATCH_MAX_WAIT_MS", "5"))
+        ) if micro_batching else None
+        
+        self.logger.info(f"Serviço de Embeddings inicializado com o backend {backend.name} e o modelo: {self.model}")
+    
+    @property
+    def dimension(self) -> Optional[int]:
+        """Dimensão dos vetores gerados pelo backend, se conhecida."""
+        return self.backend.dimension
         
     def _get_cache_key(self, text: str) -> str:
         """
@@ -79,7 +601,7 @@ class EmbeddingService:
         """
         # Criar um hash do texto para usar como chave de cache
         text_hash = hashlib.md5(text.encode('utf-8')).hexdigest()
-        return f"embedding:{self.model}:{text_hash}"
+        return f"embedding:{EMBEDDING_CACHE_VERSION}:{self.cache_dtype}:{self.model}:{text_hash}"
     
     def _get_from_cache(self, text: str) -> Optional[List[float]]:
         """
@@ -91,20 +613,98 @@ class EmbeddingService:
         Returns:
             Embedding como lista de floats, ou None se não estiver no cache
         """
-        if not self.use_cache or not self.redis_client:
+        vector = self._get_many_from_cache([text])[0]
+        return vector.tolist() if vector is not None else None
+    
+    def _get_from_local_cache(self, text: str) -> Optional[List[float]]:
+        """
+        Busca um embedding apenas no cache em processo (sem round-trip ao Redis).
+        
+        Args:
+            text: Texto já pré-processado
+            
+        Returns:
+            Embedding como lista de floats, ou None se não estiver no cache local
+        """
+        if self.local_cache is None:
             return None
+        vector = self.local_cache.get(self._get_cache_key(text))
+        return None if vector is MISSING else vector.tolist()
+    
+    def _embed_texts(self, texts: List[str]) -> List[List[float]]:
+        """
+        Obtém os embeddings de textos pré-processados: cache (um MGET) e backend para o resto.
         
-        try:
-            cache_key = self._get_cache_key(text)
-            cached_data = self.redis_client.get(cache_key)
+        Usado pelo micro-batcher para resolver um lote inteiro de uma vez.
+        
+        Args:
+            texts: Textos pré-processados, não vazios e sem repetição
+            
+        Returns:
+            Embeddings na mesma ordem dos textos
+            
+        Raises:
+            Exception: Se o backend falhar
+        """
+        cached = self._get_many_from_cache(texts)
+        missing = [i for i, vector in enumerate(cached) if vector is None]
+        results = [vector.tolist() if vector is not None else None for vector in cached]
+        
+        if missing:
+            embeddings, tokens = self.backend.embed([texts[i] for i in missing])
+            with self._usage_lock:
+                self.token_usage += tokens
+                self.api_calls += 1
+            for i, embedding in zip(missing, embeddings):
+                results[i] = embedding
+            self._save_many_to_cache([(texts[i], results[i]) for i in missing])
+        
+        return results
+    
+    def _get_many_from_cache(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Busca vários embeddings no cache local e, para os ausentes, no Redis com um único MGET.
+        
+        Args:
+            texts: Textos (já pré-processados) a buscar
             
-            if cached_data:
-                self.logger.debug(f"Embedding encontrado no cache para: {text[:30]}...")
-                return json.loads(cached_data)
+        Returns:
+            Lista alinhada com `texts`, com o vetor float32 ou None para cada texto
+        """
+        results: List[Optional[np.ndarray]] = [None] * len(texts)
+        if self.local_cache is None:
+            return results
+        
+        keys = [self._get_cache_key(text) for text in texts]
+        missing = []
+        for i, key in enumerate(keys):
+            vector = self.local_cache.get(key)
+            if vector is MISSING:
+                missing.append(i)
+            else:
+                results[i] = vector
+        
+        if not missing or not self.use_cache or not self.redis_client:
+            return results
+        
+        try:
+            cached_values = self.redis_client.mget([keys[i] for i in missing])
         except Exception as e:
             self.logger.warning(f"Erro ao acessar cache: {e}")
+            return results
         
-        return None
+        for i, data in zip(missing, cached_values):
+            if not data:
+                continue
+            try:
+                vector = decode_embedding(data)
+            except ValueError:
+                self.logger.warning(f"Entrada de cache inválida ignorada: {keys[i]}")
+                continue
+            self.local_cache.set(keys[i], vector, size=vector.nbytes)
+            results[i] = vector
+        
+        return results
     
     def _save_to_cache(self, text: str, embedding: List[float]) -> bool:
         """
@@ -117,16 +717,38 @@ class EmbeddingService:
         Returns:
             True se o embedding foi salvo com sucesso, False caso contrário
         """
+        return self._save_many_to_cache([(text, embedding)])
+    
+    def _save_many_to_cache(self, items: List[Tuple[str, List[float]]]) -> bool:
+        """
+        Salva vários embeddings no cache local e no Redis (um único round-trip).
+        
+        Args:
+            items: Pares (texto pré-processado, embedding)
+            
+        Returns:
+            True se os embeddings foram salvos no Redis, False caso contrário
+        """
+        if self.local_cache is None or not items:
+            return False
+        
+        encoded = []
+        for text, embedding in items:
+            key = self._get_cache_key(text)
+            data = encode_embedding(embedding, self.cache_dtype)
+            # O L1 guarda o que um leitor do Redis obteria (mesma precisão)
+            vector = decode_embedding(data)
+            self.local_cache.set(key, vector, size=vector.nbytes)
+            encoded.append((key, data))
+        
         if not self.use_cache or not self.redis_client:
             return False
         
         try:
-            cache_key = self._get_cache_key(text)
-            self.redis_client.setex(
-                cache_key,
-                self.cache_ttl,
-                json.dumps(embedding)
-            )
+            pipe = self.redis_client.pipeline(transaction=False)
+            for key, data in encoded:
+                pipe.setex(key, self.cache_ttl, data)
+            pipe.execute()
             return True
         except Exception as e:
             self.logger.warning(f"Erro ao salvar no cache: {e}")
@@ -179,6 +801,17 @@ class EmbeddingService:
             self.logger.warning("Tentativa de gerar embedding para texto vazio")
             return []
         
+        # Com micro-batching, o Redis é consultado uma vez por lote (dentro do batcher)
+        if self.batcher is not None:
+            cached_embedding = self._get_from_local_cache(processed_text)
+            if cached_embedding is not None:
+                return cached_embedding
+            try:
+                return self.batcher.submit(processed_text).result()
+            except Exception as e:
+                self.logger.error(f"Erro ao gerar embedding: {str(e)}")
+                raise
+        
         # Verificar se o embedding está no cache
         cached_embedding = self._get_from_cache(processed_text)
         if cached_embedding is not None:
@@ -186,15 +819,11 @@ class EmbeddingService:
         
         # Se não estiver no cache, gerar o embedding
         try:
-            response = self.client.embeddings.create(
-                model=self.model,
-                input=processed_text
-            )
-            
-            embedding = response.data[0].embedding
+            embeddings, tokens = self.backend.embed([processed_text])
+            embedding = embeddings[0]
             
             # Atualizar contadores de uso
-            self.token_usage += response.usage.total_tokens
+            self.token_usage += tokens
             self.api_calls += 1
             
             # Salvar no cache
@@ -205,6 +834,30 @@ class EmbeddingService:
             self.logger.error(f"Erro ao gerar embedding: {str(e)}")
             raise
     
+    async def aget_embedding(self, text: str) -> List[float]:
+        """
+        Versão assíncrona de get_embedding, sem bloquear o event loop.
+        
+        Args:
+            text: Texto para o qual gerar o embedding.
+            
+        Returns:
+            Lista de floats representando o embedding do texto.
+        """
+        processed_text = self._preprocess_text(text)
+        if not processed_text:
+            self.logger.warning("Tentativa de gerar embedding para texto vazio")
+            return []
+        
+        if self.batcher is None:
+            return await asyncio.to_thread(self.get_embedding, text)
+        
+        cached_embedding = self._get_from_local_cache(processed_text)
+        if cached_embedding is not None:
+            return cached_embedding
+        # shield: cancelar este chamador não cancela o future compartilhado com outros
+        return await asyncio.shield(asyncio.wrap_future(self.batcher.submit(processed_text)))
+    
     def get_batch_embeddings(self, texts: List[str], batch_size: int = 20) -> List[List[float]]:
         """
         Gera embeddings para múltiplos textos em uma única chamada de API.
@@ -241,17 +894,16 @@ class EmbeddingService:
         # Inicializar lista de resultados com o mesmo tamanho da entrada
         results = [[] for _ in texts]
         
-        # Verificar quais textos já estão no cache
+        # Verificar quais textos já estão no cache (L1 + um único MGET no Redis)
         texts_to_embed = []
         indices_to_embed = []
         
-        for i in valid_indices:
-            text = processed_texts[i]
-            cached_embedding = self._get_from_cache(text)
+        cached_embeddings = self._get_many_from_cache([processed_texts[i] for i in valid_indices])
+        for i, cached_embedding in zip(valid_indices, cached_embeddings):
             if cached_embedding is not None:
-                results[i] = cached_embedding
+                results[i] = cached_embedding.tolist()
             else:
-                texts_to_embed.append(text)
+                texts_to_embed.append(processed_texts[i])
                 indices_to_embed.append(i)
         
         # Se todos os embeddings foram encontrados no cache, retornar os resultados
@@ -264,26 +916,18 @@ class EmbeddingService:
             batch_indices = indices_to_embed[i:i+batch_size]
             
             try:
-                response = self.client.embeddings.create(
-                    model=self.model,
-                    input=batch_texts
-                )
+                embeddings, tokens = self.backend.embed(batch_texts)
                 
                 # Atualizar contadores de uso
-                self.token_usage += response.usage.total_tokens
+                self.token_usage += tokens
                 self.api_calls += 1
                 
-                # Extrair os embeddings da resposta e salvá-los no cache
-                for j, data in enumerate(response.data):
-                    embedding = data.embedding
-                    original_index = batch_indices[j]
-                    original_text = batch_texts[j]
-                    
-                    # Salvar no cache
-                    self._save_to_cache(original_text, embedding)
-                    
-                    # Atualizar resultados
-                    results[original_index] = embedding
+                # Extrair os embeddings da resposta
+                for j, embedding in enumerate(embeddings):
+                    results[batch_indices[j]] = embedding
+                
+                # Salvar o lote no cache em um único round-trip
+                self._save_many_to_cache(list(zip(batch_texts, embeddings)))
                     
             except Exception as e:
                 self.logger.error(f"Erro ao gerar embeddings em lote: {e}")
@@ -302,17 +946,20 @@ class EmbeddingService:
             Dicionário com estatísticas de uso e estimativa de custos
         """
         # Calcular custo estimado com base no uso de tokens
-        # Para text-embedding-3-small: $0.02 por milhão de tokens
-        cost_per_million = 0.02
+        cost_per_million = self.backend.cost_per_million_tokens
         estimated_cost = (self.token_usage / 1_000_000) * cost_per_million
         
         return {
+            "backend": self.backend.name,
             "model": self.model,
             "api_calls": self.api_calls,
             "tokens_used": self.token_usage,
             "estimated_cost_usd": estimated_cost,
             "cache_enabled": self.use_cache,
-            "cache_status": "connected" if (self.use_cache and self.redis_client) else "disabled"
+            "cache_status": "connected" if (self.use_cache and self.redis_client) else "disabled",
+            "cache_dtype": self.cache_dtype,
+            "local_cache": self.local_cache.stats() if self.local_cache else None,
+            "micro_batching": self.batcher.stats() if self.batcher else None
         }
     
     def reset_usage_stats(self) -> None:
@@ -322,3 +969,34 @@ class EmbeddingService:
         self.token_usage = 0
         self.api_calls = 0
         self.logger.info("Contadores de uso reiniciados")
+
+
+# Serviços compartilhados por backend: tenants com o mesmo backend dividem
+# o mesmo cliente e o mesmo cache em processo
+_shared_services: Dict[str, EmbeddingService] = {}
+_shared_services_lock = threading.Lock()
+
+
+def get_embedding_service(tenant_id: Optional[str] = None) -> EmbeddingService:
+    """
+    Obtém o serviço de embeddings compartilhado de um tenant.
+    
+    O backend é escolhido por `resolve_backend_name`. Tenants que usam backends
+    diferentes geram vetores de dimensões diferentes e precisam de coleções
+    próprias no Qdrant.
+    
+    Args:
+        tenant_id: Identificador do tenant (conta ou domínio de negócio)
+        
+    Returns:
+        EmbeddingService do backend do tenant
+    """
+    backend_name = resolve_backend_name(tenant_id)
+    service = _shared_services.get(backend_name)
+    if service is None:
+        with _shared_services_lock:
+            service = _shared_services.get(backend_name)
+            if service is None:
+                service = EmbeddingService(backend=backend_name)
+                _shared_services[backend_name] = service
+    return service
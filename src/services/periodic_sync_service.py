@@ -1,6 +1,6 @@
 """
 Serviço de Sincronização Periódica.
-Este serviço executa sincronizações completas em intervalos regulares para garantir
+Este serviço executa sincronizações em intervalos regulares para garantir
 a consistência entre o PostgreSQL e o Qdrant.
 """
 import os
@@ -8,7 +8,7 @@ import logging
 import asyncio
 import time
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, Optional
 
 from src.services.data_sync_service import DataSyncService
 
@@ -16,14 +16,18 @@ class PeriodicSyncService:
     """
     Serviço para sincronização periódica entre PostgreSQL e Qdrant.
     
-    Este serviço executa sincronizações completas em intervalos regulares para
-    garantir a consistência dos dados, mesmo se algumas notificações forem perdidas.
+    Este serviço executa sincronizações em intervalos regulares para garantir
+    a consistência dos dados, mesmo se algumas notificações forem perdidas.
+    Por padrão a sincronização é incremental: só recebem novo embedding as
+    linhas cujo texto mudou, e só o payload é atualizado quando apenas os
+    metadados mudaram.
     """
     
     def __init__(
         self, 
         data_sync_service: DataSyncService,
-        sync_interval: int = 3600  # Padrão: 1 hora
+        sync_interval: int = 3600,  # Padrão: 1 hora
+        incremental: bool = True
     ):
         """
         Inicializa o serviço de sincronização periódica.
@@ -31,11 +35,15 @@ class PeriodicSyncService:
         Args:
             data_sync_service: Instância do DataSyncService para sincronização.
             sync_interval: Intervalo entre sincronizações em segundos.
+            incremental: Se True, usa a sincronização incremental (por hash de conteúdo);
+                         se False, refaz todos os embeddings a cada execução.
         """
         self.data_sync_service = data_sync_service
         self.sync_interval = sync_interval
+        self.incremental = incremental
         self.running = False
         self.last_sync_time = None
+        self.last_sync_report: Dict[str, Any] = {}
         self.logger = logging.getLogger(__name__)
         
         self.logger.info(f"Serviço de Sincronização Periódica inicializado com intervalo de {sync_interval} segundos")
@@ -80,23 +88,26 @@ class PeriodicSyncService:
             
     async def _perform_sync(self):
         """
-        Executa uma sincronização completa.
+        Executa uma sincronização.
         
-        Este método sincroniza todos os produtos e regras de negócio entre
+        Este método sincroniza os produtos e regras de negócio entre
         o PostgreSQL e o Qdrant.
         """
         try:
             self.logger.info("Iniciando sincronização periódica")
             
-            # Sincronizar produtos
-            products_success = await asyncio.to_thread(
-                self.data_sync_service.full_sync_products
-            )
-            
-            # Sincronizar regras de negócio
-            rules_success = await asyncio.to_thread(
-                self.data_sync_service.full_sync_business_rules
-            )
+            if self.incremental:
+                products_success, rules_success = await self._perform_incremental_sync()
+            else:
+                # Sincronizar produtos
+                products_success = await asyncio.to_thread(
+                    self.data_sync_service.full_sync_products
+                )
+                
+                # Sincronizar regras de negócio
+                rules_success = await asyncio.to_thread(
+                    self.data_sync_service.full_sync_business_rules
+                )
             
             # Registrar resultado
             self.last_sync_time = datetime.now()
@@ -112,6 +123,36 @@ class PeriodicSyncService:
         except Exception as e:
             self.logger.error(f"Erro durante sincronização periódica: {e}")
             
+    async def _perform_incremental_sync(self):
+        """
+        Executa a sincronização incremental de produtos e regras de negócio.
+        
+        Returns:
+            Tupla (produtos_ok, regras_ok).
+        """
+        products_stats = await asyncio.to_thread(
+            self.data_sync_service.incremental_sync_products
+        )
+        rules_stats = await asyncio.to_thread(
+            self.data_sync_service.incremental_sync_business_rules
+        )
+        
+        self.last_sync_report = {
+            "products": products_stats,
+            "business_rules": rules_stats
+        }
+        for name, stats in self.last_sync_report.items():
+            if stats:
+                self.logger.info(
+                    f"{name}: {stats['scanned']} lidos, {stats['embedded']} com novo embedding, "
+                    f"{stats['payload_updated']} com payload atualizado, {stats['skipped']} ignorados"
+                )
+        
+        return (
+            bool(products_stats) and not products_stats["failed"],
+            bool(rules_stats) and not rules_stats["failed"]
+        )
+            
     def stop(self):
         """
         Para o serviço de sincronização periódica.
@@ -131,5 +172,7 @@ class PeriodicSyncService:
             "running": self.running,
             "last_sync_time": self.last_sync_time.isoformat() if self.last_sync_time else None,
             "sync_interval": self.sync_interval,
+            "incremental": self.incremental,
+            "last_sync_report": self.last_sync_report,
             "next_sync_in": self.sync_interval - (time.time() - self.last_sync_time.timestamp()) if self.last_sync_time else self.sync_interval
         }
@@ -2,17 +2,34 @@
 Serviço de Busca Híbrida de Produtos.
 Este serviço implementa a busca híbrida de produtos, combinando o banco de dados
 relacional (PostgreSQL) e o banco de dados vetorial (Qdrant).
+
+Quando o payload do Qdrant está atualizado (dentro de SEARCH_PAYLOAD_MAX_AGE),
+os resultados são montados diretamente a partir dele, sem consultar o
+PostgreSQL; a consulta ao banco fica restrita a preço/estoque quando a busca
+exige esses valores atualizados.
 """
 import os
+import time
 import logging
 import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from typing import List, Dict, Any, Optional, Tuple
 import psycopg2
 from psycopg2.extras import RealDictCursor
 from qdrant_client import QdrantClient
-from qdrant_client.http.models import Filter, FieldCondition, MatchValue
+from qdrant_client.http.models import Filter, FieldCondition, MatchValue, QueryRequest
+
+from src.core.cache.search_cache import SearchResultCache
+from src.services.embedding_service import EmbeddingService, get_embedding_service
+from src.services.vector_index import InMemoryVectorIndex, get_vector_index, resolve_index_mode
+
+# Campos de payload necessários para servir um resultado sem consultar o PostgreSQL
+PRODUCT_PAYLOAD_FIELDS = ("name", "category_id", "active", "price", "description", "benefits")
+BUSINESS_RULE_PAYLOAD_FIELDS = ("name", "category", "active", "description", "rule_text")
 
-from src.services.embedding_service import EmbeddingService
+# Tempo de vida do cache de nomes de categorias (segundos)
+CATEGORY_NAMES_TTL = 300
 
 class ProductSearchService:
     """
@@ -28,7 +45,9 @@ class ProductSearchService:
         db_connection_string: Optional[str] = None,
         qdrant_url: Optional[str] = None,
         embedding_service: Optional[EmbeddingService] = None,
-        redis_client = None
+        redis_client = None,
+        payload_max_age: Optional[int] = None,
+        tenant_id: Optional[str] = None
     ):
         """
         Inicializa o serviço de busca híbrida de produtos.
@@ -38,9 +57,14 @@ class ProductSearchService:
                                  será buscada na variável de ambiente DATABASE_URL.
             qdrant_url: URL do serviço Qdrant. Se não fornecida, será buscada na
                        variável de ambiente QDRANT_URL.
-            embedding_service: Instância do EmbeddingService. Se não fornecida, uma nova
-                              instância será criada.
+            embedding_service: Instância do EmbeddingService. Se não fornecida, usa o
+                              serviço compartilhado (get_embedding_service).
             redis_client: Cliente Redis para cache (opcional).
+            payload_max_age: Idade máxima (segundos) do payload do Qdrant para servir
+                            resultados sem consultar o PostgreSQL; 0 desativa
+                            (padrão: SEARCH_PAYLOAD_MAX_AGE ou 3600).
+            tenant_id: Identificador do tenant; com VECTOR_INDEX_<TENANT>=memory as
+                       buscas usam um índice vetorial em memória (ver vector_index).
         """
         self.db_connection_string = db_connection_string or os.environ.get("DATABASE_URL")
         if not self.db_connection_string:
@@ -50,11 +74,34 @@ class ProductSearchService:
         if not self.qdrant_url:
             raise ValueError("URL do Qdrant não fornecida e não encontrada nas variáveis de ambiente")
             
-        self.embedding_service = embedding_service or EmbeddingService()
+        self.tenant_id = tenant_id
+        self.embedding_service = embedding_service or get_embedding_service(tenant_id)
         self.redis_client = redis_client
         self.qdrant_client = QdrantClient(url=self.qdrant_url)
         self.logger = logging.getLogger(__name__)
         
+        # Índices em memória por coleção (tenants pequenos); sem índice, as buscas usam o Qdrant.
+        # O índice é obtido a cada busca, para acompanhar recargas e novas tentativas.
+        self.use_vector_index = resolve_index_mode(tenant_id) == "memory"
+        if self.use_vector_index:
+            for collection in ("products", "business_rules"):
+                if self._get_vector_index(collection) is None:
+                    self.logger.info(f"Coleção {collection} usará o Qdrant (índice em memória indisponível)")
+        
+        # Caches de busca versionados; o DataSyncService incrementa as gerações e
+        # remove as entradas que retornaram itens alterados
+        self.product_search_cache = SearchResultCache(redis_client, "product_search")
+        self.business_rule_search_cache = SearchResultCache(redis_client, "business_rule_search")
+        
+        self.payload_max_age = payload_max_age if payload_max_age is not None else int(
+            os.environ.get("SEARCH_PAYLOAD_MAX_AGE", "3600")
+        )
+        self._category_names: Dict[int, str] = {}
+        self._category_names_loaded_at = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="product-search")
+        # Contadores de como os resultados foram servidos
+        self.stats = {"payload": 0, "sql": 0, "critical_refresh": 0}
+        
         self.logger.info("Serviço de Busca Híbrida de Produtos inicializado")
         
     def _get_db_connection(self):
@@ -70,6 +117,10 @@ class ProductSearchService:
         """
         Gera uma chave de cache para a consulta.
         
+        A chave inclui a geração do catálogo (ou da categoria filtrada), então
+        uma sincronização que altera o catálogo invalida as buscas afetadas
+        sem precisar apagar chaves.
+        
         Args:
             query: Consulta do usuário.
             limit: Número máximo de resultados.
@@ -79,16 +130,8 @@ class ProductSearchService:
         Returns:
             Chave de cache.
         """
-        key_parts = [
-            f"query:{query}",
-            f"limit:{limit}",
-            f"min_score:{min_score}"
-        ]
-        
-        if category_id is not None:
-            key_parts.append(f"category_id:{category_id}")
-            
-        return f"product_search:{':'.join(key_parts)}"
+        params = {"query": query, "limit": limit, "min_score": min_score}
+        return self.product_search_cache.build_key(params, scope=category_id)
         
     def _check_cache(self, cache_key: str) -> Optional[List[Dict[str, Any]]]:
         """
@@ -112,7 +155,8 @@ class ProductSearchService:
                 
         return None
         
-    def _save_to_cache(self, cache_key: str, results: List[Dict[str, Any]], ttl: int = 3600) -> bool:
+    def _save_to_cache(self, cache_key: str, results: List[Dict[str, Any]], ttl: int = 3600,
+                       search_cache: Optional[SearchResultCache] = None) -> bool:
         """
         Salva resultados no cache.
         
@@ -120,6 +164,8 @@ class ProductSearchService:
             cache_key: Chave de cache.
             results: Lista de resultados.
             ttl: Tempo de vida do cache em segundos (padrão: 1 hora).
+            search_cache: Cache de busca que gerou a chave; a entrada é associada
+                          aos IDs dos resultados para invalidação por item.
             
         Returns:
             True se o cache foi salvo com sucesso, False caso contrário.
@@ -127,157 +173,413 @@ class ProductSearchService:
         if not self.redis_client:
             return False
             
+        if search_cache is not None:
+            return search_cache.set(cache_key, results, tags=[result["id"] for result in results], ttl=ttl)
+            
         try:
             self.redis_client.setex(
                 cache_key,
                 ttl,
-                json.dumps(results)
+                json.dumps(results, default=str)
             )
             return True
         except Exception as e:
             self.logger.warning(f"Erro ao salvar no cache: {e}")
             return False
             
-    def search_products(
-        self, 
-        query: str, 
-        limit: int = 5, 
-        min_score: float = 0.7,
-        category_id: Optional[int] = None
-    ) -> List[Dict[str, Any]]:
+    def _product_conditions(self, category_id: Optional[int] = None) -> Dict[str, Any]:
+        """Condições de busca para produtos ativos (e da categoria, se informada)."""
+        conditions = {"active": True}
+        if category_id is not None:
+            conditions["category_id"] = category_id
+        return conditions
+    
+    def _business_rule_conditions(self, category: Optional[str] = None) -> Dict[str, Any]:
+        """Condições de busca para regras ativas (e da categoria, se informada)."""
+        conditions = {"active": True}
+        if category:
+            conditions["category"] = category
+        return conditions
+    
+    @staticmethod
+    def _to_qdrant_filter(conditions: Dict[str, Any]) -> Filter:
+        """Converte condições de igualdade sobre o payload em um filtro do Qdrant."""
+        return Filter(
+            must=[
+                FieldCondition(
+                    key=key,
+                    match=MatchValue(value=value)
+                )
+                for key, value in conditions.items()
+            ]
+        )
+    
+    def _get_vector_index(self, collection: str) -> Optional[InMemoryVectorIndex]:
+        """Retorna o índice em memória carregado da coleção, se o tenant usa um."""
+        if not self.use_vector_index:
+            return None
+        return get_vector_index(collection, self.qdrant_client, self.redis_client)
+    
+    def _query_batch(self, collection: str, embeddings: List[List[float]], conditions: Dict[str, Any],
+                     limit: int, min_score: float) -> List[List[Any]]:
         """
-        Realiza uma busca híbrida por produtos.
+        Executa várias buscas em uma coleção com uma única requisição ao Qdrant.
         
-        Esta função combina a busca semântica do Qdrant com a verificação
-        de disponibilidade e informações detalhadas do PostgreSQL.
+        Se a coleção tiver um índice em memória carregado (tenants pequenos),
+        as buscas são respondidas no próprio processo.
         
         Args:
-            query: Consulta do usuário.
-            limit: Número máximo de resultados.
-            min_score: Pontuação mínima para considerar um resultado relevante.
-            category_id: ID da categoria para filtrar (opcional).
+            collection: Coleção do Qdrant.
+            embeddings: Vetores de consulta.
+            conditions: Condições de igualdade sobre o payload, aplicadas a todas as buscas.
+            limit: Resultados por busca.
+            min_score: Pontuação mínima.
             
         Returns:
-            Lista de produtos encontrados, ordenados por relevância.
+            Lista de resultados (pontos com payload) para cada vetor, na mesma ordem.
         """
-        # Verificar cache
-        cache_key = self._get_cache_key(query, limit, min_score, category_id)
-        cached_results = self._check_cache(cache_key)
-        if cached_results:
-            self.logger.info(f"Resultados encontrados no cache para '{query}'")
-            return cached_results
-            
-        try:
-            # 1. Converter a consulta em embedding
-            query_embedding = self.embedding_service.get_embedding(query)
-            
-            # 2. Preparar filtro para o Qdrant
-            qdrant_filter = Filter(
-                must=[
-                    FieldCondition(
-                        key="active",
-                        match=MatchValue(value=True)
-                    )
-                ]
-            )
-            
-            # Adicionar filtro de categoria se especificado
-            if category_id is not None:
-                qdrant_filter.must.append(
-                    FieldCondition(
-                        key="category_id",
-                        match=MatchValue(value=category_id)
-                    )
+        index = self._get_vector_index(collection)
+        if index is not None:
+            return [
+                index.search(embedding, limit=limit, score_threshold=min_score, must=conditions)
+                for embedding in embeddings
+            ]
+        
+        qdrant_filter = self._to_qdrant_filter(conditions)
+        responses = self.qdrant_client.query_batch_points(
+            collection_name=collection,
+            requests=[
+                QueryRequest(
+                    query=embedding,
+                    filter=qdrant_filter,
+                    limit=limit,
+                    score_threshold=min_score,
+                    with_payload=True
                 )
-            
-            # 3. Buscar no Qdrant produtos semanticamente relevantes
-            qdrant_results = self.qdrant_client.search(
-                collection_name="products",
-                query_vector=query_embedding,
-                query_filter=qdrant_filter,
-                limit=limit * 2,  # Buscamos mais resultados para compensar possíveis filtros posteriores
-                score_threshold=min_score
-            )
-            
-            if not qdrant_results:
-                self.logger.info(f"Nenhum produto encontrado no Qdrant para '{query}'")
-                return []
+                for embedding in embeddings
+            ]
+        )
+        return [response.points for response in responses]
+    
+    def _get_verified_at(self, collection: str) -> float:
+        """
+        Retorna quando a coleção foi verificada por completo pela sincronização.
+        
+        Todos os payloads estavam consistentes com o PostgreSQL nesse instante;
+        pontos alterados depois disso têm o próprio `last_updated` mais recente.
+        """
+        if not self.redis_client:
+            return 0.0
+        try:
+            value = self.redis_client.get(f"sync:verified_at:{collection}")
+            return float(value) if value else 0.0
+        except Exception as e:
+            self.logger.warning(f"Erro ao ler verificação da coleção {collection}: {e}")
+            return 0.0
+    
+    def _payload_is_fresh(self, payload: Dict[str, Any], fields: Tuple[str, ...], verified_at: float) -> bool:
+        """
+        Indica se o payload tem todos os campos necessários e está dentro da idade máxima.
+        """
+        if any(field not in payload for field in fields):
+            return False
+        updated_at = verified_at
+        try:
+            if payload.get("last_updated"):
+                updated_at = max(updated_at, datetime.fromisoformat(payload["last_updated"]).timestamp())
+        except ValueError:
+            pass
+        return time.time() - updated_at <= self.payload_max_age
+    
+    def _can_serve_from_payload(self, collection: str, hits: List[Any], fields: Tuple[str, ...]) -> bool:
+        """Indica se todos os resultados podem ser montados a partir do payload."""
+        if not self.payload_max_age:
+            return False
+        verified_at = self._get_verified_at(collection)
+        return all(self._payload_is_fresh(hit.payload or {}, fields, verified_at) for hit in hits)
+    
+    def _get_category_names(self) -> Dict[int, str]:
+        """
+        Retorna os nomes das categorias de produtos, com cache em memória.
+        """
+        if time.monotonic() - self._category_names_loaded_at > CATEGORY_NAMES_TTL:
+            try:
+                with self._get_db_connection() as conn:
+                    with conn.cursor() as cursor:
+                        cursor.execute("SELECT id, name FROM product_categories")
+                        self._category_names = dict(cursor.fetchall())
+                self._category_names_loaded_at = time.monotonic()
+            except Exception as e:
+                self.logger.warning(f"Erro ao carregar nomes de categorias: {e}")
+        return self._category_names
+    
+    def _fetch_products(self, product_ids: List[int], category_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Obtém os produtos ativos no PostgreSQL (com o nome da categoria).
+        """
+        with self._get_db_connection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                # Construir a consulta SQL
+                sql = """
+                    SELECT p.*, pc.name as category_name
+                    FROM products p
+                    JOIN product_categories pc ON p.category_id = pc.id
+                    WHERE p.id = ANY(%s) AND p.active = TRUE
+                """
                 
-            # 4. Extrair IDs dos produtos encontrados
-            product_ids = [int(result.id) for result in qdrant_results]
-            product_scores = {int(result.id): result.score for result in qdrant_results}
+                # Adicionar filtro de categoria se especificado
+                params = [product_ids]
+                if category_id is not None:
+                    sql += " AND p.category_id = %s"
+                    params.append(category_id)
+                    
+                # Executar a consulta
+                cursor.execute(sql, params)
+                return [dict(product) for product in cursor.fetchall()]
+    
+    def _refresh_critical_fields(self, products: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Atualiza preço, ativação e estoque dos produtos com uma consulta enxuta.
+        
+        Produtos desativados desde a última sincronização são removidos.
+        
+        Args:
+            products: Produtos montados a partir do payload ou do cache.
             
-            # 5. Verificar disponibilidade e obter detalhes no PostgreSQL
+        Returns:
+            Produtos ativos com `price` e `stock_quantity` atuais.
+        """
+        if not products:
+            return products
+        self.stats["critical_refresh"] += 1
+        with self._get_db_connection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute("""
+                    SELECT p.id, p.price, p.active, COALESCE(SUM(i.quantity), 0) AS stock_quantity
+                    FROM products p
+                    LEFT JOIN inventory i ON i.product_id = p.id
+                    WHERE p.id = ANY(%s)
+                    GROUP BY p.id
+                """, [[product["id"] for product in products]])
+                current = {row["id"]: row for row in cursor.fetchall()}
+        
+        refreshed = []
+        for product in products:
+            row = current.get(product["id"])
+            if not row or not row["active"]:
+                continue
+            product = dict(product, price=row["price"], stock_quantity=int(row["stock_quantity"]))
+            refreshed.append(product)
+        return refreshed
+    
+    def _products_from_hits(self, hits: List[Any], limit: int,
+                            category_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Converte resultados do Qdrant em produtos, ordenados por relevância.
+        
+        Usa o payload quando ele está atualizado; caso contrário, obtém os
+        detalhes e verifica a disponibilidade no PostgreSQL.
+        """
+        if not hits:
+            return []
+        
+        if self._can_serve_from_payload("products", hits, PRODUCT_PAYLOAD_FIELDS):
+            self.stats["payload"] += 1
+            category_names = self._get_category_names()
+            results = []
+            for hit in hits:
+                product = {field: hit.payload.get(field) for field in PRODUCT_PAYLOAD_FIELDS}
+                product["id"] = int(hit.id)
+                product["category_name"] = category_names.get(product["category_id"])
+                product["score"] = hit.score
+                results.append(product)
+        else:
+            self.stats["sql"] += 1
+            product_scores = {int(hit.id): hit.score for hit in hits}
+            results = self._fetch_products(list(product_scores), category_id)
+            for product in results:
+                product["score"] = product_scores.get(product["id"], 0)
+        
+        # Ordenar por relevância (score) e limitar ao número solicitado
+        results.sort(key=lambda x: x["score"], reverse=True)
+        return results[:limit]
+    
+    def _business_rules_from_hits(self, hits: List[Any], limit: int,
+                                  category: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Converte resultados do Qdrant em regras de negócio, ordenadas por relevância.
+        """
+        if not hits:
+            return []
+        
+        if self._can_serve_from_payload("business_rules", hits, BUSINESS_RULE_PAYLOAD_FIELDS):
+            self.stats["payload"] += 1
+            results = []
+            for hit in hits:
+                rule = {field: hit.payload.get(field) for field in BUSINESS_RULE_PAYLOAD_FIELDS}
+                rule["id"] = int(hit.id)
+                rule["score"] = hit.score
+                results.append(rule)
+        else:
+            self.stats["sql"] += 1
+            rule_scores = {int(hit.id): hit.score for hit in hits}
             with self._get_db_connection() as conn:
                 with conn.cursor(cursor_factory=RealDictCursor) as cursor:
                     # Construir a consulta SQL
                     sql = """
-                        SELECT p.*, pc.name as category_name
-                        FROM products p
-                        JOIN product_categories pc ON p.category_id = pc.id
-                        WHERE p.id = ANY(%s) AND p.active = TRUE
+                        SELECT *
+                        FROM business_rules
+                        WHERE id = ANY(%s) AND active = TRUE
                     """
                     
                     # Adicionar filtro de categoria se especificado
-                    params = [product_ids]
-                    if category_id is not None:
-                        sql += " AND p.category_id = %s"
-                        params.append(category_id)
+                    params = [list(rule_scores)]
+                    if category:
+                        sql += " AND category = %s"
+                        params.append(category)
                         
                     # Executar a consulta
                     cursor.execute(sql, params)
-                    products = cursor.fetchall()
-                    
-            # 6. Converter resultados para dicionários e adicionar score
-            results = []
-            for product in products:
-                product_dict = dict(product)
-                product_dict["score"] = product_scores.get(product_dict["id"], 0)
-                results.append(product_dict)
-                
-            # 7. Ordenar por relevância (score)
-            results.sort(key=lambda x: x["score"], reverse=True)
-            
-            # 8. Limitar ao número solicitado
-            results = results[:limit]
-            
-            # 9. Salvar no cache
-            self._save_to_cache(cache_key, results)
+                    results = [dict(rule) for rule in cursor.fetchall()]
+            for rule in results:
+                rule["score"] = rule_scores.get(rule["id"], 0)
+        
+        # Ordenar por relevância (score) e limitar ao número solicitado
+        results.sort(key=lambda x: x["score"], reverse=True)
+        return results[:limit]
+    
+    def search_products_batch(
+        self,
+        queries: List[str],
+        limit: int = 5,
+        min_score: float = 0.7,
+        category_id: Optional[int] = None,
+        price_critical: bool = False,
+        query_embeddings: Optional[List[List[float]]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Realiza várias buscas de produtos de uma vez.
+        
+        Consultas em cache são respondidas diretamente; as demais têm seus
+        embeddings gerados em lote e são enviadas ao Qdrant em uma única
+        requisição.
+        
+        Args:
+            queries: Consultas do usuário.
+            limit: Número máximo de resultados por consulta.
+            min_score: Pontuação mínima para considerar um resultado relevante.
+            category_id: ID da categoria para filtrar (opcional).
+            price_critical: Se True, preço, ativação e estoque são confirmados no
+                           PostgreSQL (ex.: orçamentos e pedidos).
+            query_embeddings: Embeddings já calculados das consultas, na mesma
+                              ordem (opcional; evita gerá-los novamente).
             
-            self.logger.info(f"Encontrados {len(results)} produtos para '{query}'")
+        Returns:
+            Lista de resultados para cada consulta, na mesma ordem.
+        """
+        results: List[Optional[List[Dict[str, Any]]]] = [None] * len(queries)
+        cache_keys = [self._get_cache_key(query, limit, min_score, category_id) for query in queries]
+        
+        pending = []
+        for index, cache_key in enumerate(cache_keys):
+            cached_results = self._check_cache(cache_key)
+            if cached_results:
+                self.logger.info(f"Resultados encontrados no cache para '{queries[index]}'")
+                results[index] = cached_results
+            else:
+                pending.append(index)
+        
+        try:
+            if pending:
+                # 1. Converter as consultas em embeddings (uma chamada para todas)
+                if query_embeddings is not None:
+                    embeddings = [query_embeddings[i] for i in pending]
+                else:
+                    embeddings = self.embedding_service.get_batch_embeddings([queries[i] for i in pending])
+                
+                # 2. Buscar no Qdrant (uma requisição para todas as consultas)
+                hits_per_query = self._query_batch(
+                    "products", embeddings, self._product_conditions(category_id),
+                    limit * 2,  # Buscamos mais resultados para compensar possíveis filtros posteriores
+                    min_score
+                )
+                
+                # 3. Montar os resultados (payload ou PostgreSQL) e salvar no cache
+                for index, hits in zip(pending, hits_per_query):
+                    results[index] = self._products_from_hits(hits, limit, category_id)
+                    self._save_to_cache(cache_keys[index], results[index], search_cache=self.product_search_cache)
+                    self.logger.info(f"Encontrados {len(results[index])} produtos para '{queries[index]}'")
+            
+            if price_critical:
+                results = [self._refresh_critical_fields(products) for products in results]
             return results
             
         except Exception as e:
             self.logger.error(f"Erro ao buscar produtos: {e}")
-            return []
+            return [products or [] for products in results]
+    
+    def search_products(
+        self, 
+        query: str, 
+        limit: int = 5, 
+        min_score: float = 0.7,
+        category_id: Optional[int] = None,
+        price_critical: bool = False,
+        query_embedding: Optional[List[float]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Realiza uma busca híbrida por produtos.
+        
+        Esta função combina a busca semântica do Qdrant com a verificação
+        de disponibilidade e informações detalhadas do PostgreSQL (ou do
+        payload do Qdrant, quando atualizado).
+        
+        Args:
+            query: Consulta do usuário.
+            limit: Número máximo de resultados.
+            min_score: Pontuação mínima para considerar um resultado relevante.
+            category_id: ID da categoria para filtrar (opcional).
+            price_critical: Se True, preço, ativação e estoque são confirmados no
+                           PostgreSQL (ex.: orçamentos e pedidos).
+            query_embedding: Embedding já calculado da consulta (opcional).
+            
+        Returns:
+            Lista de produtos encontrados, ordenados por relevância.
+        """
+        return self.search_products_batch(
+            [query], limit, min_score, category_id, price_critical,
+            query_embeddings=[query_embedding] if query_embedding else None
+        )[0]
             
     def search_business_rules(
         self, 
         query: str, 
         limit: int = 3, 
         min_score: float = 0.7,
-        category: Optional[str] = None
+        category: Optional[str] = None,
+        query_embedding: Optional[List[float]] = None
     ) -> List[Dict[str, Any]]:
         """
         Realiza uma busca híbrida por regras de negócio.
         
         Esta função combina a busca semântica do Qdrant com a verificação
-        de ativação e informações detalhadas do PostgreSQL.
+        de ativação e informações detalhadas do PostgreSQL (ou do payload
+        do Qdrant, quando atualizado).
         
         Args:
             query: Consulta do usuário.
             limit: Número máximo de resultados.
             min_score: Pontuação mínima para considerar um resultado relevante.
             category: Categoria para filtrar (opcional).
+            query_embedding: Embedding já calculado da consulta (opcional).
             
         Returns:
             Lista de regras de negócio encontradas, ordenadas por relevância.
         """
         # Verificar cache
-        cache_key = f"business_rule_search:query:{query}:limit:{limit}:min_score:{min_score}"
-        if category:
-            cache_key += f":category:{category}"
-            
+        cache_key = self.business_rule_search_cache.build_key(
+            {"query": query, "limit": limit, "min_score": min_score}, scope=category or None
+        )
         cached_results = self._check_cache(cache_key)
         if cached_results:
             self.logger.info(f"Resultados encontrados no cache para '{query}'")
@@ -285,79 +587,25 @@ class ProductSearchService:
             
         try:
             # 1. Converter a consulta em embedding
-            query_embedding = self.embedding_service.get_embedding(query)
+            if not query_embedding:
+                query_embedding = self.embedding_service.get_embedding(query)
             
-            # 2. Preparar filtro para o Qdrant
-            qdrant_filter = Filter(
-                must=[
-                    FieldCondition(
-                        key="active",
-                        match=MatchValue(value=True)
-                    )
-                ]
-            )
-            
-            # Adicionar filtro de categoria se especificado
-            if category:
-                qdrant_filter.must.append(
-                    FieldCondition(
-                        key="category",
-                        match=MatchValue(value=category)
-                    )
-                )
+            # 2. Buscar no Qdrant regras semanticamente relevantes
+            hits = self._query_batch(
+                "business_rules", [query_embedding], self._business_rule_conditions(category),
+                limit * 2,  # Buscamos mais resultados para compensar possíveis filtros posteriores
+                min_score
+            )[0]
             
-            # 3. Buscar no Qdrant regras semanticamente relevantes
-            qdrant_results = self.qdrant_client.search(
-                collection_name="business_rules",
-                query_vector=query_embedding,
-                query_filter=qdrant_filter,
-                limit=limit * 2,  # Buscamos mais resultados para compensar possíveis filtros posteriores
-                score_threshold=min_score
-            )
-            
-            if not qdrant_results:
+            if not hits:
                 self.logger.info(f"Nenhuma regra de negócio encontrada no Qdrant para '{query}'")
                 return []
-                
-            # 4. Extrair IDs das regras encontradas
-            rule_ids = [int(result.id) for result in qdrant_results]
-            rule_scores = {int(result.id): result.score for result in qdrant_results}
             
-            # 5. Verificar ativação e obter detalhes no PostgreSQL
-            with self._get_db_connection() as conn:
-                with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-                    # Construir a consulta SQL
-                    sql = """
-                        SELECT *
-                        FROM business_rules
-                        WHERE id = ANY(%s) AND active = TRUE
-                    """
-                    
-                    # Adicionar filtro de categoria se especificado
-                    params = [rule_ids]
-                    if category:
-                        sql += " AND category = %s"
-                        params.append(category)
-                        
-                    # Executar a consulta
-                    cursor.execute(sql, params)
-                    rules = cursor.fetchall()
-                    
-            # 6. Converter resultados para dicionários e adicionar score
-            results = []
-            for rule in rules:
-                rule_dict = dict(rule)
-                rule_dict["score"] = rule_scores.get(rule_dict["id"], 0)
-                results.append(rule_dict)
-                
-            # 7. Ordenar por relevância (score)
-            results.sort(key=lambda x: x["score"], reverse=True)
-            
-            # 8. Limitar ao número solicitado
-            results = results[:limit]
+            # 3. Montar os resultados (payload ou PostgreSQL)
+            results = self._business_rules_from_hits(hits, limit, category)
             
-            # 9. Salvar no cache
-            self._save_to_cache(cache_key, results)
+            # 4. Salvar no cache
+            self._save_to_cache(cache_key, results, search_cache=self.business_rule_search_cache)
             
             self.logger.info(f"Encontradas {len(results)} regras de negócio para '{query}'")
             return results
@@ -365,6 +613,53 @@ class ProductSearchService:
         except Exception as e:
             self.logger.error(f"Erro ao buscar regras de negócio: {e}")
             return []
+    
+    def search(
+        self,
+        query: str,
+        product_limit: int = 5,
+        rule_limit: int = 3,
+        min_score: float = 0.7,
+        category_id: Optional[int] = None,
+        rule_category: Optional[str] = None,
+        price_critical: bool = False
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Busca produtos e regras de negócio para a mesma consulta.
+        
+        O embedding da consulta é gerado uma única vez e usado pelas duas
+        buscas, que rodam em paralelo.
+        
+        Args:
+            query: Consulta do usuário.
+            product_limit: Número máximo de produtos.
+            rule_limit: Número máximo de regras de negócio.
+            min_score: Pontuação mínima para considerar um resultado relevante.
+            category_id: ID da categoria de produtos para filtrar (opcional).
+            rule_category: Categoria de regras para filtrar (opcional).
+            price_critical: Se True, preço, ativação e estoque dos produtos são
+                           confirmados no PostgreSQL.
+            
+        Returns:
+            Dicionário com as listas "products" e "business_rules".
+        """
+        try:
+            query_embedding = self.embedding_service.get_embedding(query)
+        except Exception as e:
+            # Cada busca tenta gerar o embedding por conta própria
+            self.logger.warning(f"Erro ao gerar embedding da consulta '{query}': {e}")
+            query_embedding = None
+        
+        rules_future = self._executor.submit(
+            self.search_business_rules, query, rule_limit, min_score, rule_category, query_embedding
+        )
+        products = self.search_products(
+            query, product_limit, min_score, category_id, price_critical, query_embedding
+        )
+        return {
+            "products": products,
+            "business_rules": rules_future.result()
+        }
             
     def format_product_results(self, products: List[Dict[str, Any]]) -> str:
         """
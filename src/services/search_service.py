@@ -10,7 +10,7 @@ from typing import List, Dict, Any, Optional, Tuple
 from qdrant_client import QdrantClient
 from qdrant_client.http import models
 
-from .embedding_service import EmbeddingService
+from .embedding_service import EmbeddingService, get_embedding_service
 from .sync_service import PostgreSQLClient
 
 class ProductSearchService:
@@ -36,7 +36,7 @@ class ProductSearchService:
         Args:
             postgres_client: Cliente PostgreSQL. Se não fornecido, será criado um novo.
             qdrant_client: Cliente Qdrant. Se não fornecido, será criado um novo.
-            embedding_service: Serviço de embeddings. Se não fornecido, será criado um novo.
+            embedding_service: Serviço de embeddings. Se não fornecido, usa o serviço compartilhado.
             use_redis: Se True, tentará usar Redis para cache. Se False, desativa o cache.
         """
         self.postgres = postgres_client or PostgreSQLClient()
@@ -44,7 +44,7 @@ class ProductSearchService:
         qdrant_url = os.environ.get("QDRANT_URL", "http://qdrant:6333")
         self.qdrant = qdrant_client or QdrantClient(url=qdrant_url)
         
-        self.embedding_service = embedding_service or EmbeddingService()
+        self.embedding_service = embedding_service or get_embedding_service()
         self.logger = logging.getLogger(__name__)
         
         # Configurar Redis para cache (opcional)
@@ -0,0 +1,414 @@
+"""
+Índice vetorial em memória para tenants com catálogos pequenos.
+
+Para catálogos de alguns milhares de itens, a ida e volta ao Qdrant domina a
+latência da busca. Este módulo mantém uma cópia da coleção em memória (matriz
+NumPy float32 com vetores normalizados) e responde buscas com top-k exato no
+próprio processo: um produto matriz-vetor e um argpartition.
+
+O índice é carregado do Qdrant na inicialização e mantido atualizado pelos
+serviços de sincronização: o DataSyncService publica os IDs alterados no canal
+VECTOR_INDEX_CHANNEL (via CacheInvalidationBus) e cada processo com índice
+carregado relê esses pontos do Qdrant. Coleções acima do limite de memória não
+são carregadas e as buscas continuam no Qdrant.
+
+Como o pub/sub não garante entrega (mensagens perdidas em reconexões ou com o
+processo ocupado), o índice é recarregado por completo periodicamente
+(VECTOR_INDEX_RELOAD_INTERVAL), em segundo plano; uma carga que falhou é
+tentada de novo após VECTOR_INDEX_RETRY_INTERVAL.
+"""
+
+import os
+import re
+import logging
+import time
+import threading
+from collections import namedtuple
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.core.cache.invalidation import CacheInvalidationBus
+
+logger = logging.getLogger(__name__)
+
+# Canal pub/sub com os IDs de pontos alterados pela sincronização
+VECTOR_INDEX_CHANNEL = "vector_index:changes"
+
+# Limite padrão de memória dos vetores de uma coleção
+DEFAULT_MAX_BYTES = int(os.environ.get("VECTOR_INDEX_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Intervalo (segundos) entre recargas completas de um índice carregado
+VECTOR_INDEX_RELOAD_INTERVAL = float(os.environ.get("VECTOR_INDEX_RELOAD_INTERVAL", "900"))
+
+# Intervalo (segundos) até tentar de novo uma carga que falhou
+VECTOR_INDEX_RETRY_INTERVAL = float(os.environ.get("VECTOR_INDEX_RETRY_INTERVAL", "30"))
+
+# Resultado de busca com a mesma interface usada dos pontos do Qdrant
+VectorHit = namedtuple("VectorHit", ["id", "score", "payload"])
+
+
+def resolve_index_mode(tenant_id: Optional[str] = None) -> str:
+    """
+    Determina onde as buscas vetoriais de um tenant são executadas.
+
+    Usa VECTOR_INDEX_<TENANT> (ex.: VECTOR_INDEX_COSMETICOS=memory), depois
+    VECTOR_INDEX e, por fim, "qdrant".
+
+    Args:
+        tenant_id: Identificador do tenant (conta ou domínio de negócio)
+
+    Returns:
+        "memory" ou "qdrant"
+    """
+    if tenant_id:
+        tenant_var = "VECTOR_INDEX_" + re.sub(r"\W", "_", str(tenant_id)).upper()
+        if os.environ.get(tenant_var):
+            return os.environ[tenant_var]
+    return os.environ.get("VECTOR_INDEX", "qdrant")
+
+
+class MemoryLimitExceeded(Exception):
+    """Erro lançado quando a coleção não cabe no limite de memória do índice."""
+
+
+class InMemoryVectorIndex:
+    """
+    Índice vetorial exato em memória (similaridade de cosseno).
+
+    Os vetores são normalizados na inserção, então o cosseno é um produto
+    escalar. Leituras e escritas são protegidas por um lock; as buscas
+    operam sobre um snapshot dos arrays.
+    """
+
+    def __init__(self, collection: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Inicializa um índice vazio.
+
+        Args:
+            collection: Coleção do Qdrant espelhada pelo índice.
+            max_bytes: Memória máxima ocupada pelos vetores.
+        """
+        self.collection = collection
+        self.max_bytes = max_bytes
+        self._ids: List[Any] = []
+        self._positions: Dict[Any, int] = {}
+        self._payloads: List[Dict[str, Any]] = []
+        self._matrix: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+        self.loaded = False
+        # A última carga falhou por exceder max_bytes (não adianta tentar logo de novo)
+        self.over_limit = False
+        # Momento (time.monotonic) da próxima recarga ou nova tentativa
+        self.next_load_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @property
+    def nbytes(self) -> int:
+        return self._matrix.nbytes if self._matrix is not None else 0
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def upsert(self, points: Iterable[Tuple[Any, List[float], Dict[str, Any]]]) -> None:
+        """
+        Insere ou substitui pontos.
+
+        Args:
+            points: Tuplas (id, vetor, payload).
+
+        Raises:
+            MemoryLimitExceeded: Se os novos pontos ultrapassarem o limite de memória.
+        """
+        points = list(points)
+        if not points:
+            return
+        vectors = self._normalize(np.asarray([vector for _, vector, _ in points], dtype=np.float32))
+
+        with self._lock:
+            new_rows = []
+            for (point_id, _, payload), vector in zip(points, vectors):
+                position = self._positions.get(point_id)
+                if position is None:
+                    new_rows.append((point_id, vector, payload or {}))
+                else:
+                    self._matrix[position] = vector
+                    self._payloads[position] = payload or {}
+
+            if not new_rows:
+                return
+            added = np.stack([vector for _, vector, _ in new_rows])
+            if self.nbytes + added.nbytes > self.max_bytes:
+                raise MemoryLimitExceeded(
+                    f"Índice de {self.collection} excederia {self.max_bytes} bytes"
+                )
+            self._matrix = added if self._matrix is None else np.vstack([self._matrix, added])
+            for point_id, _, payload in new_rows:
+                self._positions[point_id] = len(self._ids)
+                self._ids.append(point_id)
+                self._payloads.append(payload)
+
+    def remove(self, ids: Iterable[Any]) -> None:
+        """
+        Remove pontos do índice (IDs ausentes são ignorados).
+
+        Args:
+            ids: IDs dos pontos.
+        """
+        with self._lock:
+            positions = {self._positions[point_id] for point_id in ids if point_id in self._positions}
+            if not positions:
+                return
+            keep = [position for position in range(len(self._ids)) if position not in positions]
+            self._matrix = self._matrix[keep]
+            self._ids = [self._ids[position] for position in keep]
+            self._payloads = [self._payloads[position] for position in keep]
+            self._positions = {point_id: position for position, point_id in enumerate(self._ids)}
+
+    def search(self, vector: List[float], limit: int = 10, score_threshold: Optional[float] = None,
+               must: Optional[Dict[str, Any]] = None) -> List[VectorHit]:
+        """
+        Busca os pontos mais similares (top-k exato).
+
+        Args:
+            vector: Vetor de consulta.
+            limit: Número máximo de resultados.
+            score_threshold: Similaridade mínima (opcional).
+            must: Condições de igualdade sobre o payload (ex.: {"active": True}).
+
+        Returns:
+            Resultados ordenados por similaridade decrescente.
+        """
+        with self._lock:
+            matrix, ids, payloads = self._matrix, self._ids, self._payloads
+        if matrix is None or not len(ids):
+            return []
+
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        scores = matrix @ (query / norm if norm else query)
+
+        if must:
+            mask = np.fromiter(
+                (all(payload.get(key) == value for key, value in must.items()) for payload in payloads),
+                dtype=bool, count=len(payloads)
+            )
+            scores = np.where(mask, scores, -np.inf)
+        if score_threshold is not None:
+            scores = np.where(scores >= score_threshold, scores, -np.inf)
+
+        limit = min(limit, len(ids))
+        if limit <= 0:
+            return []
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+        return [
+            VectorHit(ids[position], float(scores[position]), payloads[position])
+            for position in top
+            if np.isfinite(scores[position])
+        ]
+
+    def load_from_qdrant(self, qdrant_client, batch_size: int = 1000) -> bool:
+        """
+        Carrega todos os pontos da coleção do Qdrant.
+
+        Args:
+            qdrant_client: Cliente Qdrant.
+            batch_size: Pontos lidos por página.
+
+        Returns:
+            True se a coleção foi carregada, False se excedeu o limite de memória
+            ou ocorreu um erro (nesse caso o índice fica vazio).
+        """
+        try:
+            offset = None
+            while True:
+                records, offset = qdrant_client.scroll(
+                    collection_name=self.collection,
+                    limit=batch_size,
+                    offset=offset,
+                    with_payload=True,
+                    with_vectors=True
+                )
+                self.upsert((record.id, record.vector, record.payload) for record in records)
+                if offset is None:
+                    break
+        except MemoryLimitExceeded as e:
+            logger.warning(f"Índice em memória de {self.collection} não carregado: {e}")
+            self.clear()
+            self.over_limit = True
+            return False
+        except Exception as e:
+            logger.warning(f"Índice em memória de {self.collection} não carregado: {e}")
+            self.clear()
+            return False
+
+        self.loaded = True
+        self.over_limit = False
+        logger.info(
+            f"Índice em memória de {self.collection} carregado: {len(self)} pontos, "
+            f"{self.nbytes / (1024 * 1024):.1f} MB"
+        )
+        return True
+
+    def refresh_from_qdrant(self, qdrant_client, ids: List[Any]) -> None:
+        """
+        Relê pontos alterados no Qdrant; pontos que não existem mais são removidos.
+
+        Args:
+            qdrant_client: Cliente Qdrant.
+            ids: IDs alterados.
+        """
+        records = qdrant_client.retrieve(
+            collection_name=self.collection,
+            ids=list(ids),
+            with_payload=True,
+            with_vectors=True
+        )
+        found = {record.id for record in records}
+        self.remove([point_id for point_id in ids if point_id not in found])
+        try:
+            self.upsert((record.id, record.vector, record.payload) for record in records)
+        except MemoryLimitExceeded as e:
+            # Acima do limite o índice deixa de ser usado e as buscas voltam ao Qdrant
+            logger.warning(f"{e}; desativando índice em memória")
+            self.clear()
+
+    def items(self) -> List[Tuple[Any, Dict[str, Any]]]:
+        """Retorna os pares (id, payload) indexados."""
+        with self._lock:
+            return list(zip(self._ids, self._payloads))
+
+    def clear(self) -> None:
+        """Esvazia o índice e o marca como não carregado."""
+        with self._lock:
+            self._ids, self._payloads, self._positions, self._matrix = [], [], {}, None
+        self.loaded = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "collection": self.collection,
+            "loaded": self.loaded,
+            "points": len(self),
+            "bytes": self.nbytes,
+            "max_bytes": self.max_bytes
+        }
+
+
+_shared_indexes: Dict[str, InMemoryVectorIndex] = {}
+_shared_lock = threading.Lock()
+_subscriber: Optional[CacheInvalidationBus] = None
+# Coleções com recarga em andamento
+_reloading = set()
+
+
+def _apply_vector_changes(qdrant_client, keys: List[str], prefixes: List[str]) -> None:
+    """Relê nos índices carregados os pontos anunciados como alterados."""
+    changed: Dict[str, List[Any]] = {}
+    for key in keys:
+        collection, _, point_id = key.rpartition(":")
+        changed.setdefault(collection, []).append(int(point_id) if point_id.isdigit() else point_id)
+    for collection, ids in changed.items():
+        index = _shared_indexes.get(collection)
+        if index is not None and index.loaded:
+            index.refresh_from_qdrant(qdrant_client, ids)
+
+
+def _load_index(collection: str, qdrant_client, max_bytes: int,
+                reload_interval: float, retry_interval: float) -> InMemoryVectorIndex:
+    """Carrega um índice novo e agenda sua próxima recarga (ou nova tentativa)."""
+    index = InMemoryVectorIndex(collection, max_bytes=max_bytes)
+    index.load_from_qdrant(qdrant_client)
+    delay = reload_interval if index.loaded or index.over_limit else retry_interval
+    index.next_load_at = time.monotonic() + delay
+    return index
+
+
+def _reload_index(collection: str, qdrant_client, max_bytes: int,
+                  reload_interval: float, retry_interval: float) -> None:
+    """
+    Recarrega um índice compartilhado e o substitui quando a carga termina.
+
+    Se a recarga falhar por um erro transitório, o índice atual continua em
+    uso; se a coleção passou do limite de memória, as buscas voltam ao Qdrant.
+    """
+    try:
+        index = _load_index(collection, qdrant_client, max_bytes, reload_interval, retry_interval)
+        with _shared_lock:
+            current = _shared_indexes.get(collection)
+            if index.loaded or index.over_limit or current is None or not current.loaded:
+                _shared_indexes[collection] = index
+            else:
+                current.next_load_at = index.next_load_at
+    except Exception as e:
+        logger.error(f"Erro ao recarregar índice em memória de {collection}: {e}")
+    finally:
+        with _shared_lock:
+            _reloading.discard(collection)
+
+
+def get_vector_index(collection: str, qdrant_client, redis_client=None,
+                     max_bytes: int = DEFAULT_MAX_BYTES,
+                     reload_interval: float = VECTOR_INDEX_RELOAD_INTERVAL,
+                     retry_interval: float = VECTOR_INDEX_RETRY_INTERVAL) -> Optional[InMemoryVectorIndex]:
+    """
+    Obtém o índice em memória compartilhado de uma coleção, carregando-o na primeira chamada.
+
+    Com um cliente Redis, o processo passa a receber as alterações publicadas
+    pela sincronização e mantém o índice atualizado. Vencido o intervalo de
+    recarga (ou de nova tentativa, se a carga falhou), o índice é recarregado
+    em uma thread; a chamada não espera a recarga.
+
+    Args:
+        collection: Coleção do Qdrant.
+        qdrant_client: Cliente Qdrant usado para carregar e atualizar o índice.
+        redis_client: Cliente Redis para receber alterações (opcional).
+        max_bytes: Memória máxima dos vetores da coleção.
+        reload_interval: Segundos entre recargas completas do índice.
+        retry_interval: Segundos até tentar de novo uma carga que falhou.
+
+    Returns:
+        Índice carregado, ou None se a coleção não está carregada (não coube no
+        limite de memória ou a carga falhou); nesse caso as buscas devem usar o Qdrant.
+    """
+    global _subscriber
+    with _shared_lock:
+        index = _shared_indexes.get(collection)
+        if index is None:
+            index = _load_index(collection, qdrant_client, max_bytes, reload_interval, retry_interval)
+            _shared_indexes[collection] = index
+        elif time.monotonic() >= index.next_load_at and collection not in _reloading:
+            _reloading.add(collection)
+            threading.Thread(
+                target=_reload_index,
+                args=(collection, qdrant_client, max_bytes, reload_interval, retry_interval),
+                name=f"vector-index-reload-{collection}", daemon=True
+            ).start()
+
+        if redis_client is not None and _subscriber is None:
+            _subscriber = CacheInvalidationBus(redis_client, channel=VECTOR_INDEX_CHANNEL)
+            _subscriber.add_listener(
+                lambda keys, prefixes: _apply_vector_changes(qdrant_client, keys, prefixes)
+            )
+            _subscriber.start()
+
+    return index if index.loaded else None
+
+
+def publish_vector_changes(bus: Optional[CacheInvalidationBus], collection: str, ids: Iterable[Any]) -> None:
+    """
+    Anuncia pontos alterados ou removidos de uma coleção aos índices em memória.
+
+    Args:
+        bus: Barramento no canal VECTOR_INDEX_CHANNEL (None desativa).
+        collection: Coleção do Qdrant.
+        ids: IDs dos pontos.
+    """
+    if bus is None:
+        return
+    bus.publish_keys([f"{collection}:{point_id}" for point_id in ids])
@@ -247,13 +247,15 @@ class TwoLevelCache(BaseTool):
     # Campos não-Pydantic que serão inicializados no __init__
     redis_cache: Any = None
     memory_cache: Any = None
+    invalidation_bus: Any = None
     local_cache: Dict[str, Dict[str, Any]] = {}
     
     def __init__(self, 
                  redis_client: Redis,
                  prefix: str = "",
                  default_ttl: int = 3600,
-                 local_cache_size: int = 1024):
+                 local_cache_size: int = 1024,
+                 invalidation_bus: Any = None):
         """
         Initialize the two-level cache.
         
@@ -262,6 +264,8 @@ class TwoLevelCache(BaseTool):
             prefix: Prefix for Redis keys
             default_ttl: Default time-to-live in seconds
             local_cache_size: Size of the local LRU cache
+            invalidation_bus: CacheInvalidationBus used to propagate local
+                invalidations to other processes (optional)
         """
         # Log para depuração da conexão Redis
         logger.info(f"Inicializando TwoLevelCache com Redis: {redis_client}")
@@ -286,7 +290,8 @@ class TwoLevelCache(BaseTool):
             redis_client=redis_client,
             prefix=prefix,
             default_ttl=default_ttl,
-            local_cache_size=local_cache_size
+            local_cache_size=local_cache_size,
+            invalidation_bus=invalidation_bus
         )
 
         # Inicializar o cache Redis
@@ -299,6 +304,10 @@ class TwoLevelCache(BaseTool):
         
         # O local_cache já foi definido como campo da classe
         # Não precisamos redefinir o local_cache_size pois já foi inicializado pelo super().__init__
+        
+        # Receber invalidações feitas por outros processos
+        if self.invalidation_bus:
+            self.invalidation_bus.add_listener(self._apply_remote_invalidation)
     
     def _run(self, action: str, key: str, value: str = None, ttl: int = None) -> str:
         """
@@ -352,6 +361,28 @@ class TwoLevelCache(BaseTool):
         else:
             return f"Unknown action '{action}'. Supported actions: get, set, delete, clear"
     
+    def _apply_remote_invalidation(self, keys, prefixes):
+        """Drop local entries invalidated by another process."""
+        for key in keys:
+            self.local_cache.pop(key, None)
+        for prefix in prefixes:
+            for key in [k for k in self.local_cache if k.startswith(prefix)]:
+                self.local_cache.pop(key, None)
+        
+        if keys or prefixes:
+            self.redis_cache.cached_get.cache_clear()
+    
+    def close(self):
+        """
+        Stop receiving invalidations from the shared bus.
+        
+        The bus is shared by the whole process, so it keeps a reference to
+        every registered cache until its listener is removed.
+        """
+        if self.invalidation_bus:
+            self.invalidation_bus.remove_listener(self._apply_remote_invalidation)
+            self.invalidation_bus.flush()
+    
     def _clean_expired_local(self):
         """Clean expired entries from the local cache."""
         now = time.time()
@@ -448,6 +479,10 @@ class TwoLevelCache(BaseTool):
             
             # Enforce size limit
             self._enforce_local_size()
+            
+            # Invalidate stale copies held by other processes
+            if self.invalidation_bus:
+                self.invalidation_bus.publish_key(key, source=self._apply_remote_invalidation)
         
         return success
     
@@ -465,6 +500,10 @@ class TwoLevelCache(BaseTool):
         if key in self.local_cache:
             del self.local_cache[key]
         
+        # Propagate to the local caches of other processes
+        if self.invalidation_bus:
+            self.invalidation_bus.publish_key(key, source=self._apply_remote_invalidation)
+        
         # Delete from Redis
         return self.redis_cache.delete(key)
     
@@ -491,6 +530,11 @@ class TwoLevelCache(BaseTool):
             # Clear all if no prefix specified
             self.local_cache.clear()
         
+        # Propagate to the local caches of other processes (an empty prefix
+        # would wipe every cache on the channel, so clear-all stays local)
+        if self.invalidation_bus and (prefix or self.prefix):
+            self.invalidation_bus.publish_prefix(prefix or self.prefix, source=self._apply_remote_invalidation)
+        
         # Clear from Redis
         return self.redis_cache.clear_prefix(prefix)
     
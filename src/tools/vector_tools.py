@@ -6,12 +6,12 @@ This module implements tools for semantic search using Qdrant vector database.
 
 import logging
 from typing import Dict, List, Any, Optional
-import numpy as np
 from qdrant_client import QdrantClient
 from qdrant_client.http.models import Filter, FieldCondition, MatchValue
-from openai import OpenAI
 from crewai.tools.base_tool import BaseTool
 
+from src.services.embedding_service import EmbeddingService, get_embedding_service
+
 logger = logging.getLogger(__name__)
 
 
@@ -31,11 +31,11 @@ class QdrantVectorSearchTool(BaseTool):
     openai_api_key: Optional[str] = None
     embedding_model: str = "text-embedding-3-small"  # Modelo mais econômico da OpenAI
     top_k: int = 5
+    tenant_id: Optional[str] = None
     
     # Campos adicionais que serão inicializados no __init__
     qdrant_client: Any = None
-    openai_client: Any = None
-    embedding_cache: Dict[str, List[float]] = {}
+    embedding_service: Any = None
     
     def __init__(self, 
                  qdrant_url: str, 
@@ -43,7 +43,9 @@ class QdrantVectorSearchTool(BaseTool):
                  collection_name: str = "default",
                  openai_api_key: Optional[str] = None,
                  embedding_model: str = "text-embedding-3-small",  # Modelo mais econômico da OpenAI
-                 top_k: int = 5):
+                 top_k: int = 5,
+                 tenant_id: Optional[str] = None,
+                 embedding_service: Optional[EmbeddingService] = None):
         """
         Initialize the Qdrant vector search tool.
         
@@ -51,16 +53,21 @@ class QdrantVectorSearchTool(BaseTool):
             qdrant_url: URL of the Qdrant server
             qdrant_api_key: API key for Qdrant (optional)
             collection_name: Name of the collection to search
-            openai_api_key: API key for OpenAI (for generating embeddings)
-            embedding_model: Name of the embedding model to use
+            openai_api_key: Kept for compatibility; the shared embedding service
+                reads its credentials from the environment
+            embedding_model: Kept for compatibility (same as openai_api_key)
             top_k: Number of results to return
+            tenant_id: Tenant whose embedding backend should be used
+            embedding_service: Embedding service to use (defaults to the
+                shared service of the tenant, so the cache is shared too)
         """
         super().__init__(qdrant_url=qdrant_url,
                          qdrant_api_key=qdrant_api_key,
                          collection_name=collection_name,
                          openai_api_key=openai_api_key,
                          embedding_model=embedding_model,
-                         top_k=top_k)
+                         top_k=top_k,
+                         tenant_id=tenant_id)
         
         # Initialize Qdrant client
         self.qdrant_client = QdrantClient(
@@ -68,8 +75,8 @@ class QdrantVectorSearchTool(BaseTool):
             api_key=qdrant_api_key
         )
         
-        # Initialize OpenAI client for embeddings
-        self.openai_client = OpenAI(api_key=openai_api_key)
+        # Embeddings come from the same service (backend, cache and batcher) used by the rest of the system
+        self.embedding_service = embedding_service or get_embedding_service(tenant_id)
     
     def generate_embedding(self, text: str) -> List[float]:
         """
@@ -80,17 +87,12 @@ class QdrantVectorSearchTool(BaseTool):
             
         Returns:
             The embedding as a list of floats
+            
+        Raises:
+            Exception: If the embedding could not be generated (a zero vector
+                would silently match arbitrary documents)
         """
-        try:
-            response = self.openai_client.embeddings.create(
-                input=text,
-                model=self.embedding_model
-            )
-            return response.data[0].embedding
-        except Exception as e:
-            logger.error(f"Error generating embedding: {e}")
-            # Return empty embedding in case of error
-            return [0.0] * 1536  # text-embedding-3-small também usa 1536 dimensões
+        return self.embedding_service.get_embedding(text)
     
     def _run(self, query: str, filter_conditions: Optional[Dict[str, Any]] = None, top_k: Optional[int] = None) -> str:
         """
@@ -158,16 +160,17 @@ class QdrantVectorSearchTool(BaseTool):
                 search_filter = Filter(must=filter_clauses)
             
             # Perform the search
-            results = self.qdrant_client.search(
+            response = self.qdrant_client.query_points(
                 collection_name=self.collection_name,
-                query_vector=query_embedding,
+                query=query_embedding,
                 limit=top_k or self.top_k,
-                filter=search_filter
+                query_filter=search_filter,
+                with_payload=True
             )
             
             # Format results
             formatted_results = []
-            for result in results:
+            for result in response.points:
                 formatted_results.append({
                     "score": result.score,
                     "payload": result.payload,
@@ -238,17 +241,18 @@ class QdrantVectorSearchTool(BaseTool):
             logger.error(f"Error deleting document from Qdrant: {e}")
             return False
     
-    def create_collection_if_not_exists(self, vector_size: int = 1536) -> bool:
+    def create_collection_if_not_exists(self, vector_size: Optional[int] = None) -> bool:
         """
         Create the collection if it doesn't exist.
         
         Args:
-            vector_size: Size of the embedding vectors. O valor padrão 1536 é o tamanho 
-                         utilizado pelo modelo text-embedding-3-small da OpenAI.
+            vector_size: Size of the embedding vectors. Se não fornecido, usa a dimensão
+                         do backend de embeddings (1536 para text-embedding-3-small da OpenAI).
             
         Returns:
             True if successful, False otherwise
         """
+        vector_size = vector_size or self.embedding_service.dimension or 1536
         try:
             collections = self.qdrant_client.get_collections().collections
             collection_names = [collection.name for collection in collections]
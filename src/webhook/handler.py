@@ -5,6 +5,7 @@ Este módulo implementa o handler do webhook do Chatwoot, processando as mensage
 recebidas e encaminhando-as para o sistema de agentes.
 """
 
+import os
 import logging
 import json
 from typing import Dict, Any, Optional
@@ -15,6 +16,7 @@ import traceback
 from src.core.hub import HubCrew
 from src.core.memory import MemorySystem
 from src.core.data_service_hub import DataServiceHub
+from src.core.async_processing import BlockingCallExecutor
 from src.api.chatwoot.legacy_client import ChatwootClient
 from src.core.domain import DomainManager
 from src.plugins.core.plugin_manager import PluginManager
@@ -35,6 +37,10 @@ class ChatwootWebhookHandler:
     4. Normaliza os dados para formato interno
     5. Encaminha para o HubCrew para processamento
     6. Retorna a resposta para o Chatwoot
+    
+    O HubCrew e o sistema de memória são síncronos (Redis, psycopg2, LLM).
+    Essas chamadas são executadas em um executor limitado, para que uma
+    mensagem lenta não bloqueie o event loop e os demais webhooks do worker.
     """
     
     def __init__(self, config: Dict[str, Any] = None):
@@ -46,6 +52,14 @@ class ChatwootWebhookHandler:
         """
         self.config = config or {}
         
+        # Executor limitado para o trabalho síncrono das crews (concorrência por worker)
+        self.crew_executor = BlockingCallExecutor(
+            max_concurrency=int(self.config.get(
+                "crew_concurrency", os.getenv("CREW_MAX_CONCURRENCY", "8")
+            )),
+            thread_name_prefix="webhook-crew"
+        )
+        
         # Inicializa o cliente do Chatwoot
         self.chatwoot_client = ChatwootClient(
             api_key=self.config.get("chatwoot_api_key", ""),
@@ -176,9 +190,9 @@ class ChatwootWebhookHandler:
             if event_type == "message_created":
                 result = await self._process_message_created(webhook_data)
             elif event_type == "conversation_created":
-                result = self._process_conversation_created(webhook_data)
+                result = await self.crew_executor.run(self._process_conversation_created, webhook_data)
             elif event_type == "conversation_status_changed":
-                result = self._process_conversation_status_changed(webhook_data)
+                result = await self.crew_executor.run(self._process_conversation_status_changed, webhook_data)
             else:
                 logger.warning(f"Tipo de evento desconhecido: {event_type}")
                 result = {"status": "ignored", "reason": f"Unsupported event type: {event_type}"}
@@ -200,7 +214,8 @@ class ChatwootWebhookHandler:
                 "messages_received": self.stats["messages_received"],
                 "messages_processed": self.stats["messages_processed"],
                 "response_time_avg": f"{self.stats['response_time_avg']:.3f}s",
-                "errors": self.stats["errors"]
+                "errors": self.stats["errors"],
+                "crew_executor": self.crew_executor.stats()
             }
             
             return result
@@ -274,8 +289,9 @@ class ChatwootWebhookHandler:
         
         # Processa a mensagem com o HubCrew
         try:
-            # Processar a mensagem pelo HubCrew
-            hub_result = self.hub_crew.process_message(
+            # Processar a mensagem pelo HubCrew fora do event loop
+            hub_result = await self.crew_executor.run(
+                self.hub_crew.process_message,
                 message=normalized_message,
                 conversation_id=conversation_id,
                 channel_type=channel_type
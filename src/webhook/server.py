@@ -10,8 +10,9 @@ import sys
 import logging
 import json
 import uvicorn
-from fastapi import FastAPI, Request, HTTPException, Depends
+from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
 from typing import Dict, Any, List, Optional
 from datetime import datetime
@@ -38,6 +39,8 @@ instance_manager = MultiInstanceManager()
 from src.api.chatwoot.client import ChatwootWebhookHandler, ChatwootClient
 from src.core.hub import HubCrew  # Importa HubCrew do core.hub em vez de crews.hub_crew
 from src.core.crew_registry import CrewRegistry
+from src.core.async_processing import AsyncTaskProcessor, BlockingCallExecutor, MessageQueue
+from src.core.cache.agent_cache import stable_hash
 
 # Cria a aplicação FastAPI
 app = FastAPI(title="Chatwoot Webhook Server", description="Servidor para receber webhooks do Chatwoot")
@@ -55,6 +58,68 @@ app.add_middleware(
 crew_registry = None
 webhook_handler = None
 
+# Executor limitado para o processamento síncrono das crews, mantendo o event loop livre
+# (concorrência por worker configurável via CREW_MAX_CONCURRENCY)
+crew_executor = BlockingCallExecutor(thread_name_prefix="webhook-crew")
+
+# Modo assíncrono: o endpoint apenas valida, persiste o evento na fila e responde 202;
+# os processos worker (src/webhook/worker.py) consomem a fila e respondem ao Chatwoot
+WEBHOOK_ASYNC_MODE = os.getenv('WEBHOOK_ASYNC_MODE', 'true').lower() == 'true'
+WEBHOOK_QUEUE_PREFIX = os.getenv('WEBHOOK_QUEUE_PREFIX', 'webhook_task')
+WEBHOOK_IDEMPOTENCY_TTL = int(os.getenv('WEBHOOK_IDEMPOTENCY_TTL', '86400'))
+message_queue = None
+
+def get_message_queue() -> MessageQueue:
+    """
+    Obtém a fila de eventos de webhook (criada sob demanda).
+    
+    Returns:
+        MessageQueue: Fila usada pelo endpoint e pelos workers
+    """
+    global message_queue
+    if message_queue is None:
+        from redis import Redis
+        redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+        logger.info(f"Conectando a fila de webhooks ao Redis: {redis_url}")
+        processor = AsyncTaskProcessor(
+            redis_client=Redis.from_url(redis_url, decode_responses=True),
+            queue_prefix=WEBHOOK_QUEUE_PREFIX
+        )
+        message_queue = MessageQueue(processor)
+    return message_queue
+
+def get_idempotency_key(data: Dict[str, Any]) -> Optional[str]:
+    """
+    Extrai a chave de idempotência de um evento do Chatwoot.
+    
+    Para eventos de mensagem, usa o ID da mensagem no Chatwoot, de modo que
+    reentregas do mesmo evento sejam descartadas. Em message_updated a chave
+    inclui a data de atualização (ou o hash do conteúdo), para que edições
+    legítimas da mesma mensagem não sejam descartadas como reentregas.
+    
+    Args:
+        data: Payload do webhook
+        
+    Returns:
+        Chave de idempotência ou None se o evento não tiver ID de mensagem
+    """
+    event_type = data.get('event')
+    if event_type not in ('message_created', 'message_updated'):
+        return None
+    message = data.get('message') or {}
+    message_id = message.get('id') or data.get('id')
+    if message_id is None:
+        return None
+    if event_type == 'message_created':
+        return f"{event_type}:{message_id}"
+    version = message.get('updated_at') or data.get('updated_at')
+    if version is None:
+        version = stable_hash({
+            'content': message.get('content', data.get('content')),
+            'attributes': message.get('content_attributes', data.get('content_attributes'))
+        })
+    return f"{event_type}:{message_id}:{version}"
+
 def get_webhook_handler():
     """
     Obtém o handler de webhook.
@@ -175,7 +240,12 @@ async def startup_event():
     Evento executado na inicialização do servidor.
     """
     logger.info("Iniciando servidor webhook...")
-    initialize_crews()
+    if WEBHOOK_ASYNC_MODE:
+        # As crews rodam nos processos worker; aqui só precisamos da fila
+        get_message_queue()
+        logger.info("Modo assíncrono: eventos serão enfileirados para os workers")
+    else:
+        initialize_crews()
     
     # Obtém informações do ambiente para exibir a URL do webhook
     webhook_domain = os.getenv('WEBHOOK_DOMAIN', 'localhost')
@@ -228,12 +298,13 @@ async def health_check():
         "timestamp": datetime.now().isoformat(),
         "service": "webhook_server",
         "version": "1.0.0",
-        "instances": len(instance_manager.instances) if hasattr(instance_manager, 'instances') else 1
+        "instances": len(instance_manager.instances) if hasattr(instance_manager, 'instances') else 1,
+        "crew_executor": crew_executor.stats()
     }
 
 @app.post("/webhook")
 @log_function_call(level=TRACE)
-async def webhook(request: Request, handler: ChatwootWebhookHandler = Depends(get_webhook_handler)):
+async def webhook(request: Request):
     """
     Endpoint para receber webhooks do Chatwoot.
     
@@ -244,16 +315,17 @@ async def webhook(request: Request, handler: ChatwootWebhookHandler = Depends(ge
     O fluxo de processamento é:
     1. Verificar o token de autenticação
     2. Receber os dados JSON do webhook
-    3. Identificar o tipo de evento (message_created, conversation_created, etc.)
-    4. Encaminhar para o handler apropriado
-    5. Processar o evento e retornar uma resposta
+    3. No modo assíncrono (padrão): descartar reentregas da mesma mensagem,
+       persistir o evento na fila e responder 202 imediatamente
+    4. No modo síncrono (WEBHOOK_ASYNC_MODE=false): encaminhar para o handler
+       e responder com o resultado do processamento
     
     Args:
         request: Requisição HTTP contendo os dados do webhook
-        handler: Handler de webhook que processa os diferentes tipos de eventos
         
     Returns:
-        Resposta do processamento do webhook
+        202 com o ID da tarefa (modo assíncrono), 200 para reentregas
+        duplicadas, ou a resposta do processamento (modo síncrono)
         
     Raises:
         HTTPException: Se ocorrer um erro durante o processamento ou autenticação falhar
@@ -335,13 +407,41 @@ async def webhook(request: Request, handler: ChatwootWebhookHandler = Depends(ge
         #   }
         # }
         
+        if WEBHOOK_ASYNC_MODE:
+            idempotency_key = get_idempotency_key(data)
+            try:
+                task_id = get_message_queue().enqueue_webhook_event(
+                    data,
+                    idempotency_key=idempotency_key,
+                    idempotency_ttl=WEBHOOK_IDEMPOTENCY_TTL
+                )
+            except Exception as e:
+                # Sem persistência não confirmamos o recebimento: o Chatwoot fará nova tentativa
+                logger.error(f"Erro ao enfileirar webhook {event_type}: {e}")
+                raise HTTPException(status_code=503, detail="Fila de processamento indisponível")
+            
+            if task_id is None:
+                return JSONResponse(
+                    status_code=200,
+                    content={"status": "duplicate", "idempotency_key": idempotency_key}
+                )
+            
+            logger.info(f"Webhook {event_type} enfileirado como tarefa {task_id}")
+            return JSONResponse(
+                status_code=202,
+                content={"status": "accepted", "task_id": task_id, "event": event_type}
+            )
+        
+        handler = get_webhook_handler()
+        
         # Marca o início do processamento para medir performance
         start_time = datetime.now()
         
         # Processa o webhook usando o handler apropriado
         # O handler.handle_webhook irá direcionar para o método específico
-        # com base no tipo de evento (ex: _handle_message_created)
-        response = handler.handle_webhook(data)
+        # com base no tipo de evento (ex: _handle_message_created).
+        # O handler é síncrono, então roda no executor para não bloquear o event loop
+        response = await crew_executor.run(handler.handle_webhook, data)
         
         # Calcula e registra o tempo de processamento
         processing_time = (datetime.now() - start_time).total_seconds()
@@ -0,0 +1,144 @@
+"""
+Worker de processamento de webhooks do Chatwoot.
+
+O servidor webhook (src/webhook/server.py) apenas valida e persiste os eventos
+na fila, respondendo 202 imediatamente. Este processo consome a fila, executa
+as crews e envia as respostas ao Chatwoot. Vários workers podem rodar em
+paralelo, em um ou mais nós, consumindo a mesma fila.
+
+A ordem dos eventos de uma mesma conversa (e o agrupamento de rajadas) só é
+garantida dentro de um processo: com vários workers na mesma fila, eventos
+de uma conversa podem ser consumidos por processos diferentes. Quando a
+ordem importa, rode um único worker por fila.
+
+Uso:
+    python -m src.webhook.worker
+"""
+
+import os
+import sys
+import signal
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+# Adiciona o diretório raiz ao path para importar os módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.core.async_processing import KeyedTaskScheduler, WEBHOOK_TASK_TYPE
+from src.webhook.server import get_message_queue, get_webhook_handler
+
+logger = logging.getLogger(__name__)
+
+# Janela (segundos) para agrupar rajadas de mensagens da mesma conversa; 0 desativa
+WEBHOOK_COALESCE_WINDOW = float(os.getenv('WEBHOOK_COALESCE_WINDOW', '0'))
+WEBHOOK_COALESCE_MAX = int(os.getenv('WEBHOOK_COALESCE_MAX', '10'))
+
+
+def get_conversation_key(event: Dict[str, Any]) -> Optional[str]:
+    """
+    Extrai o ID da conversa do Chatwoot de um evento de webhook.
+
+    Args:
+        event: Payload do webhook
+
+    Returns:
+        ID da conversa, ou None se o evento não pertencer a uma conversa
+    """
+    conversation = event.get("conversation") or {}
+    conversation_id = conversation.get("id")
+    return str(conversation_id) if conversation_id is not None else None
+
+
+def is_incoming_message(event: Dict[str, Any]) -> bool:
+    """Indica se o evento é uma mensagem recebida do cliente."""
+    message = event.get("message") or {}
+    return event.get("event") == "message_created" and message.get("message_type") == "incoming"
+
+
+def merge_message_events(events: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Combina uma rajada de mensagens recebidas da mesma conversa em um único evento.
+
+    O evento resultante é o último da rajada, com o conteúdo de todas as
+    mensagens (em event["message"]) concatenado em ordem, para que a crew
+    responda uma única vez.
+
+    Args:
+        events: Eventos message_created da mesma conversa, em ordem de chegada
+
+    Returns:
+        Evento combinado
+    """
+    messages = [e.get("message") or {} for e in events]
+    merged = dict(events[-1])
+    merged["message"] = {
+        **messages[-1],
+        "content": "\n".join(m["content"] for m in messages if m.get("content")),
+        "coalesced_message_ids": [m.get("id") for m in messages]
+    }
+    return merged
+
+
+async def run_worker():
+    """
+    Consome a fila de webhooks até receber SIGINT/SIGTERM.
+    """
+    handler = get_webhook_handler()
+    processor = get_message_queue().processor
+
+    # Eventos da mesma conversa são processados em ordem; conversas diferentes
+    # rodam em paralelo (até TASK_WORKER_CONCURRENCY eventos simultâneos).
+    # Eventos esperando atrás da própria conversa não ocupam vaga de concorrência.
+    # O handler é síncrono (crews, Redis, psycopg2, LLM) e roda em threads.
+    def process_conversation_events(conversation_id: str, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if len(events) > 1 and all(is_incoming_message(e) for e in events):
+            logger.info(f"Agrupando {len(events)} mensagens da conversa {conversation_id}")
+            return [handler.handle_webhook(merge_message_events(events))]
+        return [handler.handle_webhook(event) for event in events]
+
+    scheduler = KeyedTaskScheduler(
+        process_conversation_events,
+        coalesce_window=WEBHOOK_COALESCE_WINDOW,
+        max_batch_size=WEBHOOK_COALESCE_MAX
+    )
+
+    async def process_webhook_event(payload: Dict[str, Any]) -> Any:
+        event = payload["event"]
+        conversation_id = get_conversation_key(event)
+        if conversation_id is None:
+            return await asyncio.to_thread(handler.handle_webhook, event)
+        async with processor.released_slot() as slots:
+            return await scheduler.submit(conversation_id, event, limiter=slots)
+
+    processor.register_handler(WEBHOOK_TASK_TYPE, process_webhook_event)
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, processor.stop)
+        except NotImplementedError:
+            # Windows não suporta add_signal_handler
+            pass
+
+    logger.info(
+        f"Worker de webhooks iniciado (fila: {processor.queue_prefix}, "
+        f"consumidor: {processor.consumer_name}, concorrência: {processor.concurrency})"
+    )
+    try:
+        await processor.process_tasks()
+    finally:
+        stats = processor.get_worker_stats()
+        logger.info(f"Worker de webhooks encerrado ({stats['processed']} eventos processados)")
+
+
+def main():
+    """
+    Função principal para iniciar o worker.
+    """
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run_worker())
+
+
+if __name__ == "__main__":
+    main()
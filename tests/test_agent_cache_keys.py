@@ -0,0 +1,60 @@
+"""
+Testes unitários para a geração de chaves do RedisAgentCache.
+"""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock
+
+from src.core.cache.agent_cache import RedisAgentCache, stable_hash
+
+project_root = Path(__file__).resolve().parent.parent
+
+
+def test_stable_hash_ignores_volatile_fields_and_key_order():
+    first = json.dumps({"message": {"id": 1, "content": "oi", "timestamp": "t1"}, "context": {"a": 1, "b": 2}})
+    second = json.dumps({"context": {"b": 2, "a": 1}, "message": {"content": "oi", "id": 2, "timestamp": "t2"}})
+    third = json.dumps({"message": {"id": 1, "content": "olá"}, "context": {"a": 1, "b": 2}})
+
+    assert stable_hash(first) == stable_hash(second)
+    assert stable_hash(first) != stable_hash(third)
+
+
+def test_stable_hash_is_process_independent():
+    code = "from src.core.cache.agent_cache import stable_hash; print(stable_hash('{\"content\": \"preço\"}'))"
+    digests = set()
+    for seed in ("1", "2"):
+        env = {**os.environ, "PYTHONHASHSEED": seed}
+        output = subprocess.run(
+            [sys.executable, "-c", code], cwd=project_root, env=env,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+        digests.add(output.splitlines()[-1])
+
+    assert digests == {stable_hash('{"content": "preço"}')}
+
+
+def test_hit_rate_per_agent():
+    redis_client = MagicMock()
+    redis_client.get.side_effect = [json.dumps({"crew": "sales"}), None]
+    cache = RedisAgentCache(redis_client=redis_client)
+
+    assert cache.get("hub", '{"content": "oi"}') == {"crew": "sales"}
+    assert cache.get("hub", '{"content": "tchau"}') is None
+
+    stats = cache.get_stats("hub")
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_stable_hash_keeps_nested_entity_ids():
+    first = {"message": {"id": 1, "content": "status"}, "context": {"order": {"id": 10}}}
+    second = {"message": {"id": 2, "content": "status"}, "context": {"order": {"id": 11}}}
+
+    # O id da mensagem é volátil; o id do pedido faz parte do conteúdo
+    assert stable_hash(first) != stable_hash(second)
+    assert stable_hash(first) == stable_hash({**second, "context": {"order": {"id": 10}}})
@@ -0,0 +1,339 @@
+"""
+Testes unitários para os componentes de processamento assíncrono.
+"""
+
+import asyncio
+import json
+import threading
+import time
+
+from src.core.async_processing import BlockingCallExecutor
+
+
+def test_blocking_executor_keeps_event_loop_free_and_bounds_concurrency():
+    executor = BlockingCallExecutor(max_concurrency=2)
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def slow_call(value):
+        with lock:
+            running.append(value)
+            peak.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.remove(value)
+        return value * 2
+
+    async def main():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        ticker_task = asyncio.create_task(ticker())
+        results = await asyncio.gather(*(executor.run(slow_call, i) for i in range(4)))
+        ticker_task.cancel()
+        return results, ticks
+
+    results, ticks = asyncio.run(main())
+    executor.shutdown()
+
+    assert results == [0, 2, 4, 6]
+    assert max(peak) <= 2
+    # O event loop continuou rodando enquanto as chamadas bloqueantes executavam
+    assert ticks > 5
+
+
+
+def test_blocking_executor_runs_calls_in_caller_context():
+    from contextvars import ContextVar
+
+    request_id = ContextVar("request_id", default=None)
+    executor = BlockingCallExecutor(max_concurrency=1)
+
+    async def main():
+        request_id.set("r1")
+        return await executor.run(request_id.get)
+
+    assert asyncio.run(main()) == "r1"
+    executor.shutdown()
+
+def test_webhook_event_idempotency_drops_duplicate_deliveries():
+    from unittest.mock import MagicMock
+    from src.core.async_processing import AsyncTaskProcessor, MessageQueue
+
+    redis_client = MagicMock()
+    # SET NX: primeira entrega grava a chave, a reentrega encontra a chave existente
+    redis_client.set.side_effect = [True, None]
+    queue = MessageQueue(AsyncTaskProcessor(redis_client, queue_prefix="test_webhook"))
+
+    event = {"event": "message_created", "id": 42}
+    first = queue.enqueue_webhook_event(event, idempotency_key="message_created:42")
+    second = queue.enqueue_webhook_event(event, idempotency_key="message_created:42")
+
+    assert first is not None
+    assert second is None
+    redis_client.set.assert_any_call(
+        "test_webhook:idempotency:message_created:42", "1", nx=True, ex=86400
+    )
+
+
+def _stream_processor(redis_client, **kwargs):
+    from src.core.async_processing import AsyncTaskProcessor
+
+    pipe = redis_client.pipeline.return_value
+    pipe.execute.return_value = []
+    redis_client.register_script.return_value = lambda keys, args: []
+    return AsyncTaskProcessor(redis_client, queue_prefix="test_stream", block_ms=10, **kwargs)
+
+
+def test_enqueue_routes_task_to_priority_lane_in_one_round_trip():
+    from unittest.mock import MagicMock
+
+    redis_client = MagicMock()
+    processor = _stream_processor(redis_client)
+    pipe = redis_client.pipeline.return_value
+
+    task_id = processor.enqueue_task("job", {"x": 1}, priority="URGENT")
+
+    lane, fields = pipe.xadd.call_args[0]
+    assert lane == "test_stream:stream:urgent"
+    assert json.loads(fields["task"])["id"] == task_id
+    pipe.set.assert_called_once()
+    pipe.execute.assert_called_once()
+
+
+def _stream_entry(task_id):
+    task = {"id": task_id, "type": "job", "payload": {"id": task_id}, "priority": 0, "attempts": 0}
+    return (f"{task_id}-0", {"task": json.dumps(task)})
+
+
+def test_stream_batch_runs_higher_priority_first_and_acks_entries():
+    from unittest.mock import MagicMock
+
+    redis_client = MagicMock()
+    processor = _stream_processor(redis_client, reclaim_interval=3600, concurrency=1)
+    processor._last_reclaim = time.monotonic()
+    pipe = redis_client.pipeline.return_value
+
+    calls = []
+
+    def read_batch(*args, **kwargs):
+        if calls:
+            processor.stop()
+            return []
+        calls.append(1)
+        return [
+            ["test_stream:stream:low", [_stream_entry("1")]],
+            ["test_stream:stream:urgent", [_stream_entry("2")]],
+        ]
+
+    redis_client.xreadgroup.side_effect = read_batch
+    order = []
+    processor.register_handler("job", lambda payload: order.append(payload["id"]))
+
+    asyncio.run(processor.process_tasks())
+
+    assert order == ["2", "1"]
+    pipe.xack.assert_any_call("test_stream:stream:urgent", "test_stream:workers", "2-0")
+    pipe.xack.assert_any_call("test_stream:stream:low", "test_stream:workers", "1-0")
+
+
+def test_worker_bounds_concurrency_and_drains_on_stop():
+    from unittest.mock import MagicMock
+
+    redis_client = MagicMock()
+    processor = _stream_processor(redis_client, reclaim_interval=3600, concurrency=3)
+    processor._last_reclaim = time.monotonic()
+
+    reads = []
+
+    def read_batch(*args, **kwargs):
+        reads.append(kwargs["count"])
+        if len(reads) > 1:
+            processor.stop()
+            return []
+        return [["test_stream:stream:normal", [_stream_entry(str(i)) for i in range(6)]]]
+
+    redis_client.xreadgroup.side_effect = read_batch
+    running = []
+    peak = []
+    done = []
+
+    async def handler(payload):
+        running.append(payload["id"])
+        peak.append(len(running))
+        await asyncio.sleep(0.02)
+        running.remove(payload["id"])
+        done.append(payload["id"])
+
+    processor.register_handler("job", handler)
+    asyncio.run(processor.process_tasks())
+
+    # Só são pedidas tantas entradas quanto slots livres
+    assert reads[0] == 3
+    assert max(peak) == 3
+    # stop() aguarda as tarefas em execução terminarem
+    assert sorted(done) == [str(i) for i in range(6)]
+    stats = processor.get_worker_stats()
+    assert stats["processed"] == 6
+    assert stats["task_types"]["job"]["latency"]["count"] == 6
+    assert stats["task_types"]["job"]["queue_wait"]["count"] == 6
+
+
+def test_keyed_scheduler_orders_per_key_and_runs_keys_in_parallel():
+    from src.core.async_processing import KeyedTaskScheduler
+
+    calls = []
+    running = set()
+    overlap = []
+
+    async def handler(key, items):
+        running.add(key)
+        overlap.append(len(running))
+        await asyncio.sleep(0.01)
+        calls.append((key, items))
+        running.discard(key)
+        return items
+
+    scheduler = KeyedTaskScheduler(handler)
+
+    async def main():
+        return await asyncio.gather(
+            scheduler.submit("a", 1), scheduler.submit("b", 1),
+            scheduler.submit("a", 2), scheduler.submit("a", 3)
+        )
+
+    results = asyncio.run(main())
+
+    assert results == [[1], [1], [2], [3]]
+    assert [items for key, items in calls if key == "a"] == [[1], [2], [3]]
+    # Chaves diferentes rodaram ao mesmo tempo
+    assert max(overlap) == 2
+    assert scheduler.stats()["active_keys"] == 0
+
+
+def test_keyed_scheduler_coalesces_bursts():
+    from src.core.async_processing import KeyedTaskScheduler
+
+    calls = []
+
+    def handler(key, items):
+        calls.append(list(items))
+        return len(items)
+
+    scheduler = KeyedTaskScheduler(handler, coalesce_window=0.02, max_batch_size=5)
+
+    async def main():
+        return await asyncio.gather(*(scheduler.submit(42, i) for i in range(3)))
+
+    assert asyncio.run(main()) == [3, 3, 3]
+    assert calls == [[0, 1, 2]]
+    assert scheduler.stats()["coalesced_items"] == 3
+
+
+def test_delayed_tasks_are_moved_by_a_single_script_call():
+    from unittest.mock import MagicMock
+    from src.core.async_processing import AsyncTaskProcessor
+
+    redis_client = MagicMock()
+    processor = AsyncTaskProcessor(redis_client, queue_prefix="test_delayed")
+    move_due = redis_client.register_script.return_value
+    move_due.return_value = 2
+
+    assert processor._move_delayed_tasks() == 2
+
+    # Remoção do zset e inclusão nas filas acontecem no mesmo script, sem outro round-trip
+    move_due.assert_called_once()
+    keys = move_due.call_args.kwargs["keys"]
+    assert keys[0] == "test_delayed:delayed"
+    assert keys[1:] == ["test_delayed:stream:low", "test_delayed:stream:normal",
+                        "test_delayed:stream:high", "test_delayed:stream:urgent"]
+    assert move_due.call_args.kwargs["args"][2] == "test_delayed:task:"
+    redis_client.pipeline.assert_not_called()
+    redis_client.mget.assert_not_called()
+
+
+def test_items_waiting_behind_their_key_do_not_hold_a_worker_slot():
+    from unittest.mock import MagicMock
+    from src.core.async_processing import AsyncTaskProcessor, KeyedTaskScheduler
+
+    processor = AsyncTaskProcessor(MagicMock(), queue_prefix="test_keyed", concurrency=2)
+    running = []
+    peak = []
+
+    async def handler(key, items):
+        running.append(key)
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.remove(key)
+        return items
+
+    scheduler = KeyedTaskScheduler(handler)
+
+    async def process(key, item):
+        # Como _process_entry: cada entrada ocupa uma vaga enquanto roda
+        await processor._slots.acquire()
+        try:
+            async with processor.released_slot() as slots:
+                return await scheduler.submit(key, item, limiter=slots)
+        finally:
+            processor._slots.release()
+
+    async def main():
+        processor._slots = asyncio.Semaphore(processor.concurrency)
+        # Duas entradas da conversa "a" ocupariam as duas vagas; "b" não pode ficar bloqueada
+        results = await asyncio.wait_for(asyncio.gather(
+            process("a", 1), process("a", 2), process("b", 1)
+        ), timeout=1)
+        return results, processor._slots._value
+
+    results, free_slots = asyncio.run(main())
+
+    assert results == [[1], [2], [1]]
+    assert max(peak) <= 2 and free_slots == 2
+
+
+def test_running_entries_are_renewed_and_redis_calls_stay_off_the_event_loop():
+    from unittest.mock import MagicMock
+
+    redis_client = MagicMock()
+    processor = _stream_processor(redis_client, reclaim_interval=0, concurrency=1, heartbeat_interval=0.01)
+    pipe = redis_client.pipeline.return_value
+    loop_thread = threading.current_thread()
+    redis_threads = set()
+
+    def execute(*args, **kwargs):
+        redis_threads.add(threading.current_thread())
+        return []
+
+    pipe.execute.side_effect = execute
+    redis_client.xautoclaim.side_effect = lambda *args, **kwargs: redis_threads.add(threading.current_thread())
+
+    reads = []
+
+    def read_batch(*args, **kwargs):
+        redis_threads.add(threading.current_thread())
+        reads.append(1)
+        if len(reads) > 1:
+            processor.stop()
+            return []
+        return [["test_stream:stream:normal", [_stream_entry("1")]]]
+
+    redis_client.xreadgroup.side_effect = read_batch
+
+    async def handler(payload):
+        # Mais longo que vários intervalos de heartbeat
+        await asyncio.sleep(0.08)
+
+    processor.register_handler("job", handler)
+    asyncio.run(processor.process_tasks())
+
+    pipe.xclaim.assert_any_call("test_stream:stream:normal", "test_stream:workers", processor.consumer_name,
+                                min_idle_time=0, message_ids=["1-0"], justid=True)
+    assert loop_thread not in redis_threads
+    assert processor._in_flight == {"test_stream:stream:normal": set()}
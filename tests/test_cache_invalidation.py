@@ -0,0 +1,123 @@
+"""
+Testes unitários para o barramento de invalidação de cache entre processos.
+"""
+
+from unittest.mock import MagicMock
+
+from src.core.cache import invalidation
+from src.core.cache.invalidation import CacheInvalidationBus, get_invalidation_bus
+
+
+def _deliver(redis_client, bus):
+    """Entrega a bus todas as mensagens publicadas em redis_client."""
+    for call in redis_client.publish.call_args_list:
+        channel, data = call.args
+        if channel == bus.channel:
+            bus._on_message({"data": data.encode("utf-8")})
+
+
+def test_published_invalidation_reaches_listeners_of_other_process():
+    redis_client = MagicMock()
+    publisher = CacheInvalidationBus(redis_client, channel="cache:test")
+    receiver = CacheInvalidationBus(redis_client, channel="cache:test")
+    listener = MagicMock()
+    receiver.add_listener(listener)
+
+    # Sem thread de flush, a publicação é síncrona
+    publisher.publish_key("produto:1")
+    publisher.publish_prefix("regras:")
+    _deliver(redis_client, receiver)
+
+    assert redis_client.publish.call_count == 2
+    listener.assert_any_call(["produto:1"], [])
+    listener.assert_any_call([], ["regras:"])
+
+
+def test_own_messages_are_ignored():
+    redis_client = MagicMock()
+    bus = CacheInvalidationBus(redis_client)
+    listener = MagicMock()
+    bus.add_listener(listener)
+
+    bus.publish_keys(["a", "b"], source=listener)
+    _deliver(redis_client, bus)
+
+    listener.assert_not_called()
+    assert bus.received_messages == 0
+
+
+def test_empty_prefix_is_never_published_nor_applied():
+    redis_client = MagicMock()
+    bus = CacheInvalidationBus(redis_client)
+    listener = MagicMock()
+    bus.add_listener(listener)
+
+    bus.publish_prefix("")
+    redis_client.publish.assert_not_called()
+
+    # Mensagem de um publicador antigo pedindo prefixo vazio não limpa o L1
+    bus._on_message({"data": '{"origin": "outro", "keys": [], "prefixes": [""]}'})
+    listener.assert_not_called()
+    bus._on_message({"data": '{"origin": "outro", "keys": ["k"], "prefixes": ["", "p:"]}'})
+    listener.assert_called_once_with(["k"], ["p:"])
+
+
+def test_removed_listener_stops_receiving():
+    bus = CacheInvalidationBus(MagicMock())
+    listener = MagicMock()
+    bus.add_listener(listener)
+    bus.remove_listener(listener)
+
+    bus._on_message({"data": '{"origin": "outro", "keys": ["k"], "prefixes": []}'})
+
+    listener.assert_not_called()
+
+
+def test_shared_bus_is_reused_per_server_and_channel(monkeypatch):
+    monkeypatch.setattr(invalidation, "_shared_buses", {})
+    monkeypatch.setattr(CacheInvalidationBus, "start", lambda self: True)
+    first, second = MagicMock(), MagicMock()
+    for client in (first, second):
+        client.connection_pool.connection_kwargs = {"host": "redis", "port": 6379, "db": 0}
+
+    hub_bus = get_invalidation_bus(first, channel="cache:invalidate:hub")
+
+    assert get_invalidation_bus(second, channel="cache:invalidate:hub") is hub_bus
+    assert get_invalidation_bus(first, channel="cache:invalidate:tools") is not hub_bus
+
+
+def test_publication_reaches_other_listeners_of_the_same_process():
+    redis_client = MagicMock()
+    bus = CacheInvalidationBus(redis_client)
+    publisher, peer = MagicMock(), MagicMock()
+    bus.add_listener(publisher)
+    bus.add_listener(peer)
+
+    bus.publish_key("produto:1", source=publisher)
+    bus.publish_prefix("regras:", source=publisher)
+    # O eco vindo do Redis tem a origem do processo e não é reaplicado
+    _deliver(redis_client, bus)
+
+    publisher.assert_not_called()
+    assert peer.call_count == 2
+    peer.assert_any_call(["produto:1"], [])
+    peer.assert_any_call([], ["regras:"])
+
+
+def test_closed_two_level_cache_leaves_the_shared_bus():
+    from redis import Redis
+
+    from src.tools.cache_tools import TwoLevelCache
+
+    redis_client = MagicMock(spec=Redis)
+    bus = CacheInvalidationBus(redis_client)
+    first = TwoLevelCache(redis_client=redis_client, invalidation_bus=bus)
+    second = TwoLevelCache(redis_client=redis_client, invalidation_bus=bus)
+    second.local_cache["k"] = {"value": 1, "last_accessed": 0, "expires_at": float("inf")}
+
+    first.delete("k")
+    assert "k" not in second.local_cache
+
+    first.close()
+    second.close()
+    assert bus._listeners == []
@@ -0,0 +1,156 @@
+"""
+Testes unitários para o ConversationContextService (carregamento em um único round-trip e escrita de variáveis em lote).
+"""
+
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.core.async_processing import BlockingCallExecutor
+from src.services.data.conversation_context_service import ConversationContextService
+
+
+@pytest.fixture
+def hub():
+    hub = MagicMock()
+    hub.sqlite_conn = None
+    hub.cache_get_many.return_value = [None, None, None]
+    hub.execute_query.return_value = None
+    return hub
+
+
+@pytest.fixture
+def service(hub):
+    return ConversationContextService(hub)
+
+
+def test_cache_miss_loads_context_messages_and_variables_in_one_query(service, hub):
+    hub.execute_query.return_value = {
+        "context": {"id": 7, "conversation_id": "c1", "status": "open", "metadata": '{"canal": "whatsapp"}',
+                    "created_at": "2024-01-01T10:00:00"},
+        "messages": [{"id": 1, "content": "oi", "metadata": None}, {"id": 2, "content": "tudo bem?", "metadata": "{}"}],
+        "variables": {"nome": "\"Ana\"", "idade": "30", "nota": "texto livre"}
+    }
+
+    context = service.get_context("c1")
+
+    hub.cache_get_many.assert_called_once_with(["context:c1", "messages:c1", "variables:c1"])
+    hub.execute_query.assert_called_once()
+    assert context["id"] == 7 and context["metadata"] == {"canal": "whatsapp"}
+    assert [m["id"] for m in context["messages"]] == [1, 2] and context["messages"][0]["metadata"] == {}
+    assert context["variables"] == {"nome": "Ana", "idade": 30, "nota": "texto livre"}
+    # Uma única escrita em lote para as três chaves
+    cached = hub.cache_set_many.call_args.args[0]
+    assert set(cached) == {"context:c1", "messages:c1", "variables:c1"}
+    hub.cache_set.assert_not_called()
+
+
+def test_cached_messages_and_variables_take_precedence_over_database(service, hub):
+    cached_messages = [{"id": 9, "content": "só no cache"}]
+    hub.cache_get_many.return_value = [None, cached_messages, {"etapa": "checkout"}]
+    hub.execute_query.return_value = {"context": None, "messages": [], "variables": {}}
+
+    context = service.get_context("c2")
+
+    assert context["status"] == "new"
+    assert context["messages"] == cached_messages and context["variables"] == {"etapa": "checkout"}
+    assert set(hub.cache_set_many.call_args.args[0]) == {"context:c2"}
+
+
+def test_cached_context_skips_database(service, hub):
+    hub.cache_get_many.return_value = [{"conversation_id": "c3", "messages": [], "variables": {}}, None, None]
+
+    assert service.get_context("c3")["conversation_id"] == "c3"
+    hub.execute_query.assert_not_called()
+
+
+def test_batch_writes_coalesce_variables_into_one_upsert(service, hub):
+    hub.cache_get.return_value = {"etapa": "inicio"}
+    hub.execute_values.return_value = True
+
+    with service.batch_writes():
+        for i in range(10):
+            service.set_variable("c1", f"var{i}", i)
+        service.set_variable("c1", "var0", "sobrescrita")
+        service.set_variable("c2", "etapa", {"nome": "checkout"})
+        # Leituras dentro do bloco já enxergam as escritas pendentes
+        assert service.get_variables("c1")["var0"] == "sobrescrita"
+        hub.execute_values.assert_not_called()
+
+    hub.execute_values.assert_called_once()
+    query, rows = hub.execute_values.call_args.args[:2]
+    assert "ON CONFLICT (conversation_id, variable_key)" in query
+    assert len(rows) == 11 and ("c1", "var0", "sobrescrita") in rows
+    assert ("c2", "etapa", '{"nome": "checkout"}') in rows
+    hub.cache_invalidate_many.assert_called_once_with(
+        ["variables:c1", "context:c1", "variables:c2", "context:c2"]
+    )
+
+
+def test_set_variable_outside_batch_is_a_single_upsert(service, hub):
+    hub.execute_values.return_value = True
+
+    assert service.set_variable("c1", "idade", 30)
+
+    hub.execute_values.assert_called_once()
+    assert hub.execute_values.call_args.args[1] == [("c1", "idade", "30")]
+    hub.execute_query.assert_not_called()
+
+
+def test_set_variables_deletes_and_upserts_in_one_transaction(service, hub):
+    hub.execute_values.return_value = True
+
+    assert service.set_variables("c1", {"etapa": "checkout", "idade": 30})
+
+    # A remoção das variáveis antigas vai no preâmbulo da mesma transação do upsert
+    hub.execute_query.assert_not_called()
+    hub.execute_values.assert_called_once()
+    preamble = hub.execute_values.call_args.kwargs["preamble"]
+    assert len(preamble) == 1 and preamble[0][0].strip().startswith("DELETE FROM conversation_variables")
+    assert preamble[0][1] == {"conversation_id": "c1", "keys": ["etapa", "idade"]}
+
+    hub.execute_values.return_value = False
+    assert service.set_variables("c1", {}) is False
+
+
+def test_batch_opened_in_async_code_collects_writes_from_executor_threads(service, hub):
+    hub.execute_values.return_value = True
+    executor = BlockingCallExecutor(max_concurrency=2)
+
+    async def main():
+        with service.batch_writes():
+            await asyncio.gather(
+                executor.run(service.set_variable, "c1", "etapa", "checkout"),
+                executor.run(service.set_variable, "c1", "idade", 30)
+            )
+            hub.execute_values.assert_not_called()
+
+    asyncio.run(main())
+    executor.shutdown()
+
+    hub.execute_values.assert_called_once()
+    assert sorted(hub.execute_values.call_args.args[1]) == [("c1", "etapa", "checkout"), ("c1", "idade", "30")]
+
+
+def test_hub_crew_processes_message_inside_one_write_batch(service, hub):
+    from src.core.hub import HubCrew
+
+    hub.execute_values.return_value = True
+    hub.services = {"ConversationContextService": service}
+    memory_system = MagicMock()
+    memory_system.retrieve_conversation_context.return_value = {}
+    crew = HubCrew(memory_system=memory_system, data_service_hub=hub)
+
+    def update_context(conversation_id, message, current_context):
+        service.set_variable(conversation_id, "ultima_mensagem", message["content"])
+        service.set_variable(conversation_id, "canal", current_context["channel_type"])
+        hub.execute_values.assert_not_called()
+        return current_context
+
+    crew.__dict__["_context_manager"] = MagicMock(update_context=update_context)
+    crew.__dict__["_route_message"] = MagicMock(return_value={"crew": "general"})
+    crew.process_message({"id": "m1", "content": "oi", "sender_id": "a"}, "c1", "whatsapp")
+
+    hub.execute_values.assert_called_once()
+    assert len(hub.execute_values.call_args.args[1]) == 2
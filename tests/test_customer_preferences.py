@@ -0,0 +1,22 @@
+"""
+Testes unitários para a gravação em lote de preferências de clientes.
+"""
+
+from unittest.mock import MagicMock
+
+from src.services.data.customer_data_service import CustomerDataService
+
+
+def test_set_preferences_writes_all_keys_with_one_upsert():
+    hub = MagicMock()
+    hub.execute_values.return_value = True
+    service = CustomerDataService(hub)
+
+    assert service.set_preferences(42, {"canal": "whatsapp", "marcas": ["A", "B"]})
+
+    hub.execute_values.assert_called_once()
+    query, rows = hub.execute_values.call_args.args[:2]
+    assert "ON CONFLICT (customer_id, preference_key)" in query
+    assert rows == [(42, "canal", "whatsapp"), (42, "marcas", '["A", "B"]')]
+    hub.execute_query.assert_not_called()
+    hub.cache_invalidate.assert_called_once_with("42", "customers")
@@ -0,0 +1,165 @@
+"""
+Testes unitários para a sincronização em lote do DataSyncService.
+"""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.services.data_sync_service import DataSyncService
+
+
+def _product(product_id):
+    return {
+        "id": product_id, "name": f"Produto {product_id}", "description": "",
+        "category_id": 1, "active": True, "price": 10
+    }
+
+
+@pytest.fixture
+def sync_service():
+    embedding_service = MagicMock()
+    embedding_service.get_batch_embeddings.side_effect = lambda texts, batch_size=20: [[0.1, 0.2] for _ in texts]
+    redis_client = MagicMock()
+    redis_client.get.return_value = None
+    service = DataSyncService(
+        db_connection_string="postgresql://test", qdrant_url="http://localhost:6333",
+        embedding_service=embedding_service, redis_client=redis_client
+    )
+    service.qdrant_client = MagicMock()
+    service.qdrant_client.scroll.return_value = ([], None)
+    service._iter_pages = MagicMock(return_value=iter([]))
+    return service
+
+
+def _embedded_batches(service):
+    """Tamanho de cada chamada de embeddings feita pelo serviço."""
+    return [len(c.args[0]) for c in service.embedding_service.get_batch_embeddings.call_args_list]
+
+
+def test_full_sync_embeds_and_upserts_once_per_batch(sync_service):
+    service = sync_service
+    service._iter_pages.return_value = iter([[_product(i) for i in range(1, 4)], [_product(i) for i in range(4, 6)]])
+
+    assert service.full_sync_products(batch_size=3, max_in_flight=2)
+
+    assert _embedded_batches(service) == [3, 2]
+    assert service.qdrant_client.upsert.call_count == 2
+    stats = service.last_sync_stats["products"]
+    assert stats["scanned"] == 5 and stats["synced"] == 5 and stats["failed"] == 0
+    # Sincronização completa sem falhas remove o checkpoint
+    service.redis_client.delete.assert_any_call("sync:checkpoint:products")
+
+
+def test_full_sync_checkpoint_stops_at_failed_batch(sync_service):
+    service = sync_service
+    service._iter_pages.return_value = iter([[_product(1), _product(2)], [_product(3), _product(4)], [_product(5)]])
+    service.embedding_service.get_batch_embeddings.side_effect = [
+        [[0.1, 0.2]] * 2, RuntimeError("falha simulada"), [[0.1, 0.2]]
+    ]
+
+    service.full_sync_products(batch_size=2, max_in_flight=1)
+
+    saved = [c.args for c in service.redis_client.set.call_args_list]
+    assert saved == [("sync:checkpoint:products", 2)]
+    assert service.last_sync_stats["products"]["failed"] == 2
+
+
+def test_incremental_sync_only_reembeds_changed_text(sync_service):
+    from types import SimpleNamespace
+    from src.utils.text_processor import prepare_product_text
+
+    unchanged, repriced, renamed, new = _product(1), _product(2), _product(3), _product(4)
+    service = sync_service
+    service._iter_pages.return_value = iter([[unchanged, repriced, renamed, new]])
+
+    def stored(row, **old_values):
+        # Ponto gravado no Qdrant a partir da versão anterior da linha
+        old = dict(row, **old_values)
+        payload = service._point_payload(old, prepare_product_text(old), service._product_payload)
+        return SimpleNamespace(id=row["id"], payload=payload)
+
+    service.qdrant_client.retrieve.return_value = [
+        stored(unchanged), stored(repriced, price=99), stored(renamed, name="Antigo")
+    ]
+
+    stats = service.incremental_sync_products()
+
+    # Só o produto renomeado e o novo geram embeddings, em uma única chamada
+    assert _embedded_batches(service) == [2]
+    assert stats["scanned"] == 4
+    assert stats["embedded"] == 2
+    assert stats["payload_updated"] == 1
+    assert stats["skipped"] == 1
+    operations = service.qdrant_client.batch_update_points.call_args.kwargs["update_operations"]
+    assert [op.set_payload.points for op in operations] == [[2]]
+
+
+def test_sync_products_batches_changed_ids_and_removes_deleted(sync_service):
+    service = sync_service
+    service._fetch_rows = MagicMock(return_value=[_product(1), _product(2)])
+    service.qdrant_client.retrieve.return_value = []
+
+    stats = service.sync_products([2, 1, 3, 2])
+
+    # Uma leitura e uma chamada de embeddings para todos os IDs alterados
+    service._fetch_rows.assert_called_once_with("products", [1, 2, 3])
+    assert _embedded_batches(service) == [2]
+    assert stats["embedded"] == 2
+    assert stats["deleted"] == 1
+    service.qdrant_client.delete.assert_called_once_with(collection_name="products", points_selector=[3])
+
+
+def test_incremental_sync_removes_deactivated_and_deleted_rows(sync_service):
+    from types import SimpleNamespace
+
+    service = sync_service
+    service._iter_pages.return_value = iter([[_product(1), dict(_product(2), active=False),
+                                              dict(_product(3), active=False)]])
+    # Qdrant ainda tem o 1 (que precisa de embedding), o 2 (desativado) e o 5 (apagado no PostgreSQL)
+    service.qdrant_client.retrieve.side_effect = [[SimpleNamespace(id=2)], []]
+    service.qdrant_client.scroll.return_value = (
+        [SimpleNamespace(id=1), SimpleNamespace(id=2), SimpleNamespace(id=5)], None
+    )
+
+    stats = service.incremental_sync_products()
+
+    assert _embedded_batches(service) == [1]
+    assert stats["embedded"] == 1 and stats["deleted"] == 2
+    deleted = [c.kwargs["points_selector"] for c in service.qdrant_client.delete.call_args_list]
+    assert deleted == [[2], [5]]
+
+
+def test_sync_product_shares_the_incremental_path(sync_service):
+    from types import SimpleNamespace
+    from src.utils.text_processor import prepare_product_text
+
+    service = sync_service
+    search_cache = MagicMock()
+    service.search_caches = dict(service.search_caches, product=(search_cache, "category_id"))
+    old = dict(_product(1), price=99)
+    stored = SimpleNamespace(
+        id=1, payload=service._point_payload(old, prepare_product_text(old), service._product_payload)
+    )
+    service.qdrant_client.retrieve.return_value = [stored]
+
+    # Alteração só de preço: set_payload, sem embedding e sem trocar a geração do catálogo
+    service._fetch_rows = MagicMock(return_value=[_product(1)])
+    assert service.sync_product(1)
+    assert _embedded_batches(service) == []
+    service.qdrant_client.upsert.assert_not_called()
+    service.qdrant_client.batch_update_points.assert_called_once()
+    search_cache.bump.assert_not_called()
+    search_cache.invalidate_tags.assert_called_with([1])
+
+    # Produto desativado sai do Qdrant em vez de ser regravado com active=False
+    service._fetch_rows = MagicMock(return_value=[dict(_product(1), active=False)])
+    assert service.sync_product(1)
+    service.qdrant_client.delete.assert_called_once_with(collection_name="products", points_selector=[1])
+    service.qdrant_client.upsert.assert_not_called()
+
+    # Regra apagada no PostgreSQL também é removida
+    service._fetch_rows = MagicMock(return_value=[])
+    assert service.sync_business_rule(7)
+    service._fetch_rows.assert_called_once_with("business_rules", [7])
+    service.qdrant_client.delete.assert_called_with(collection_name="business_rules", points_selector=[7])
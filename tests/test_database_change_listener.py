@@ -0,0 +1,178 @@
+"""
+Testes unitários para o buffer de notificações do DatabaseChangeListener.
+"""
+
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+asyncpg = pytest.importorskip("asyncpg")
+
+from src.services.database_change_listener import DatabaseChangeListener
+
+
+def _notification(entity_id, operation="UPDATE"):
+    return json.dumps({"id": entity_id, "operation": operation})
+
+
+@pytest.fixture
+def sync_service():
+    service = MagicMock()
+    service.sync_products.return_value = {"failed": 0}
+    service.sync_business_rules.return_value = {"failed": 0}
+    return service
+
+
+@pytest.fixture
+def listener(sync_service):
+    return DatabaseChangeListener(
+        sync_service, db_connection_string="postgresql://test",
+        debounce_seconds=0.1, max_batch_size=100, max_pending=1000, resync_on_start=False,
+        retry_delay=0
+    )
+
+
+def _connection():
+    """Conexão asyncpg simulada: métodos de consulta assíncronos, is_closed e listeners síncronos."""
+    conn = AsyncMock()
+    conn.is_closed = MagicMock(return_value=False)
+    conn.add_termination_listener = MagicMock()
+    return conn
+
+
+async def _run_flush_loop(listener):
+    """Inicia o loop de descarga como o start() faz, sem conectar ao PostgreSQL."""
+    listener.running = True
+    listener._wakeup = asyncio.Event()
+    listener._flush_task = asyncio.create_task(listener._flush_loop())
+
+
+async def _stop_flush_loop(listener):
+    listener.running = False
+    listener._wakeup.set()
+    await asyncio.wait_for(listener._flush_task, timeout=1)
+
+
+def test_repeated_notifications_of_same_id_are_coalesced(listener):
+    listener._wakeup = asyncio.Event()
+
+    listener._enqueue_change("products", _notification(1, "INSERT"))
+    listener._enqueue_change("products", _notification(2))
+    listener._enqueue_change("products", _notification(1, "UPDATE"))
+    listener._enqueue_change("products", _notification(1, "DELETE"))
+    listener._enqueue_change("products", "payload inválido")
+
+    # A ordem de chegada é preservada e vale a última operação de cada ID
+    assert listener._pending["products"] == {1: "DELETE", 2: "UPDATE"}
+    assert listener.stats["received"] == 4 and listener.stats["coalesced"] == 2
+
+
+def test_pending_ids_are_synced_in_one_batch_after_debounce_window(listener, sync_service):
+    async def main():
+        await _run_flush_loop(listener)
+        for entity_id in (3, 1, 3, 2):
+            listener._enqueue_change("products", _notification(entity_id))
+        await asyncio.sleep(0.03)
+        # Ainda dentro da janela: nada sincronizado
+        assert not sync_service.sync_products.called
+        await asyncio.sleep(0.2)
+        await _stop_flush_loop(listener)
+
+    asyncio.run(main())
+
+    sync_service.sync_products.assert_called_once_with([3, 1, 2], 100)
+    assert listener.stats["batches"] == 1
+
+
+def test_full_buffer_is_flushed_before_debounce_window(listener, sync_service):
+    listener.debounce_seconds = 10
+    listener.max_batch_size = 3
+
+    async def main():
+        await _run_flush_loop(listener)
+        for entity_id in (1, 2, 3):
+            listener._enqueue_change("business_rules", _notification(entity_id))
+        await asyncio.sleep(0.1)
+        flushed = sync_service.sync_business_rules.call_args
+        await _stop_flush_loop(listener)
+        return flushed
+
+    flushed = asyncio.run(main())
+
+    assert flushed.args == ([1, 2, 3], 3)
+
+
+def test_overflow_drops_notifications_and_schedules_resync(listener, sync_service):
+    listener.max_pending = 2
+
+    async def main():
+        await _run_flush_loop(listener)
+        for entity_id in (1, 2, 3, 4):
+            listener._enqueue_change("products", _notification(entity_id))
+        assert listener._needs_resync == {"products"}
+        await _stop_flush_loop(listener)
+
+    asyncio.run(main())
+
+    assert listener.stats["dropped"] == 2
+    sync_service.sync_products.assert_called_once_with([1, 2], 100)
+    # As notificações descartadas são recuperadas pela sincronização incremental
+    sync_service.incremental_sync_products.assert_called_once_with()
+    assert listener._needs_resync == set() and listener.stats["resyncs"] == 1
+
+
+def test_pending_changes_are_flushed_when_listener_stops(listener, sync_service, monkeypatch):
+    monkeypatch.setattr(asyncpg, "connect", AsyncMock(return_value=_connection()))
+    listener.debounce_seconds = 60
+
+    async def main():
+        started = asyncio.create_task(listener.start())
+        await asyncio.sleep(0.05)
+        listener._enqueue_change("products", _notification(7))
+        listener.stop()
+        await asyncio.wait_for(started, timeout=3)
+
+    asyncio.run(main())
+
+    # A janela de 60s não é esperada: o buffer é descarregado ao parar
+    sync_service.sync_products.assert_called_once_with([7], 100)
+
+
+def test_lost_connection_is_reestablished_and_triggers_resync(listener, sync_service, monkeypatch):
+    first, second = _connection(), _connection()
+    connect = AsyncMock(side_effect=[first, second])
+    monkeypatch.setattr(asyncpg, "connect", connect)
+
+    async def main():
+        started = asyncio.create_task(listener.start())
+        await asyncio.sleep(0.05)
+        # O PostgreSQL encerra a conexão do LISTEN
+        first.is_closed.return_value = True
+        first.add_termination_listener.call_args.args[0](first)
+        await asyncio.sleep(0.1)
+        listener.stop()
+        await asyncio.wait_for(started, timeout=3)
+
+    asyncio.run(main())
+
+    assert connect.await_count == 2 and listener.stats["reconnects"] == 1
+    second.add_listener.assert_any_await('product_changes', listener._on_product_change)
+    # As notificações perdidas sem conexão são recuperadas pela sincronização incremental
+    sync_service.incremental_sync_products.assert_called_once_with()
+    sync_service.incremental_sync_business_rules.assert_called_once_with()
+
+
+def test_failed_flush_schedules_resync_without_new_notifications(listener, sync_service):
+    sync_service.sync_products.side_effect = RuntimeError("Qdrant indisponível")
+
+    async def main():
+        await _run_flush_loop(listener)
+        listener._enqueue_change("products", _notification(1))
+        await asyncio.sleep(0.3)
+        resynced = sync_service.incremental_sync_products.called
+        await _stop_flush_loop(listener)
+        return resynced
+
+    assert asyncio.run(main())
@@ -0,0 +1,89 @@
+"""
+Testes unitários para o pool de conexões PostgreSQL (psycopg2 simulado).
+"""
+
+from unittest.mock import MagicMock
+
+import psycopg2
+import pytest
+from psycopg2 import extensions
+
+from src.core import db_pool
+from src.core.db_pool import PoolTimeoutError, PostgresConnectionPool
+
+
+@pytest.fixture
+def pg_pool(monkeypatch):
+    """Pool com max_size=2 sobre um ThreadedConnectionPool simulado."""
+    raw_pool = MagicMock()
+
+    def getconn():
+        conn = MagicMock(closed=0)
+        conn.get_transaction_status.return_value = extensions.TRANSACTION_STATUS_IDLE
+        return conn
+
+    raw_pool.getconn.side_effect = getconn
+    monkeypatch.setattr(db_pool, "ThreadedConnectionPool", MagicMock(return_value=raw_pool))
+    pool = PostgresConnectionPool("localhost", 5432, "user", "secret", "db", max_size=2, timeout=0.05)
+    return pool, raw_pool
+
+
+def test_borrowed_connection_is_returned_to_pool(pg_pool):
+    pool, raw_pool = pg_pool
+
+    with pool.connection() as conn:
+        assert conn.autocommit is True
+        assert pool.stats()["in_use"] == 1
+
+    raw_pool.putconn.assert_called_once_with(conn, close=False)
+    stats = pool.stats()
+    assert stats["in_use"] == 0 and stats["checkouts"] == 1 and stats["discarded_connections"] == 0
+
+
+def test_connection_is_returned_when_block_raises(pg_pool):
+    pool, raw_pool = pg_pool
+
+    with pytest.raises(ValueError):
+        with pool.connection() as conn:
+            conn.get_transaction_status.return_value = extensions.TRANSACTION_STATUS_INERROR
+            raise ValueError("consulta inválida")
+
+    # Transação abortada é desfeita, e a conexão volta ao pool
+    conn.rollback.assert_called_once()
+    raw_pool.putconn.assert_called_once_with(conn, close=False)
+    assert pool.stats()["in_use"] == 0
+
+
+def test_broken_connection_is_discarded(pg_pool):
+    pool, raw_pool = pg_pool
+
+    with pytest.raises(psycopg2.OperationalError):
+        with pool.connection() as conn:
+            raise psycopg2.OperationalError("servidor caiu")
+
+    raw_pool.putconn.assert_called_once_with(conn, close=True)
+    assert pool.stats()["discarded_connections"] == 1
+
+
+def test_exhausted_pool_times_out_and_recovers(pg_pool):
+    pool, _ = pg_pool
+
+    with pool.connection(), pool.connection():
+        with pytest.raises(PoolTimeoutError):
+            with pool.connection():
+                pass
+        assert pool.stats()["saturation"] == 1.0
+
+    assert pool.stats()["timeouts"] == 1
+    with pool.connection():
+        assert pool.stats()["in_use"] == 1
+
+
+def test_transaction_commits_and_restores_autocommit(pg_pool):
+    pool, _ = pg_pool
+
+    with pool.transaction() as conn:
+        assert conn.autocommit is False
+
+    conn.__exit__.assert_called_once()
+    assert conn.autocommit is True
@@ -0,0 +1,114 @@
+"""
+Testes unitários para o cache binário de embeddings.
+"""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from src.services.embedding_service import EmbeddingService, decode_embedding, encode_embedding
+
+
+@pytest.mark.parametrize("dtype,max_bytes,tolerance", [
+    ("float32", 4 + 1536 * 4, 1e-7),
+    ("float16", 4 + 1536 * 2, 1e-3),
+    ("int8", 8 + 1536, 1e-2),
+])
+def test_binary_format_roundtrip(dtype, max_bytes, tolerance):
+    vector = np.random.default_rng(0).uniform(-0.1, 0.1, 1536).astype(np.float32)
+
+    data = encode_embedding(vector.tolist(), dtype)
+    decoded = decode_embedding(data)
+
+    assert len(data) == max_bytes
+    assert decoded.dtype == np.float32
+    assert np.allclose(decoded, vector, atol=tolerance)
+
+
+def test_batch_lookup_uses_single_mget_and_local_cache(monkeypatch):
+    monkeypatch.delenv("REDIS_URL", raising=False)
+    service = EmbeddingService(api_key="test")
+    service.redis_client = MagicMock()
+    service.use_cache = True
+
+    cached = [0.1, 0.2, 0.3]
+    service.redis_client.mget.return_value = [encode_embedding(cached), None]
+    service.backend.client = MagicMock()
+    service.backend.client.embeddings.create.return_value = SimpleNamespace(
+        data=[SimpleNamespace(embedding=[0.5, 0.5, 0.5])],
+        usage=SimpleNamespace(total_tokens=3)
+    )
+
+    results = service.get_batch_embeddings(["em cache", "novo"])
+
+    assert np.allclose(results[0], cached)
+    assert results[1] == [0.5, 0.5, 0.5]
+    service.redis_client.mget.assert_called_once()
+    service.backend.client.embeddings.create.assert_called_once()
+
+    # Segunda consulta é servida pelo LRU em processo, sem ir ao Redis
+    service.redis_client.mget.reset_mock()
+    assert np.allclose(service.get_embedding("novo"), [0.5, 0.5, 0.5])
+    service.redis_client.mget.assert_not_called()
+
+
+def test_hashing_backend_is_deterministic_and_offline():
+    service = EmbeddingService(backend="hashing")
+
+    first = service.get_embedding("Batom vermelho matte")
+    again = EmbeddingService(backend="hashing").get_embedding("batom  VERMELHO matte")
+    related = service.get_embedding("batom vermelho")
+    unrelated = service.get_embedding("agendar consulta")
+
+    assert len(first) == service.dimension == 1536
+    assert np.allclose(first, again)
+    assert np.dot(first, related) > np.dot(first, unrelated)
+    assert service.get_usage_stats()["estimated_cost_usd"] == 0.0
+
+
+def test_backend_is_selectable_per_tenant(monkeypatch):
+    from src.services.embedding_service import get_embedding_service, resolve_backend_name
+
+    monkeypatch.setenv("EMBEDDING_BACKEND", "openai")
+    monkeypatch.setenv("EMBEDDING_BACKEND_LOJA_TESTE", "hashing")
+
+    assert resolve_backend_name("loja-teste") == "hashing"
+    assert resolve_backend_name("outra") == "openai"
+    assert get_embedding_service("loja-teste").backend.name == "hashing"
+    assert get_embedding_service("loja-teste") is get_embedding_service("loja-teste")
+
+
+def test_micro_batcher_coalesces_concurrent_requests():
+    from concurrent.futures import ThreadPoolExecutor
+    from src.services.embedding_service import HashingEmbeddingBackend
+
+    class CountingBackend(HashingEmbeddingBackend):
+        calls = []
+
+        def embed(self, texts):
+            self.calls.append(list(texts))
+            return super().embed(texts)
+
+    backend = CountingBackend(dimension=8)
+    service = EmbeddingService(backend=backend, micro_batching=True)
+    service.batcher.max_wait = 0.05
+
+    texts = ["batom", "perfume", "batom", "creme", "batom", "perfume"]
+    with ThreadPoolExecutor(max_workers=len(texts)) as pool:
+        results = list(pool.map(service.get_embedding, texts))
+
+    assert results[0] == results[2] == results[4]
+    assert sum(len(call) for call in backend.calls) == 3
+    stats = service.get_usage_stats()["micro_batching"]
+    assert stats["requests"] == 6
+    assert stats["deduplicated"] == 3
+    assert stats["batch_size"]["count"] == stats["batches"] == len(backend.calls)
+
+    async def concurrent_queries():
+        return await asyncio.gather(*(service.aget_embedding(t) for t in ["sabonete", "sabonete"]))
+
+    first, second = asyncio.run(concurrent_queries())
+    assert first == second
@@ -0,0 +1,97 @@
+"""
+Testes unitários para o classificador de intenção compilado do hub.
+"""
+
+import os
+import time
+
+from src.core.intent_classifier import DEFAULT_DOMAINS_DIR, IntentClassifier
+
+DOMAIN_YAML = """
+name: Teste
+active: true
+business_rules:
+  - id: 1
+    type: support
+    keywords: ["protetor solar", "pele sensível"]
+    active: true
+  - id: 2
+    type: sales
+    keywords: ["cupom"]
+    active: false
+"""
+
+
+def _write_domain(tmp_path, content=DOMAIN_YAML):
+    path = tmp_path / "teste.yaml"
+    path.write_text(content, encoding="utf-8")
+    return path
+
+
+def test_scores_all_crews_in_one_pass_without_order_overrides(tmp_path):
+    _write_domain(tmp_path)
+    classifier = IntentClassifier(domains_dir=str(tmp_path))
+
+    crew, confidence, scores = classifier.classify("I want to BUY this product, what is the price?")
+
+    # Duas palavras de vendas superam uma de produto, independentemente da ordem das tabelas
+    assert crew == "sales"
+    assert scores["sales"] > 0.8 and scores["product"] == 0.7 and scores["support"] == 0.0
+    assert confidence == min(scores["sales"], 0.95)
+
+
+def test_domain_keywords_are_accent_and_case_insensitive(tmp_path):
+    _write_domain(tmp_path)
+    classifier = IntentClassifier(domains_dir=str(tmp_path))
+
+    crew, confidence, _ = classifier.classify("Qual PROTETOR SOLAR para pele sensivel?")
+
+    assert crew == "support"
+    assert confidence > 0.6
+    # Regras inativas não contribuem e mensagens sem palavras-chave não têm crew
+    assert classifier.classify("tem cupom?")[0] is None
+
+
+def test_keywords_only_match_whole_words(tmp_path):
+    classifier = IntentClassifier(domains_dir=str(tmp_path))
+
+    # "costume" e "helpful" não contêm as palavras "cost" e "help"
+    assert classifier.classify("I love this costume, very helpful")[0] is None
+    assert classifier.classify("what does it cost?")[0] == "sales"
+
+
+def test_default_domains_dir_does_not_depend_on_working_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    # Os YAMLs reais são encontrados mesmo fora da raiz do repositório
+    assert IntentClassifier(domains_dir=DEFAULT_DOMAINS_DIR)._domain_files()
+
+
+def test_reloads_when_domain_file_changes(tmp_path):
+    path = _write_domain(tmp_path)
+    classifier = IntentClassifier(domains_dir=str(tmp_path), reload_interval=0)
+    assert classifier.classify("tem cupom?")[0] is None
+
+    path.write_text(DOMAIN_YAML.replace("active: false", "active: true"), encoding="utf-8")
+    mtime = time.time() + 10
+    os.utime(path, (mtime, mtime))
+
+    assert classifier.classify("tem cupom?")[0] == "sales"
+
+
+def test_throughput_with_real_domains():
+    classifier = IntentClassifier(domains_dir=DEFAULT_DOMAINS_DIR, reload_interval=60)
+    messages = [
+        "Olá, gostaria de saber o preço do hidratante e se tem desconto na primeira compra",
+        "Meu pedido chegou com defeito, preciso de ajuda com a troca",
+        "Quais são os ingredientes do protetor solar para pele oleosa?",
+        "Bom dia!",
+    ] * 2500
+
+    start = time.perf_counter()
+    for message in messages:
+        classifier.score(message)
+    elapsed = time.perf_counter() - start
+
+    # Limite folgado para não depender da máquina; o esperado é bem acima de 10 mil/s
+    assert len(messages) / elapsed > 2000
@@ -0,0 +1,59 @@
+"""
+Testes unitários para o cache local (L1) usado pelo DataServiceHub.
+"""
+
+import time
+
+from src.core.cache.local_cache import LocalCache, MISSING
+
+
+def test_lru_eviction_by_entries():
+    cache = LocalCache(max_entries=2, max_bytes=1024, default_ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    # Acessar "a" torna "b" o menos recentemente usado
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_eviction_by_bytes_budget():
+    cache = LocalCache(max_entries=100, max_bytes=10, default_ttl=60)
+    cache.set("a", "x" * 6)
+    cache.set("b", "y" * 6)
+
+    assert cache.get("a") is MISSING
+    assert cache.get("b") == "y" * 6
+    assert cache.stats()["bytes"] == 6
+    # Valores maiores que o orçamento não são armazenados
+    assert cache.set("c", "z" * 11) is False
+
+
+def test_ttl_expiration_and_stored_objects():
+    cache = LocalCache(max_entries=10, max_bytes=1024, default_ttl=60)
+    context = {"messages": [1, 2, 3]}
+    cache.set("ctx", context, ttl=0.05)
+
+    # O objeto armazenado é retornado sem nova desserialização
+    assert cache.get("ctx") is context
+    time.sleep(0.06)
+    assert cache.get("ctx") is MISSING
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["expirations"] == 1
+
+
+def test_delete_prefix():
+    cache = LocalCache(max_entries=10, max_bytes=1024, default_ttl=60)
+    cache.set("product:1", {"id": 1})
+    cache.set("product:2", {"id": 2})
+    cache.set("customer:1", {"id": 1})
+
+    assert cache.delete_prefix("product:") == 2
+    assert len(cache) == 1
@@ -0,0 +1,49 @@
+"""
+Testes unitários para a busca híbrida de produtos (full-text + vetorial com RRF).
+"""
+
+from unittest.mock import MagicMock
+
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import Distance, PointStruct, VectorParams
+
+from src.services.data.product_data_service import ProductDataService, reciprocal_rank_fusion
+
+
+def test_reciprocal_rank_fusion_rewards_items_found_by_both_sources():
+    scores = reciprocal_rank_fusion([[1, 2, 3], [3, 4]], k=60)
+
+    assert scores[3] == 1 / 63 + 1 / 61
+    assert max(scores, key=scores.get) == 3
+    assert scores[1] > scores[2] == scores[4]
+
+
+def test_hybrid_search_fuses_legs_and_fetches_products_once():
+    hub = MagicMock()
+    products = {i: {"id": i, "name": f"Produto {i}"} for i in range(1, 6)}
+
+    def execute_query(query, params=None, fetch_all=True):
+        if "search_vector" in query:
+            return [{"id": 1}, {"id": 2}, {"id": 3}]
+        return [products[i] for i in params["ids"] if i in products]
+
+    hub.execute_query.side_effect = execute_query
+    qdrant_client = QdrantClient(location=":memory:")
+    qdrant_client.create_collection(
+        collection_name="products", vectors_config=VectorParams(size=2, distance=Distance.COSINE)
+    )
+    # Ordem por similaridade com a consulta [1, 0]: 3, 4, 99
+    qdrant_client.upsert(collection_name="products", points=[
+        PointStruct(id=3, vector=[1.0, 0.0]), PointStruct(id=4, vector=[1.0, 0.5]),
+        PointStruct(id=99, vector=[0.0, 1.0])
+    ])
+    embedding_service = MagicMock()
+    embedding_service.get_embedding.return_value = [1.0, 0.0]
+
+    service = ProductDataService(hub, qdrant_client=qdrant_client, embedding_service=embedding_service)
+    results = service.hybrid_search("creme hidratante", limit=3)
+
+    assert [product["id"] for product in results] == [3, 1, 2]
+    assert results[0]["text_rank"] == 3 and results[0]["vector_rank"] == 1
+    # Uma consulta textual e uma única leitura dos produtos fundidos
+    assert hub.execute_query.call_count == 2
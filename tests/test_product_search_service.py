@@ -0,0 +1,77 @@
+"""
+Testes unitários para o ProductSearchService (busca em lote e resultados servidos pelo payload).
+"""
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.services.product_search_service import ProductSearchService
+
+
+def _hit(product_id, score, age_seconds=0):
+    updated = datetime.now() - timedelta(seconds=age_seconds)
+    return SimpleNamespace(id=product_id, score=score, payload={
+        "name": f"Produto {product_id}", "category_id": 1, "active": True, "price": 10.0,
+        "description": "", "benefits": "", "last_updated": updated.isoformat()
+    })
+
+
+@pytest.fixture
+def search_service():
+    embedding_service = MagicMock()
+    embedding_service.get_batch_embeddings.side_effect = lambda texts: [[0.1] for _ in texts]
+    embedding_service.get_embedding.return_value = [0.2]
+    service = ProductSearchService(
+        db_connection_string="postgresql://test", qdrant_url="http://localhost:6333",
+        embedding_service=embedding_service, payload_max_age=3600
+    )
+    service.qdrant_client = MagicMock()
+    service._get_category_names = MagicMock(return_value={1: "Cabelos"})
+    service._fetch_products = MagicMock(return_value=[])
+    return service
+
+
+def test_batch_search_uses_one_qdrant_request_and_serves_fresh_payload(search_service):
+    search_service.qdrant_client.query_batch_points.return_value = [
+        SimpleNamespace(points=[_hit(1, 0.9), _hit(2, 0.8)]), SimpleNamespace(points=[_hit(3, 0.95)])
+    ]
+
+    results = search_service.search_products_batch(["shampoo", "máscara"], limit=5)
+
+    search_service.qdrant_client.query_batch_points.assert_called_once()
+    assert len(search_service.qdrant_client.query_batch_points.call_args.kwargs["requests"]) == 2
+    assert [p["id"] for p in results[0]] == [1, 2]
+    assert results[1][0]["category_name"] == "Cabelos"
+    # Nenhuma consulta ao PostgreSQL
+    search_service._fetch_products.assert_not_called()
+
+
+def test_stale_payload_falls_back_to_postgres(search_service):
+    search_service.qdrant_client.query_batch_points.return_value = [
+        SimpleNamespace(points=[_hit(1, 0.9, age_seconds=7200)])
+    ]
+    search_service._fetch_products.return_value = [{"id": 1, "name": "Produto 1", "price": 12}]
+
+    results = search_service.search_products("shampoo")
+
+    search_service._fetch_products.assert_called_once_with([1], None)
+    assert results[0]["price"] == 12 and results[0]["score"] == 0.9
+
+
+def test_combined_search_embeds_query_once_for_both_legs(search_service):
+    search_service.qdrant_client.query_batch_points.return_value = [SimpleNamespace(points=[])]
+
+    results = search_service.search("shampoo para cabelo seco")
+
+    assert results == {"products": [], "business_rules": []}
+    search_service.embedding_service.get_embedding.assert_called_once_with("shampoo para cabelo seco")
+    search_service.embedding_service.get_batch_embeddings.assert_not_called()
+    # As duas buscas no Qdrant usam o mesmo vetor
+    vectors = [
+        call.kwargs["requests"][0].query
+        for call in search_service.qdrant_client.query_batch_points.call_args_list
+    ]
+    assert vectors == [[0.2], [0.2]]
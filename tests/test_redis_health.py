@@ -0,0 +1,83 @@
+"""
+Testes unitários para o circuit breaker compartilhado do Redis.
+"""
+
+import gc
+import time
+import weakref
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.core import redis_health
+from src.core.redis_health import CircuitBreaker, CircuitOpenError, CircuitState, get_redis_breaker
+
+
+def failing_call():
+    raise ConnectionError("redis down")
+
+
+def test_breaker_opens_after_threshold_and_rejects_calls():
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=60)
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(failing_call)
+
+    assert breaker.state == CircuitState.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: "ok")
+    assert breaker.stats()["rejected_calls"] == 1
+
+
+def test_half_open_allows_single_trial_and_closes_on_success():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.01)
+    with pytest.raises(ConnectionError):
+        breaker.call(failing_call)
+    time.sleep(0.02)
+
+    assert breaker.state == CircuitState.HALF_OPEN
+    assert breaker.allow_request() is True
+    # Apenas uma operação de teste por vez no estado HALF_OPEN
+    assert breaker.allow_request() is False
+
+    breaker.record_success()
+    assert breaker.state == CircuitState.CLOSED
+
+
+def test_non_connectivity_errors_do_not_open_the_circuit():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=60)
+
+    with pytest.raises(ValueError):
+        breaker.call(lambda: (_ for _ in ()).throw(ValueError("bad data")))
+
+    assert breaker.state == CircuitState.CLOSED
+
+
+def test_half_open_trial_is_released_after_non_connectivity_error():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.01)
+    with pytest.raises(ConnectionError):
+        breaker.call(failing_call)
+    time.sleep(0.02)
+
+    with pytest.raises(ValueError):
+        breaker.call(lambda: (_ for _ in ()).throw(ValueError("bad data")))
+
+    # Outra operação de teste pode ser feita, e o sucesso fecha o circuito
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == CircuitState.CLOSED
+
+
+def test_registry_entry_and_monitor_go_away_with_client():
+    client = MagicMock()
+    breaker = get_redis_breaker(client, start_monitor=False)
+    assert get_redis_breaker(client, start_monitor=False) is breaker
+
+    monitor = redis_health._registry[client.connection_pool][1]
+    pool = weakref.ref(client.connection_pool)
+    del client, breaker
+    gc.collect()
+
+    # O registro não mantém o pool vivo, e o monitor não mantém o cliente
+    assert pool() is None
+    assert monitor.redis is None and monitor.check() is False
@@ -0,0 +1,112 @@
+"""
+Testes unitários para o cache semântico de decisões de roteamento.
+"""
+
+from unittest.mock import MagicMock
+
+from src.core.cache.route_cache import SemanticRouteCache
+from src.core.hub import TieredRouter
+from src.core.intent_classifier import IntentClassifier
+
+DECISION = {"crew": "sales", "confidence": 0.7, "reasoning": "LLM", "source": "keywords"}
+
+
+def test_reuses_decision_of_similar_message_in_same_scope():
+    cache = SemanticRouteCache(threshold=0.9)
+    cache.set([1.0, 0.0, 0.1], DECISION, "whatsapp", "cosmeticos")
+
+    hit = cache.get([1.0, 0.02, 0.1], "whatsapp", "cosmeticos")
+
+    assert hit["crew"] == "sales" and hit["similarity"] > 0.9
+    # Outro canal, outro domínio ou mensagem pouco similar não compartilham a decisão
+    assert cache.get([1.0, 0.02, 0.1], "instagram", "cosmeticos") is None
+    assert cache.get([1.0, 0.02, 0.1], "whatsapp", "saude") is None
+    assert cache.get([0.0, 1.0, 0.0], "whatsapp", "cosmeticos") is None
+
+
+def test_expired_and_rule_changed_entries_are_not_served():
+    cache = SemanticRouteCache(threshold=0.9, ttl=-1)
+    cache.set([1.0, 0.0], DECISION, "whatsapp")
+    assert cache.get([1.0, 0.0], "whatsapp") is None
+    assert cache.stats()["entries"] == 0
+
+    cache = SemanticRouteCache(threshold=0.9)
+    cache.set([1.0, 0.0], DECISION, "whatsapp", signatures={"sales": "v1", "support": "v1"})
+    cache.set([0.0, 1.0], {**DECISION, "crew": "support"}, "whatsapp", signatures={"sales": "v1", "support": "v1"})
+
+    # Apenas as regras de vendas mudaram
+    signatures = {"sales": "v2", "support": "v1"}
+    assert cache.get([1.0, 0.0], "whatsapp", signatures=signatures) is None
+    assert cache.get([0.0, 1.0], "whatsapp", signatures=signatures)["crew"] == "support"
+
+    cache.invalidate_crew("support")
+    assert cache.get([0.0, 1.0], "whatsapp", signatures=signatures) is None
+
+
+def test_router_serves_llm_decision_to_similar_message_from_other_customer():
+    embedding_service = MagicMock()
+    embedding_service.get_embedding.return_value = [0.3, 0.9]
+    router = TieredRouter(
+        classifier=IntentClassifier(), embedding_service=embedding_service,
+        use_centroids=False, semantic_cache=SemanticRouteCache(threshold=0.9)
+    )
+    fallback = MagicMock(return_value=DECISION)
+    context = {"channel_type": "whatsapp", "domain": "cosmeticos"}
+
+    first = router.route({"id": "1", "content": "quanto sai o sérum?"}, {**context, "customer_id": "a"}, fallback)
+    second = router.route({"id": "2", "content": "quanto sai o serum"}, {**context, "customer_id": "b"}, fallback)
+
+    assert first["tier"] == "llm"
+    assert second["tier"] == "semantic_cache" and second["crew"] == "sales"
+    fallback.assert_called_once()
+
+
+def test_router_does_not_cache_history_default_or_low_confidence_decisions():
+    embedding_service = MagicMock()
+    embedding_service.get_embedding.return_value = [0.3, 0.9]
+    cache = SemanticRouteCache(threshold=0.9, min_confidence=0.6)
+    router = TieredRouter(
+        classifier=IntentClassifier(), embedding_service=embedding_service,
+        use_centroids=False, semantic_cache=cache
+    )
+    decisions = [
+        {"crew": "support", "confidence": 0.6, "reasoning": "Customer has recent support tickets",
+         "source": "customer_history"},
+        {"crew": "general", "confidence": 0.5, "reasoning": "Default routing to general crew", "source": "default"},
+        {**DECISION, "confidence": 0.55},
+    ]
+
+    for decision in decisions:
+        result = router.route({"id": "1", "content": "oi, tudo bem?"}, {"customer_id": "a"},
+                              MagicMock(return_value=decision))
+        assert result["tier"] == "llm"
+
+    assert cache.stats()["entries"] == 0 and cache.stats()["skipped"] == 1
+
+
+def test_qdrant_store_overwrites_repeated_messages_and_removes_expired_points():
+    qdrant_client = MagicMock()
+    qdrant_client.get_collections.return_value.collections = []
+    cache = SemanticRouteCache(qdrant_client=qdrant_client, cleanup_interval=0)
+
+    cache.set([1.0, 0.0], DECISION, "whatsapp")
+    cache.set([1.0, 0.0001], DECISION, "whatsapp")
+    cache.set([1.0, 0.0], DECISION, "instagram")
+
+    ids = [call.kwargs["points"][0].id for call in qdrant_client.upsert.call_args_list]
+    # Mesmo embedding (quantizado) e escopo reutilizam o ponto; outro canal não
+    assert ids[0] == ids[1] and ids[0] != ids[2]
+    # Decisões expiradas são apagadas por filtro em expires_at
+    selector = qdrant_client.delete.call_args.kwargs["points_selector"]
+    assert selector.filter.must[0].key == "expires_at"
+
+
+def test_qdrant_stale_hit_is_deleted():
+    qdrant_client = MagicMock()
+    hit = MagicMock(id="p1", score=0.99, payload={"decision": DECISION, "expires_at": 0})
+    qdrant_client.query_points.return_value.points = [hit]
+    cache = SemanticRouteCache(qdrant_client=qdrant_client)
+
+    assert cache.get([1.0, 0.0], "whatsapp") is None
+
+    qdrant_client.delete.assert_called_once_with(collection_name="route_cache", points_selector=["p1"])
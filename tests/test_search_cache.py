@@ -0,0 +1,84 @@
+"""
+Testes unitários para o cache de resultados de busca (gerações e tags).
+"""
+
+from src.core.cache.search_cache import SearchResultCache
+
+
+class _FakeRedis:
+    """Subconjunto mínimo de comandos Redis usados pelo SearchResultCache."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def setex(self, key, ttl, value):
+        self.data[key] = value
+
+    def incr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) + 1
+        return self.data[key]
+
+    def sadd(self, key, member):
+        self.data.setdefault(key, set()).add(member)
+
+    def expire(self, key, ttl):
+        return True
+
+    def smembers(self, key):
+        return set(self.data.get(key, set()))
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def pipeline(self, transaction=False):
+        return _FakePipeline(self)
+
+
+class _FakePipeline:
+    def __init__(self, redis_client):
+        self.redis_client = redis_client
+        self.results = []
+
+    def __getattr__(self, name):
+        def command(*args):
+            self.results.append(getattr(self.redis_client, name)(*args))
+        return command
+
+    def execute(self):
+        return self.results
+
+
+def test_generation_bump_invalidates_catalogue_and_category_searches():
+    cache = SearchResultCache(_FakeRedis(), "product_search")
+    params = {"query": "shampoo", "limit": 5, "min_score": 0.7}
+
+    all_key = cache.build_key(params)
+    cat1_key = cache.build_key(params, scope=1)
+    cat2_key = cache.build_key(params, scope=2)
+    for key in (all_key, cat1_key, cat2_key):
+        cache.set(key, [{"id": 1}])
+
+    cache.bump(scopes=[1])
+
+    assert cache.build_key(params) != all_key
+    assert cache.build_key(params, scope=1) != cat1_key
+    # Outras categorias não são afetadas
+    assert cache.build_key(params, scope=2) == cat2_key
+    assert cache.get(cat2_key) == [{"id": 1}]
+
+
+def test_tag_invalidation_only_removes_searches_that_returned_the_item():
+    cache = SearchResultCache(_FakeRedis(), "product_search")
+    with_item = cache.build_key({"query": "shampoo"})
+    without_item = cache.build_key({"query": "condicionador"})
+    cache.set(with_item, [{"id": 1}, {"id": 2}], tags=[1, 2])
+    cache.set(without_item, [{"id": 3}], tags=[3])
+
+    assert cache.invalidate_tags([2]) == 1
+
+    assert cache.get(with_item) is None
+    assert cache.get(without_item) == [{"id": 3}]
@@ -0,0 +1,98 @@
+"""
+Testes unitários para o índice vetorial em memória.
+"""
+
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import threading
+
+import numpy as np
+import pytest
+
+from src.services import vector_index
+from src.services.vector_index import InMemoryVectorIndex, MemoryLimitExceeded, get_vector_index, resolve_index_mode
+
+
+def _record(point_id, vector, **payload):
+    return SimpleNamespace(id=point_id, vector=vector, payload=dict(active=True, **payload))
+
+
+def test_search_returns_exact_top_k_with_payload_filter():
+    index = InMemoryVectorIndex("products")
+    index.upsert([
+        (1, [1.0, 0.0], {"active": True}),
+        (2, [0.8, 0.6], {"active": True}),
+        (3, [0.99, 0.1], {"active": False}),
+        (4, [0.0, 1.0], {"active": True}),
+    ])
+
+    hits = index.search([2.0, 0.0], limit=2, must={"active": True})
+
+    assert [hit.id for hit in hits] == [1, 2]
+    assert hits[0].score == pytest.approx(1.0)
+    assert index.search([1.0, 0.0], limit=5, score_threshold=0.9, must={"active": True})[0].id == 1
+
+
+def test_upsert_replaces_and_remove_compacts():
+    index = InMemoryVectorIndex("products")
+    index.upsert([(1, [1.0, 0.0], {}), (2, [0.0, 1.0], {})])
+    index.upsert([(1, [0.0, 1.0], {"name": "novo"})])
+    index.remove([2])
+
+    hits = index.search([0.0, 1.0], limit=5)
+
+    assert len(index) == 1
+    assert hits[0].id == 1 and hits[0].payload == {"name": "novo"}
+
+
+def test_memory_ceiling_and_refresh_from_qdrant():
+    index = InMemoryVectorIndex("products", max_bytes=2 * 2 * np.dtype(np.float32).itemsize)
+    qdrant_client = MagicMock()
+    qdrant_client.scroll.return_value = ([_record(1, [1.0, 0.0]), _record(2, [0.0, 1.0])], None)
+    assert index.load_from_qdrant(qdrant_client)
+
+    # Ponto 2 removido no Qdrant, ponto 1 alterado
+    qdrant_client.retrieve.return_value = [_record(1, [0.6, 0.8], name="atualizado")]
+    index.refresh_from_qdrant(qdrant_client, [1, 2])
+    assert len(index) == 1 and index.search([0.6, 0.8], limit=1)[0].payload["name"] == "atualizado"
+
+    with pytest.raises(MemoryLimitExceeded):
+        index.upsert([(5, [1.0, 1.0], {}), (6, [1.0, 0.0], {})])
+
+
+def test_index_mode_is_selected_per_tenant(monkeypatch):
+    monkeypatch.setenv("VECTOR_INDEX_LOJA_PEQUENA", "memory")
+    monkeypatch.delenv("VECTOR_INDEX", raising=False)
+
+    assert resolve_index_mode("loja-pequena") == "memory"
+    assert resolve_index_mode("outra") == "qdrant"
+
+
+def _wait_for_reloads():
+    for thread in threading.enumerate():
+        if thread.name.startswith("vector-index-reload-"):
+            thread.join(timeout=1)
+
+
+def test_failed_load_is_retried_and_loaded_index_is_reloaded(monkeypatch):
+    monkeypatch.setattr(vector_index, "_shared_indexes", {})
+    qdrant_client = MagicMock()
+    qdrant_client.scroll.side_effect = [
+        ConnectionError("qdrant indisponível"),
+        ([_record(1, [1.0, 0.0])], None),
+        ([_record(1, [1.0, 0.0]), _record(2, [0.0, 1.0])], None),
+    ]
+
+    # A primeira carga falha: as buscas usam o Qdrant até a nova tentativa
+    assert get_vector_index("products", qdrant_client, retry_interval=0) is None
+    get_vector_index("products", qdrant_client, retry_interval=0, reload_interval=0)
+    _wait_for_reloads()
+    index = get_vector_index("products", qdrant_client, reload_interval=3600)
+    assert index is not None and len(index) == 1
+
+    # Recarga periódica: pontos cuja notificação foi perdida passam a aparecer
+    index.next_load_at = 0
+    get_vector_index("products", qdrant_client)
+    _wait_for_reloads()
+    assert len(get_vector_index("products", qdrant_client)) == 2
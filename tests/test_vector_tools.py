@@ -0,0 +1,42 @@
+"""
+Testes unitários para a ferramenta de busca vetorial no Qdrant.
+"""
+
+from unittest.mock import MagicMock
+
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import Distance, PointStruct, VectorParams
+
+from src.tools import vector_tools
+from src.tools.vector_tools import QdrantVectorSearchTool
+
+
+def test_tool_uses_shared_embedding_service_and_query_points(monkeypatch):
+    shared_service = MagicMock()
+    shared_service.get_embedding.return_value = [1.0, 0.0]
+    get_service = MagicMock(return_value=shared_service)
+    monkeypatch.setattr(vector_tools, "get_embedding_service", get_service)
+
+    tool = QdrantVectorSearchTool(
+        qdrant_url="http://localhost:6333", collection_name="regras",
+        openai_api_key="sk-teste", tenant_id="loja"
+    )
+
+    # A chave da OpenAI não cria um serviço próprio: o serviço do tenant é reutilizado
+    get_service.assert_called_once_with("loja")
+    assert tool.embedding_service is shared_service
+
+    tool.qdrant_client = QdrantClient(location=":memory:")
+    tool.qdrant_client.create_collection(
+        collection_name="regras", vectors_config=VectorParams(size=2, distance=Distance.COSINE)
+    )
+    tool.qdrant_client.upsert(collection_name="regras", points=[
+        PointStruct(id=1, vector=[0.0, 1.0], payload={"tipo": "frete"}),
+        PointStruct(id=2, vector=[1.0, 0.1], payload={"tipo": "troca"}),
+    ])
+
+    results = tool.search("posso trocar?")
+
+    assert [result["id"] for result in results] == [2, 1]
+    assert results[0]["payload"] == {"tipo": "troca"}
+    assert [result["id"] for result in tool.search("frete", {"tipo": "frete"})] == [1]
@@ -0,0 +1,37 @@
+"""
+Testes unitários para o agrupamento de mensagens do worker de webhooks.
+"""
+
+from src.webhook.worker import get_conversation_key, is_incoming_message, merge_message_events
+
+
+def _event(message_id, content, message_type="incoming"):
+    # Formato real do Chatwoot: dados da mensagem ficam em "message"
+    return {
+        "event": "message_created",
+        "account": {"id": 1},
+        "conversation": {"id": 123},
+        "contact": {"id": 9, "name": "Ana"},
+        "inbox": {"id": 2, "channel_type": "whatsapp"},
+        "message": {"id": message_id, "content": content, "message_type": message_type}
+    }
+
+
+def test_incoming_messages_are_detected_from_nested_message():
+    assert is_incoming_message(_event(1, "oi"))
+    assert not is_incoming_message(_event(2, "resposta", message_type="outgoing"))
+    assert not is_incoming_message({**_event(3, "oi"), "event": "message_updated"})
+    assert get_conversation_key(_event(1, "oi")) == "123"
+
+
+def test_burst_of_messages_is_merged_into_last_event():
+    events = [_event(1, "oi"), _event(2, None), _event(3, "quanto custa o sérum?")]
+
+    merged = merge_message_events(events)
+
+    assert merged["message"]["id"] == 3
+    assert merged["message"]["content"] == "oi\nquanto custa o sérum?"
+    assert merged["message"]["coalesced_message_ids"] == [1, 2, 3]
+    assert merged["conversation"] == {"id": 123} and is_incoming_message(merged)
+    # Os eventos originais não são alterados
+    assert events[-1]["message"]["content"] == "quanto custa o sérum?"